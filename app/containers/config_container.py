@@ -0,0 +1,329 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.containers.logging_container import LoggingContainer
+from app.containers.metrics_container import MetricsContainer
+from app.models.settings import PROFILES, Caches, Intervals, Limits, Profile, Settings
+
+logger = LoggingContainer.get_logger("Config")
+
+IDLE = MetricsContainer.gauge("bluedrive_idle", "1 while background polling is paused for lack of subscribers")
+CONFIG_RELOADS = MetricsContainer.counter("bluedrive_config_reloads_total", "config.yaml reloads by result", ("result",))
+
+
+def _merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in override.items():
+        merged[key] = _merge(base[key], value) if isinstance(value, dict) and isinstance(base.get(key), dict) else value
+    return merged
+
+
+class ConfigContainer:
+    """Typed settings from config.yaml, reloaded when the file changes, and the idle mode.
+
+    The file picks a profile (responsive, balanced, low-power) and may
+    override any of its values; see app/models/settings.py. Services read
+    ``intervals()``, ``caches()`` and ``limits()`` each time they wait or size something,
+    so a reload applies without a restart; the few that copy a value hold a
+    listener. A profile set at runtime (``set_profile``, e.g. from an
+    ignition hook) is kept in <data dir>/profile and beats the file's;
+    every process watches both, so the owner daemon and its API workers
+    switch together.
+
+    With no WebSocket subscriber for ``idle.after`` seconds the process is
+    idle: ``pause`` holds background pollers (HFP modem check, snapshot
+    saves, the owner's state poll) until one connects, and the loop
+    monitor stops sampling. API workers report
+    their subscribers to the owner daemon, which decides for all of them.
+
+    Settings (environment):
+        BLUEDRIVE_CONFIG        config.yaml
+        BLUEDRIVE_CONFIG_POLL   2 (seconds between file and subscriber checks)
+    """
+
+    path = Path(os.getenv("BLUEDRIVE_CONFIG", "config.yaml"))
+    poll = float(os.getenv("BLUEDRIVE_CONFIG_POLL", "2"))
+
+    _settings = None
+    _profile = None
+    _override = None  # Profile name set at runtime
+    _stamps = None  # (config.yaml, override) (mtime, size), to notice changes
+    _error = None
+    _loaded_at = None
+    _idle = False
+    _quiet_since = None
+    _remote = {}  # source -> (subscribers, monotonic time reported)
+    _listeners = []
+    _cond = threading.Condition()
+    _thread = None
+    _running = False
+    _count_local = True
+    _report = None
+
+    # Settings
+
+    @staticmethod
+    def settings() -> Settings:
+        if ConfigContainer._settings is None:
+            ConfigContainer.reload()
+        return ConfigContainer._settings
+
+    @staticmethod
+    def profile() -> tuple[str, Profile]:
+        """(name, values) of the active profile."""
+        if ConfigContainer._settings is None:
+            ConfigContainer.reload()
+        return ConfigContainer._profile
+
+    @staticmethod
+    def intervals() -> Intervals:
+        return ConfigContainer.profile()[1].intervals
+
+    @staticmethod
+    def caches() -> Caches:
+        return ConfigContainer.profile()[1].caches
+
+    @staticmethod
+    def limits() -> Limits:
+        return ConfigContainer.profile()[1].limits
+
+    @staticmethod
+    def add_listener(callback):
+        """callback() after a reload, a profile switch or an idle/active change (watcher thread)."""
+        ConfigContainer._listeners.append(callback)
+
+    @staticmethod
+    def remove_listener(callback):
+        if callback in ConfigContainer._listeners:
+            ConfigContainer._listeners.remove(callback)
+
+    @staticmethod
+    def reload() -> bool:
+        """Read the files again. An invalid file is logged and the previous settings stay."""
+        import yaml
+        from pydantic import ValidationError
+
+        stamps = ConfigContainer._file_stamps()
+        try:
+            text = ConfigContainer.path.read_text() if ConfigContainer.path.exists() else ""
+            raw = yaml.safe_load(text) or {}
+            if not isinstance(raw, dict):
+                raise ValueError("config.yaml bir eşleme (anahtar: değer) olmalı")
+            profiles = {name: dict(values) for name, values in PROFILES.items()}
+            for name, values in (raw.get("profiles") or {}).items():
+                # A new profile starts from balanced
+                profiles[name] = _merge(profiles.get(name, PROFILES["balanced"]), values or {})
+            settings = Settings(**{**raw, "profiles": profiles})
+            override = ConfigContainer._read_override()
+            name = override or settings.profile
+            if name not in settings.profiles:
+                raise ValueError(f"Bilinmeyen profil: {name}")
+        except (OSError, ValueError, ValidationError, yaml.YAMLError) as e:
+            ConfigContainer._stamps = stamps
+            ConfigContainer._error = str(e)
+            CONFIG_RELOADS.labels("invalid").inc()
+            if ConfigContainer._settings is None:
+                logger.error("❌ %s unusable, built-in balanced profile in use: %s", ConfigContainer.path, e)
+                ConfigContainer._settings = Settings(profiles=PROFILES)
+                ConfigContainer._profile = ("balanced", ConfigContainer._settings.profiles["balanced"])
+            else:
+                logger.error("❌ %s unusable, previous settings kept: %s", ConfigContainer.path, e)
+            return False
+
+        previous = ConfigContainer._profile[0] if ConfigContainer._profile else None
+        with ConfigContainer._cond:
+            ConfigContainer._settings = settings
+            ConfigContainer._profile = (name, settings.profiles[name])
+            ConfigContainer._override = override
+            ConfigContainer._stamps = stamps
+            ConfigContainer._error = None
+            ConfigContainer._loaded_at = time.time()
+            # Wakes pausing pollers so a shorter interval applies now
+            ConfigContainer._cond.notify_all()
+        CONFIG_RELOADS.labels("ok").inc()
+        if previous is None:
+            logger.info("⚙️ Profile %s (%s)", name, "runtime" if override else ConfigContainer.path)
+        elif previous != name:
+            logger.info("⚙️ Profile %s -> %s", previous, name)
+        else:
+            logger.info("⚙️ %s reloaded", ConfigContainer.path)
+        ConfigContainer._notify()
+        return True
+
+    @staticmethod
+    def set_profile(name: str | None) -> dict:
+        """Switch every process to a profile until cleared (None: back to config.yaml's)."""
+        from app.utils.storage_utils import data_dir, write_atomic
+
+        path = data_dir() / "profile"
+        if name:
+            if name not in ConfigContainer.settings().profiles:
+                raise LookupError(f"Bilinmeyen profil: {name}")
+            write_atomic(path, name.encode())
+        else:
+            path.unlink(missing_ok=True)
+        ConfigContainer.reload()
+        return ConfigContainer.status()
+
+    @staticmethod
+    def status() -> dict:
+        name, profile = ConfigContainer.profile()
+        return {
+            "profile": name,
+            "source": "runtime" if ConfigContainer._override else str(ConfigContainer.path),
+            "profiles": sorted(ConfigContainer.settings().profiles),
+            "idle": ConfigContainer._idle,
+            "idle_settings": ConfigContainer.settings().idle.model_dump(),
+            "subscribers": ConfigContainer._subscribers(),
+            "loaded_at": ConfigContainer._loaded_at,
+            "error": ConfigContainer._error,
+            **profile.model_dump(),
+        }
+
+    # Idle mode
+
+    @staticmethod
+    def idle() -> bool:
+        return ConfigContainer._idle
+
+    @staticmethod
+    def pause(interval: str, stop: threading.Event | None = None, heartbeat=None) -> bool:
+        """Sleep for the active profile's ``interval``, then for as long as the process is idle.
+
+        A reload re-reads the interval, so switching to a faster profile
+        cuts a long wait short. ``heartbeat()`` is called at least every
+        10 s (for watchdogs). False when ``stop`` was set.
+        """
+        began = time.monotonic()
+        with ConfigContainer._cond:
+            while not (stop and stop.is_set()):
+                if heartbeat:
+                    heartbeat()
+                remaining = began + getattr(ConfigContainer.intervals(), interval) - time.monotonic()
+                if remaining <= 0 and not ConfigContainer._idle:
+                    return True
+                ConfigContainer._cond.wait(min(remaining, 10.0) if remaining > 0 else 10.0)
+        return False
+
+    @staticmethod
+    def wake():
+        """Let pausing threads check their stop events now."""
+        with ConfigContainer._cond:
+            ConfigContainer._cond.notify_all()
+
+    @staticmethod
+    def report_subscribers(source: str, count: int):
+        """Subscribers an API worker serves; reports older than 30 s are ignored."""
+        ConfigContainer._remote[source] = (int(count), time.monotonic())
+        if count and ConfigContainer._idle:
+            ConfigContainer._evaluate()
+
+    # Watcher
+
+    @staticmethod
+    def start(count_local: bool = True, report=None):
+        """Watch the files and the subscriber count.
+
+        ``count_local`` is off in the owner daemon, whose own subscriptions
+        only feed the shared state. ``report(count)`` forwards this
+        process's subscribers (an API worker's, to the owner).
+        """
+        if ConfigContainer._thread is not None:
+            return
+        ConfigContainer.settings()
+        ConfigContainer._count_local = count_local
+        ConfigContainer._report = report
+        ConfigContainer._running = True
+        ConfigContainer._quiet_since = time.monotonic()
+        IDLE.set_function(lambda: int(ConfigContainer._idle))
+        ConfigContainer._thread = threading.Thread(target=ConfigContainer._watch, name="ConfigWatcher", daemon=True)
+        ConfigContainer._thread.start()
+
+    @staticmethod
+    def shutdown():
+        ConfigContainer._running = False
+        thread, ConfigContainer._thread = ConfigContainer._thread, None
+        ConfigContainer.wake()
+        if thread is not None:
+            thread.join(timeout=ConfigContainer.poll + 1)
+
+    @staticmethod
+    def _watch():
+        reported, reported_at = None, 0.0
+        while ConfigContainer._running:
+            if ConfigContainer._file_stamps() != ConfigContainer._stamps:
+                ConfigContainer.reload()
+            if ConfigContainer._report is not None:
+                local = ConfigContainer._local_subscribers()
+                if local != reported or time.monotonic() - reported_at >= 10:
+                    try:
+                        ConfigContainer._report(local)
+                        reported, reported_at = local, time.monotonic()
+                    except Exception as e:
+                        logger.debug("Subscriber report failed: %s", e)
+            ConfigContainer._evaluate()
+            with ConfigContainer._cond:
+                if ConfigContainer._running:
+                    ConfigContainer._cond.wait(ConfigContainer.poll)
+
+    @staticmethod
+    def _evaluate():
+        settings = ConfigContainer.settings().idle
+        subscribers = ConfigContainer._subscribers()
+        now = time.monotonic()
+        if subscribers or not settings.enabled:
+            ConfigContainer._quiet_since = now
+            idle = False
+        else:
+            idle = now - (ConfigContainer._quiet_since or now) >= settings.after
+        if idle == ConfigContainer._idle:
+            return
+        with ConfigContainer._cond:
+            ConfigContainer._idle = idle
+            ConfigContainer._cond.notify_all()
+        if idle:
+            logger.info("💤 Idle: no subscribers for %.0f s, background polling paused", settings.after)
+        else:
+            logger.info("⏰ Active: %d subscriber(s), background polling resumed", subscribers)
+        ConfigContainer._notify()
+
+    @staticmethod
+    def _local_subscribers() -> int:
+        from app.utils.metrics_utils import SUBSCRIBERS
+        return int(SUBSCRIBERS.total())
+
+    @staticmethod
+    def _subscribers() -> int:
+        now = time.monotonic()
+        remote = sum(count for count, at in list(ConfigContainer._remote.values()) if now - at < 30)
+        return remote + (ConfigContainer._local_subscribers() if ConfigContainer._count_local else 0)
+
+    @staticmethod
+    def _notify():
+        for callback in list(ConfigContainer._listeners):
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Config listener failed: %s", e)
+
+    @staticmethod
+    def _read_override() -> str | None:
+        from app.utils.storage_utils import data_dir
+        try:
+            return (data_dir() / "profile").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _file_stamps() -> tuple:
+        from app.utils.storage_utils import data_dir
+        stamps = []
+        for path in (ConfigContainer.path, data_dir() / "profile"):
+            try:
+                stat = path.stat()
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
@@ -0,0 +1,262 @@
+import functools
+import marshal
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.containers.metrics_container import MetricsContainer
+
+# Record kinds: a SIGNAL is an input that replay feeds back; a STATE is what a service derived from it
+SIGNAL, STATE = 1, 2
+
+MAGIC = b"BDJ1"
+HEADER_SIZE = 64
+# magic, version, capacity, head, tail, count, next seq
+_HEADER = struct.Struct("<4sH2xQQQQQ")
+# length (0 marks a wrap to the start), seq, unix time, kind, topic length; then topic and marshal payload
+_RECORD = struct.Struct("<IQdBH")
+_WRAP = struct.Struct("<I")
+VERSION = 1
+
+JOURNAL_RECORDS = MetricsContainer.counter(
+    "bluedrive_journal_records_total", "Events written to the journal", ("kind",))
+JOURNAL_DROPPED = MetricsContainer.counter(
+    "bluedrive_journal_dropped_total", "Events not journaled (payload not encodable or larger than the journal)")
+
+
+def _plain(value):
+    """dbus-python and GLib values as the built-in types marshal accepts."""
+    if value is None or type(value) in (bool, int, float, str, bytes):
+        return value
+    if isinstance(value, str):
+        return str(value)  # dbus.String, dbus.ObjectPath
+    if isinstance(value, int):
+        # dbus.Boolean subclasses int, not bool
+        return bool(value) if type(value).__name__ == "Boolean" else int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(value, dict):
+        return {_plain(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+    if isinstance(value, (list, set, frozenset)):
+        return [_plain(item) for item in value]
+    return repr(value)
+
+
+class _RingFile:
+    """Fixed-size memory-mapped ring of records; the oldest are overwritten when it is full.
+
+    The header (head, tail, count) is updated after each record is
+    written, so a crash leaves at most the last record unreferenced. Pages
+    reach the disk through normal write-back, never with a sync per event.
+    """
+
+    def __init__(self, path: Path, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = HEADER_SIZE + capacity
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, version, capacity, head, tail, count, next_seq = _HEADER.unpack_from(self._map, 0)
+        if magic == MAGIC and version == VERSION and capacity == self.capacity and head < capacity:
+            # Appending after a restart keeps the history leading up to it
+            self.head, self.tail, self.count, self.next_seq = head, tail, count, next_seq
+        else:
+            self.head = self.tail = self.count = 0
+            self.next_seq = 1
+            self._write_header()
+
+    def append(self, kind: int, topic: bytes, payload: bytes) -> bool:
+        length = _RECORD.size + len(topic) + len(payload)
+        if length > self.capacity - _WRAP.size:
+            return False
+        if self.head + length > self.capacity - _WRAP.size:
+            # Records between head and the end go; the wrap marker sends readers back to 0
+            while self.count and self.tail >= self.head:
+                self._evict()
+            _WRAP.pack_into(self._map, HEADER_SIZE + self.head, 0)
+            self.head = 0
+            if not self.count:
+                self.tail = 0
+        while self.count and self.head <= self.tail < self.head + length:
+            self._evict()
+        if not self.count:
+            self.tail = self.head
+        offset = HEADER_SIZE + self.head
+        _RECORD.pack_into(self._map, offset, length, self.next_seq, time.time(), kind, len(topic))
+        offset += _RECORD.size
+        self._map[offset:offset + len(topic)] = topic
+        offset += len(topic)
+        self._map[offset:offset + len(payload)] = payload
+        self.head += length
+        self.count += 1
+        self.next_seq += 1
+        self._write_header()
+        return True
+
+    def _evict(self):
+        (length,) = _WRAP.unpack_from(self._map, HEADER_SIZE + self.tail)
+        if length == 0:
+            self.tail = 0
+            return
+        self.tail += length
+        self.count -= 1
+
+    def _write_header(self):
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity, self.head, self.tail, self.count, self.next_seq)
+
+    def snapshot(self) -> bytes:
+        """A compact copy, live records from offset 0 and no free space; itself a valid journal."""
+        records = []
+        position, left = self.tail, self.count
+        while left:
+            (length,) = _WRAP.unpack_from(self._map, HEADER_SIZE + position)
+            if length == 0:
+                position = 0
+                continue
+            records.append(self._map[HEADER_SIZE + position:HEADER_SIZE + position + length])
+            position += length
+            left -= 1
+        body = b"".join(records)
+        header = _HEADER.pack(MAGIC, VERSION, len(body) + _WRAP.size, len(body), 0, self.count, self.next_seq)
+        return header.ljust(HEADER_SIZE, b"\0") + body + bytes(_WRAP.size)
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+
+
+def read_journal(data: bytes) -> list:
+    """Events of a journal file's contents, oldest first, as (seq, unix time, kind, topic, payload)."""
+    try:
+        magic, version, capacity, head, tail, count, _ = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Geçersiz günlük dosyası")
+        events = []
+        position = tail
+        while len(events) < count:
+            (length,) = _WRAP.unpack_from(data, HEADER_SIZE + position)
+            if length == 0:
+                if position == 0:
+                    raise ValueError("Bozuk günlük dosyası: boş kayıt")
+                position = 0
+                continue
+            _, seq, at, kind, topic_length = _RECORD.unpack_from(data, HEADER_SIZE + position)
+            start = HEADER_SIZE + position + _RECORD.size
+            topic = data[start:start + topic_length].decode()
+            payload = marshal.loads(data[start + topic_length:HEADER_SIZE + position + length])
+            events.append((seq, at, kind, topic, payload))
+            position += length
+    except (struct.error, EOFError, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Bozuk günlük dosyası: {e}") from e
+    return events
+
+
+class JournalContainer:
+    """Process-wide flight recorder of bus signals and the state changes they cause.
+
+    Services record each incoming D-Bus signal (``SIGNAL``, usually through
+    ``journaled``) and each transition they derive from it (``STATE``: the
+    active player, a call, a track, a Wi-Fi or Bluetooth connection) into a
+    bounded binary ring at data/journal.bin. A field problem can then be
+    replayed at the desk (``JournalReplayer``). Writing an event costs one
+    marshal and a memory copy under a lock; nothing is synced per event.
+
+    Settings (environment):
+        BLUEDRIVE_JOURNAL           1 (0 turns recording off)
+        BLUEDRIVE_JOURNAL_FILE      <data dir>/journal.bin
+        BLUEDRIVE_JOURNAL_MB        8
+    """
+
+    enabled = os.getenv("BLUEDRIVE_JOURNAL", "1") != "0"
+
+    _ring = None
+    _capture = None  # List collecting events instead of the file, during a replay
+    _lock = threading.Lock()
+
+    @staticmethod
+    def record(kind: int, topic: str, payload=None):
+        if not JournalContainer.enabled:
+            return
+        try:
+            data = marshal.dumps(_plain(payload))
+        except ValueError:
+            JOURNAL_DROPPED.inc()
+            return
+        with JournalContainer._lock:
+            if JournalContainer._capture is not None:
+                JournalContainer._capture.append((kind, topic, marshal.loads(data)))
+                return
+            ring = JournalContainer._get_ring()
+            if ring is None or not ring.append(kind, topic.encode(), data):
+                JOURNAL_DROPPED.inc()
+                return
+        JOURNAL_RECORDS.labels("signal" if kind == SIGNAL else "state").inc()
+
+    @staticmethod
+    def journaled(topic: str, handler):
+        """Wrap a signal handler so each call is journaled as a SIGNAL with its arguments first."""
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            JournalContainer.record(SIGNAL, topic, (args, kwargs))
+            return handler(*args, **kwargs)
+        return wrapper
+
+    @staticmethod
+    @contextmanager
+    def capturing():
+        """Collect events in a list instead of the file (replayed events must not rewrite the history)."""
+        captured = []
+        with JournalContainer._lock:
+            JournalContainer._capture = captured
+        try:
+            yield captured
+        finally:
+            with JournalContainer._lock:
+                JournalContainer._capture = None
+
+    @staticmethod
+    def snapshot() -> bytes:
+        """The journal as it is now, compacted (readable with ``read_journal``)."""
+        with JournalContainer._lock:
+            ring = JournalContainer._get_ring()
+            if ring is None:
+                raise LookupError("Olay günlüğü kapalı.")
+            return ring.snapshot()
+
+    @staticmethod
+    def shutdown():
+        with JournalContainer._lock:
+            if JournalContainer._ring is not None:
+                JournalContainer._ring.close()
+                JournalContainer._ring = None
+
+    @staticmethod
+    def _get_ring():
+        """Caller holds the lock. None when recording is off or the file can't be opened."""
+        if JournalContainer._ring is None and JournalContainer.enabled:
+            from app.containers.logging_container import LoggingContainer
+            from app.utils.storage_utils import data_dir
+            logger = LoggingContainer.get_logger("EventJournal")
+            path = Path(os.getenv("BLUEDRIVE_JOURNAL_FILE") or data_dir() / "journal.bin")
+            try:
+                JournalContainer._ring = _RingFile(path, int(float(os.getenv("BLUEDRIVE_JOURNAL_MB", "8")) * 1024 * 1024))
+            except OSError as e:
+                logger.error("Journal %s could not be opened, recording off: %s", path, e)
+                JournalContainer.enabled = False
+                return None
+            logger.info("📼 Event journal at %s (%d events kept from before)", path, JournalContainer._ring.count)
+        return JournalContainer._ring
@@ -1,30 +1,268 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
 from pathlib import Path
 
+from app.containers.metrics_container import MetricsContainer
+
+LOG_DROPPED = MetricsContainer.counter(
+    "bluedrive_log_dropped_total", "Log records dropped by rate limiting or a full log queue", ("logger", "reason"))
+
+
+class RateLimiter:
+    """Token bucket for one logger: ``rate`` records/s on average, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or rate * 5
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> int | None:
+        """None to drop the record, else how many were dropped since the last one let through."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self._suppressed += 1
+                return None
+            self._tokens -= 1
+            suppressed, self._suppressed = self._suppressed, 0
+            return suppressed
+
+
+class _RateLimitedLogger(logging.Logger):
+    """Logger that applies its rate limit before a LogRecord is built.
+
+    Building a record (caller lookup, thread and process info) is most of a
+    log call's cost, so a dropped record costs only the bucket check. ERROR
+    and above always pass. The next record that gets through carries the
+    number suppressed before it.
+    """
+
+    limiter = None
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if self.limiter is not None and level < logging.ERROR:
+            suppressed = self.limiter.allow()
+            if suppressed is None:
+                LOG_DROPPED.labels(self.name, "rate").inc()
+                return
+            if suppressed:
+                extra = {**(extra or {}), "suppressed": suppressed}
+        super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + 1)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues the record as is; the listener thread does all formatting.
+
+    The stock ``prepare`` formats the message in the calling thread, which is
+    the cost this pipeline exists to avoid. Arguments are formatted later, so
+    log sites pass values, not objects they go on to mutate.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Rendered now so the traceback's frames aren't kept alive in the queue
+            record.exc_text = _TEXT_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if LoggingContainer._listener is None:
+            # Stopped by an earlier shutdown (lifespan restart in the same process)
+            LoggingContainer._restart_listener()
+        # SimpleQueue has no maxsize; the bound is checked here instead (qsize is O(1))
+        if self.queue.qsize() >= LoggingContainer.QUEUE_SIZE:
+            LOG_DROPPED.labels(record.name, "queue_full").inc()
+            return
+        self.queue.put_nowait(record)
+
+
+class _RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Appending file that rotates by size and by age (name.log.1 ... name.log.N)."""
+
+    def __init__(self, filename: Path, max_bytes: int, backups: int, interval: float):
+        super().__init__(filename, mode="a", maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        self.interval = interval
+        self._rollover_at = self._first_rollover(filename)
+
+    def _first_rollover(self, filename: Path) -> float:
+        # History survives restarts, so an old file is measured from its last write, not from now
+        try:
+            return os.stat(filename).st_mtime + self.interval
+        except OSError:
+            return time.time() + self.interval
+
+    def shouldRollover(self, record) -> bool:
+        if self.interval and time.time() >= self._rollover_at:
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self._rollover_at = time.time() + self.interval
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self._rollover_at = time.time() + self.interval
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} (+{suppressed} suppressed)" if suppressed else text
+
+
+class _JsonFormatter(logging.Formatter):
+    """One JSON object per line, for shipping or grepping with jq."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_TEXT_FORMATTER = _TextFormatter("[%(asctime)s] [%(levelname)s] %(message)s")
+
+
+class _FileDispatcher(logging.Handler):
+    """Listener-side handler: routes each record to logs/<logger name>.log (or .jsonl)."""
+
+    def __init__(self, log_dir: Path, json_lines: bool, max_bytes: int, backups: int, interval: float):
+        super().__init__()
+        self.log_dir = log_dir
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self._files = {}
+        self._formatter = _JsonFormatter() if json_lines else _TEXT_FORMATTER
+
+    def emit(self, record: logging.LogRecord):
+        handler = self._files.get(record.name)
+        if handler is None:
+            suffix = "jsonl" if self.json_lines else "log"
+            handler = _RotatingFileHandler(
+                self.log_dir / f"{record.name}.{suffix}", self.max_bytes, self.backups, self.interval)
+            handler.setFormatter(self._formatter)
+            self._files[record.name] = handler
+        handler.handle(record)
+
+    def close(self):
+        for handler in self._files.values():
+            handler.close()
+        super().close()
+
+
 class LoggingContainer:
+    """Per-name loggers writing to logs/<name>.log through a single background thread.
+
+    Log calls only check the level, apply the logger's rate limit and put
+    the record on a queue. A QueueListener thread formats it and writes it
+    to a file that is appended across restarts and rotated by size and
+    age. WARNING and above are echoed to stderr (journald under systemd).
+
+    Settings (environment):
+        BLUEDRIVE_LOG_LEVEL           DEBUG
+        BLUEDRIVE_LOG_JSON            0 (1: logs/<name>.jsonl, one JSON object per line)
+        BLUEDRIVE_LOG_MAX_BYTES       5 MB per file
+        BLUEDRIVE_LOG_BACKUPS         5
+        BLUEDRIVE_LOG_ROTATE_HOURS    24
+        BLUEDRIVE_LOG_RATE            50 records/s per logger, bursts of 5x (below ERROR)
+        BLUEDRIVE_LOG_CONSOLE_LEVEL   WARNING
+    """
+
+    QUEUE_SIZE = 10000
+
     _loggers = {}
+    _queue = None
+    _listener = None
+    _lock = threading.Lock()
 
     @staticmethod
-    def get_logger(name: str, log_level=logging.DEBUG):
+    def get_logger(name: str, log_level=None, rate_limit: float = None):
         if name in LoggingContainer._loggers:
             return LoggingContainer._loggers[name]
 
-        logger = logging.getLogger(name)
-        logger.setLevel(log_level)
-        logger.propagate = False  # Üst loglara yollama
+        with LoggingContainer._lock:
+            if name in LoggingContainer._loggers:
+                return LoggingContainer._loggers[name]
+            LoggingContainer._start_listener()
 
-        # Log klasörü ve dosyası
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        log_file = log_dir / f"{name}.log"
+            logger = logging.getLogger(name)
+            # Only this logger gets the subclass; setLoggerClass would change it for every library too
+            logger.__class__ = _RateLimitedLogger
+            logger.setLevel(log_level or os.getenv("BLUEDRIVE_LOG_LEVEL", "DEBUG").upper())
+            logger.propagate = False  # Üst loglara yollama
+            rate = rate_limit if rate_limit is not None else float(os.getenv("BLUEDRIVE_LOG_RATE", "50"))
+            if rate > 0:
+                logger.limiter = RateLimiter(rate)
+            logger.addHandler(_QueueHandler(LoggingContainer._queue))
+
+            LoggingContainer._loggers[name] = logger
+            return logger
+
+    @staticmethod
+    def shutdown():
+        """Flush queued records and close the files. Safe to call more than once.
+
+        The queue outlives the listener: a record logged afterwards starts a
+        new listener on it, so nothing is left in a queue nobody reads.
+        """
+        with LoggingContainer._lock:
+            listener = LoggingContainer._listener
+            if listener is not None:
+                listener.stop()
+                LoggingContainer._listener = None
+                for handler in listener.handlers:
+                    handler.close()
 
-        # Dosya handler (üzerine yazar)
-        file_handler = logging.FileHandler(log_file, mode='w')  # <-- 'w' = overwrite
-        file_handler.setLevel(log_level)
-        formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s")
-        file_handler.setFormatter(formatter)
+    @staticmethod
+    def _restart_listener():
+        with LoggingContainer._lock:
+            LoggingContainer._start_listener()
 
-        logger.addHandler(file_handler)
+    @staticmethod
+    def _start_listener():
+        """Caller holds the lock."""
+        if LoggingContainer._listener is not None:
+            return
+        log_dir = Path("logs")
+        log_dir.mkdir(exist_ok=True)
+        files = _FileDispatcher(
+            log_dir,
+            json_lines=os.getenv("BLUEDRIVE_LOG_JSON", "0") == "1",
+            max_bytes=int(os.getenv("BLUEDRIVE_LOG_MAX_BYTES", str(5 * 1024 * 1024))),
+            backups=int(os.getenv("BLUEDRIVE_LOG_BACKUPS", "5")),
+            interval=float(os.getenv("BLUEDRIVE_LOG_ROTATE_HOURS", "24")) * 3600,
+        )
+        console = logging.StreamHandler(sys.stderr)
+        console.setLevel(os.getenv("BLUEDRIVE_LOG_CONSOLE_LEVEL", "WARNING").upper())
+        console.setFormatter(logging.Formatter("[%(levelname)s] %(name)s: %(message)s"))
 
-        LoggingContainer._loggers[name] = logger
-        return logger
+        if LoggingContainer._queue is None:
+            # Shared by every logger's handler for the life of the process
+            LoggingContainer._queue = queue.SimpleQueue()
+            atexit.register(LoggingContainer.shutdown)
+        # Each handler applies its own level; the file gets everything the logger let through
+        LoggingContainer._listener = logging.handlers.QueueListener(
+            LoggingContainer._queue, files, console, respect_handler_level=True)
+        LoggingContainer._listener.start()
@@ -0,0 +1,215 @@
+import bisect
+import math
+import threading
+
+# Seconds; covers a sub-millisecond D-Bus property read up to a 30 s bluetoothctl pairing
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("_lock", "value", "function")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self.function = None  # Evaluated at scrape time when set
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is None:
+            return self.value
+        try:
+            return float(self.function())
+        except Exception:
+            return math.nan
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    kind = None
+    child_type = None
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child for one label combination, created on first use and cached."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        return self.child_type()
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+    child_type = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {_number(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_type = _GaugeChild
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def total(self) -> float:
+        """Sum over every label combination."""
+        return sum(child.get() for child in list(self._children.values()))
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {_number(child.get())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines, cumulative = [], 0
+        for bound, bucket in zip(self.buckets, counts):
+            cumulative += bucket
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f"{self.name}_bucket{self._label_text(values, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{self._label_text(values, le)} {count}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {count}")
+        return lines
+
+
+class MetricsContainer:
+    """Process-wide metrics registry, rendered in Prometheus text format.
+
+    Like LoggingContainer, metrics are registered by name and the same
+    instance is returned on every later call. Hot paths should keep the
+    child from ``labels(...)`` at hand: an observation is then a bisect and
+    an uncontended lock, around a microsecond.
+    """
+
+    _metrics = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def counter(name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return MetricsContainer._register(Counter, name, help_text, labelnames)
+
+    @staticmethod
+    def gauge(name: str, help_text: str, labelnames: tuple = ()) -> Gauge:
+        return MetricsContainer._register(Gauge, name, help_text, labelnames)
+
+    @staticmethod
+    def histogram(name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return MetricsContainer._register(Histogram, name, help_text, labelnames, buckets)
+
+    @staticmethod
+    def render() -> str:
+        lines = []
+        for metric in list(MetricsContainer._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _register(cls, name: str, *args):
+        with MetricsContainer._lock:
+            metric = MetricsContainer._metrics.get(name)
+            if metric is None:
+                metric = MetricsContainer._metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
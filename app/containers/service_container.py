@@ -1,8 +1,302 @@
-from app.services.hfp_service import HandsFreeService
-from app.services.media_service import MediaService
-from app.services.wifi_service import WifiService
-
-# Global, paylaşılabilir servis örnekleri
-hfp_service = HandsFreeService()
-media_service = MediaService()
-wifi_service = WifiService()
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import JournalContainer
+from app.containers.logging_container import LoggingContainer
+from app.utils.trace_utils import span
+
+logger = LoggingContainer.get_logger("ServiceContainer")
+
+# standalone: this process drives the hardware (one uvicorn worker, the default).
+# worker: one of several uvicorn workers; the services run in the owner daemon (python -m app.owner).
+ROLE = os.getenv("BLUEDRIVE_ROLE", "standalone")
+
+# Service builds and handlers' blocking calls, kept off the default pool behind asyncio.to_thread
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BLUEDRIVE_SERVICE_THREADS", "8")),
+                               thread_name_prefix="ServiceCall")
+
+
+async def run_blocking(function, *args):
+    """``asyncio.to_thread`` on the container's own pool, with the caller's trace context."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _executor, functools.partial(context.run, function, *args))
+
+
+class Provider:
+    """Lazily built, thread-safe singleton.
+
+    The factory runs on first use, so importing the container costs nothing and
+    heavy modules (pydbus, gi, dbus, requests, PIL, pexpect) are only imported
+    by the factories. Attribute access is forwarded to the instance, so
+    ``media_service.next()`` works as if it were the service itself.
+    A failed build is not cached and is retried on the next access.
+    """
+
+    def __init__(self, name: str, factory, start=None, stop=None):
+        self.name = name
+        self._factory = factory
+        self._start = start
+        self._stop = stop
+        self._lock = threading.Lock()
+        self._instance = None
+        self._started = False
+        self.build_seconds = None
+        self.error = None
+
+    @property
+    def built(self) -> bool:
+        return self._instance is not None
+
+    @property
+    def state(self) -> str:
+        if self._instance is not None:
+            return "ready"
+        return "failed" if self.error else "pending"
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    began = time.perf_counter()
+                    try:
+                        # Part of whichever trace first needs the service (a request or the warm-up)
+                        with span(f"build {self.name}"):
+                            instance = self._factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.build_seconds = time.perf_counter() - began
+                    self.error = None
+                    logger.info(f"⚙️ {self.name} built in {self.build_seconds * 1000:.0f} ms")
+                    self._instance = instance
+        return self._instance
+
+    def start(self):
+        """Build, then run the start hook once."""
+        instance = self.get()
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        if self._start:
+            with span(f"start {self.name}"):
+                self._start(instance)
+
+    def stop(self):
+        """Run the stop hook if the service was ever built."""
+        if self._instance is not None and self._stop:
+            self._stop(self._instance)
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def _device_registry():
+    from app.services.device_registry import DeviceRegistry
+    registry = DeviceRegistry()
+    registry.add_strength_listener(lambda kind, address, name, value: signal_history.record(kind, address, value, label=name))
+    return registry
+
+def _hfp_service():
+    from app.services.hfp_service import HandsFreeService
+    return HandsFreeService(device_registry.get())
+
+def _media_service():
+    from app.services.media_service import MediaService
+    return MediaService(device_registry.get())
+
+def _media_browser():
+    from app.services.media_browser import MediaBrowser
+    return MediaBrowser(device_registry.get())
+
+def _wifi_service():
+    from app.services.wifi_service import WifiService
+    service = WifiService()
+    service.add_scan_listener(lambda networks: signal_history.record_networks(networks))
+    return service
+
+def _bluetooth_service():
+    from app.services.bluetooth_cache import BluetoothCache
+    from app.services.bluetooth_service import BluetoothService
+    from app.utils.storage_utils import data_dir
+    return BluetoothService(BluetoothCache(
+        root=Path(os.getenv("BLUEDRIVE_BLUETOOTH_STORAGE", "/var/lib/bluetooth")),
+        backups=data_dir() / "bluetooth_backups",
+        keep=int(os.getenv("BLUEDRIVE_BLUETOOTH_BACKUPS", "10")),
+        escalate_after=float(os.getenv("BLUEDRIVE_BLUETOOTH_ESCALATE", "600")),
+    ))
+
+def _profiler():
+    from app.services.profiler import Profiler
+    return Profiler(memory_frames=int(os.getenv("BLUEDRIVE_TRACEMALLOC_FRAMES", "10")))
+
+def _journal_replayer():
+    from app.services.journal_replay import JournalReplayer
+    # Providers, not instances: a service that can't build here only loses its own signals
+    return JournalReplayer((device_registry, hfp_service))
+
+def _telemetry_service():
+    from app.services.telemetry_service import TelemetryService
+    from app.utils.telemetry_utils import channel_names
+    # host:port; empty turns the UDP listener off
+    host, _, port = os.getenv("BLUEDRIVE_TELEMETRY_ADDR", "0.0.0.0:5600").rpartition(":")
+    return TelemetryService(
+        host or None, int(port or 0),
+        names=channel_names(os.getenv("BLUEDRIVE_TELEMETRY_CHANNELS", "")),
+        capacity=int(os.getenv("BLUEDRIVE_TELEMETRY_RING", "16384")),
+    )
+
+def _signal_history():
+    from app.services.signal_history import SignalHistory
+    from app.utils.storage_utils import data_dir
+    persist = os.getenv("BLUEDRIVE_SIGNAL_HISTORY_PERSIST", "1") != "0"
+    return SignalHistory(
+        capacity=int(os.getenv("BLUEDRIVE_SIGNAL_HISTORY_SAMPLES", "524288")),
+        path=data_dir() / "signal_history.bin" if persist else None,
+    )
+
+def _state_snapshot():
+    from app.services.state_snapshot import StateSnapshot
+    # BLUEDRIVE_SNAPSHOT_INTERVAL pins the interval; otherwise it follows the profile
+    interval = os.getenv("BLUEDRIVE_SNAPSHOT_INTERVAL")
+    snapshot = StateSnapshot(interval=float(interval) if interval else None)
+    # Sources never build a service; unbuilt ones keep their saved section
+    snapshot.add_source("metadata", lambda: media_service.current_metadata() if media_service.built else None)
+    snapshot.add_source("devices", lambda: device_registry.devices() if device_registry.built else None)
+    snapshot.add_source("paired_devices", lambda: device_registry.paired_devices() if device_registry.built else None)
+    snapshot.add_source("last_phone", lambda: device_registry.last_phone() if device_registry.built else None)
+    snapshot.add_source("wifi", lambda: wifi_service.get_wifi_status() if wifi_service.built else None)
+    snapshot.add_source("phone", lambda: json.loads(hfp_service.get_call_status()) if hfp_service.built else None)
+    return snapshot
+
+def _loop_monitor():
+    from app.services.loop_monitor import LoopMonitor
+    monitor = LoopMonitor(block_threshold=float(os.getenv("BLUEDRIVE_LOOP_BLOCK_MS", "100")) / 1000)
+    if ROLE == "worker":
+        # The GLib loop and the HFP monitor are the owner's; only this event loop is watched here
+        return monitor
+    monitor.watch_glib(lambda: hfp_service.mainloop_thread if hfp_service.built else None)
+    # The HFP monitor polls oFono every 5 s; a stuck D-Bus call stops its heartbeat
+    monitor.watch_heartbeat(
+        "HFP monitor",
+        lambda: hfp_service.monitor_heartbeat if hfp_service.built else None,
+        lambda: hfp_service.monitor_thread if hfp_service.built else None,
+        max_age=30.0,
+    )
+    return monitor
+
+
+# Global, paylaşılabilir servis örnekleri (ilk kullanımda oluşturulur)
+device_registry = Provider("DeviceRegistry", _device_registry, start=lambda s: s.start(), stop=lambda s: s.stop())
+hfp_service = Provider("HandsFreeService", _hfp_service, start=lambda s: s.start(), stop=lambda s: s.stop())
+media_service = Provider("MediaService", _media_service, start=lambda s: s.start(), stop=lambda s: s.stop())
+media_browser = Provider("MediaBrowser", _media_browser, stop=lambda s: s.stop())
+wifi_service = Provider("WifiService", _wifi_service)
+bluetooth_service = Provider("BluetoothService", _bluetooth_service)
+state_snapshot = Provider("StateSnapshot", _state_snapshot, start=lambda s: s.start(), stop=lambda s: s.stop())
+loop_monitor = Provider("LoopMonitor", _loop_monitor, start=lambda s: s.start(), stop=lambda s: s.stop())
+profiler = Provider("Profiler", _profiler, stop=lambda s: s.stop())
+journal_replayer = Provider("JournalReplayer", _journal_replayer)
+telemetry_service = Provider("TelemetryService", _telemetry_service, start=lambda s: s.start(), stop=lambda s: s.stop())
+signal_history = Provider("SignalHistory", _signal_history, stop=lambda s: s.close())
+# The event journal and the runtime config (a worker's are the owner's)
+journal = JournalContainer
+config = ConfigContainer
+
+if ROLE == "worker":
+    from app.services.owner_link import OwnerLink, RemoteProvider
+    from app.utils.ipc_utils import owner_socket_path, shared_state_path
+    owner_link = OwnerLink(owner_socket_path(), shared_state_path(), timeout=float(os.getenv("BLUEDRIVE_OWNER_TIMEOUT", "30")))
+    # Same names and surface as the local providers, so controllers don't know the difference.
+    # The event-loop monitor and the profiler stay local: they watch this process.
+    device_registry = RemoteProvider("DeviceRegistry", "device_registry", owner_link)
+    hfp_service = RemoteProvider("HandsFreeService", "hfp_service", owner_link)
+    media_service = RemoteProvider("MediaService", "media_service", owner_link)
+    media_browser = RemoteProvider("MediaBrowser", "media_browser", owner_link)
+    wifi_service = RemoteProvider("WifiService", "wifi_service", owner_link)
+    bluetooth_service = RemoteProvider("BluetoothService", "bluetooth_service", owner_link)
+    state_snapshot = RemoteProvider("StateSnapshot", "state_snapshot", owner_link)
+    journal_replayer = RemoteProvider("JournalReplayer", "journal_replayer", owner_link)
+    journal = RemoteProvider("EventJournal", "journal", owner_link)
+    config = RemoteProvider("Config", "config", owner_link)
+    telemetry_service = RemoteProvider("TelemetryService", "telemetry_service", owner_link)
+    signal_history = RemoteProvider("SignalHistory", "signal_history", owner_link)
+
+# Reverse order is used for shutdown: the snapshot is saved before anything stops
+PROVIDERS = (device_registry, hfp_service, media_service, media_browser, wifi_service, bluetooth_service, state_snapshot, loop_monitor,
+             profiler, journal_replayer, telemetry_service, signal_history)
+
+
+def owner_targets() -> dict:
+    """What the owner daemon lets workers call, by the names the worker-side providers use."""
+    return {
+        "device_registry": device_registry,
+        "hfp_service": hfp_service,
+        "media_service": media_service,
+        "media_browser": media_browser,
+        "wifi_service": wifi_service,
+        "bluetooth_service": bluetooth_service,
+        "state_snapshot": state_snapshot,
+        "journal_replayer": journal_replayer,
+        "telemetry_service": telemetry_service,
+        "signal_history": signal_history,
+        "journal": JournalContainer,
+        "config": ConfigContainer,
+    }
+
+
+def subscriber_reporter():
+    """How this process tells the owner daemon about its subscribers (None: it decides idle mode itself)."""
+    if ROLE != "worker":
+        return None
+    source = f"worker-{os.getpid()}"
+    return lambda count: owner_link.call("config.report_subscribers", (source, count), timeout=5)
+
+
+async def warm_up():
+    """Build and start every service in parallel worker threads.
+
+    The media chain needs the registry first. Wi-Fi (nmcli) and the
+    Bluetooth CLI service are independent. A service that fails here is
+    logged and built again on its first request. A worker only connects
+    to the owner daemon.
+    """
+    if ROLE == "worker":
+        owner_link.start()
+        return
+
+    async def run(provider: Provider):
+        try:
+            await run_blocking(provider.start)
+        except Exception as e:
+            logger.error(f"❌ {provider.name} warm-up failed: {e}")
+
+    async def media_chain():
+        await run(device_registry)
+        await asyncio.gather(run(hfp_service), run(media_service), run(media_browser))
+
+    began = time.perf_counter()
+    with span("startup.warm_up", root=True):
+        await asyncio.gather(media_chain(), run(wifi_service), run(bluetooth_service), run(signal_history))
+    logger.info(f"🔥 Warm-up finished in {(time.perf_counter() - began) * 1000:.0f} ms")
+
+def shutdown():
+    if ROLE == "worker":
+        owner_link.stop()
+    for provider in reversed(PROVIDERS):
+        try:
+            provider.stop()
+        except Exception as e:
+            logger.error(f"{provider.name} stop failed: {e}")
+
+def status() -> dict:
+    return {provider.name: provider.state for provider in PROVIDERS}
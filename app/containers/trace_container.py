@@ -0,0 +1,272 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+
+# OTLP span kinds and status codes
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "events",
+                 "status", "status_message")
+
+    def __init__(self, trace, parent_id: str | None, name: str, kind: int, attributes: dict):
+        self.trace = trace
+        self.span_id = random.getrandbits(64).to_bytes(8, "big").hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.events = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append((time.time_ns(), name, attributes))
+
+    def fail(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self.attributes),
+            "status": {"code": self.status, "message": self.status_message} if self.status else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.events:
+            span["events"] = [
+                {"timeUnixNano": str(at), "name": name, "attributes": _attributes(attributes)}
+                for at, name, attributes in self.events
+            ]
+        return span
+
+
+class Trace:
+    """Spans of one operation; exported as a whole when the root span ends."""
+
+    MAX_SPANS = 256  # A runaway loop of D-Bus calls must not grow a trace without bound
+
+    __slots__ = ("trace_id", "root", "spans", "dropped", "_lock")
+
+    def __init__(self):
+        self.trace_id = random.getrandbits(128).to_bytes(16, "big").hex()
+        self.root = None
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            if len(self.spans) < self.MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def summary(self) -> dict:
+        """Slow-operation view: the root plus every finished span with its offset from the start."""
+        root = self.root
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "started_at": root.start_ns / 1e9,
+            "duration_ms": round(root.duration_ms, 1),
+            "status": "error" if root.status == STATUS_ERROR else "ok",
+            "attributes": root.attributes,
+            "dropped_spans": self.dropped,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "offset_ms": round((span.start_ns - root.start_ns) / 1e6, 1),
+                    "duration_ms": round(span.duration_ms, 1),
+                    "attributes": span.attributes,
+                    "events": [
+                        {"name": name, "offset_ms": round((at - root.start_ns) / 1e6, 1), **attributes}
+                        for at, name, attributes in span.events
+                    ],
+                    "error": span.status_message if span.status == STATUS_ERROR else None,
+                }
+                for span in spans
+            ],
+        }
+
+
+class _TraceExporter:
+    """Appends finished traces to a size-rotated JSON-lines file from a writer thread.
+
+    Each line is an OTLP/JSON ``ExportTraceServiceRequest``, the same shape
+    the OpenTelemetry collector's file exporter writes, so the files can be
+    replayed into any OTLP backend.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="TraceExporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        self._queue.put(trace)
+
+    def stop(self, timeout: float = 2.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        # Imported here: LoggingContainer's own imports must not depend on tracing
+        from app.containers.logging_container import LoggingContainer
+        logger = LoggingContainer.get_logger("TraceExporter")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                line = json.dumps(self._request(trace), separators=(",", ":"), default=str) + "\n"
+                self._rotate(len(line))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except Exception as e:
+                # Tracing must never take a request down with it
+                logger.error("Trace export failed: %s", e)
+
+    def _request(self, trace: Trace) -> dict:
+        with trace._lock:
+            spans = [span.to_otlp() for span in trace.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _attributes({"service.name": "bluedrive", "process.pid": os.getpid()})},
+                "scopeSpans": [{"scope": {"name": "bluedrive"}, "spans": spans}],
+            }]
+        }
+
+    def _rotate(self, incoming: int):
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+
+class TraceContainer:
+    """Process-wide request tracing.
+
+    A root span (an HTTP request, the startup warm-up) starts a trace; spans
+    opened inside it become children through a context variable, which
+    follows awaits and ``asyncio.to_thread``/threadpool hops. Outside a
+    trace, ``start`` returns None and instrumentation costs one lookup.
+    Finished traces go to logs/traces.jsonl and a buffer behind
+    ``/debug/traces/recent``.
+    """
+
+    RECENT = 200
+
+    enabled = os.getenv("BLUEDRIVE_TRACING", "1") != "0"
+    sample_rate = float(os.getenv("BLUEDRIVE_TRACE_SAMPLE", "1.0"))
+    current = ContextVar("bluedrive_span", default=None)
+
+    _recent = deque(maxlen=RECENT)
+    _exporter = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def start(name: str, kind: int = INTERNAL, attributes: dict = None, root: bool = False) -> Span | None:
+        """Open a span under the current one. A root span starts a new trace (subject to sampling)."""
+        parent = TraceContainer.current.get()
+        if parent is not None and not root:
+            span = Span(parent.trace, parent.span_id, name, kind, attributes or {})
+        elif root and TraceContainer.enabled and random.random() < TraceContainer.sample_rate:
+            trace = Trace()
+            span = trace.root = Span(trace, None, name, kind, attributes or {})
+        else:
+            return None
+        return span
+
+    @staticmethod
+    def finish(span: Span, error: BaseException = None):
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.fail(f"{type(error).__name__}: {error}")
+        elif span.status == STATUS_UNSET:
+            span.status = STATUS_OK
+        trace = span.trace
+        trace.add(span)
+        if span is trace.root:
+            TraceContainer._recent.append(trace)
+            TraceContainer._get_exporter().export(trace)
+
+    @staticmethod
+    def recent(limit: int = 20, min_ms: float = 0.0) -> list:
+        """Slowest recently finished traces first."""
+        traces = [trace for trace in list(TraceContainer._recent) if trace.root.duration_ms >= min_ms]
+        traces.sort(key=lambda trace: trace.root.duration_ms, reverse=True)
+        return [trace.summary() for trace in traces[:limit]]
+
+    @staticmethod
+    def shutdown():
+        # The next finished trace starts a new exporter (lifespan restart in the same process)
+        with TraceContainer._lock:
+            if TraceContainer._exporter is not None:
+                TraceContainer._exporter.stop()
+                TraceContainer._exporter = None
+
+    @staticmethod
+    def _get_exporter() -> _TraceExporter:
+        if TraceContainer._exporter is None:
+            with TraceContainer._lock:
+                if TraceContainer._exporter is None:
+                    TraceContainer._exporter = _TraceExporter(
+                        Path(os.getenv("BLUEDRIVE_TRACE_FILE", "logs/traces.jsonl")),
+                        max_bytes=int(os.getenv("BLUEDRIVE_TRACE_MAX_BYTES", str(5 * 1024 * 1024))),
+                        backups=3,
+                    )
+        return TraceContainer._exporter
+
+
+def _attributes(values: dict) -> list:
+    return [{"key": key, "value": _value(value)} for key, value in values.items()]
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # OTLP/JSON encodes int64 as a string
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
@@ -1,9 +1,9 @@
 # app/controllers/bluetooth_controller.py
 from fastapi import APIRouter, WebSocket
-from app.services.bluetooth_service import BluetoothService
+from fastapi.responses import JSONResponse
+from app.containers.service_container import bluetooth_service
 
 router = APIRouter()
-bluetooth_service = BluetoothService()
 
 @router.get("/scan")
 async def get_devices():
@@ -22,12 +22,37 @@ def paired_devices_list():
     except Exception as e:
         return {"status": "failed", "error": str(e)}
 
+# mac: only that phone; level: cache (pairing kept) | device (that phone re-pairs) | full (every phone
+# re-pairs). Without a level, a repeat within BLUEDRIVE_BLUETOOTH_ESCALATE seconds goes one further
 @router.get("/clean-cache")
-def clean_cache():
+def clean_cache(mac: str | None = None, level: str | None = None):
     try:
-        bluetooth_service.reset_bluetooth_cache()
-        return {"status": "success"}
+        return {"status": "success", **bluetooth_service.reset_bluetooth_cache(mac_address=mac, level=level)}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
     except Exception as e:
         return {"status": "failed", "error": str(e)}
-    
-     
+
+# What BlueZ stores per device: pairing (info), attributes, cache entry
+@router.get("/bluetooth-cache")
+def cached_devices():
+    return bluetooth_service.cached_devices()
+
+@router.get("/bluetooth-backups")
+def pairing_backups():
+    return bluetooth_service.pairing_backups()
+
+@router.post("/bluetooth-backups")
+def backup_pairings():
+    return {"backup": bluetooth_service.backup_pairings()}
+
+@router.post("/bluetooth-backups/{name}/restore")
+def restore_pairings(name: str):
+    try:
+        return bluetooth_service.restore_pairings(name)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
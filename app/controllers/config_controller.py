@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.containers.service_container import config
+
+router = APIRouter(prefix="/config", tags=["Configuration"])
+
+# Active profile with its intervals and cache sizes, idle mode and subscriber count
+@router.get("")
+def get_config():
+    return config.status()
+
+# name=responsive|balanced|low-power (or a profile from config.yaml); no name: back to config.yaml's
+@router.post("/profile")
+def set_profile(name: str | None = None):
+    try:
+        return config.set_profile(name or None)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
@@ -0,0 +1,104 @@
+import os
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.containers.journal_container import SIGNAL, read_journal
+from app.containers.service_container import journal, journal_replayer, loop_monitor, profiler
+from app.containers.trace_container import TraceContainer
+from app.services.journal_replay import ReplayBusy
+from app.services.profiler import ProfilerBusy
+
+router = APIRouter(prefix="/debug", tags=["Diagnostics"])
+
+def require_admin(x_debug_token: str | None = Header(default=None)):
+    """Profiling routes exist only when BLUEDRIVE_DEBUG_TOKEN is set, and need it in X-Debug-Token."""
+    token = os.getenv("BLUEDRIVE_DEBUG_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not secrets.compare_digest(x_debug_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Yetkisiz erişim")
+
+# Event-loop lag histogram, blocked-loop incidents with stacks, GLib/D-Bus watchdog
+@router.get("/loop")
+def loop_diagnostics():
+    return loop_monitor.report()
+
+# Slowest recent traced operations (HTTP requests, startup warm-up) with their spans
+@router.get("/traces/recent")
+def recent_traces(limit: int = 20, min_ms: float = 0.0):
+    return TraceContainer.recent(limit=limit, min_ms=min_ms)
+
+# format=text|pstats: cProfile of the event loop thread; format=collapsed: 100 Hz stack samples of every thread
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile(seconds: float = 5, format: str = "text", sort: str = "cumulative", limit: int = 60):
+    if format not in ("text", "pstats", "collapsed"):
+        return JSONResponse(status_code=400, content={"error": "format text, pstats veya collapsed olmalı"})
+    try:
+        if format == "collapsed":
+            return PlainTextResponse(await profiler.sample(seconds))
+        stats = await profiler.profile(seconds)
+    except ProfilerBusy as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    if format == "pstats":
+        return Response(
+            profiler.pstats_bytes(stats),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="bluedrive.pstats"'},
+        )
+    return PlainTextResponse(profiler.pstats_text(stats, sort=sort, limit=limit))
+
+# action=start|snapshot|stop; a snapshot also diffs against the previous one
+@router.get("/memory", dependencies=[Depends(require_admin)])
+def memory(action: str = "snapshot", top: int = 20, group_by: str = "lineno"):
+    if action == "start":
+        return profiler.memory_start()
+    if action == "stop":
+        return profiler.memory_stop()
+    if group_by not in ("lineno", "filename", "traceback"):
+        return JSONResponse(status_code=400, content={"error": "group_by lineno, filename veya traceback olmalı"})
+    try:
+        return profiler.memory_snapshot(top=top, group_by=group_by)
+    except LookupError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+
+# Stacks of every thread (GLib main loop, HFP monitor, workers) and pending asyncio tasks
+@router.get("/threads", dependencies=[Depends(require_admin)])
+async def threads():
+    return profiler.threads()
+
+# The event journal file as it is now (read with read_journal or tools.replay_journal)
+@router.get("/journal", dependencies=[Depends(require_admin)])
+def journal_file():
+    try:
+        data = journal.snapshot()
+    except LookupError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    return Response(
+        data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="journal.bin"'},
+    )
+
+# Most recent journal events, decoded; topic filters by prefix (bluez., hfp., media.)
+@router.get("/journal/events", dependencies=[Depends(require_admin)])
+def journal_events(limit: int = 100, topic: str = ""):
+    try:
+        events = read_journal(journal.snapshot())
+    except LookupError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    events = [event for event in events if event[3].startswith(topic)][-limit:]
+    return [
+        {"seq": seq, "time": at, "kind": "signal" if kind == SIGNAL else "state", "topic": name, "payload": payload}
+        for seq, at, kind, name, payload in events
+    ]
+
+# Body: a journal file (empty: this instance's own journal); speed=0 replays as fast as possible
+@router.post("/journal/replay", dependencies=[Depends(require_admin)])
+async def replay_journal(request: Request, speed: float = 1.0, max_gap: float = 5.0):
+    data = await request.body()
+    try:
+        return await journal_replayer.replay(data or journal.snapshot(), speed=speed, max_gap=max_gap)
+    except (ValueError, LookupError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except ReplayBusy as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
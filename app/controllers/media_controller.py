@@ -1,29 +1,140 @@
-from fastapi import APIRouter, Depends
-from app.services.media_service import MediaService
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import JSONResponse
+from app.containers.service_container import device_registry, media_browser, media_service, state_snapshot
+from app.models.schemas import Metadata
+from app.services.cover_cache import CoverCache
 
 router = APIRouter(prefix="/media", tags=["Media"])
 
+def _snapshot_metadata():
+    """Last known track while MediaService is still warming up."""
+    if media_service.built:
+        return None
+    cached = state_snapshot.section("metadata")
+    return Metadata(**{**cached, "stale": True}) if cached else None
+
 @router.get("/metadata")
 def get_metadata():
-    media_service = MediaService()
-    return media_service.get_metadata()
+    return _snapshot_metadata() or media_service.get_metadata()
 
 @router.get("/spotify-metadata")
 def get_spotify_metadata():
-    media_service = MediaService()
-    return media_service.get_spotify_metadata()
+    return _snapshot_metadata() or media_service.get_spotify_metadata()
+
+@router.get("/cover/{cover_id}")
+def get_cover(cover_id: str, request: Request, size: int = CoverCache.DEFAULT_SIZE):
+    cached = media_service.cover_cache.get(cover_id, size)
+    if not cached:
+        return JSONResponse(status_code=404, content={"error": "Kapak bulunamadı"})
+    _, etag = cached
+    # Thumbnails for an id never change, so clients may cache them indefinitely
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    # Evicted since get(): a 404, not a FileResponse on a missing file
+    data = media_service.cover_cache.read(cover_id, size)
+    if data is None:
+        return JSONResponse(status_code=404, content={"error": "Kapak bulunamadı"})
+    return Response(content=data, media_type="image/jpeg", headers=headers)
 
+# Commands return right after the optimistic update; D-Bus calls run in the pipeline
 @router.get("/next")
 def next_music():
-    service = MediaService()
-    return service.next()
+    return media_service.next()
 
 @router.get("/previous")
 def previous_music():
-    service = MediaService()
-    return service.previous()
+    return media_service.previous()
 
 @router.get("/toggle")
 def toggle_music():
-    service = MediaService()
-    return service.toggle_playback()
+    return media_service.toggle_playback()
+
+# Absolute volume (0..127); writes are rate limited, the latest level wins
+@router.get("/volume")
+def get_volume():
+    try:
+        return media_service.volume.get()
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+
+@router.post("/volume")
+def set_volume(level: int):
+    try:
+        return media_service.volume.set(level)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+
+@router.post("/volume/step")
+def step_volume(delta: int):
+    try:
+        return media_service.volume.step(delta)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+
+# Play history: recent window from memory, older plays by time range and artist
+@router.get("/history/recent")
+def recent_history(limit: int = 20):
+    return media_service.history.recent(limit)
+
+@router.get("/history")
+def query_history(since: float | None = None, until: float | None = None, artist: str | None = None, limit: int = 100):
+    return media_service.history.query(since, until, artist, limit)
+
+# Multi-phone: per-device state and controls, active-source pinning
+@router.get("/devices")
+def list_devices():
+    if not device_registry.built and state_snapshot.section("devices") is not None:
+        return [{**device, "stale": True} for device in state_snapshot.section("devices")]
+    return device_registry.devices()
+
+@router.post("/devices/{address}/pin")
+def pin_device(address: str):
+    try:
+        device_registry.pin(address)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    return {"status": "pinned", "address": address.upper()}
+
+@router.delete("/devices/pin")
+def unpin_device():
+    device_registry.pin(None)
+    return {"status": "automatic"}
+
+@router.get("/devices/{address}/{command}")
+def device_command(address: str, command: str):
+    return media_service.device_command(address, command)
+
+# AVRCP browsing (MediaFolder1/MediaItem1), paged and cached per folder
+@router.get("/browse")
+def browse(folder: str | None = None, start: int = 0, count: int = 50):
+    try:
+        return media_browser.list_folder(folder, start, count)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Klasör listelenemedi: {e}"})
+
+@router.get("/browse/now-playing")
+def browse_now_playing(start: int = 0, count: int = 50):
+    try:
+        return media_browser.list_now_playing(start, count)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Çalma listesi alınamadı: {e}"})
+
+@router.post("/browse/play")
+def browse_play(item: str):
+    try:
+        media_browser.play(item)
+        return {"status": "playing", "item": item}
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": f"Oynatılamadı: {e}"})
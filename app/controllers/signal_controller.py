@@ -0,0 +1,26 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.containers.service_container import signal_history
+
+router = APIRouter(prefix="/signals", tags=["Link Quality"])
+
+# Every recorded source (Bluetooth RSSI, Wi-Fi access points, cellular) with its latest sample
+@router.get("")
+def list_series():
+    return signal_history.series()
+
+# series: keys or kinds, comma separated (bt, wifi, cell, wifi:<bssid>); empty is every series.
+# start/end are unix times; a negative start is relative to end (-86400: the last day)
+@router.get("/series")
+def query(series: str = "", start: float = -3600, end: float | None = None, points: int = 300):
+    if not 1 <= points <= 5000:
+        return JSONResponse(status_code=400, content={"error": "points 1-5000 arası olmalı"})
+    end = time.time() if end is None else end
+    if start < 0:
+        start = end + start
+    keys = [key for key in series.split(",") if key] or None
+    try:
+        return signal_history.query(keys, start=start, end=end, points=points)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
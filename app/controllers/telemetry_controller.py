@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.containers.service_container import telemetry_service
+
+router = APIRouter(prefix="/telemetry", tags=["Vehicle Telemetry"])
+
+# Every channel seen so far: sample count, rate, last value and when it arrived
+@router.get("/channels")
+def channels():
+    return {**telemetry_service.stats(), "items": telemetry_service.channels()}
+
+# mode=minmax: per-bucket min and max (peaks survive); mode=decimate: every k-th sample
+@router.get("/series")
+def series(channel: str, seconds: float = 10.0, points: int = 300, mode: str = "minmax"):
+    if mode not in ("minmax", "decimate"):
+        return JSONResponse(status_code=400, content={"error": "mode minmax veya decimate olmalı"})
+    if not 1 <= points <= 10000 or seconds <= 0:
+        return JSONResponse(status_code=400, content={"error": "points 1-10000 arası, seconds pozitif olmalı"})
+    try:
+        return telemetry_service.series(channel, seconds=seconds, points=points, mode=mode)
+    except LookupError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
@@ -1,14 +1,16 @@
 import asyncio
 from fastapi import APIRouter, WebSocket, HTTPException, status, Depends
-from app.services.wifi_service import WifiService
-from app.containers.service_container import wifi_service
+from app.containers.service_container import run_blocking, state_snapshot, wifi_service
 from app.models.schemas import WifiCredentials
+from app.containers.config_container import ConfigContainer
+from app.utils.metrics_utils import SUBSCRIBERS
 
 router = APIRouter(prefix="/wifi", tags=["Wifi Service"])
-service = wifi_service
+
+# nmcli calls (and owner IPC in worker mode) block, so the routes run in the threadpool
 
 @router.get("/scan")
-async def scan_networks():
+def scan_networks():
     try:
         return wifi_service.scan_networks()
     except Exception as e:
@@ -18,7 +20,7 @@ async def scan_networks():
         )
 
 @router.post("/connect")
-async def connect(request: WifiCredentials):
+def connect(request: WifiCredentials):
     try:
         success = wifi_service.connect(request.ssid, request.password)
         if success:
@@ -44,7 +46,7 @@ async def connect(request: WifiCredentials):
         )
 
 @router.post("/disconnect")
-async def disconnect():
+def disconnect():
     try:
         success = wifi_service.disconnect()
         if success:
@@ -60,7 +62,9 @@ async def disconnect():
         )
 
 @router.get("/status")
-async def get_status():
+def get_status():
+    if not wifi_service.built and state_snapshot.section("wifi"):
+        return {**state_snapshot.section("wifi"), "stale": True}
     try:
         return wifi_service.get_wifi_status()
     except Exception as e:
@@ -70,7 +74,7 @@ async def get_status():
         )
 
 @router.get("/current-connection")
-async def current_connection():
+def current_connection():
     try:
         connection = wifi_service.get_current_connection()
         if connection:
@@ -88,13 +92,16 @@ async def current_connection():
 @router.websocket("/ws/scan")
 async def websocket_scan(websocket: WebSocket):
     await websocket.accept()
+    SUBSCRIBERS.labels("wifi-scan").inc()
     try:
         while True:
-            networks = wifi_service.scan_networks()
+            networks = await run_blocking(wifi_service.scan_networks)
             await websocket.send_json(networks)
-            await asyncio.sleep(10)  # 10 saniyede bir güncelle
+            await asyncio.sleep(ConfigContainer.intervals().wifi_scan)  # Profile'a göre (balanced: 10 sn)
     except Exception as e:
         await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        SUBSCRIBERS.labels("wifi-scan").dec()
 
     
      
@@ -2,35 +2,142 @@ import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from app.models.schemas import Metadata
 import asyncio
-from app.containers.service_container import hfp_service, media_service
+import time
+from app.containers.config_container import ConfigContainer
+from app.containers.logging_container import LoggingContainer
+from app.containers.service_container import (device_registry, hfp_service, media_service, run_blocking, state_snapshot,
+                                              telemetry_service)
+from app.utils.metrics_utils import SUBSCRIBERS, WS_SEND_SECONDS
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
+logger = LoggingContainer.get_logger("WebSocket")
+
+
+async def _send(websocket: WebSocket, channel: str, text: str):
+    start = time.perf_counter()
+    try:
+        await websocket.send_text(text)
+    finally:
+        WS_SEND_SECONDS.labels(channel).observe(time.perf_counter() - start)
 
 
 @router.websocket("/spotify-metadata")
 async def websocket_spotify_metadata(websocket: WebSocket):
     await websocket.accept()
+    if not media_service.built and state_snapshot.section("metadata"):
+        # Something to show while MediaService warms up
+        await _send(websocket, "spotify-metadata", json.dumps({**state_snapshot.section("metadata"), "stale": True}))
+    await run_blocking(media_service.get)
+    # Track changes, position and status are pushed by the pipeline; a quiet interval resends
+    # the last frame without touching D-Bus
+    updates = media_service.subscribe()
     try:
         while True:
-            metadata = media_service.get_spotify_metadata()
+            try:
+                metadata = await asyncio.wait_for(updates.get(), timeout=ConfigContainer.intervals().metadata_resend)
+            except asyncio.TimeoutError:
+                metadata = media_service.current_metadata()
             if isinstance(metadata, Metadata):
-                await websocket.send_text(metadata.model_dump_json())
-            await asyncio.sleep(0.1)
+                await _send(websocket, "spotify-metadata", metadata.model_dump_json())
+    except WebSocketDisconnect:
+        logger.info("📡 WebSocket bağlantısı kesildi.")
+    finally:
+        media_service.unsubscribe(updates)
+
+@router.websocket("/volume")
+async def websocket_volume(websocket: WebSocket):
+    """Effective volume, pushed from the transport's PropertiesChanged signal."""
+    await websocket.accept()
+    await run_blocking(media_service.get)
+    updates = media_service.volume.subscribe()
+    try:
+        while True:
+            state = await updates.get()
+            await _send(websocket, "volume", state.model_dump_json())
+    except WebSocketDisconnect:
+        logger.info("📡 WebSocket bağlantısı kesildi.")
+    finally:
+        media_service.volume.unsubscribe(updates)
+
+@router.websocket("/devices")
+async def websocket_devices(websocket: WebSocket):
+    """Per-device players and modems, pushed on every registry change."""
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+
+    def notify():
+        loop.call_soon_threadsafe(changed.set)
+
+    device_registry.add_change_listener(notify)
+    SUBSCRIBERS.labels("devices").inc()
+    try:
+        while True:
+            changed.clear()
+            devices = [device.model_dump() for device in device_registry.devices()]
+            await _send(websocket, "devices", json.dumps(devices))
+            await changed.wait()
     except WebSocketDisconnect:
-        print("📡 WebSocket bağlantısı kesildi.")
+        logger.info("📡 WebSocket bağlantısı kesildi.")
+    finally:
+        device_registry.remove_change_listener(notify)
+        SUBSCRIBERS.labels("devices").dec()
 
 @router.websocket("/phone-data")
 async def call_websocket(websocket: WebSocket):
     await websocket.accept()
-    print("🔗 WebSocket bağlantısı kabul edildi")
-
-    loop = asyncio.get_event_loop()
-    loop.run_in_executor(None, hfp_service.start_call_monitoring)
+    logger.info("🔗 WebSocket bağlantısı kabul edildi")
+    if not hfp_service.built and state_snapshot.section("phone"):
+        await _send(websocket, "phone-data", json.dumps({**state_snapshot.section("phone"), "stale": True}))
+    # Call signals are handled by the service's own GLib thread, started with it
+    await run_blocking(hfp_service.get)
+    SUBSCRIBERS.labels("phone-data").inc()
     try:
         while True:
             status = hfp_service.get_call_status()
-            await websocket.send_text(json.dumps(status))
-            await asyncio.sleep(3)
+            await _send(websocket, "phone-data", json.dumps(status))
+            await asyncio.sleep(ConfigContainer.intervals().phone_poll)
     except Exception as e:
-        print(f"❌ WebSocket bağlantısı kesildi: {e}")
+        logger.info("❌ WebSocket bağlantısı kesildi: %s", e)
+    finally:
+        SUBSCRIBERS.labels("phone-data").dec()
+
 
+@router.websocket("/telemetry")
+async def websocket_telemetry(websocket: WebSocket, channels: str = "speed,rpm", rate: float = 20.0,
+                              points_per_second: int = 200, mode: str = "minmax"):
+    """New telemetry samples at the UI's refresh rate, downsampled per subscriber.
+
+    Each frame carries what arrived since the previous one, cut to
+    ``points_per_second / rate`` points per channel, so a slow display
+    asks for less instead of the server sending every sample.
+    """
+    await websocket.accept()
+    if mode not in ("minmax", "decimate"):
+        await websocket.close(code=1008, reason="mode minmax veya decimate olmalı")
+        return
+    names = [name for name in channels.split(",") if name]
+    interval = 1 / min(max(rate, 1.0), 60.0)
+    points = max(1, int(points_per_second * interval))
+    cursors = {}
+    # Nothing may be sent for a long time (no telemetry), so a close is noticed by receiving
+    incoming = asyncio.ensure_future(websocket.receive())
+    SUBSCRIBERS.labels("telemetry").inc()
+    try:
+        while True:
+            began = time.monotonic()
+            frame = await run_blocking(telemetry_service.frame, names, cursors, points, mode)
+            cursors = frame["cursors"]
+            if frame["series"]:
+                await _send(websocket, "telemetry", json.dumps(frame["series"]))
+            await asyncio.wait({incoming}, timeout=max(0.0, interval - (time.monotonic() - began)))
+            if incoming.done():
+                if incoming.result()["type"] == "websocket.disconnect":
+                    break
+                incoming = asyncio.ensure_future(websocket.receive())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        incoming.cancel()
+        SUBSCRIBERS.labels("telemetry").dec()
+        logger.info("📡 WebSocket bağlantısı kesildi.")
@@ -1,21 +1,50 @@
 import asyncio
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from app.containers.service_container import hfp_service
-from app.controllers import bluetooth_controller, media_controller, ws_controller,hfp_controller,wifi_controller
+from app.containers import service_container
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import JournalContainer
+from app.containers.logging_container import LoggingContainer
+from app.containers.metrics_container import MetricsContainer
+from app.containers.trace_container import TraceContainer
+from app.services.owner_link import OwnerUnavailable
+from app.utils.ipc_utils import acquire_owner_lock, release_owner_lock
+from app.utils.trace_utils import SERVER, span
+from app.controllers import bluetooth_controller, config_controller, debug_controller, media_controller, signal_controller, telemetry_controller, ws_controller,hfp_controller,wifi_controller
+
+logger = LoggingContainer.get_logger("App")
 
 # Lifespan context
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    hfp_service.start()
+    # Two processes driving BlueZ/oFono/bluetoothctl fight; a second one refuses to start
+    owner_lock = acquire_owner_lock() if service_container.ROLE != "worker" else None
+    # Reloads config.yaml on change; idle mode while nobody is subscribed
+    ConfigContainer.start(report=service_container.subscriber_reporter())
+    # Last-known state is served right away, marked stale until services are live
+    service_container.state_snapshot.start()
+    # Samples this event loop; started here because it needs the running loop
+    service_container.loop_monitor.start()
+    # The UDP telemetry listener reads on this event loop too (the owner's, for workers)
+    service_container.telemetry_service.start()
+    # Services are built in the background; the API answers while they warm up
+    warm_up = asyncio.create_task(service_container.warm_up())
     try:
         yield
     except asyncio.CancelledError:
-        print("🛑 Lifespan iptal edildi")
+        logger.info("🛑 Lifespan iptal edildi")
     finally:
-        hfp_service.stop()
+        # Let services that are still being built finish before stopping them
+        await asyncio.wait({warm_up}, timeout=5)
+        service_container.shutdown()
+        ConfigContainer.shutdown()
+        JournalContainer.shutdown()
+        TraceContainer.shutdown()
+        LoggingContainer.shutdown()
+        release_owner_lock(owner_lock)
 
 """ @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -42,6 +71,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Scrapes and diagnostics would crowd real operations out of the trace buffer
+UNTRACED_PATHS = ("/health", "/metrics", "/debug/")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if request.url.path.startswith(UNTRACED_PATHS):
+        return await call_next(request)
+    with span(f"{request.method} {request.url.path}", SERVER, root=True) as traced:
+        response = await call_next(request)
+        if traced:
+            # Named after the route template so /connect/{mac} groups across devices
+            route = request.scope.get("route")
+            if route is not None:
+                traced.name = f"{request.method} {route.path}"
+                traced.set("http.route", route.path)
+            traced.set("http.method", request.method)
+            traced.set("http.target", request.url.path)
+            traced.set("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                traced.fail(f"HTTP {response.status_code}")
+        return response
+
+
+# Worker role: the owner daemon is down or restarting
+@app.exception_handler(OwnerUnavailable)
+async def owner_unavailable(request: Request, exc: OwnerUnavailable):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "role": service_container.ROLE, "services": service_container.status()}
+
+@app.get("/snapshot")
+def snapshot():
+    return service_container.state_snapshot.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(MetricsContainer.render(), media_type="text/plain; version=0.0.4")
 
 # Route'lar
 app.include_router(hfp_controller.router)
@@ -49,5 +119,9 @@ app.include_router(media_controller.router)
 app.include_router(bluetooth_controller.router)
 app.include_router(ws_controller.router)
 app.include_router(wifi_controller.router)
+app.include_router(debug_controller.router)
+app.include_router(telemetry_controller.router)
+app.include_router(signal_controller.router)
+app.include_router(config_controller.router)
 
 # sudo env PATH=$PATH uvicorn app.main:app --reload
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Metadata(BaseModel):
     title: Optional[str] = None
@@ -12,6 +12,62 @@ class Metadata(BaseModel):
     duration_ms: Optional[int] = None
     position: Optional[int] = None
     status: Optional[str] = None
+    track_id: Optional[int] = None
+    enriched: bool = False
+    palette: Optional[Dict[str, str]] = None
+    pending_skips: int = 0
+    stale: bool = False  # Served from the warm-start snapshot
+
+class SourceDevice(BaseModel):
+    address: str
+    name: Optional[str] = None
+    connected: bool = False
+    player_path: Optional[str] = None
+    modem_path: Optional[str] = None
+    status: Optional[str] = None
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    active: bool = False
+    pinned: bool = False
+    driver: bool = False
+
+class VolumeState(BaseModel):
+    transport_path: Optional[str] = None
+    volume: Optional[int] = None  # Effective level reported by the phone, 0..127
+    percent: Optional[int] = None
+    target: Optional[int] = None  # Requested level not yet confirmed
+    pending: bool = False
+
+class PlayRecord(BaseModel):
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    album: Optional[str] = None
+    duration_ms: Optional[int] = None
+    enrichment_id: Optional[str] = None  # Spotify track id
+    device: Optional[str] = None
+    started_at: float
+    ended_at: Optional[float] = None
+    current: bool = False
+
+class BrowseItem(BaseModel):
+    path: str
+    name: Optional[str] = None
+    type: Optional[str] = None
+    folder_type: Optional[str] = None
+    playable: bool = False
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    album: Optional[str] = None
+    number: Optional[int] = None
+    duration_ms: Optional[int] = None
+
+class BrowsePage(BaseModel):
+    folder: str
+    name: Optional[str] = None
+    total: int = 0
+    start: int = 0
+    items: List[BrowseItem] = []
+    cached: bool = False
 
 class HandsFreeData(BaseModel):
     device_name: Optional[str] = None
@@ -0,0 +1,87 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class Intervals(BaseModel):
+    """Seconds between polls, scans and waits."""
+    model_config = ConfigDict(extra="forbid")
+
+    # /ws/spotify-metadata: the last frame is resent after this long without a push. Track, status
+    # and position are pushed from signals; position is not extrapolated between them on purpose
+    # (phones send it on seek, pause and track change, the UI advances it while playing)
+    metadata_resend: float = Field(gt=0)
+    loop_sample: float = Field(gt=0)  # event-loop lag samples (loop monitor)
+    phone_poll: float = Field(gt=0)  # /ws/phone-data
+    modem_poll: float = Field(gt=0, le=600)  # HFP monitor: is the modem still online
+    wifi_scan: float = Field(gt=0)  # /wifi/ws/scan
+    wifi_scan_wait: float = Field(ge=0)  # after `nmcli device wifi rescan`, before listing
+    bluetoothctl_step: float = Field(ge=0)  # between commands sent to bluetoothctl
+    snapshot: float = Field(gt=0)  # warm-start snapshot saves
+    shared_state: float = Field(gt=0)  # owner daemon: state published for API workers
+    command_window: float = Field(ge=0)  # steering-wheel presses coalesced into one D-Bus round
+
+
+class Caches(BaseModel):
+    """Cache sizes and how long a failing dependency is left alone."""
+    model_config = ConfigDict(extra="forbid")
+
+    cover_cache_mb: int = Field(ge=1)  # album art on disk
+    browse_folders: int = Field(ge=1)  # AVRCP folders kept with their pages
+    spotify_circuit_reset: float = Field(gt=0)  # Spotify skipped this long after repeated failures
+
+
+class Limits(BaseModel):
+    """Rates and budgets for calls leaving the process."""
+    model_config = ConfigDict(extra="forbid")
+
+    volume_writes: float = Field(gt=0)  # MediaTransport1.Volume writes per second
+    spotify_budget: float = Field(gt=0)  # seconds per Spotify search, token fetch included
+
+
+class Profile(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    intervals: Intervals
+    caches: Caches
+    limits: Limits
+
+
+class IdleSettings(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    enabled: bool = True
+    after: float = Field(default=60.0, ge=0)  # Seconds without subscribers before going idle
+
+
+class Settings(BaseModel):
+    """config.yaml, with the built-in profiles under any overrides it gives."""
+    model_config = ConfigDict(extra="forbid")
+
+    profile: str = "balanced"
+    idle: IdleSettings = IdleSettings()
+    profiles: dict[str, Profile]
+
+
+# balanced is what the services used before profiles existed
+PROFILES = {
+    "responsive": {
+        "intervals": {"metadata_resend": 1, "phone_poll": 1, "modem_poll": 2, "wifi_scan": 5, "wifi_scan_wait": 4,
+                      "bluetoothctl_step": 2, "snapshot": 15, "shared_state": 0.25, "command_window": 0.03,
+                      "loop_sample": 0.05},
+        "caches": {"cover_cache_mb": 128, "browse_folders": 32, "spotify_circuit_reset": 15},
+        "limits": {"volume_writes": 15, "spotify_budget": 2},
+    },
+    "balanced": {
+        "intervals": {"metadata_resend": 2, "phone_poll": 3, "modem_poll": 5, "wifi_scan": 10, "wifi_scan_wait": 10,
+                      "bluetoothctl_step": 3, "snapshot": 30, "shared_state": 1, "command_window": 0.05,
+                      "loop_sample": 0.05},
+        "caches": {"cover_cache_mb": 64, "browse_folders": 16, "spotify_circuit_reset": 30},
+        "limits": {"volume_writes": 10, "spotify_budget": 2},
+    },
+    "low-power": {
+        "intervals": {"metadata_resend": 5, "phone_poll": 10, "modem_poll": 20, "wifi_scan": 60, "wifi_scan_wait": 10,
+                      "bluetoothctl_step": 3, "snapshot": 120, "shared_state": 5, "command_window": 0.1,
+                      "loop_sample": 0.25},
+        "caches": {"cover_cache_mb": 16, "browse_folders": 4, "spotify_circuit_reset": 120},
+        "limits": {"volume_writes": 5, "spotify_budget": 1.5},
+    },
+}
@@ -0,0 +1,114 @@
+"""Hardware owner daemon, for serving the API from several uvicorn workers.
+
+    python -m app.owner
+    BLUEDRIVE_ROLE=worker uvicorn app.main:app --host 0.0.0.0 --workers 4
+
+The owner is the only process that talks to BlueZ, oFono, NetworkManager,
+bluetoothctl and Spotify. It publishes the dashboard state (metadata,
+volume, devices, phone, service health, snapshot) to a shared-memory
+segment and announces each new version on its command socket. Workers
+serve HTTP and WebSockets from that state and forward commands over the
+socket. Start it before the workers; they wait for it, and reconnect
+when it restarts.
+"""
+import asyncio
+import os
+import signal
+
+from app.containers import service_container
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import JournalContainer
+from app.containers.logging_container import LoggingContainer
+from app.containers.trace_container import TraceContainer
+from app.services.owner_link import OwnerServer
+from app.services.shared_state import StatePublisher
+from app.utils.ipc_utils import acquire_owner_lock, owner_socket_path, release_owner_lock, shared_state_path
+
+logger = LoggingContainer.get_logger("Owner")
+
+
+def _publisher() -> StatePublisher:
+    interval = os.getenv("BLUEDRIVE_SHARED_STATE_INTERVAL")
+    publisher = StatePublisher(
+        shared_state_path(),
+        size=int(float(os.getenv("BLUEDRIVE_SHARED_STATE_KB", "1024")) * 1024),
+        interval=float(interval) if interval else None,  # None: the profile's
+    )
+    device_registry = service_container.device_registry
+    hfp_service = service_container.hfp_service
+    media_service = service_container.media_service
+    # Sources never build a service; unbuilt ones are left out until they are
+    publisher.add_source("health", service_container.status, while_idle=True)
+    publisher.add_source("snapshot", service_container.state_snapshot.snapshot)
+    publisher.add_source("metadata", lambda: media_service.get_spotify_metadata() if media_service.built else None)
+    publisher.add_source("volume", lambda: media_service.volume.get() if media_service.built else None)
+    publisher.add_source("devices", lambda: device_registry.devices() if device_registry.built else None)
+    publisher.add_source("phone", lambda: hfp_service.get_call_status() if hfp_service.built else None)
+    return publisher
+
+
+async def _push_changes(publisher: StatePublisher, warm_up: asyncio.Task):
+    """Publish pushed changes right away; polling alone would delay them by up to an interval."""
+    await warm_up
+    device_registry = service_container.device_registry
+    media_service = service_container.media_service
+    if device_registry.built:
+        device_registry.add_change_listener(lambda: publisher.refresh("devices"))
+    if not media_service.built:
+        return
+    tracks = media_service.subscribe()
+    volumes = media_service.volume.subscribe()
+
+    async def forward(section: str, updates: asyncio.Queue):
+        while True:
+            publisher.publish(section, await updates.get())
+
+    try:
+        await asyncio.gather(forward("metadata", tracks), forward("volume", volumes))
+    finally:
+        media_service.unsubscribe(tracks)
+        media_service.volume.unsubscribe(volumes)
+
+
+async def serve():
+    owner_lock = acquire_owner_lock()
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    # Workers report their subscribers; the owner's own subscriptions only feed the shared state
+    ConfigContainer.start(count_local=False)
+    service_container.state_snapshot.start()
+    service_container.loop_monitor.start()
+    service_container.telemetry_service.start()
+    publisher = _publisher()
+    server = OwnerServer(service_container.owner_targets())
+    await server.start(owner_socket_path())
+    publisher.on_change = server.notify
+    publisher.start()
+    warm_up = asyncio.create_task(service_container.warm_up())
+    pushes = asyncio.create_task(_push_changes(publisher, warm_up))
+    logger.info("🚗 Owner daemon ready (pid %d)", os.getpid())
+
+    await stopping.wait()
+    logger.info("🛑 Owner daemon stopping")
+    pushes.cancel()
+    await server.stop()
+    publisher.stop()
+    await asyncio.wait({warm_up}, timeout=5)
+    service_container.shutdown()
+    owner_socket_path().unlink(missing_ok=True)
+    ConfigContainer.shutdown()
+    JournalContainer.shutdown()
+    TraceContainer.shutdown()
+    LoggingContainer.shutdown()
+    release_owner_lock(owner_lock)
+
+
+def main():
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import os
+import re
+import shutil
+import tarfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.containers.journal_container import STATE, JournalContainer
+from app.containers.logging_container import LoggingContainer
+from app.containers.metrics_container import MetricsContainer
+from app.utils.metrics_utils import TimedBus, run_command
+from app.utils.trace_utils import add_event, set_attribute, traced
+
+logger = LoggingContainer.get_logger("BluetoothCache")
+
+# Softest first; a device is escalated through all three, the whole adapter skips "device"
+LEVELS = ("cache", "device", "full")
+_MAC = re.compile(r"^(?:[0-9A-F]{2}:){5}[0-9A-F]{2}$")
+_BACKUP = re.compile(r"^bluetooth-\d{8}-\d{6}(?:-[a-z0-9-]+)?\.tar\.gz$")
+
+BT_RESETS = MetricsContainer.counter("bluedrive_bluetooth_resets_total", "Bluetooth cache resets by level", ("level",))
+
+
+class BluetoothCache:
+    """BlueZ's storage (/var/lib/bluetooth) reset one step at a time, with backups.
+
+    BlueZ keeps, per adapter, a directory per paired device (``info``
+    with the link keys, ``attributes`` with the GATT database) and a
+    ``cache/`` of every device ever seen (name, SDP records, GATT cache).
+    A phone that stops working after an update usually only needs its
+    cache and attributes gone:
+
+        cache   that device's cache/ entry and attributes; pairing kept
+        device  Adapter1.RemoveDevice: that device alone re-pairs
+        full    the whole directory, as the old reset did: every phone re-pairs
+
+    Without ``level``, resetting the same device (or the whole adapter)
+    again within ``escalate_after`` seconds goes one level further. Every
+    reset first saves the directory to ``backups`` (a few KB), and
+    ``restore`` puts any of those back. File changes are made with
+    bluetooth.service stopped, since bluetoothd rewrites what it holds in
+    memory.
+    """
+
+    def __init__(self, root: Path = Path("/var/lib/bluetooth"), backups: Path | None = None,
+                 keep: int = 10, escalate_after: float = 600.0):
+        self.root = Path(root)
+        self.backups = Path(backups) if backups is not None else None
+        self.keep = keep
+        self.escalate_after = escalate_after
+        self._lock = threading.Lock()
+        self._last = {}  # address or None (whole adapter) -> (level, monotonic time)
+
+    # Storage
+
+    def adapters(self) -> list[Path]:
+        if not self.root.is_dir():
+            return []
+        return sorted(path for path in self.root.iterdir() if path.is_dir() and _MAC.match(path.name))
+
+    def devices(self) -> list[dict]:
+        """Devices BlueZ stores, per adapter: paired (has info), with attributes, with a cache entry."""
+        devices = []
+        for adapter in self.adapters():
+            cached = {path.name for path in (adapter / "cache").glob("*") if _MAC.match(path.name)}
+            stored = {path.name for path in adapter.iterdir() if path.is_dir() and _MAC.match(path.name)}
+            for address in sorted(cached | stored):
+                devices.append({
+                    "adapter": adapter.name,
+                    "address": address,
+                    "paired": (adapter / address / "info").is_file(),
+                    "attributes": (adapter / address / "attributes").is_file(),
+                    "cache": address in cached,
+                })
+        return devices
+
+    # Resets
+
+    @traced("bluetooth.reset_cache")
+    def reset(self, address: str | None = None, level: str | None = None) -> dict:
+        """Reset one device (or every device with ``address`` None) at ``level``.
+
+        Raises ValueError for an unknown level and LookupError when BlueZ
+        stores nothing for ``address``; a failing systemctl raises
+        CalledProcessError after the files it could change are changed.
+        """
+        address = address.upper() if address else None
+        if address and not _MAC.match(address):
+            raise ValueError(f"Geçersiz MAC adresi: {address}")
+        if level is not None and level not in LEVELS:
+            raise ValueError(f"Bilinmeyen seviye: {level} ({', '.join(LEVELS)})")
+        with self._lock:
+            if level is None:
+                level = self._next_level(address)
+            if address and level != "full" and not any(d["address"] == address for d in self.devices()):
+                raise LookupError(f"Cihaz bulunamadı: {address}")
+            set_attribute("bluetooth.reset_level", level)
+            if address:
+                set_attribute("bluetooth.mac", address)
+            logger.info("🧹 Bluetooth reset (%s): %s", level, address or "all devices")
+
+            backup = self.backup(f"before-{level}")
+            if level == "cache":
+                result = self._offline(lambda: self._remove_cached(address))
+            elif level == "device" and address:
+                result = self._remove_device(address)
+            else:
+                result = self._offline(self._remove_all)
+            result.update(level=level, address=address, backup=backup)
+
+            self._last[address] = (level, time.monotonic())
+        BT_RESETS.labels(level).inc()
+        JournalContainer.record(STATE, "bluetooth.reset", {"level": level, "address": address,
+                                                           "removed": len(result["removed"])})
+        logger.info("✅ Bluetooth reset (%s) done: %d path(s) removed", level, len(result["removed"]))
+        return result
+
+    def _next_level(self, address: str | None) -> str:
+        levels = LEVELS if address else ("cache", "full")
+        last, at = self._last.get(address, (None, 0.0))
+        if last is None or time.monotonic() - at > self.escalate_after:
+            return levels[0]
+        # A repeated reset is one further along, and stays at the strongest
+        following = [level for level in levels if LEVELS.index(level) > LEVELS.index(last)]
+        return following[0] if following else levels[-1]
+
+    def _remove_cached(self, address: str | None) -> list[str]:
+        paths = []
+        for adapter in self.adapters():
+            if address:
+                paths += [adapter / "cache" / address, adapter / address / "attributes"]
+            else:
+                paths += list((adapter / "cache").glob("*")) + list(adapter.glob("*/attributes"))
+        return self._delete(paths)
+
+    def _remove_all(self) -> list[str]:
+        return self._delete(list(self.root.iterdir()) if self.root.is_dir() else [])
+
+    def _remove_device(self, address: str) -> dict:
+        """RemoveDevice on the running bluetoothd; what it leaves on disk is removed offline."""
+        stored = [path for adapter in self.adapters()
+                  for path in (adapter / address, adapter / "cache" / address) if path.exists()]
+        via = "files"
+        try:
+            self._remove_over_dbus(address)
+            via = "RemoveDevice"
+        except Exception as e:
+            logger.warning("⚠️ RemoveDevice for %s failed, removing its files offline: %s", address, e)
+        removed = [str(path.relative_to(self.root)) for path in stored if not path.exists()]
+        leftovers = [path for path in stored if path.exists()]
+        if not leftovers:
+            return {"removed": removed, "restarted": False, "via": via}
+        result = self._offline(lambda: self._delete(leftovers))
+        result.update(removed=removed + result["removed"], via=via)
+        return result
+
+    def _remove_over_dbus(self, address: str):
+        from pydbus import SystemBus
+
+        bus = TimedBus(SystemBus())
+        objects = bus.get("org.bluez", "/").GetManagedObjects()
+        found = False
+        for path, interfaces in objects.items():
+            device = interfaces.get("org.bluez.Device1")
+            if device and device.get("Address", "").upper() == address:
+                bus.get("org.bluez", device["Adapter"]).RemoveDevice(path)
+                add_event(f"RemoveDevice {path}")
+                found = True
+        if not found:
+            raise LookupError(f"BlueZ {address} cihazını tanımıyor")
+
+    def _offline(self, change) -> dict:
+        """Run ``change()`` (returns removed paths) with bluetooth.service stopped."""
+        run_command(["sudo", "systemctl", "stop", "bluetooth"], check=True)
+        try:
+            removed = change()
+        finally:
+            run_command(["sudo", "systemctl", "start", "bluetooth"], check=True)
+            logger.info("♻️ Bluetooth service restarted")
+        return {"removed": removed, "restarted": True}
+
+    def _delete(self, paths: list[Path]) -> list[str]:
+        removed = []
+        for path in paths:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            elif path.exists() or path.is_symlink():
+                path.unlink()
+            else:
+                continue
+            removed.append(str(path.relative_to(self.root)))
+        return removed
+
+    # Backups
+
+    def backup(self, reason: str = "manual") -> str | None:
+        """Save the storage directory as bluetooth-<time>-<reason>.tar.gz; None without backups or storage."""
+        if self.backups is None or not self.root.is_dir():
+            return None
+        self.backups.mkdir(parents=True, exist_ok=True)
+        reason = re.sub(r"[^a-z0-9-]+", "-", reason.lower()).strip("-")
+        stamp = f"bluetooth-{datetime.now():%Y%m%d-%H%M%S}{'-' + reason if reason else ''}"
+        name, counter = f"{stamp}.tar.gz", 1
+        while (self.backups / name).exists():  # Two backups in the same second
+            counter += 1
+            name = f"{stamp}-{counter}.tar.gz"
+        path = self.backups / name
+        tmp = path.with_name(path.name + ".tmp")
+        with tarfile.open(tmp, "w:gz") as archive:
+            archive.add(self.root, arcname=".")
+        os.replace(tmp, path)
+        logger.info("💾 Bluetooth pairings saved: %s", name)
+        self._prune()
+        return name
+
+    def list_backups(self) -> list[dict]:
+        if self.backups is None or not self.backups.is_dir():
+            return []
+        backups = []
+        for path in self.backups.glob("bluetooth-*.tar.gz"):
+            stat = path.stat()
+            backups.append({"name": path.name, "size": stat.st_size, "created": stat.st_mtime})
+        return sorted(backups, key=lambda backup: backup["created"], reverse=True)
+
+    def restore(self, name: str) -> dict:
+        """Replace the storage directory with a backup; the current one is backed up first."""
+        path = self.backups / name if self.backups is not None and _BACKUP.match(name) else None
+        if path is None or not path.is_file():
+            raise LookupError(f"Yedek bulunamadı: {name}")
+        # Opened before the current directory is backed up, which may prune this one
+        with tarfile.open(path, "r:gz") as archive, self._lock:
+            members = archive.getmembers()
+            for member in members:
+                target = (self.root / member.name).resolve()
+                if not (member.isdir() or member.isfile()) or not target.is_relative_to(self.root.resolve()):
+                    raise ValueError(f"Yedek geçersiz bir yol içeriyor: {member.name}")
+            before = self.backup("before-restore")
+
+            def change():
+                removed = self._remove_all()
+                self.root.mkdir(parents=True, exist_ok=True)
+                # filter="data" where available (3.11.4+); the members were checked above either way
+                extra = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+                archive.extractall(self.root, members=members, **extra)
+                return removed
+
+            result = self._offline(change)
+            self._last.clear()
+        JournalContainer.record(STATE, "bluetooth.restore", {"backup": name})
+        logger.info("♻️ Bluetooth pairings restored from %s", name)
+        return {"restored": name, "backup": before, "restarted": result["restarted"]}
+
+    def _prune(self):
+        for backup in self.list_backups()[self.keep:]:
+            (self.backups / backup["name"]).unlink(missing_ok=True)
+
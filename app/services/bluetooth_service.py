@@ -1,68 +1,82 @@
 import asyncio
-import os
-import shutil
 import subprocess
 import time
 import re
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import STATE, JournalContainer
 from app.containers.logging_container import LoggingContainer
-from pydbus import SystemBus
-import pexpect
+from app.services.bluetooth_cache import BluetoothCache
+from app.utils.metrics_utils import TimedBus, observe_subprocess
+from app.utils.trace_utils import add_event, set_attribute, traced
 
 logger = LoggingContainer.get_logger("BluetoothService")
 
 class BluetoothService:
-    def __init__(self):
-        pass
+    def __init__(self, cache: BluetoothCache | None = None):
+        self.cache = cache or BluetoothCache()
     
     # Need to be updated
     async def auto_connect_paired_devices(self) -> bool:
         return True
 
     # Completed
+    @traced("bluetooth.scan_devices")
     async def scan_devices(self, scan_duration=10):
         """Scan bluetooth devices for a given duration."""
         logger.info(f"Scanning is started. Scan duration is {scan_duration}")
-        process = subprocess.Popen(
-            ["bluetoothctl"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        try:
-            process.stdin.write("scan on\n")
-            process.stdin.flush()
-            time.sleep(scan_duration)
-            process.stdin.write("scan off\n")
-            process.stdin.write("devices\n")
-            process.stdin.write("exit\n")
-            process.stdin.flush()
-        except Exception as e:
-            logger.error(f"Error while sending commands: {e}")
-            process.terminate()
-
-        output, _ = process.communicate()
-        return self._parse_devices(output)  
+        with observe_subprocess("bluetoothctl"):
+            process = subprocess.Popen(
+                ["bluetoothctl"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            try:
+                process.stdin.write("scan on\n")
+                process.stdin.flush()
+                await asyncio.sleep(scan_duration)
+                process.stdin.write("scan off\n")
+                process.stdin.write("devices\n")
+                process.stdin.write("exit\n")
+                process.stdin.flush()
+            except Exception as e:
+                logger.error(f"Error while sending commands: {e}")
+                process.terminate()
+
+            output, _ = await asyncio.to_thread(process.communicate)
+        devices = self._parse_devices(output)
+        JournalContainer.record(STATE, "bluetooth.scan", {"devices": len(devices)})
+        return devices
     
     # It can be better
+    @traced("bluetooth.disconnect_device")
     async def disconnect_device(self):
         """Disconnect connected device."""
         logger.info("Disconnecting device...")
-        return await self._run_bluetoothctl_commands(["disconnect"])
+        disconnected = await self._run_bluetoothctl_commands(["disconnect"])
+        JournalContainer.record(STATE, "bluetooth.disconnect", {"ok": disconnected})
+        return disconnected
     
     # Completed
+    @traced("bluetooth.connect_device")
     async def connect_device(self, mac_address: str):
         """ Trys to connect to a device. If the device is already paired, it will connect directly. If not, it will pair and connect."""
         logger.info(f"Connecting to device: {mac_address}")
-        known_devices = self._get_known_devices_mac_address()
-        if mac_address in known_devices:
+        set_attribute("bluetooth.mac", mac_address)
+        known_devices = await asyncio.to_thread(self._get_known_devices_mac_address)
+        paired = mac_address in known_devices
+        if paired:
             logger.info(f"Device {mac_address} is already paired.")
-            return await self.connect_paired_device(mac_address)
+            connected = await self.connect_paired_device(mac_address)
         else:
             logger.info(f"Device {mac_address} is new. Pairing and connecting...")
-            return await self.connect_new_device(mac_address)
+            connected = await self.connect_new_device(mac_address)
+        JournalContainer.record(STATE, "bluetooth.connect", {"mac": mac_address, "paired": paired, "ok": connected})
+        return connected
     
     # Completed
+    @traced("bluetooth.connect_paired_device")
     async def connect_paired_device(self, mac_address: str):
         """Connect to a paired device."""
         await self.disconnect_device()
@@ -72,173 +86,181 @@ class BluetoothService:
                 f"connect {mac_address}",
                 "exit"
             ])  
-            return self._try_activate_profiles(mac_address)
+            return await asyncio.to_thread(self._try_activate_profiles, mac_address)
         except Exception as e:
             logger.error(f"Connecting to paired device failed: {e}")
             return False
 
     # Check if this function is working
+    @traced("bluetooth.connect_new_device")
     async def connect_new_device(self, mac_address: str):
         """Pair and connect a new device using pexpect with auto-confirmation."""
         await self.disconnect_device()
+        # pexpect waits up to 20 s per step, so the session runs in a thread
+        return await asyncio.to_thread(self._pair_and_connect, mac_address)
+
+    def _pair_and_connect(self, mac_address: str) -> bool:
+        import pexpect  # Only needed for pairing, kept off the startup path
         logger.info(f"🔐 [pexpect] Starting pairing with new device: {mac_address}")
         child = None
         
-        try:
-            # 1. Start bluetoothctl session
-            child = pexpect.spawn("bluetoothctl", encoding="utf-8", timeout=15)
-            child.delaybeforesend = 0.5  # Delay between sends
+        with observe_subprocess("bluetoothctl"):
+            try:
+                # 1. Start bluetoothctl session
+                child = pexpect.spawn("bluetoothctl", encoding="utf-8", timeout=15)
+                child.delaybeforesend = 0.5  # Delay between sends
             
-            # 2. Wait for initial prompt
-            child.expect(r"\[bluetooth\].*#", timeout=10)
+                # 2. Wait for initial prompt
+                child.expect(r"\[bluetooth\].*#", timeout=10)
+                add_event("prompt")
             
-            # 3. Agent configuration
-            child.sendline("agent NoInputNoOutput")
-            child.expect("Agent is already registered", timeout=5)
+                # 3. Agent configuration
+                child.sendline("agent NoInputNoOutput")
+                child.expect("Agent is already registered", timeout=5)
             
-            child.sendline("default-agent")
-            child.expect("Default agent request successful", timeout=5)
+                child.sendline("default-agent")
+                child.expect("Default agent request successful", timeout=5)
+                add_event("agent ready")
             
-            # 4. Begin pairing
-            child.sendline(f"pair {mac_address}")
+                # 4. Begin pairing
+                child.sendline(f"pair {mac_address}")
             
-            # 5. Handle possible responses
-            patterns = [
-                "Confirm passkey.*yes/no",    # 0 - Confirm passkey
-                "Enter PIN code:",            # 1 - Request PIN
-                "Pairing successful",         # 2 - Success
-                "Already paired",             # 3 - Already paired
-                "Failed to pair",             # 4 - Failed
-                "Device not available",       # 5 - Not found
-                pexpect.TIMEOUT               # 6 - Timeout
-            ]
+                # 5. Handle possible responses
+                patterns = [
+                    "Confirm passkey.*yes/no",    # 0 - Confirm passkey
+                    "Enter PIN code:",            # 1 - Request PIN
+                    "Pairing successful",         # 2 - Success
+                    "Already paired",             # 3 - Already paired
+                    "Failed to pair",             # 4 - Failed
+                    "Device not available",       # 5 - Not found
+                    pexpect.TIMEOUT               # 6 - Timeout
+                ]
             
-            while True:
-                index = child.expect(patterns)
+                while True:
+                    index = child.expect(patterns)
+                    add_event("pair response", response=patterns[index] if index != 6 else "timeout")
                 
-                if index == 0:  # Passkey confirmation
-                    child.sendline("yes")
-                    logger.info("✅ Passkey automatically confirmed")
+                    if index == 0:  # Passkey confirmation
+                        child.sendline("yes")
+                        logger.info("✅ Passkey automatically confirmed")
                     
-                elif index == 1:  # Enter PIN
-                    child.sendline("0000")  # Default PIN
-                    logger.info("🔑 Default PIN (0000) sent")
+                    elif index == 1:  # Enter PIN
+                        child.sendline("0000")  # Default PIN
+                        logger.info("🔑 Default PIN (0000) sent")
                     
-                elif index == 2:  # Success
-                    logger.info("✅ Pairing completed successfully")
-                    break
+                    elif index == 2:  # Success
+                        logger.info("✅ Pairing completed successfully")
+                        break
                     
-                elif index == 3:  # Already paired
-                    logger.info("ℹ️ Device already paired")
-                    break
+                    elif index == 3:  # Already paired
+                        logger.info("ℹ️ Device already paired")
+                        break
                     
-                elif index in [4, 5, 6]:  # Errors
-                    logger.error(f"❌ Pairing error: {child.before}")
-                    return False
-
-            # 6. Mark device as trusted
-            child.sendline(f"trust {mac_address}")
-            child.expect("trust succeeded", timeout=10)
+                    elif index in [4, 5, 6]:  # Errors
+                        logger.error(f"❌ Pairing error: {child.before}")
+                        return False
+
+                # 6. Mark device as trusted
+                child.sendline(f"trust {mac_address}")
+                child.expect("trust succeeded", timeout=10)
+                add_event("trusted")
             
-            # 7. Attempt to connect
-            child.sendline(f"connect {mac_address}")
+                # 7. Attempt to connect
+                child.sendline(f"connect {mac_address}")
             
-            # 8. Check connection result
-            connection_result = child.expect([
-                "Connection successful.*#", 
-                "Failed to connect",
-                pexpect.TIMEOUT
-            ], timeout=20)
+                # 8. Check connection result
+                connection_result = child.expect([
+                    "Connection successful.*#", 
+                    "Failed to connect",
+                    pexpect.TIMEOUT
+                ], timeout=20)
+                add_event("connect response", response=("connected", "failed", "timeout")[connection_result])
             
-            if connection_result == 0:
-                logger.info("✅ Device connected successfully")
-                # 9. Disable pairable/discoverable modes
-                child.sendline("pairable off")
-                child.sendline("discoverable off")
-                logger.info("🎧 A2DP profile activated")
-                return True
+                if connection_result == 0:
+                    logger.info("✅ Device connected successfully")
+                    # 9. Disable pairable/discoverable modes
+                    child.sendline("pairable off")
+                    child.sendline("discoverable off")
+                    logger.info("🎧 A2DP profile activated")
+                    return True
                 
-            logger.error(f"❌ Connection failed: {child.before}")
-            return False
+                logger.error(f"❌ Connection failed: {child.before}")
+                return False
             
-        except Exception as e:
-            logger.exception(f"⛔ Critical error during device connection: {str(e)}")
-            return False
+            except Exception as e:
+                logger.exception(f"⛔ Critical error during device connection: {str(e)}")
+                return False
             
-        finally:
-            if child and child.isalive():
-                child.sendline("exit")
-                child.close()
+            finally:
+                if child and child.isalive():
+                    child.sendline("exit")
+                    child.close()
 
     # Completed
+    @traced("bluetooth.run_bluetoothctl_commands")
     async def _run_bluetoothctl_commands(self, commands):
         """Send commands into bluetoothctl and check the output."""
-        process = subprocess.Popen(
-            ["bluetoothctl"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        with observe_subprocess("bluetoothctl"):
+            process = subprocess.Popen(
+                ["bluetoothctl"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
 
-        try:
-            for cmd in commands:
-                process.stdin.write(cmd + "\n")
-                process.stdin.flush()
-                time.sleep(3)
-        except Exception as e:
-            logger.error(f"❌ Error while sending commands: {e}")
-            process.terminate()
+            try:
+                for cmd in commands:
+                    add_event(f"send {cmd}")
+                    process.stdin.write(cmd + "\n")
+                    process.stdin.flush()
+                    await asyncio.sleep(ConfigContainer.intervals().bluetoothctl_step)
+            except Exception as e:
+                logger.error(f"❌ Error while sending commands: {e}")
+                process.terminate()
 
-        output, _ = process.communicate()
-        logger.debug("📄 bluetoothctl output:")
-        logger.debug(output)
+            output, _ = await asyncio.to_thread(process.communicate)
+        logger.debug("📄 bluetoothctl output:\n%s", output)
 
         return "Connected: yes" in output
     
     # Completed
-    def reset_bluetooth_cache(self):
-        try:
-            # 1. Stop the Bluetooth service
-            subprocess.run(["sudo", "systemctl", "stop", "bluetooth"], check=True)
-            
-            # 2. Delete the Bluetooth cache directory
-            cache_path = "/var/lib/bluetooth"
-            if os.path.exists(cache_path):
-                shutil.rmtree(cache_path)
-                logger.info(f"✅ Bluetooth cache deleted: {cache_path}")
-            else:
-                logger.info("ℹ️ Cache directory does not exist")
+    def reset_bluetooth_cache(self, mac_address: str | None = None, level: str | None = None) -> dict:
+        """Reset one device's (or every device's) BlueZ cache, escalating on repeats; see BluetoothCache."""
+        return self.cache.reset(mac_address, level)
+
+    def cached_devices(self) -> list[dict]:
+        return self.cache.devices()
+
+    def backup_pairings(self) -> str | None:
+        return self.cache.backup()
+
+    def pairing_backups(self) -> list[dict]:
+        return self.cache.list_backups()
+
+    def restore_pairings(self, name: str) -> dict:
+        return self.cache.restore(name)
 
-            # 3. Restart the Bluetooth service
-            subprocess.run(["sudo", "systemctl", "start", "bluetooth"], check=True)
-            logger.info("♻️ Bluetooth service restarted")
-            
-            return True
-        
-        except Exception as e:
-            logger.error(f"❌ An error occurred while resetting Bluetooth cache: {str(e)}")
-            return False
-        
     # Completed
     def get_known_devices(self):
         try:
             # Launch bluetoothctl in interactive mode
-            process = subprocess.Popen(
-                ["bluetoothctl"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1  # Enable line buffering
-            )
-
-            # Send commands and read the output
-            commands = [
-                "devices Paired\n",  # Correct command to list paired devices
-                "exit\n"
-            ]
-            output, error = process.communicate("".join(commands), timeout=10)
+            with observe_subprocess("bluetoothctl"):
+                process = subprocess.Popen(
+                    ["bluetoothctl"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    bufsize=1  # Enable line buffering
+                )
+
+                # Send commands and read the output
+                commands = [
+                    "devices Paired\n",  # Correct command to list paired devices
+                    "exit\n"
+                ]
+                output, error = process.communicate("".join(commands), timeout=10)
 
             # Example line: "Device 40:4E:36:AA:BB:CC JBL Speaker"
             device_pattern = re.compile(r"Device\s+([0-9A-Fa-f:]{17})\s+(.+)")
@@ -258,27 +280,29 @@ class BluetoothService:
             return []
     
     # Completed
+    @traced("bluetooth.get_known_devices_mac_address")
     def _get_known_devices_mac_address(self) -> list[str]:
         """Returns the list of paired Bluetooth device MAC addresses using bluetoothctl."""
         try:
             logger.info("Retrieving paired devices using bluetoothctl...")
 
             # Launch bluetoothctl in interactive mode
-            process = subprocess.Popen(
-                ["bluetoothctl"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1  # Enable line buffering
-            )
-
-            # Send commands to bluetoothctl
-            commands = [
-                "devices Paired\n",  # Lists paired devices
-                "exit\n"
-            ]
-            output, error = process.communicate("".join(commands), timeout=10)
+            with observe_subprocess("bluetoothctl"):
+                process = subprocess.Popen(
+                    ["bluetoothctl"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    bufsize=1  # Enable line buffering
+                )
+
+                # Send commands to bluetoothctl
+                commands = [
+                    "devices Paired\n",  # Lists paired devices
+                    "exit\n"
+                ]
+                output, error = process.communicate("".join(commands), timeout=10)
 
             # Check for any error output
             if error:
@@ -318,10 +342,13 @@ class BluetoothService:
         return list(unique_devices)
     
     # Completed -- Need to be more tests
+    @traced("bluetooth.try_activate_profiles")
     def _try_activate_profiles(self, mac_address: str) -> bool:
         """Try to activate supported Bluetooth profiles for a connected device."""
+        from pydbus import SystemBus
+
         logger.info(f"Activating profiles for device: {mac_address}")
-        bus = SystemBus()
+        bus = TimedBus(SystemBus())
         device_path = f"/org/bluez/hci0/dev_{mac_address.replace(':', '_')}"
 
         try:
@@ -339,7 +366,7 @@ class BluetoothService:
         # Try to read supported UUIDs
         try:
             uuids = device.UUIDs
-            logger.debug(f"UUIDs: {uuids}")
+            logger.debug("UUIDs: %s", uuids)
         except Exception as e:
             logger.error(f"Error retrieving UUIDs: {e}")
             uuids = []
@@ -348,6 +375,7 @@ class BluetoothService:
         try:
             player = bus.get("org.bluez", f"{device_path}/player0")
             player.Play()
+            add_event("sleep 1s after Play")
             time.sleep(1)
             player.Pause()
             logger.info("✅ A2DP activated successfully.")
@@ -370,54 +398,3 @@ class BluetoothService:
             logger.error(f"❌ Error while checking HFP support: {e}")
 
         return True
-    
-    """ def _try_activate_profiles(self,mac_address: str) -> bool:
-        Connect device and try to activate profiles.
-        logger.info(f"Profiles are being activated for {mac_address}")
-        bus = SystemBus()
-        device_path = f"/org/bluez/hci0/dev_{mac_address.replace(':', '_')}"
-        
-        try:
-            device = bus.get("org.bluez", device_path)
-            device.Connect()
-            time.sleep(1)
-        except Exception as e:
-            logger.error(f"Connection error: {e}")
-            return False
-
-        # UUID'ler üzerinden desteklenen profilleri kontrol edelim
-        try:
-            uuids = device.UUIDs
-            for uuid in uuids:
-                print(f" → {uuid}")
-        except Exception as e:
-            logger.error(f"Error catched on UUID retrieval: {e}")
-            uuids = []
-
-        # A2DP tetikle
-        try:
-            player = bus.get("org.bluez", f"{device_path}/player0")
-            player.Play()
-            time.sleep(1)
-            player.Pause()
-            logger.info(f"✅ A2DP  Activated")
-        except Exception as e:
-            logger.warning(f"❌ A2DP error when opening: {e}")
-
-        # AVRCP kontrolü (player zaten tetikliyor ama ayrı log için)
-        if any("110e" in uuid or "110c" in uuid for uuid in uuids):
-            logger.info("🎵 AVRCP is supported. Try to trigger.")
-        else:
-            logger.warning("⚠️ AVRCP UUID is not found.")
-
-        # HFP Audio Gateway (not: BlueZ tek başına HFP desteklemez)
-        try:
-            if any("111f" in uuid for uuid in uuids):
-                logger.info("📞 HFP is supported, try to trigger.")
-                # BlueZ üzerinden doğrudan bağlanamaz, sadece bilgilendirme
-            else:
-                logger.warning("⚠️ HFP UUID is not found.")
-        except Exception as e:
-            logger.error(f"❌ HFP control error: {e}")
-        return True """
-
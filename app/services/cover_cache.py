@@ -0,0 +1,247 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+from app.containers.logging_container import LoggingContainer
+from app.services.spotify_client import CircuitBreaker
+from app.utils.image_utils import extract_palette
+from app.utils.metrics_utils import HTTP_ERRORS, HTTP_SECONDS, cache_result
+from app.utils.trace_utils import CLIENT, span
+from app.utils.storage_utils import data_dir, write_atomic
+
+logger = LoggingContainer.get_logger("CoverCache")
+
+_COVER_ID = re.compile(r"[0-9a-f]{16}")
+
+
+class CoverCache:
+    """Size-bounded on-disk album art cache with pre-resized thumbnails.
+
+    Each cover lives in its own directory (``<id>/<size>.jpg`` plus
+    ``palette.json``) where the id is derived from the source URL. Whole covers
+    are evicted least recently used first once the cache grows past
+    ``max_bytes``. Downloads are streamed up to ``max_download`` bytes and
+    skipped while the Spotify circuit is open: the link is down and the
+    only enrichment worker would wait out the timeout for every track.
+    """
+
+    SIZES = (64, 300, 640)
+    DEFAULT_SIZE = 300
+    JPEG_QUALITY = 85
+
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        timeout: float = 5.0,
+        session: requests.Session | None = None,
+        max_download: int = 5 * 1024 * 1024,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.root = Path(root) if root else data_dir() / "covers"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_download = max_download
+        self.breaker = breaker
+        self.session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # cover_id -> bytes on disk, oldest first
+        self._etags = {}  # (cover_id, size) -> strong ETag
+        self._palettes = {}  # cover_id -> palette dict
+        self._total = 0
+        self._load()
+
+    @staticmethod
+    def cover_id(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def local_url(cover_id: str) -> str:
+        return f"/media/cover/{cover_id}"
+
+    def contains(self, cover_id: str) -> bool:
+        with self._lock:
+            return cover_id in self._entries
+
+    def fetch(self, url: str) -> str | None:
+        """Download and thumbnail a cover unless cached. Returns the cover id."""
+        cover_id = self.cover_id(url)
+        hit = self.contains(cover_id)
+        cache_result("cover", hit)
+        if hit:
+            self._touch(cover_id)
+            return cover_id
+        if self.breaker is not None and self.breaker.state == CircuitBreaker.OPEN:
+            logger.debug("Spotify circuit is open, not downloading %s", url)
+            return None
+
+        with span("HTTP GET cover", CLIENT) as traced:
+            start = time.perf_counter()
+            try:
+                content = self._download(url)
+                image = Image.open(io.BytesIO(content))
+                image.load()
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                HTTP_ERRORS.labels("cover", "image", type(e).__name__).inc()
+                logger.warning(f"Cover download failed for {url}: {e}")
+                if traced:
+                    traced.fail(type(e).__name__)
+                return None
+            finally:
+                HTTP_SECONDS.labels("cover", "image").observe(time.perf_counter() - start)
+
+        directory = self.root / cover_id
+        directory.mkdir(exist_ok=True)
+        size_on_disk = 0
+        for size in self.SIZES:
+            data = self._thumbnail(image, size)
+            write_atomic(directory / f"{size}.jpg", data)
+            size_on_disk += len(data)
+            with self._lock:
+                self._etags[(cover_id, size)] = self._etag(data)
+
+        # Computed once per cover so the frontend never decodes pixels itself
+        palette = extract_palette(image)
+        write_atomic(directory / "palette.json", json.dumps(palette).encode())
+
+        with self._lock:
+            self._entries[cover_id] = size_on_disk
+            self._palettes[cover_id] = palette
+            self._total += size_on_disk
+            evicted = self._evict()
+        for old_id in evicted:
+            self._remove_dir(old_id)
+        logger.debug("Cached cover %s (%d bytes)", cover_id, size_on_disk)
+        return cover_id
+
+    def get(self, cover_id: str, size: int = DEFAULT_SIZE) -> tuple[Path, str] | None:
+        """Path and strong ETag of a cached thumbnail, or None."""
+        if not _COVER_ID.fullmatch(cover_id):
+            return None
+        size = min(self.SIZES, key=lambda s: abs(s - size))
+        path = self.root / cover_id / f"{size}.jpg"
+        with self._lock:
+            if cover_id not in self._entries:
+                return None
+            etag = self._etags.get((cover_id, size))
+        if etag is None:
+            try:
+                etag = self._etag(path.read_bytes())
+            except OSError:
+                return None
+            with self._lock:
+                self._etags[(cover_id, size)] = etag
+        self._touch(cover_id)
+        return path, etag
+
+    def _download(self, url: str) -> bytes:
+        """Body of ``url``, raising ValueError past ``max_download`` bytes."""
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            if int(response.headers.get("Content-Length") or 0) > self.max_download:
+                raise ValueError(f"cover larger than {self.max_download} bytes")
+            content = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                if len(content) > self.max_download:
+                    raise ValueError(f"cover larger than {self.max_download} bytes")
+        return bytes(content)
+
+    def read(self, cover_id: str, size: int = DEFAULT_SIZE) -> bytes | None:
+        """Bytes of a cached thumbnail, or None. Read under the lock so eviction cannot race it."""
+        if not _COVER_ID.fullmatch(cover_id):
+            return None
+        size = min(self.SIZES, key=lambda s: abs(s - size))
+        with self._lock:
+            if cover_id not in self._entries:
+                return None
+            try:
+                return (self.root / cover_id / f"{size}.jpg").read_bytes()
+            except OSError:
+                return None
+
+    def palette(self, cover_id: str) -> dict | None:
+        with self._lock:
+            if cover_id not in self._entries:
+                return None
+            palette = self._palettes.get(cover_id)
+        if palette is None:
+            path = self.root / cover_id / "palette.json"
+            try:
+                palette = json.loads(path.read_text())
+            except FileNotFoundError:
+                # Cached before palettes existed: derive it from a thumbnail once
+                try:
+                    with Image.open(self.root / cover_id / f"{self.DEFAULT_SIZE}.jpg") as image:
+                        palette = extract_palette(image)
+                    write_atomic(path, json.dumps(palette).encode())
+                except OSError:
+                    return None
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._palettes[cover_id] = palette
+        return palette
+
+    def _touch(self, cover_id: str):
+        with self._lock:
+            if cover_id in self._entries:
+                self._entries.move_to_end(cover_id)
+        try:
+            # mtime carries the LRU order across restarts
+            os.utime(self.root / cover_id)
+        except OSError:
+            pass
+
+    def _evict(self) -> list:
+        """Drop least recently used covers until under budget. Caller holds the lock."""
+        evicted = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            old_id, size_on_disk = self._entries.popitem(last=False)
+            self._total -= size_on_disk
+            self._palettes.pop(old_id, None)
+            for size in self.SIZES:
+                self._etags.pop((old_id, size), None)
+            evicted.append(old_id)
+        return evicted
+
+    def _remove_dir(self, cover_id: str):
+        directory = self.root / cover_id
+        for file in directory.glob("*"):
+            file.unlink(missing_ok=True)
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+
+    def _load(self):
+        dirs = sorted((d for d in self.root.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime)
+        for directory in dirs:
+            size_on_disk = sum(f.stat().st_size for f in directory.glob("*.jpg"))
+            if size_on_disk:
+                self._entries[directory.name] = size_on_disk
+                self._total += size_on_disk
+        for old_id in self._evict():
+            self._remove_dir(old_id)
+        logger.info(f"Cover cache: {len(self._entries)} covers, {self._total} bytes")
+
+    def _thumbnail(self, image: Image.Image, size: int) -> bytes:
+        thumb = image.convert("RGB")
+        thumb.thumbnail((size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumb.save(buffer, format="JPEG", quality=self.JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _etag(data: bytes) -> str:
+        return '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
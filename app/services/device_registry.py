@@ -0,0 +1,498 @@
+import os
+import re
+import threading
+import time
+
+from pydbus import SystemBus
+
+from app.containers.journal_container import STATE, JournalContainer
+from app.containers.logging_container import LoggingContainer
+from app.models.schemas import SourceDevice
+from app.utils.metrics_utils import TimedBus
+
+logger = LoggingContainer.get_logger("DeviceRegistry")
+
+_DEVICE_PATH = re.compile(r"(/org/bluez/hci\d+/dev(?:_[0-9A-Fa-f]{2}){6})")
+_MAC = re.compile(r"(?:[0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}")
+
+
+class _Device:
+    __slots__ = (
+        "path", "address", "name", "paired", "connected", "connected_at",
+        "players", "modem_path", "modem_online", "modem_seen_at",
+        "transport_path", "volume",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self.address = path.rsplit("dev_", 1)[-1].replace("_", ":")
+        self.name = None
+        self.paired = False
+        self.connected = False
+        self.connected_at = 0.0
+        self.players = {}  # player path -> {"status", "track", "last_playing"}
+        self.modem_path = None
+        self.modem_online = False
+        self.modem_seen_at = 0.0
+        self.transport_path = None  # A2DP MediaTransport1 carrying the audio
+        self.volume = None
+
+
+class DeviceRegistry:
+    """Every connected phone with its AVRCP players and oFono modem.
+
+    The registry is seeded with one GetManagedObjects/GetModems call and then
+    kept current from ObjectManager, PropertiesChanged and oFono signals, so
+    there is no polling per device. The active source is chosen by policy:
+    user-pinned phone, then the most recently playing player, then the
+    driver's phone (BLUEDRIVE_DRIVER_PHONE), then the most recently connected.
+    """
+
+    def __init__(self, driver_address: str | None = None):
+        self.bus = TimedBus(SystemBus())
+        self.driver_address = (driver_address or os.getenv("BLUEDRIVE_DRIVER_PHONE") or "").upper() or None
+        self.pinned_address = None
+        self._lock = threading.RLock()
+        self._devices = {}  # device path -> _Device
+        self._active_player = None
+        self._subscriptions = []
+        self._player_listeners = []
+        self._active_listeners = []
+        self._change_listeners = []
+        self._interface_listeners = {}  # interface -> [callback(path, changed, invalidated)]
+        self._strength_listeners = []
+        self._seeded = False
+        self._last_seed_attempt = 0.0
+
+    # Lifecycle
+
+    def start(self):
+        """Seed from BlueZ/oFono and subscribe to their signals.
+
+        Signals are dispatched by the GLib main loop on the default context,
+        which HandsFreeService runs in its own thread.
+        """
+        subscriptions = [
+            dict(sender="org.bluez", iface="org.freedesktop.DBus.ObjectManager",
+                 signal="InterfacesAdded", signal_fired=self._on_interfaces_added),
+            dict(sender="org.bluez", iface="org.freedesktop.DBus.ObjectManager",
+                 signal="InterfacesRemoved", signal_fired=self._on_interfaces_removed),
+            dict(sender="org.bluez", iface="org.freedesktop.DBus.Properties",
+                 signal="PropertiesChanged", signal_fired=self._on_properties_changed),
+            dict(sender="org.ofono", iface="org.ofono.Manager",
+                 signal="ModemAdded", signal_fired=self._on_modem_added),
+            dict(sender="org.ofono", iface="org.ofono.Manager",
+                 signal="ModemRemoved", signal_fired=self._on_modem_removed),
+            dict(sender="org.ofono", iface="org.ofono.Modem",
+                 signal="PropertyChanged", signal_fired=self._on_modem_property_changed),
+            dict(sender="org.ofono", iface="org.ofono.NetworkRegistration", topic="ofono.NetworkRegistration.PropertyChanged",
+                 signal="PropertyChanged", signal_fired=self._on_network_property_changed),
+        ]
+        for kwargs in subscriptions:
+            # Journaled as received, so JournalReplayer can feed them back through journal_handlers()
+            topic = kwargs.pop("topic", None) or f"{kwargs['sender'][4:]}.{kwargs['signal']}"
+            kwargs["signal_fired"] = JournalContainer.journaled(topic, kwargs["signal_fired"])
+            try:
+                self._subscriptions.append(self.bus.subscribe(**kwargs))
+            except Exception as e:
+                logger.error(f"Could not subscribe to {kwargs['signal']}: {e}")
+        self.refresh()
+
+    def stop(self):
+        for subscription in self._subscriptions:
+            subscription.unsubscribe()
+        self._subscriptions = []
+
+    def refresh(self):
+        """Full rescan. Only used for seeding and recovery, never per request."""
+        self._last_seed_attempt = time.monotonic()
+        try:
+            objects = self.bus.get("org.bluez", "/").GetManagedObjects()
+        except Exception as e:
+            logger.error(f"BlueZ GetManagedObjects failed: {e}")
+            objects = {}
+        try:
+            modems = self.bus.get("org.ofono", "/").GetModems()
+        except Exception as e:
+            logger.warning(f"oFono GetModems failed: {e}")
+            modems = []
+
+        # Journaled like a signal, so a replay starts from the same devices
+        JournalContainer.journaled("registry.seed", self._seed)(objects, modems)
+
+    def _seed(self, objects: dict, modems: list):
+        with self._lock:
+            self._devices = {}
+            for path, interfaces in objects.items():
+                self._add_interfaces(path, interfaces)
+            for path, props in modems:
+                self._add_modem(path, props)
+            self._seeded = bool(objects)
+        logger.info(f"Device registry seeded: {len(self._devices)} device(s)")
+        self._reselect()
+
+    def journal_handlers(self) -> dict:
+        """Journal topic -> handler, for replaying recorded signals."""
+        return {
+            "registry.seed": self._seed,
+            "bluez.InterfacesAdded": self._on_interfaces_added,
+            "bluez.InterfacesRemoved": self._on_interfaces_removed,
+            "bluez.PropertiesChanged": self._on_properties_changed,
+            "ofono.ModemAdded": self._on_modem_added,
+            "ofono.ModemRemoved": self._on_modem_removed,
+            "ofono.PropertyChanged": self._on_modem_property_changed,
+            "ofono.NetworkRegistration.PropertyChanged": self._on_network_property_changed,
+        }
+
+    # Listeners
+
+    def add_player_listener(self, callback):
+        """callback(player_path, changed) for every MediaPlayer1 PropertiesChanged."""
+        self._player_listeners.append(callback)
+
+    def add_active_listener(self, callback):
+        """callback(player_path or None) when the active player changes."""
+        self._active_listeners.append(callback)
+
+    def add_change_listener(self, callback):
+        """callback() after any device, player or modem change."""
+        self._change_listeners.append(callback)
+
+    def add_interface_listener(self, interface: str, callback):
+        """callback(path, changed, invalidated) for PropertiesChanged on another BlueZ interface."""
+        self._interface_listeners.setdefault(interface, []).append(callback)
+
+    def add_strength_listener(self, callback):
+        """callback(kind, address, name, value): "bt" RSSI in dBm, "cell" network strength in %."""
+        self._strength_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    # Queries
+
+    def active_player_path(self) -> str | None:
+        if not self._seeded and time.monotonic() - self._last_seed_attempt > 5:
+            self.refresh()
+        return self._active_player
+
+    def player_state(self, player_path: str) -> dict | None:
+        with self._lock:
+            for device in self._devices.values():
+                if player_path in device.players:
+                    return dict(device.players[player_path])
+        return None
+
+    def address_for(self, path: str) -> str | None:
+        """Bluetooth address of the phone owning a BlueZ object path."""
+        with self._lock:
+            device = self._device_for(path, create=False)
+            return device.address if device else None
+
+    def player_path_for(self, address: str) -> str | None:
+        with self._lock:
+            device = self._by_address(address)
+            return self._best_player(device) if device else None
+
+    def transport_for(self, player_path: str) -> tuple[str | None, int | None]:
+        """(MediaTransport1 path, last known volume) of the phone owning a player."""
+        with self._lock:
+            device = self._device_for(player_path, create=False)
+            if device is None:
+                return None, None
+            return device.transport_path, device.volume
+
+    def active_modem_path(self) -> str | None:
+        """oFono modem of the preferred phone, using the same policy as players."""
+        with self._lock:
+            online = [d for d in self._devices.values() if d.modem_path and d.modem_online]
+            if not online:
+                return None
+            for address in (self.pinned_address, self.driver_address):
+                for device in online:
+                    if device.address == address:
+                        return device.modem_path
+            if self._active_player:
+                for device in online:
+                    if self._active_player in device.players:
+                        return device.modem_path
+            return max(online, key=lambda d: d.modem_seen_at).modem_path
+
+    def paired_devices(self) -> list[dict]:
+        """Paired phones as {"name", "mac"}, from memory rather than bluetoothctl."""
+        with self._lock:
+            return [{"name": d.name, "mac": d.address} for d in self._devices.values() if d.paired]
+
+    def last_phone(self) -> dict | None:
+        """Phone behind the active player, else the most recently connected one."""
+        with self._lock:
+            device = self._device_for(self._active_player, create=False) if self._active_player else None
+            if device is None:
+                connected = [d for d in self._devices.values() if d.connected]
+                device = max(connected, key=lambda d: d.connected_at) if connected else None
+            return {"name": device.name, "mac": device.address} if device else None
+
+    def devices(self) -> list[SourceDevice]:
+        with self._lock:
+            result = []
+            for device in self._devices.values():
+                # BlueZ also lists paired phones that are out of range
+                if not (device.connected or device.players or device.modem_path):
+                    continue
+                player_path = self._best_player(device)
+                player = device.players.get(player_path, {})
+                track = player.get("track") or {}
+                result.append(SourceDevice(
+                    address=device.address,
+                    name=device.name,
+                    connected=device.connected,
+                    player_path=player_path,
+                    modem_path=device.modem_path if device.modem_online else None,
+                    status=player.get("status"),
+                    title=track.get("Title"),
+                    artist=track.get("Artist"),
+                    active=player_path is not None and player_path == self._active_player,
+                    pinned=device.address == self.pinned_address,
+                    driver=device.address == self.driver_address,
+                ))
+            return result
+
+    # Policy
+
+    def pin(self, address: str | None):
+        """Pin a phone as the active source; None restores automatic selection."""
+        address = address.upper() if address else None
+        if address and not _MAC.fullmatch(address):
+            raise ValueError(f"Invalid Bluetooth address: {address}")
+        self.pinned_address = address
+        logger.info(f"Pinned source: {address or 'automatic'}")
+        self._reselect()
+
+    def _select(self) -> str | None:
+        """Caller holds the lock."""
+        candidates = [d for d in self._devices.values() if d.players]
+        if not candidates:
+            return None
+
+        if self.pinned_address:
+            device = self._by_address(self.pinned_address)
+            if device and device.players:
+                return self._best_player(device)
+
+        playing = [
+            (state["last_playing"], path)
+            for d in candidates for path, state in d.players.items()
+            if state.get("status") == "playing"
+        ]
+        if playing:
+            return max(playing)[1]
+
+        if self.driver_address:
+            device = self._by_address(self.driver_address)
+            if device and device.players:
+                return self._best_player(device)
+
+        # Nothing playing: stay on the current player while it exists
+        if self._active_player and any(self._active_player in d.players for d in candidates):
+            return self._active_player
+        return self._best_player(max(candidates, key=lambda d: d.connected_at))
+
+    def _best_player(self, device: _Device) -> str | None:
+        if not device.players:
+            return None
+        return max(device.players, key=lambda p: device.players[p]["last_playing"])
+
+    def _reselect(self):
+        with self._lock:
+            previous = self._active_player
+            self._active_player = self._select()
+            current = self._active_player
+        if current != previous:
+            logger.info("Active player: %s -> %s", previous, current)
+            JournalContainer.record(STATE, "registry.active_player", current)
+            for callback in self._active_listeners:
+                self._safe_call(callback, current)
+        for callback in list(self._change_listeners):
+            self._safe_call(callback)
+
+    # Signal handlers (GLib thread)
+
+    def _on_interfaces_added(self, sender, path, iface, signal, params):
+        object_path, interfaces = params
+        with self._lock:
+            self._add_interfaces(object_path, interfaces)
+        self._reselect()
+
+    def _on_interfaces_removed(self, sender, path, iface, signal, params):
+        object_path, interfaces = params
+        with self._lock:
+            if "org.bluez.Device1" in interfaces:
+                self._devices.pop(object_path, None)
+            if "org.bluez.MediaPlayer1" in interfaces:
+                device = self._device_for(object_path, create=False)
+                if device:
+                    device.players.pop(object_path, None)
+            if "org.bluez.MediaTransport1" in interfaces:
+                device = self._device_for(object_path, create=False)
+                if device and device.transport_path == object_path:
+                    device.transport_path = None
+                    device.volume = None
+        self._reselect()
+
+    def _on_properties_changed(self, sender, path, iface, signal, params):
+        interface, changed, invalidated = params
+        if interface == "org.bluez.Device1" and "RSSI" in changed:
+            # Only sent while discovering or for LE advertisements
+            self._report_strength("bt", path, changed["RSSI"])
+        if interface == "org.bluez.MediaTransport1" and "Volume" in changed:
+            # Recorded before listeners run so they read the new volume
+            with self._lock:
+                device = self._device_for(path, create=False)
+                if device:
+                    device.transport_path = path
+                    device.volume = changed["Volume"]
+        for callback in self._interface_listeners.get(interface, ()):
+            self._safe_call(callback, path, changed, invalidated)
+        if interface == "org.bluez.MediaPlayer1":
+            with self._lock:
+                device = self._device_for(path)
+                if device is None:
+                    return
+                state = device.players.setdefault(path, self._new_player())
+                if "Track" in changed:
+                    state["track"] = changed["Track"]
+                if "Status" in changed:
+                    state["status"] = changed["Status"]
+                    if changed["Status"] == "playing":
+                        state["last_playing"] = time.monotonic()
+            if "Status" in changed:
+                self._reselect()
+            for callback in self._player_listeners:
+                self._safe_call(callback, path, changed)
+        elif interface == "org.bluez.Device1" and ("Connected" in changed or "Name" in changed or "Paired" in changed):
+            with self._lock:
+                device = self._device_for(path, create=False)
+                if not device:
+                    return
+                device.name = changed.get("Name", device.name)
+                device.paired = bool(changed.get("Paired", device.paired))
+                if "Connected" in changed:
+                    device.connected = bool(changed["Connected"])
+                    if device.connected:
+                        device.connected_at = time.monotonic()
+            self._reselect()
+
+    def _on_modem_added(self, sender, path, iface, signal, params):
+        modem_path, props = params
+        with self._lock:
+            self._add_modem(modem_path, props)
+        self._reselect()
+
+    def _on_modem_removed(self, sender, path, iface, signal, params):
+        (modem_path,) = params
+        with self._lock:
+            for device in self._devices.values():
+                if device.modem_path == modem_path:
+                    device.modem_path = None
+                    device.modem_online = False
+        self._reselect()
+
+    def _on_modem_property_changed(self, sender, path, iface, signal, params):
+        name, value = params
+        if name != "Online":
+            return
+        with self._lock:
+            for device in self._devices.values():
+                if device.modem_path == path:
+                    device.modem_online = bool(value)
+                    device.modem_seen_at = time.monotonic()
+        self._reselect()
+
+    def _on_network_property_changed(self, sender, path, iface, signal, params):
+        name, value = params
+        if name == "Strength":
+            self._report_strength("cell", path, value)
+
+    def _report_strength(self, kind: str, path: str, value):
+        with self._lock:
+            device = self._device_for(path, create=False)
+            if device is None and kind == "cell":
+                device = next((d for d in self._devices.values() if d.modem_path == path), None)
+            if device is None:
+                return
+            address, name = device.address, device.name
+        for callback in self._strength_listeners:
+            self._safe_call(callback, kind, address, name, int(value))
+
+    # Helpers (caller holds the lock)
+
+    def _add_interfaces(self, path: str, interfaces: dict):
+        if "org.bluez.Device1" in interfaces:
+            props = interfaces["org.bluez.Device1"]
+            device = self._device_for(path)
+            device.address = props.get("Address", device.address)
+            device.name = props.get("Name", device.name)
+            device.paired = bool(props.get("Paired", False))
+            device.connected = bool(props.get("Connected", False))
+            if device.connected and not device.connected_at:
+                device.connected_at = time.monotonic()
+        if "org.bluez.MediaPlayer1" in interfaces:
+            props = interfaces["org.bluez.MediaPlayer1"]
+            device = self._device_for(props.get("Device") or path)
+            if device is None:
+                return
+            state = device.players.setdefault(path, self._new_player())
+            state["track"] = props.get("Track", state["track"])
+            state["status"] = props.get("Status", state["status"])
+            if state["status"] == "playing":
+                state["last_playing"] = time.monotonic()
+        if "org.bluez.MediaTransport1" in interfaces:
+            props = interfaces["org.bluez.MediaTransport1"]
+            device = self._device_for(props.get("Device") or path)
+            if device is None:
+                return
+            device.transport_path = path
+            device.volume = props.get("Volume", device.volume)
+
+    def _add_modem(self, path: str, props: dict):
+        serial = props.get("Serial", "")
+        device = None
+        if _MAC.fullmatch(serial or ""):
+            device = self._by_address(serial)
+        if device is None:
+            device = self._device_for(path, create=_DEVICE_PATH.search(path) is not None)
+        if device is None:
+            return
+        device.modem_path = path
+        device.modem_online = bool(props.get("Online", False))
+        device.modem_seen_at = time.monotonic()
+        device.name = device.name or props.get("Name")
+
+    def _device_for(self, path: str, create: bool = True) -> _Device | None:
+        match = _DEVICE_PATH.search(path)
+        if not match:
+            return None
+        device_path = match.group(1)
+        device = self._devices.get(device_path)
+        if device is None and create:
+            device = self._devices[device_path] = _Device(device_path)
+        return device
+
+    def _by_address(self, address: str) -> _Device | None:
+        address = address.upper()
+        for device in self._devices.values():
+            if device.address.upper() == address:
+                return device
+        return None
+
+    @staticmethod
+    def _new_player() -> dict:
+        return {"status": None, "track": {}, "last_playing": 0.0}
+
+    @staticmethod
+    def _safe_call(callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"Registry listener failed: {e}")
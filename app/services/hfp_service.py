@@ -1,5 +1,9 @@
 from app.models.schemas import HandsFreeData
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import STATE, JournalContainer
 from app.containers.logging_container import LoggingContainer
+from app.utils.metrics_utils import TimedProxy
+from app.utils.trace_utils import traced
 import dbus
 import threading
 from dbus.mainloop.glib import DBusGMainLoop
@@ -9,42 +13,70 @@ import time
 logger = LoggingContainer.get_logger("HandsFreeService")
 
 class HandsFreeService:
-    def __init__(self):
+    def __init__(self, registry=None):
         DBusGMainLoop(set_as_default=True)
         self.bus = dbus.SystemBus()
+        self.registry = registry
         self.modem_path = None
+        self.call_modem_path = None
         self.voice_call_manager = None
         self.active_call = None
         self.incoming_number = None
         self.device_name = None
 
         self.loop_running = False
+        self.monitor_heartbeat = None  # monotonic time of the last monitor iteration
         self.main_loop = GLib.MainLoop()
 
         # Ana GLib döngüsü ayrı thread
-        self.mainloop_thread = threading.Thread(target=self._run_glib_loop)
+        self.mainloop_thread = threading.Thread(target=self._run_glib_loop, name="GLibMainLoop")
         self.mainloop_thread.daemon = True
 
         # Modem kontrolü ayrı thread
-        self.monitor_thread = threading.Thread(target=self._monitor_loop)
+        self.monitor_thread = threading.Thread(target=self._monitor_loop, name="HFPMonitor")
         self.monitor_thread.daemon = True
 
-        #sinyal dinleyici
+        #sinyal dinleyici (journaled, so JournalReplayer can feed them back through journal_handlers())
         self.bus.add_signal_receiver(
-            self._modem_removed_handler,
+            JournalContainer.journaled("dbus.PropertyChanged", self._modem_removed_handler),
             signal_name="PropertyChanged",
             dbus_interface="org.freedesktop.DBus.Properties",
             path_keyword="path"
         )
 
+        # Calls from every connected phone, registered once (not per modem)
+        self.bus.add_signal_receiver(
+            JournalContainer.journaled("ofono.CallAdded", self._call_added_handler),
+            signal_name="CallAdded",
+            dbus_interface="org.ofono.VoiceCallManager",
+            path_keyword="modem_path"
+        )
+        self.bus.add_signal_receiver(
+            JournalContainer.journaled("ofono.CallRemoved", self._call_ended_handler),
+            signal_name="CallRemoved",
+            dbus_interface="org.ofono.VoiceCallManager",
+            path_keyword="modem_path"
+        )
+
+        if self.registry:
+            self.registry.add_change_listener(self._on_registry_change)
+
     def start(self):
-        print("🎧 HandsFreeService başlatılıyor")
+        logger.info("🎧 HandsFreeService başlatılıyor")
         self.loop_running = True
         self.mainloop_thread.start()
         self.monitor_thread.start()
 
+    def journal_handlers(self) -> dict:
+        """Journal topic -> handler, for replaying recorded signals."""
+        return {
+            "dbus.PropertyChanged": self._modem_removed_handler,
+            "ofono.CallAdded": self._call_added_handler,
+            "ofono.CallRemoved": self._call_ended_handler,
+        }
+
     def stop(self):
-        print("🛑 HandsFreeService durduruluyor")
+        logger.info("🛑 HandsFreeService durduruluyor")
         self.loop_running = False
         if self.main_loop.is_running():
             self.main_loop.quit()
@@ -53,10 +85,11 @@ class HandsFreeService:
         try:
             self.main_loop.run()
         except Exception as e:
-            print(f"⚠️ GLib loop hatası: {e}")
+            logger.error("⚠️ GLib loop hatası: %s", e)
 
     def _monitor_loop(self):
         while self.loop_running:
+            self.monitor_heartbeat = time.monotonic()
             try:
                 if not self.modem_path:
                     self._try_initialize()
@@ -66,19 +99,22 @@ class HandsFreeService:
                         
                         online = self.get_modem_online_status()
                         if not online:
-                            print(f"🛑 Modem bağlantısı kesildi (polling): {self.modem_path}")
+                            logger.warning("🛑 Modem bağlantısı kesildi (polling): %s", self.modem_path)
                             self.modem_path = None
                             self.voice_call_manager = None
                             self.device_name = ""
                     except dbus.DBusException as e:
-                        print("🛑 D-BusException türü:", type(e).__name__)
-                        print("📄 Hata mesajı:", str(e))
+                        logger.warning("🛑 D-BusException (%s): %s", type(e).__name__, e)
                         self.modem_path = None
                         self.voice_call_manager = None
                         self.device_name = ""
             except Exception as e:
-                print(f"[HFP Monitor] Genel hata: {e}")
-            time.sleep(5)
+                logger.exception("[HFP Monitor] Genel hata: %s", e)
+            # Held while idle: modem changes still arrive as oFono signals and registry changes
+            ConfigContainer.pause("modem_poll", heartbeat=self._beat)
+
+    def _beat(self):
+        self.monitor_heartbeat = time.monotonic()
 
 
     def _modem_removed_handler(self, interface, changed, invalidated, path=None):
@@ -88,57 +124,58 @@ class HandsFreeService:
             and changed["Online"] == False
             and path == self.modem_path
         ):
-            print(f"🛑 Modem bağlantısı kesildi: {path}")
+            logger.warning("🛑 Modem bağlantısı kesildi: %s", path)
             self.modem_path = None
             self.voice_call_manager = None
             self.device_name = ""
+            JournalContainer.record(STATE, "hfp.modem", {"path": None})
 
     def _try_initialize(self):
         """Modem varsa başlatma işlemi yap"""
         try:
-            manager = dbus.Interface(self.bus.get_object("org.ofono", "/"), "org.ofono.Manager")
+            manager = self._interface("/", "org.ofono.Manager")
             modems = manager.GetModems()
-            for path, props in modems:
-                if props.get("Online", False) and props.get("Powered", False):
-                    self.modem_path = path
-                    self.voice_call_manager = dbus.Interface(self.bus.get_object("org.ofono", self.modem_path), "org.ofono.VoiceCallManager")
-                    self.device_name = props.get("Name", "Bilinmeyen")
-                    self._setup_call_handlers()
-                    print(f"📱 Cihaz bağlandı: {self.device_name} ({self.modem_path})")
-                    return
-            print("⏳ Bekleniyor: Bağlı modem yok.")
+            # With several phones connected, the registry's active-source policy decides
+            preferred = self.registry.active_modem_path() if self.registry else None
+            online = [(path, props) for path, props in modems
+                      if props.get("Online", False) and props.get("Powered", False)]
+            online.sort(key=lambda modem: modem[0] != preferred)
+            for path, props in online:
+                self.modem_path = path
+                self.voice_call_manager = self._interface(self.modem_path, "org.ofono.VoiceCallManager")
+                self.device_name = props.get("Name", "Bilinmeyen")
+                logger.info("📱 Cihaz bağlandı: %s (%s)", self.device_name, self.modem_path)
+                JournalContainer.record(STATE, "hfp.modem", {"path": path, "name": self.device_name})
+                return
+            logger.debug("⏳ Bekleniyor: Bağlı modem yok.")
         except Exception as e:
-            print(f"[HFP] Modem kontrol hatası: {e}")
+            logger.warning("[HFP] Modem kontrol hatası: %s", e)
 
-    def _setup_call_handlers(self):
-        self.bus.add_signal_receiver(
-            self._call_added_handler,
-            signal_name="CallAdded",
-            path=self.modem_path,
-            dbus_interface="org.ofono.VoiceCallManager"
-        )
-        self.bus.add_signal_receiver(
-            self._call_ended_handler,
-            signal_name="CallRemoved",
-            path=self.modem_path,
-            dbus_interface="org.ofono.VoiceCallManager"
-        )
+    def _on_registry_change(self):
+        preferred = self.registry.active_modem_path()
+        if preferred and preferred != self.modem_path:
+            logger.info("🔀 Aktif telefon değişti: %s", preferred)
+            self._try_initialize()
 
-    def _call_added_handler(self, path, properties):
+    def _call_added_handler(self, path, properties, modem_path=None):
         state = properties.get("State", "")
         number = properties.get("LineIdentification", "Numara Yok")
         if state == "incoming":
             self.incoming_number = number
             self.active_call = path
-            print(f"🔔 Gelen Çağrı! Arayan: {number}")
+            self.call_modem_path = modem_path
+            logger.info("🔔 Gelen Çağrı! Arayan: %s (%s)", number, modem_path)
+            JournalContainer.record(STATE, "hfp.call", {"state": "incoming", "number": number, "modem": modem_path})
         elif state == "active":
-            print(f"📞 Aktif Çağrı: {number}")
+            logger.info("📞 Aktif Çağrı: %s", number)
 
-    def _call_ended_handler(self, path):
+    def _call_ended_handler(self, path, modem_path=None):
         if path == self.active_call:
-            print("📴 Çağrı sonlandı")
+            logger.info("📴 Çağrı sonlandı")
+            JournalContainer.record(STATE, "hfp.call", {"state": "ended", "path": path})
             self.active_call = None
             self.incoming_number = None
+            self.call_modem_path = None
 
     def get_call_status(self) -> dict:
         hpf_schema = HandsFreeData()
@@ -147,42 +184,53 @@ class HandsFreeService:
         hpf_schema.caller_info = self.incoming_number or None
         return hpf_schema.model_dump_json()
 
+    def _interface(self, path: str, interface: str):
+        """oFono interface proxy whose calls are timed in /metrics."""
+        return TimedProxy(dbus.Interface(self.bus.get_object("org.ofono", path), interface), "org.ofono", interface)
+
+    def _call_manager(self):
+        """VoiceCallManager of the phone with the current call, else of the active phone."""
+        if self.call_modem_path and self.call_modem_path != self.modem_path:
+            return self._interface(self.call_modem_path, "org.ofono.VoiceCallManager")
+        return self.voice_call_manager
+
+    @traced("hfp.answer_call")
     def answer_call(self):
-        if self.voice_call_manager:
-            calls = self.voice_call_manager.GetCalls()
+        manager = self._call_manager()
+        if manager:
+            calls = manager.GetCalls()
             for path, props in calls:
                 if props.get("State") == "incoming":
-                    call_iface = dbus.Interface(self.bus.get_object("org.ofono", path), "org.ofono.VoiceCall")
-                    print(f"📲 Çağrı cevaplanıyor: {path}")
+                    call_iface = self._interface(path, "org.ofono.VoiceCall")
+                    logger.info("📲 Çağrı cevaplanıyor: %s", path)
                     call_iface.Answer()
                     return
 
+    @traced("hfp.hangup_all")
     def hangup_all(self):
-        if self.voice_call_manager:
-            calls = self.voice_call_manager.GetCalls()
+        manager = self._call_manager()
+        if manager:
+            calls = manager.GetCalls()
             for path, _ in calls:
-                call_iface = dbus.Interface(self.bus.get_object("org.ofono", path), "org.ofono.VoiceCall")
+                call_iface = self._interface(path, "org.ofono.VoiceCall")
                 call_iface.Hangup()
-            print("❌ Tüm çağrılar kapatıldı.")
+            logger.info("❌ Tüm çağrılar kapatıldı.")
 
     def start_call_monitoring(self):
-        print("🎧 Çağrı izleme başlatıldı")
+        """Run the GLib loop in the calling thread, unless the service's own thread already does."""
+        if self.mainloop_thread.is_alive() or self.main_loop.is_running():
+            return
+        logger.info("🎧 Çağrı izleme başlatıldı")
         try:
             self.main_loop.run()
         except KeyboardInterrupt:
-            print("⏹️ İzleme durduruldu")
+            logger.info("⏹️ İzleme durduruldu")
 
     def get_modem_online_status(self) -> bool:
         """Modemin online durumunu güvenli şekilde kontrol eder"""
         try:
-            # 1. Modem objesini al
-            modem_obj = self.bus.get_object("org.ofono", self.modem_path)
-            
-            # 2. Doğru arayüzü kullan (org.ofono.Modem)
-            modem_iface = dbus.Interface(
-                modem_obj,
-                dbus_interface="org.ofono.Modem"
-            )
+            # 1-2. Modem objesini al, doğru arayüzü kullan (org.ofono.Modem)
+            modem_iface = self._interface(self.modem_path, "org.ofono.Modem")
             
             # 3. Tüm özellikleri al
             properties = modem_iface.GetProperties()
@@ -191,9 +239,9 @@ class HandsFreeService:
             return bool(properties.get('Online', False))
             
         except dbus.exceptions.DBusException as e:
-            print(f"⚠️ D-Bus Hatası: {str(e)}")
+            logger.warning("⚠️ D-Bus Hatası: %s", e)
             return False
         except Exception as e:
-            print(f"⚠️ Genel Hata: {str(e)}")
+            logger.warning("⚠️ Genel Hata: %s", e)
             return False
 
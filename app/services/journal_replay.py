@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+from app.containers.journal_container import SIGNAL, STATE, JournalContainer, read_journal
+from app.containers.logging_container import LoggingContainer
+
+logger = LoggingContainer.get_logger("JournalReplayer")
+
+
+class ReplayBusy(RuntimeError):
+    pass
+
+
+class JournalReplayer:
+    """Feeds a recorded journal back into the running services' signal handlers.
+
+    Each SIGNAL event is passed to the handler that received it in the
+    field (``journal_handlers()`` of the registry and HFP service), with the
+    recorded gaps divided by ``speed``. ``speed=0`` replays back to back,
+    which makes a journal a realistic workload for regression runs.
+
+    Replay is deterministic for state derived from signals: the
+    transitions it produces are compared, in order, with the recorded ones.
+    A journal that has wrapped no longer starts with the registry seed, so
+    its first transitions can differ. Wi-Fi, Bluetooth CLI and HFP modem
+    polling results come from commands, not signals: they are recorded but
+    never re-run. Replayed events are collected in memory and are not
+    written to the journal. Live signals that arrive meanwhile land in that
+    collection too, so replay against the mocked bus or an idle one.
+    """
+
+    # Transitions that follow from signals alone
+    DERIVED = ("registry.active_player", "hfp.call", "media.track", "media.status")
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._busy = threading.Lock()
+
+    async def replay(self, data: bytes, speed: float = 1.0, max_gap: float = 5.0) -> dict:
+        """Replay a journal file's contents; gaps longer than ``max_gap`` seconds are shortened to it."""
+        events = read_journal(data)
+        if not self._busy.acquire(blocking=False):
+            raise ReplayBusy("Başka bir yeniden oynatma zaten çalışıyor.")
+        try:
+            return await asyncio.to_thread(self._replay, events, speed, max_gap)
+        finally:
+            self._busy.release()
+
+    def _handlers(self) -> dict:
+        handlers = {}
+        for provider in self.providers:
+            try:
+                handlers.update(provider.journal_handlers())
+            except Exception as e:
+                # A service that can't start here just has its signals skipped
+                logger.warning("%s signals not replayed: %s", provider.name, e)
+        return handlers
+
+    def _replay(self, events: list, speed: float, max_gap: float) -> dict:
+        handlers = self._handlers()
+        signals = [event for event in events if event[2] == SIGNAL]
+        skipped, errors, handler_ms = {}, 0, []
+        logger.info("▶️ Replaying %d signals (speed=%s)", len(signals), speed or "max")
+        began = time.perf_counter()
+        with JournalContainer.capturing() as captured:
+            previous = None
+            for seq, at, kind, topic, (args, kwargs) in signals:
+                if speed and previous is not None:
+                    time.sleep(min(max(at - previous, 0.0), max_gap) / speed)
+                previous = at
+                handler = handlers.get(topic)
+                if handler is None:
+                    skipped[topic] = skipped.get(topic, 0) + 1
+                    continue
+                called = time.perf_counter()
+                try:
+                    handler(*args, **kwargs)
+                except Exception as e:
+                    errors += 1
+                    logger.warning("Replayed %s #%d failed: %s", topic, seq, e)
+                handler_ms.append((time.perf_counter() - called) * 1000)
+        elapsed = time.perf_counter() - began
+
+        expected = [(topic, payload) for _, _, kind, topic, payload in events
+                    if kind == STATE and topic in self.DERIVED]
+        replayed = [(topic, payload) for kind, topic, payload in captured
+                    if kind == STATE and topic in self.DERIVED]
+        divergence = next(
+            (index for index, (want, got) in enumerate(zip(expected, replayed)) if want != got),
+            None if len(expected) == len(replayed) else min(len(expected), len(replayed)),
+        )
+        handler_ms.sort()
+        result = {
+            "signals": len(signals),
+            "replayed": len(handler_ms),
+            "skipped": skipped,
+            "errors": errors,
+            "seconds": round(elapsed, 3),
+            "signals_per_second": round(len(handler_ms) / elapsed, 1) if elapsed else None,
+            "handler_ms": {
+                "p50": round(handler_ms[len(handler_ms) // 2], 3),
+                "p99": round(handler_ms[min(len(handler_ms) - 1, int(len(handler_ms) * 0.99))], 3),
+                "max": round(handler_ms[-1], 3),
+            } if handler_ms else None,
+            "transitions": {"recorded": len(expected), "replayed": len(replayed)},
+            "deterministic": divergence is None,
+            "first_divergence": None if divergence is None else {
+                "index": divergence,
+                "recorded": expected[divergence] if divergence < len(expected) else None,
+                "replayed": replayed[divergence] if divergence < len(replayed) else None,
+            },
+        }
+        logger.info("⏹️ Replay finished in %.1fs, deterministic=%s", elapsed, result["deterministic"])
+        return result
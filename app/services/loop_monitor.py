@@ -0,0 +1,279 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from app.containers.config_container import ConfigContainer
+from app.containers.logging_container import LoggingContainer
+
+logger = LoggingContainer.get_logger("LoopMonitor")
+
+
+class LagHistogram:
+    """Per-bucket (non-cumulative) counts of event-loop lag in milliseconds."""
+
+    BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        index = 0
+        while index < len(self.BOUNDS_MS) and value_ms > self.BOUNDS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bucket bound containing quantile q (None if it's the overflow bucket)."""
+        if not self.total:
+            return 0.0
+        rank, seen = q * self.total, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return float(self.BOUNDS_MS[index]) if index < len(self.BOUNDS_MS) else None
+        return None
+
+    def to_dict(self) -> dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.BOUNDS_MS, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "samples": self.total,
+            "mean_ms": round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class LoopMonitor:
+    """Event-loop lag sampler plus a watchdog for blocked loops and stalled threads.
+
+    An asyncio task sleeps ``interval`` seconds at a time and records how late
+    it wakes up. A watchdog thread checks the task's heartbeat. If the loop
+    hasn't ticked for longer than ``block_threshold``, the watchdog captures
+    the loop thread's stack while the blocking callback is still running.
+    The same thread posts idle callbacks into the GLib main loop, which
+    dispatches BlueZ/oFono signals. It also checks heartbeats of other worker
+    threads, and flags any that stop answering.
+
+    Without an explicit ``interval`` the sampler follows the profile's
+    ``loop_sample``. In idle mode both the sampler and the watchdog wait
+    until a subscriber connects again.
+    """
+
+    INCIDENTS = 50
+
+    def __init__(self, interval: float | None = None, block_threshold: float = 0.1, glib_threshold: float = 2.0):
+        self.fixed_interval = interval
+        self.interval = interval or ConfigContainer.intervals().loop_sample
+        self.block_threshold = block_threshold
+        self.glib_threshold = glib_threshold
+        self.histogram = LagHistogram()
+        self._lock = threading.Lock()
+        self._incidents = deque(maxlen=self.INCIDENTS)
+        self._open_incident = None
+        self._loop_thread_id = None
+        self._loop_tick = None
+        self._task = None
+        self._stop = threading.Event()
+        self._active = threading.Event()  # Cleared in idle mode; the watchdog waits on it
+        self._loop_active = None  # The same for the sampler task, an asyncio.Event
+        self._loop = None
+        self._watchdog = None
+        self._glib_thread = None  # callable -> threading.Thread running the GLib loop, or None
+        self._glib_posted = None
+        self._glib_tick = None
+        self._glib_stalled = False
+        self._heartbeats = {}  # name -> (callable -> monotonic heartbeat or None, thread callable, max_age)
+        self._stalled = set()
+
+    def start(self):
+        """Start sampling. Must be called from the event loop."""
+        if self._task:
+            return
+        self._stop.clear()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._loop_tick = time.monotonic()
+        self._loop_active = asyncio.Event()
+        self._apply_settings()
+        ConfigContainer.add_listener(self._apply_settings)
+        self._task = self._loop.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="LoopWatchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        ConfigContainer.remove_listener(self._apply_settings)
+        self._stop.set()
+        self._active.set()  # Let an idle watchdog see the stop
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _apply_settings(self):
+        """Profile interval and idle mode; called again after every reload and idle/active change."""
+        if self.fixed_interval is None:
+            self.interval = ConfigContainer.intervals().loop_sample
+        active = not ConfigContainer.idle()
+        if active == self._active.is_set():
+            return
+        if active:
+            with self._lock:
+                # Not a blocked loop: nothing was sampled while idle
+                self._loop_tick = time.monotonic()
+            self._active.set()
+        else:
+            self._active.clear()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._loop_active.set if active else self._loop_active.clear)
+
+    def watch_glib(self, thread):
+        """thread() returns the thread running the default GLib main loop, or None while there is none."""
+        self._glib_thread = thread
+
+    def watch_heartbeat(self, name: str, heartbeat, thread, max_age: float):
+        """Flag ``name`` when heartbeat() (a monotonic timestamp) is older than max_age seconds."""
+        self._heartbeats[name] = (heartbeat, thread, max_age)
+
+    def report(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            incidents = list(self._incidents)
+            histogram = self.histogram.to_dict()
+        glib_thread = self._glib_thread() if self._glib_thread else None
+        return {
+            "loop": {
+                "paused": not self._active.is_set(),
+                "interval_ms": self.interval * 1000,
+                "block_threshold_ms": self.block_threshold * 1000,
+                "lag": histogram,
+                "last_tick_age_ms": round((now - self._loop_tick) * 1000, 1) if self._loop_tick else None,
+            },
+            "glib": {
+                "watched": glib_thread is not None,
+                "stalled": self._glib_stalled,
+                "last_dispatch_age_ms": round((now - self._glib_tick) * 1000, 1) if self._glib_tick else None,
+            },
+            "heartbeats": {
+                name: self._heartbeat_age(heartbeat, now) for name, (heartbeat, _, _) in self._heartbeats.items()
+            },
+            "incidents": list(reversed(incidents)),
+        }
+
+    # Event loop side
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._loop_active.is_set():
+                await self._loop_active.wait()
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            with self._lock:
+                self._loop_tick = time.monotonic()
+                self.histogram.observe(lag_ms)
+                if self._open_incident:
+                    # The blocking callback returned: record how long it held the loop
+                    self._open_incident["duration_ms"] = round(lag_ms + self.interval * 1000, 1)
+                    self._open_incident = None
+
+    # Watchdog thread
+
+    def _watch(self):
+        period = min(self.block_threshold / 2, 0.25)
+        while not self._stop.wait(period):
+            if not self._active.is_set():
+                self._active.wait()
+                continue
+            now = time.monotonic()
+            self._check_loop(now)
+            self._check_glib(now)
+            self._check_heartbeats(now)
+
+    def _check_loop(self, now: float):
+        with self._lock:
+            held = now - self._loop_tick - self.interval
+            if held < self.block_threshold or self._open_incident:
+                return
+        stack = self._stack(self._loop_thread_id)
+        incident = self._record("event_loop", "asyncio", stack, duration_ms=None)
+        with self._lock:
+            self._open_incident = incident
+        logger.warning(f"⏱️ Event loop blocked > {self.block_threshold * 1000:.0f} ms at {stack[-1].strip() if stack else '?'}")
+
+    def _check_glib(self, now: float):
+        thread = self._glib_thread() if self._glib_thread else None
+        if thread is None or not thread.is_alive():
+            return
+        if self._glib_posted is None:
+            self._post_glib(now)
+            return
+        answered = self._glib_tick is not None and self._glib_tick >= self._glib_posted
+        if answered:
+            if self._glib_stalled:
+                logger.info("GLib main loop dispatching again")
+                self._glib_stalled = False
+            if now - self._glib_posted >= 1.0:
+                self._post_glib(now)
+        elif now - self._glib_posted > self.glib_threshold and not self._glib_stalled:
+            self._glib_stalled = True
+            stack = self._stack(thread.ident)
+            self._record("glib", thread.name, stack, duration_ms=round((now - self._glib_posted) * 1000, 1))
+            logger.error(f"🧊 GLib/D-Bus dispatch stalled for {now - self._glib_posted:.1f}s in {thread.name}")
+
+    def _post_glib(self, now: float):
+        from gi.repository import GLib
+
+        self._glib_posted = now
+        GLib.idle_add(self._on_glib_idle)
+
+    def _on_glib_idle(self):
+        self._glib_tick = time.monotonic()
+        return False  # one-shot
+
+    def _check_heartbeats(self, now: float):
+        for name, (heartbeat, thread, max_age) in self._heartbeats.items():
+            age = self._heartbeat_age(heartbeat, now)
+            if age is None or age <= max_age:
+                self._stalled.discard(name)
+                continue
+            if name in self._stalled:
+                continue
+            self._stalled.add(name)
+            target = thread()
+            stack = self._stack(target.ident) if target else []
+            self._record("heartbeat", name, stack, duration_ms=round(age * 1000, 1))
+            logger.error(f"🧊 {name} has not checked in for {age:.1f}s")
+
+    # Helpers
+
+    @staticmethod
+    def _heartbeat_age(heartbeat, now: float) -> float | None:
+        try:
+            value = heartbeat()
+        except Exception:
+            return None
+        return round(now - value, 3) if value is not None else None
+
+    def _record(self, kind: str, thread: str, stack: list, duration_ms: float | None) -> dict:
+        incident = {"kind": kind, "thread": thread, "at": time.time(), "duration_ms": duration_ms, "stack": stack}
+        with self._lock:
+            self._incidents.append(incident)
+        return incident
+
+    @staticmethod
+    def _stack(thread_id: int | None) -> list:
+        frame = sys._current_frames().get(thread_id) if thread_id else None
+        return traceback.format_stack(frame) if frame else []
@@ -0,0 +1,198 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from gi.repository import GLib
+
+from app.containers.config_container import ConfigContainer
+from app.containers.logging_container import LoggingContainer
+from app.models.schemas import BrowseItem, BrowsePage
+from app.services.device_registry import DeviceRegistry
+from app.utils.metrics_utils import cache_result
+
+logger = LoggingContainer.get_logger("MediaBrowser")
+
+
+class MediaBrowser:
+    """Paged AVRCP browsing of the active phone's library and now-playing queue.
+
+    Listings come from MediaFolder1.ListItems in fixed-size pages and are
+    cached per folder. A folder's pages are dropped when its NumberOfItems or
+    other properties change. After every request the next page is fetched in
+    the background, so scrolling through a long playlist rarely waits on
+    Bluetooth.
+
+    AVRCP has a single "current folder" per player, so ChangeFolder and
+    ListItems are serialized.
+    """
+
+    PAGE_SIZE = 50
+    MAX_COUNT = 4 * PAGE_SIZE  # Items one request may ask for
+
+    def __init__(self, registry: DeviceRegistry):
+        self.registry = registry
+        self.bus = registry.bus
+        self._lock = threading.Lock()
+        self._dbus_lock = threading.Lock()
+        self._folders = OrderedDict()  # folder path -> {"name", "total", "pages": {index: [BrowseItem]}}
+        self._current_folder = {}  # player path -> folder selected on the phone
+        self._prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix="MediaBrowse")
+        registry.add_interface_listener("org.bluez.MediaFolder1", self._on_folder_changed)
+        registry.add_active_listener(lambda player_path: self.clear())
+
+    def stop(self):
+        self._prefetch.shutdown(wait=False, cancel_futures=True)
+
+    def clear(self):
+        with self._lock:
+            self._folders.clear()
+            self._current_folder.clear()
+
+    def root_folder(self, player_path: str) -> str:
+        return f"{player_path}/Filesystem"
+
+    def now_playing_folder(self, player_path: str) -> str:
+        try:
+            playlist = self.bus.get("org.bluez", player_path)["org.bluez.MediaPlayer1"].Playlist
+            if playlist:
+                return playlist
+        except Exception:
+            pass
+        return f"{player_path}/NowPlaying"
+
+    def list_folder(self, folder: str | None = None, start: int = 0, count: int = PAGE_SIZE) -> BrowsePage:
+        """Items [start, start + count) of a folder on the active player."""
+        player_path = self._player_path()
+        folder = folder or self.root_folder(player_path)
+        if not folder.startswith(player_path + "/"):
+            raise ValueError(f"Folder does not belong to the active player: {folder}")
+        return self._list(player_path, folder, start, count)
+
+    def list_now_playing(self, start: int = 0, count: int = PAGE_SIZE) -> BrowsePage:
+        player_path = self._player_path()
+        return self._list(player_path, self.now_playing_folder(player_path), start, count)
+
+    def play(self, item_path: str):
+        player_path = self._player_path()
+        if not item_path.startswith(player_path + "/"):
+            raise ValueError(f"Item does not belong to the active player: {item_path}")
+        self.bus.get("org.bluez", item_path)["org.bluez.MediaItem1"].Play()
+
+    def _player_path(self) -> str:
+        player_path = self.registry.active_player_path()
+        if not player_path:
+            raise LookupError("AVRCP destekli cihaz bulunamadı.")
+        return player_path
+
+    def _list(self, player_path: str, folder: str, start: int, count: int) -> BrowsePage:
+        start, count = max(0, start), max(1, min(count, self.MAX_COUNT))
+        first = start // self.PAGE_SIZE
+        last = (start + count - 1) // self.PAGE_SIZE
+        cached = all(self._cached_page(folder, index) is not None for index in range(first, last + 1))
+
+        items = []
+        for index in range(first, last + 1):
+            page = self._page(player_path, folder, index)
+            items.extend(page)
+            if len(page) < self.PAGE_SIZE:
+                break
+
+        with self._lock:
+            entry = self._folders.get(folder) or {"name": None, "total": len(items)}
+            name, total = entry["name"], entry["total"]
+
+        next_index = last + 1
+        if next_index * self.PAGE_SIZE < total and self._cached_page(folder, next_index) is None:
+            self._prefetch.submit(self._safe_prefetch, player_path, folder, next_index)
+
+        offset = start - first * self.PAGE_SIZE
+        return BrowsePage(
+            folder=folder,
+            name=name,
+            total=total,
+            start=start,
+            items=items[offset:offset + count],
+            cached=cached,
+        )
+
+    def _cached_page(self, folder: str, index: int):
+        with self._lock:
+            entry = self._folders.get(folder)
+            if entry is None:
+                return None
+            self._folders.move_to_end(folder)
+            return entry["pages"].get(index)
+
+    def _page(self, player_path: str, folder: str, index: int) -> list:
+        page = self._cached_page(folder, index)
+        cache_result("browse_page", page is not None)
+        if page is not None:
+            return page
+
+        start = index * self.PAGE_SIZE
+        with self._dbus_lock:
+            folder_iface = self.bus.get("org.bluez", player_path)["org.bluez.MediaFolder1"]
+            with self._lock:
+                current = self._current_folder.get(player_path)
+            if current != folder:
+                folder_iface.ChangeFolder(folder)
+                with self._lock:
+                    self._current_folder[player_path] = folder
+            total = folder_iface.NumberOfItems
+            name = folder_iface.Name
+            if start >= total:
+                raw = []
+            else:
+                raw = folder_iface.ListItems({
+                    "Start": GLib.Variant("u", start),
+                    "End": GLib.Variant("u", min(total, start + self.PAGE_SIZE) - 1),
+                })
+        page = [self._to_item(path, props) for path, props in raw]
+
+        with self._lock:
+            entry = self._folders.get(folder)
+            if entry is None or entry["total"] != total:
+                # New folder, or the listing changed since it was cached
+                entry = {"name": name, "total": total, "pages": {}}
+                self._folders[folder] = entry
+            entry["pages"][index] = page
+            self._folders.move_to_end(folder)
+            while len(self._folders) > ConfigContainer.caches().browse_folders:
+                self._folders.popitem(last=False)
+        logger.debug("Fetched %s page %d (%d items, total %s)", folder, index, len(page), total)
+        return page
+
+    def _safe_prefetch(self, player_path: str, folder: str, index: int):
+        try:
+            self._page(player_path, folder, index)
+        except Exception as e:
+            logger.debug("Prefetch of %s page %d failed: %s", folder, index, e)
+
+    def _on_folder_changed(self, path: str, changed: dict, invalidated: list):
+        """MediaFolder1 signals arrive on the player path and describe its current folder."""
+        with self._lock:
+            folder = self._current_folder.get(path)
+            entry = self._folders.get(folder) if folder else None
+            if entry is None:
+                return
+            if "NumberOfItems" in changed and changed["NumberOfItems"] == entry["total"] and len(changed) == 1:
+                return
+            logger.debug("Folder %s changed, dropping cached pages", folder)
+            self._folders.pop(folder, None)
+
+    @staticmethod
+    def _to_item(path: str, props: dict) -> BrowseItem:
+        metadata = props.get("Metadata", {})
+        duration = metadata.get("Duration")
+        return BrowseItem(
+            path=path,
+            name=props.get("Name"),
+            type=props.get("Type"),
+            folder_type=props.get("FolderType"),
+            playable=bool(props.get("Playable", False)),
+            title=metadata.get("Title"),
+            artist=metadata.get("Artist"),
+            album=metadata.get("Album"),
+            number=metadata.get("Number"),
+            duration_ms=int(duration) if duration is not None else None,
+        )
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from app.containers.logging_container import LoggingContainer
+
+logger = LoggingContainer.get_logger("MediaCommands")
+
+
+class MediaCommandPipeline:
+    """Merges bursts of media button presses into one D-Bus round.
+
+    "next"/"previous" add up to a net skip count and "toggle" presses cancel
+    in pairs. A single worker thread waits ``window`` seconds after the first
+    press of a burst, drains everything queued so far and calls
+    ``execute(skips, toggle)``. Presses that arrive while a round is running
+    are merged into the next round.
+    """
+
+    COMMANDS = ("next", "previous", "toggle")
+
+    def __init__(self, execute, window: float = 0.05):
+        self._execute = execute
+        self.window = window
+        self._cond = threading.Condition()
+        self._skips = 0
+        self._toggle = False
+        self._dirty = False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="MediaCommands", daemon=True)
+        self._thread.start()
+
+    def submit(self, command: str):
+        if command not in self.COMMANDS:
+            raise ValueError(f"Unknown media command: {command}")
+        with self._cond:
+            if command == "next":
+                self._skips += 1
+            elif command == "previous":
+                self._skips -= 1
+            else:
+                self._toggle = not self._toggle
+            self._dirty = True
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._dirty:
+                    self._cond.wait()
+                if not self._running:
+                    return
+
+            # Let the rest of a steering-wheel burst arrive before draining
+            time.sleep(self.window)
+
+            with self._cond:
+                skips, toggle = self._skips, self._toggle
+                self._skips, self._toggle, self._dirty = 0, False, False
+
+            if skips == 0 and not toggle:
+                logger.debug("Command burst cancelled out")
+                continue
+            try:
+                self._execute(skips, toggle)
+            except Exception as e:
+                logger.error(f"Media command round failed (skips={skips}, toggle={toggle}): {e}")
@@ -1,42 +1,135 @@
+import asyncio
 import os
-import re
-import unicodedata
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from app.models.schemas import Metadata
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import STATE, JournalContainer
 from app.containers.logging_container import LoggingContainer
-import requests
+from app.services.cover_cache import CoverCache
+from app.services.device_registry import DeviceRegistry
+from app.services.media_commands import MediaCommandPipeline
+from app.services.play_history import PlayHistory
+from app.services.spotify_client import SpotifyClient, SpotifyUnavailable
+from app.services.track_index import TrackIndex
+from app.services.volume_control import VolumeControl
+from app.utils.broadcast_utils import Broadcaster
+from app.utils.metrics_utils import TimedBus, cache_result
+from app.utils.trace_utils import traced
 from pydbus import SystemBus
 from dotenv import load_dotenv
 from fastapi.responses import JSONResponse
-from spotipy import Spotify
-from spotipy.oauth2 import SpotifyClientCredentials
 
 logger = LoggingContainer.get_logger("MediaService")
 
 class MediaService:
-    def __init__(self):
+    SKIP_RECONCILE_TIMEOUT = 2.0
+    OPTIMISTIC_HOLD = 1.0  # Polled status can't override an optimistic toggle for this long
+
+    def __init__(self, registry: DeviceRegistry):
         load_dotenv()
-        self.bus = SystemBus()
+        self.bus = TimedBus(SystemBus())
+        self.registry = registry
         self.sp = self._init_spotify()
+        self.track_index = TrackIndex()
+        self.history = PlayHistory()
+        self.cover_cache = CoverCache(max_bytes=self._cover_cache_mb() * 1024 * 1024, breaker=self.sp.breaker)
+
+        # Two-stage pipeline: bare AVRCP frame first, Spotify enrichment later
+        self._state_lock = threading.Lock()
+        self._track_key = None
+        self._track_id = 0
+        self._track = {}
+        self._position = 0
+        self._status = "unknown"
+        self._enrichment = None  # (track_id, {field: value})
+        self._enrich_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="MediaEnrich")
+        self._updates = Broadcaster("spotify-metadata")
+        self._started = False
+
+        # Cached player proxy and coalescing command pipeline with optimistic state
+        self._player_lock = threading.Lock()
+        self._player_path = None
+        self._player = None
+        self._pending_skips = 0
+        self._toggle_target = None
+        self._optimistic_until = 0.0
+        self._skip_timer = None
+        self.commands = MediaCommandPipeline(self._execute_commands)
+        self.volume = VolumeControl(registry, self._volume_writes())
+        self._apply_settings()
+        ConfigContainer.add_listener(self._apply_settings)
+
+    @staticmethod
+    def _cover_cache_mb() -> int:
+        # The environment pins it regardless of the profile
+        return int(os.getenv("BLUEDRIVE_COVER_CACHE_MB") or ConfigContainer.caches().cover_cache_mb)
+
+    @staticmethod
+    def _volume_writes() -> float:
+        # The environment pins it regardless of the profile
+        return float(os.getenv("BLUEDRIVE_VOLUME_MAX_WRITES") or ConfigContainer.limits().volume_writes)
+
+    def _apply_settings(self):
+        """Cache size, limits and timeouts of the active profile; called again after every reload."""
+        self.cover_cache.max_bytes = self._cover_cache_mb() * 1024 * 1024
+        self.sp.breaker.reset_timeout = ConfigContainer.caches().spotify_circuit_reset
+        self.sp.latency_budget = ConfigContainer.limits().spotify_budget
+        self.volume.min_interval = 1.0 / self._volume_writes()
+        self.commands.window = ConfigContainer.intervals().command_window
 
     def _init_spotify(self):
         client_id = os.getenv("SPOTIFY_CLIENT_ID")
         client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        auth_manager = SpotifyClientCredentials(client_id=client_id, client_secret=client_secret)
-        return Spotify(auth_manager=auth_manager)
+        if not client_id or not client_secret:
+            logger.info("Spotify credentials missing, metadata stays Bluetooth-only")
+        return SpotifyClient(
+            client_id=client_id,
+            client_secret=client_secret,
+            api_url=os.getenv("SPOTIFY_API_URL"),
+            token_url=os.getenv("SPOTIFY_TOKEN_URL"),
+        )
+
+    def start(self):
+        """Follow the active player's AVRCP signals through the device registry."""
+        if self._started:
+            return
+        self._started = True
+        self.registry.add_player_listener(self._on_player_properties_changed)
+        self.registry.add_active_listener(self._on_active_player_changed)
+        self._on_active_player_changed(self.registry.active_player_path())
+
+    def stop(self):
+        self.commands.stop()
+        self.volume.stop()
+        self._enrich_executor.shutdown(wait=False, cancel_futures=True)
+        self.sp.close()
+        self.track_index.close()
+        self.history.close()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a metadata listener. Must be called from the event loop."""
+        return self._updates.subscribe()
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._updates.unsubscribe(queue)
 
     def get_metadata(self) -> Metadata | JSONResponse:
-        player_path = self._find_avrcp_player_path()
-        if not player_path:
+        try:
+            player = self._get_player()
+        except LookupError:
             return JSONResponse(status_code=404, content={"error": "AVRCP destekli bağlı cihaz bulunamadı"})
 
         try:
-            player = self.bus.get("org.bluez", player_path)
-            props_iface = self.bus.get("org.bluez", player_path)["org.freedesktop.DBus.Properties"]
+            props_iface = player["org.freedesktop.DBus.Properties"]
 
             try:
                 track = props_iface.Get("org.bluez.MediaPlayer1", "Track")
             except Exception:
+                # Player went away; look it up again on the next call
+                self._invalidate_player()
                 track = {}
 
             try:
@@ -49,135 +142,365 @@ class MediaService:
             except Exception:
                 status = "unknown"
 
-            return Metadata(
-                title=track.get("Title"),
-                artist=track.get("Artist"),
-                album=track.get("Album"),
-                release_date=None,
-                cover_url=None,
-                spotify_url=None,
-                popularity=None,
-                duration_ms=int(track.get("Duration", 0) / 1_000_000),
-                position=int(position / 1_000_000),
-                status=status
-            )
+            # Polling doubles as a fallback trigger when no signal loop is running
+            with self._state_lock:
+                self._position = position
+                if time.monotonic() >= self._optimistic_until:
+                    self._status = status
+            self._observe_track(track)
+            with self._state_lock:
+                return self._build_metadata()
 
         except Exception as e:
-            print(f"Metadata alınırken hata oluştu: {e}")
+            logger.error("Metadata alınırken hata oluştu: %s", e)
             return JSONResponse(status_code=500, content={"error": "Metadata alınırken hata oluştu."})
 
     def get_spotify_metadata(self):
-        """Bluetooth + Spotify üzerinden detaylı metadata döndürür."""
+        """Bluetooth metadata merged with the cached Spotify enrichment, never blocks on the network."""
         base_metadata = self.get_metadata()
         if isinstance(base_metadata, JSONResponse):
             return base_metadata  # Hata varsa direkt dön
+        with self._state_lock:
+            return self._apply_enrichment(base_metadata)
+
+    def current_metadata(self) -> Metadata | None:
+        """Last observed frame with its enrichment, without a D-Bus call."""
+        with self._state_lock:
+            if not self._track:
+                return None
+            return self._apply_enrichment(self._build_metadata())
+
+    def _on_player_properties_changed(self, path: str, changed: dict):
+        # Other phones' players are tracked by the registry, not streamed here
+        if path != self.registry.active_player_path():
+            return
+
+        with self._state_lock:
+            if "Position" in changed:
+                self._position = changed["Position"]
+            if "Status" in changed:
+                # A real status change always wins over the optimistic one
+                self._status = changed["Status"]
+                self._optimistic_until = 0.0
+        if "Status" in changed:
+            JournalContainer.record(STATE, "media.status", changed["Status"])
+
+        if "Track" in changed:
+            self._observe_track(changed["Track"])
+        elif "Status" in changed or "Position" in changed:
+            self._publish_current()
+
+    def _observe_track(self, track: dict) -> bool:
+        """Start a new pipeline run when the AVRCP track changes. Returns True if it did."""
+        key = (track.get("Title"), track.get("Artist"), track.get("Album"), track.get("Duration"))
+        with self._state_lock:
+            if key == self._track_key:
+                return False
+            self._track_key = key
+            self._track_id += 1
+            self._track = dict(track)
+            self._enrichment = None
+            track_id = self._track_id
+            # Reconcile optimistic skips: each observed track change settles one
+            if self._pending_skips:
+                self._pending_skips -= 1 if self._pending_skips > 0 else -1
+
+        title = track.get("Title") or ""
+        artist = track.get("Artist") or ""
+        JournalContainer.record(STATE, "media.track", {"title": title, "artist": artist, "album": track.get("Album")})
+        player_path = self.registry.active_player_path()
+        self.history.track_started(
+            track_id, title, artist, track.get("Album"),
+            int(track.get("Duration", 0)) or None,
+            self.registry.address_for(player_path) if player_path else None,
+        )
+        # Known tracks are enriched from the local index before any network call
+        cached = self.track_index.lookup(title, artist) if title and artist else None
+        if title and artist:
+            cache_result("track_index", cached is not None)
+        cover_url = cached.get("cover_url") if cached else None
+        if cached:
+            cached = self._localize_cover(cached)
+
+        if cached:
+            self.history.enriched(track_id, self._spotify_id(cached))
+        with self._state_lock:
+            if cached and track_id == self._track_id:
+                self._enrichment = (track_id, cached)
+            frame = self._apply_enrichment(self._build_metadata())
+
+        logger.debug("Track changed (id=%s, cached=%s): %s - %s", track_id, cached is not None, title, artist)
+        self._publish(frame)
+
+        if cached:
+            # Cover evicted from the local cache since the track was indexed
+            if cover_url and cached["cover_url"] == cover_url:
+                self._enrich_executor.submit(self._cache_cover, track_id, cover_url)
+        # While offline the circuit is open and the frame stays Bluetooth-only
+        elif title and artist and self.sp.available:
+            self._enrich_executor.submit(self._enrich, track_id, title, artist)
+        return True
+
+    def _enrich(self, track_id: int, title: str, artist: str):
+        """Background stage: look the track up on Spotify and push the enriched frame."""
+        fields = self._search_spotify(title, artist)
+        if fields is None:
+            return
+        self.track_index.add(title, artist, fields)
+        self.history.enriched(track_id, self._spotify_id(fields))
+        if fields.get("cover_url"):
+            self.cover_cache.fetch(fields["cover_url"])
+            fields = self._localize_cover(fields)
+
+        with self._state_lock:
+            if track_id != self._track_id:
+                logger.debug("Dropping stale enrichment for track id %s", track_id)
+                return
+            self._enrichment = (track_id, fields)
+            frame = self._apply_enrichment(self._build_metadata())
+
+        self._publish(frame)
+
+    def _cache_cover(self, track_id: int, url: str):
+        """Background stage: fetch a cover for an index hit and push the local URL."""
+        if self.cover_cache.fetch(url) is None:
+            return
+        with self._state_lock:
+            if not self._enrichment or self._enrichment[0] != track_id or track_id != self._track_id:
+                return
+            self._enrichment = (track_id, self._localize_cover(self._enrichment[1]))
+            frame = self._apply_enrichment(self._build_metadata())
+        self._publish(frame)
 
-        title = base_metadata.title or ""
-        artist = base_metadata.artist or ""
-        status = base_metadata.status or ""
+    def _localize_cover(self, fields: dict) -> dict:
+        """Point cover_url at the local thumbnail proxy and attach the palette when the cover is cached."""
+        url = fields.get("cover_url")
+        if not url or url.startswith("/media/cover/"):
+            return fields
+        cover_id = self.cover_cache.cover_id(url)
+        if not self.cover_cache.contains(cover_id):
+            return fields
+        return {
+            **fields,
+            "cover_url": self.cover_cache.local_url(cover_id),
+            "palette": self.cover_cache.palette(cover_id),
+        }
 
-        if not title or not artist:
-            return base_metadata  # Şarkı bilgisi yoksa Bluetooth bilgisi yeterlidir
+    def _search_spotify(self, title: str, artist: str) -> dict | None:
+        query = f"{title} {artist}".strip()
+        if not query:
+            return None
 
         try:
-            query = f"{title} {artist}".strip()
-            if not query:
-                return base_metadata
+            result = self.sp.search(q=query, type='track', limit=1)
+        except SpotifyUnavailable as e:
+            logger.debug("Spotify unavailable, skipping enrichment: %s", e)
+            return None
+        except Exception as e:
+            logger.error("Spotify sorgusu sırasında hata oluştu: %s", e)
+            return None
 
-            try:
-                result = self.sp.search(q=query, type='track', limit=1)
-            except requests.exceptions.Timeout:
-                print("Spotify API yanıt vermedi (timeout).")
-                return base_metadata
-            except Exception as e:
-                print(f"Spotify sorgusu sırasında hata oluştu: {e}")
-                return base_metadata
-
-            tracks = result.get('tracks', {}).get('items', [])
-            if not tracks:
-                return base_metadata
+        tracks = result.get('tracks', {}).get('items', [])
+        if not tracks:
+            return None
 
+        try:
             track_sp = tracks[0]
             title_spotify = track_sp['name']
             artist_spotify = track_sp['artists'][0]['name']
 
-            # Eşleşme kontrolü
-            if self._normalize(title_spotify) != self._normalize(title) and \
-            self._normalize(artist_spotify) != self._normalize(artist):
-                return base_metadata
-
-            # Metadata nesnesini güncellenmiş şekilde döndür
-            return Metadata(
-                title=title_spotify,
-                artist=artist_spotify,
-                album=track_sp['album']['name'],
-                release_date=track_sp['album']['release_date'],
-                cover_url=track_sp['album']['images'][0]['url'],
-                spotify_url=track_sp['external_urls']['spotify'],
-                popularity=track_sp['popularity'],
-                duration_ms=track_sp['duration_ms'],
-                position=base_metadata.position,
-                status=status
-            )
+            # Eşleşme kontrolü (AVRCP variants like "- Remastered 2011" or "feat. X" still match)
+            if not TrackIndex.is_match(title, artist, title_spotify, artist_spotify):
+                return None
 
-        except Exception as e:
-            print(f"Spotify sorgusu sırasında hata oluştu: {e}")
-            return base_metadata
+            images = track_sp['album']['images']
+            return {
+                "title": title_spotify,
+                "artist": artist_spotify,
+                "album": track_sp['album']['name'],
+                "release_date": track_sp['album']['release_date'],
+                "cover_url": images[0]['url'] if images else None,
+                "spotify_url": track_sp['external_urls']['spotify'],
+                "popularity": track_sp['popularity'],
+                "duration_ms": track_sp['duration_ms'],
+            }
+        except (KeyError, IndexError) as e:
+            logger.error("Unexpected Spotify response: %s", e)
+            return None
+
+    @staticmethod
+    def _spotify_id(fields: dict) -> str | None:
+        url = fields.get("spotify_url")
+        return url.rstrip("/").rsplit("/", 1)[-1] if url else None
+
+    def _build_metadata(self) -> Metadata:
+        """Bare AVRCP frame from cached state. Caller holds the state lock."""
+        track = self._track
+        return Metadata(
+            track_id=self._track_id,
+            title=track.get("Title"),
+            artist=track.get("Artist"),
+            album=track.get("Album"),
+            release_date=None,
+            cover_url=None,
+            spotify_url=None,
+            popularity=None,
+            duration_ms=int(track.get("Duration", 0) / 1_000_000),
+            position=int(self._position / 1_000_000),
+            status=self._status,
+            pending_skips=self._pending_skips,
+        )
+
+    def _apply_enrichment(self, metadata: Metadata) -> Metadata:
+        """Caller holds the state lock."""
+        if not self._enrichment or self._enrichment[0] != metadata.track_id:
+            return metadata
+        return metadata.model_copy(update={**self._enrichment[1], "enriched": True})
+
+    def _publish_current(self):
+        with self._state_lock:
+            frame = self._apply_enrichment(self._build_metadata())
+        self._publish(frame)
+
+    def _publish(self, frame: Metadata):
+        self._updates.publish(frame)
 
     def next(self):
-        try:
-            iface = self._get_player_interface()
-            iface.Next()
-            return {"status": "skipped to next"}
-        except Exception as e:
-            return JSONResponse(status_code=500, content={"error": f"Next komutu başarısız: {e}"})
+        return self._command("next")
 
     def previous(self):
-        try:
-            iface = self._get_player_interface()
-            iface.Previous()
-            return {"status": "went to previous"}
-        except Exception as e:
-            return JSONResponse(status_code=500, content={"error": f"Previous komutu başarısız: {e}"})
+        return self._command("previous")
 
     def toggle_playback(self):
+        return self._command("toggle")
+
+    def _command(self, command: str):
+        """Acknowledge a button press at once and hand it to the coalescing pipeline."""
         try:
-            iface = self._get_player_interface()
-            status = iface.Status
+            player = self._get_player()
+            if command == "toggle":
+                with self._state_lock:
+                    known = self._status in ("playing", "paused")
+                if not known:
+                    # Cold start only: afterwards the status comes from signals/polling
+                    status = player["org.bluez.MediaPlayer1"].Status
+                    with self._state_lock:
+                        self._status = status
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"error": f"{command} komutu başarısız: {e}"})
 
-            if status == "playing":
-                iface.Pause()
-                return {"status": "paused"}
+        with self._state_lock:
+            if command == "next":
+                self._pending_skips += 1
+            elif command == "previous":
+                self._pending_skips -= 1
             else:
-                iface.Play()
-                return {"status": "playing"}
+                self._status = "paused" if self._status == "playing" else "playing"
+                self._toggle_target = self._status
+                self._optimistic_until = time.monotonic() + self.OPTIMISTIC_HOLD
+            if command != "toggle":
+                self._position = 0
+            status = self._status
+            pending_skips = self._pending_skips
+            frame = self._apply_enrichment(self._build_metadata())
+
+        self.commands.submit(command)
+        self._publish(frame)
 
+        if command == "next":
+            return {"status": "skipped to next", "pending_skips": pending_skips}
+        if command == "previous":
+            return {"status": "went to previous", "pending_skips": pending_skips}
+        return {"status": status}
+
+    def _execute_commands(self, skips: int, toggle: bool):
+        """Pipeline worker: one D-Bus round for a merged burst of presses."""
+        try:
+            iface = self._get_player()["org.bluez.MediaPlayer1"]
+            skip = iface.Next if skips > 0 else iface.Previous
+            for _ in range(abs(skips)):
+                skip()
+            if toggle:
+                with self._state_lock:
+                    target = self._toggle_target
+                if target == "playing":
+                    iface.Play()
+                else:
+                    iface.Pause()
         except Exception as e:
-            return JSONResponse(status_code=500, content={"error": f"toggle_playback başarısız: {e}"})
-
-    def _normalize(self, text):
-        text = unicodedata.normalize('NFKD', text)  # Unicode normalize
-        text = text.encode('ascii', 'ignore').decode('utf-8')  # Aksanları kaldır
-        text = text.lower().strip()  # Küçük harf, baş-son boşluk temizliği
-        text = re.sub(r'[^\w\s]', '', text)  # Noktalama işaretlerini kaldır
-        return text
-    
-    def _get_player_interface(self):
-        """AVRCP player interface'ini döndürür."""
-        player_path = self._find_avrcp_player_path()
+            logger.error("Media command failed: %s", e)
+            self._invalidate_player()
+            with self._state_lock:
+                self._pending_skips = 0
+            self._publish_current()
+            return
+
+        if skips:
+            # Phones ignore skips at playlist edges; don't leave the UI waiting forever
+            if self._skip_timer:
+                self._skip_timer.cancel()
+            self._skip_timer = threading.Timer(self.SKIP_RECONCILE_TIMEOUT, self._expire_pending_skips)
+            self._skip_timer.daemon = True
+            self._skip_timer.start()
+
+    def _expire_pending_skips(self):
+        with self._state_lock:
+            if not self._pending_skips:
+                return
+            self._pending_skips = 0
+        self._publish_current()
+
+    def _on_active_player_changed(self, player_path: str | None):
+        """Switch the metadata stream over to a newly selected player."""
+        self._invalidate_player()
+        state = self.registry.player_state(player_path) if player_path else None
+        if not state:
+            # The play ends here; the same track coming back is a new one
+            self.history.stopped()
+            with self._state_lock:
+                self._track_key = None
+            return
+        with self._state_lock:
+            self._status = state.get("status") or "unknown"
+            self._position = 0
+        if not self._observe_track(state.get("track") or {}):
+            self._publish_current()
+
+    @traced("media.device_command")
+    def device_command(self, address: str, command: str):
+        """Direct control of a specific phone's player, bypassing the active-source pipeline."""
+        player_path = self.registry.player_path_for(address)
         if not player_path:
-            raise Exception("AVRCP destekli cihaz bulunamadı.")
-        player = self.bus.get("org.bluez", player_path)
-        return player["org.bluez.MediaPlayer1"]
-    
-    def _find_avrcp_player_path(self):
-        """BlueZ üzerinden AVRCP destekli bağlı cihazı bulur."""
+            return JSONResponse(status_code=404, content={"error": f"{address} için AVRCP oynatıcı bulunamadı"})
         try:
-            mngr = self.bus.get("org.bluez", "/")
-            objects = mngr.GetManagedObjects()
-            for path, interfaces in objects.items():
-                if "org.bluez.MediaPlayer1" in interfaces:
-                    return path
+            iface = self.bus.get("org.bluez", player_path)["org.bluez.MediaPlayer1"]
+            if command == "next":
+                iface.Next()
+            elif command == "previous":
+                iface.Previous()
+            elif command == "toggle":
+                if iface.Status == "playing":
+                    iface.Pause()
+                else:
+                    iface.Play()
+            else:
+                return JSONResponse(status_code=400, content={"error": f"Bilinmeyen komut: {command}"})
+            return {"status": "ok", "device": address, "command": command}
         except Exception as e:
-            print(f"AVRCP player path ararken hata oluştu: {e}")
-        return None
+            return JSONResponse(status_code=500, content={"error": f"{command} komutu başarısız: {e}"})
+
+    def _get_player(self):
+        """Cached pydbus proxy of the active AVRCP player. Raises LookupError if none is connected."""
+        with self._player_lock:
+            if self._player is None:
+                player_path = self.registry.active_player_path()
+                if not player_path:
+                    raise LookupError("AVRCP destekli cihaz bulunamadı.")
+                self._player = self.bus.get("org.bluez", player_path)
+                self._player_path = player_path
+            return self._player
+
+    def _invalidate_player(self):
+        with self._player_lock:
+            self._player = None
+            self._player_path = None
@@ -0,0 +1,427 @@
+import asyncio
+import inspect
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from pathlib import Path
+
+from app.containers.logging_container import LoggingContainer
+from app.services.shared_state import SharedStateReader
+from app.utils.broadcast_utils import offer
+from app.utils.ipc_utils import MAX_MESSAGE, decode, encode
+from app.utils.metrics_utils import OWNER_CALL_ERRORS, OWNER_CALL_SECONDS, SUBSCRIBERS
+from app.utils.trace_utils import CLIENT, span
+
+logger = LoggingContainer.get_logger("OwnerLink")
+
+# Reads a worker answers from the shared state instead of a round trip (method -> section)
+SHARED_READS = {
+    "device_registry.devices": "devices",
+    "hfp_service.get_call_status": "phone",
+    "media_service.get_spotify_metadata": "metadata",
+    "media_service.volume.get": "volume",
+    "state_snapshot.snapshot": "snapshot",
+}
+# Methods that are coroutines in the owner; a worker awaits them in a thread
+ASYNC_CALLS = {
+    "bluetooth_service.auto_connect_paired_devices",
+    "bluetooth_service.scan_devices",
+    "bluetooth_service.disconnect_device",
+    "bluetooth_service.connect_device",
+    "bluetooth_service.connect_paired_device",
+    "bluetooth_service.connect_new_device",
+    "journal_replayer.replay",
+}
+
+
+class OwnerUnavailable(RuntimeError):
+    pass
+
+
+class OwnerServer:
+    """Owner side of the command socket.
+
+    Each line is a JSON call ``{"target", "path", "args", "kwargs"}`` on one
+    of ``targets`` (providers, by their container name), answered by one
+    line ``{"result": ...}``. Sync methods run in worker threads, coroutines
+    on this loop. Private names are refused. A connection that sends
+    ``{"subscribe": true}`` instead receives a line per published state
+    version, naming the sections that changed.
+    """
+
+    MAX_BUFFERED = 1024 * 1024  # A subscriber this far behind is dropped and re-reads everything
+
+    def __init__(self, targets: dict):
+        self.targets = targets
+        self._connections = set()
+        self._subscribers = set()
+        self._server = None
+        self._loop = None
+
+    async def start(self, path: Path):
+        path.unlink(missing_ok=True)
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_unix_server(self._serve, path=str(path), limit=MAX_MESSAGE)
+        os.chmod(path, 0o660)
+        logger.info("🔌 Owner listening on %s", path)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Workers see EOF right away instead of waiting on a call that will never be answered
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+
+    def notify(self, version: int, sections: list):
+        """Tell every subscribed worker about a new state version. Thread-safe."""
+        line = json.dumps({"version": version, "changed": sections}).encode() + b"\n"
+        try:
+            self._loop.call_soon_threadsafe(self._broadcast, line)
+        except RuntimeError:
+            pass  # Loop closed during shutdown
+
+    def _broadcast(self, line: bytes):
+        for writer in list(self._subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.MAX_BUFFERED:
+                self._subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message.get("subscribe"):
+                    self._subscribers.add(writer)
+                    continue
+                result = await self._call(message)
+                writer.write(json.dumps({"result": encode(result)}).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            # ValueError: undecodable line, or one longer than MAX_MESSAGE
+            logger.debug("Owner connection closed: %s", e)
+        finally:
+            self._connections.discard(writer)
+            self._subscribers.discard(writer)
+            writer.close()
+
+    async def _call(self, message: dict):
+        try:
+            target = self.targets[message["target"]]
+            path = message["path"]
+            if any(name.startswith("_") for name in path):
+                raise PermissionError(f"Özel üyeye erişilemez: {'.'.join(path)}")
+            args = decode(message.get("args") or [])
+            kwargs = decode(message.get("kwargs") or {})
+            if not path:
+                # A worker waiting for the service, as Provider.get() would
+                await asyncio.to_thread(target.get)
+                return None
+            function = await asyncio.to_thread(self._resolve, target, path)
+            if inspect.iscoroutinefunction(function):
+                return await function(*args, **kwargs)
+            return await asyncio.to_thread(function, *args, **kwargs)
+        except Exception as e:
+            logger.debug("Forwarded %s.%s failed: %s", message.get("target"), message.get("path"), e)
+            return e
+
+    @staticmethod
+    def _resolve(target, path: list):
+        # Attribute access on a provider builds its service, so this runs in a thread
+        for name in path:
+            target = getattr(target, name)
+        if not callable(target):
+            raise TypeError(f"{'.'.join(path)} çağrılabilir değil")
+        return target
+
+
+class OwnerLink:
+    """Worker side: forwards commands to the owner daemon and follows its shared state.
+
+    Commands go over pooled connections to the owner's socket, one call at a
+    time per connection. Reads in ``SHARED_READS`` come from the shared
+    segment without a round trip. A background thread holds a subscription
+    open and, on each new version, wakes the change listeners and queues
+    registered for the changed sections; after a reconnect every section
+    counts as changed.
+    """
+
+    def __init__(self, socket_path: Path, state_path: Path, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.state = SharedStateReader(state_path)
+        self.connected = threading.Event()
+        self._pool = queue.SimpleQueue()  # Idle (socket, file) pairs
+        self._lock = threading.Lock()
+        self._listeners = {}  # section -> [callback]
+        self._queues = {}  # section -> [(loop, queue)]
+        self._local = {
+            "media_service.subscribe": lambda: self.subscribe("metadata"),
+            "media_service.unsubscribe": self.unsubscribe,
+            "media_service.volume.subscribe": lambda: self.subscribe("volume"),
+            "media_service.volume.unsubscribe": self.unsubscribe,
+            "device_registry.add_change_listener": lambda callback: self.add_listener("devices", callback),
+            "device_registry.remove_change_listener": self.remove_listener,
+            "state_snapshot.section": self._snapshot_section,
+        }
+        self._running = False
+        self._subscription = None
+        self._thread = None
+        # This worker's metadata/volume WebSockets; the owner's MediaService never sees their queues
+        SUBSCRIBERS.labels("spotify-metadata").set_function(lambda: len(self._queues.get("metadata", ())))
+        SUBSCRIBERS.labels("volume").set_function(lambda: len(self._queues.get("volume", ())))
+
+    def start(self):
+        if self._thread:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._follow, name="OwnerLink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._subscription is not None:
+            try:
+                self._subscription.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        while True:
+            try:
+                sock, lines = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            lines.close()
+            sock.close()
+
+    # Calls
+
+    def invoke(self, method: str, args: tuple, kwargs: dict):
+        local = self._local.get(method)
+        if local is not None:
+            return local(*args, **kwargs)
+        section = self.state.section(SHARED_READS[method]) if method in SHARED_READS else None
+        if section is not None:
+            return self._raised(decode(section["value"]))
+        if method in ASYNC_CALLS:
+            return asyncio.to_thread(self.call, method, args, kwargs, None)
+        return self.call(method, args, kwargs)
+
+    def call(self, method: str, args: tuple = (), kwargs: dict = None, timeout: float | None = -1):
+        """Run ``target.path(*args, **kwargs)`` in the owner. ``timeout=None`` waits for as long as it takes."""
+        target, _, path = method.partition(".")
+        line = json.dumps({
+            "target": target,
+            "path": path.split(".") if path else [],
+            "args": encode(list(args)),
+            "kwargs": encode(kwargs or {}),
+        }).encode() + b"\n"
+        began = time.perf_counter()
+        with span(f"owner {method}", CLIENT):
+            try:
+                reply = self._round_trip(line, self.timeout if timeout == -1 else timeout)
+            except OSError as e:
+                OWNER_CALL_ERRORS.labels(method, "unavailable").inc()
+                raise OwnerUnavailable(f"Donanım servisine ulaşılamıyor ({self.socket_path}): {e}") from e
+            finally:
+                OWNER_CALL_SECONDS.labels(method).observe(time.perf_counter() - began)
+            result = decode(json.loads(reply)["result"])
+            if isinstance(result, Exception):
+                OWNER_CALL_ERRORS.labels(method, type(result).__name__).inc()
+            return self._raised(result)
+
+    def _round_trip(self, line: bytes, timeout: float | None) -> bytes:
+        # Idle connections a previous owner closed fail here and are dropped; a new one is tried last
+        while True:
+            try:
+                sock, lines = self._pool.get_nowait()
+                pooled = True
+            except queue.Empty:
+                sock, lines = self._connect()
+                pooled = False
+            try:
+                sock.settimeout(timeout)
+                sock.sendall(line)
+                reply = lines.readline()
+            except OSError as e:
+                lines.close()
+                sock.close()
+                if pooled and not isinstance(e, TimeoutError):
+                    continue
+                raise
+            if reply:
+                self._pool.put((sock, lines))
+                return reply
+            lines.close()
+            sock.close()
+            if not pooled:
+                raise ConnectionResetError("Sahip süreç bağlantıyı kapattı")
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile("rb")
+
+    @staticmethod
+    def _raised(result):
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _snapshot_section(self, name: str):
+        section = self.state.section("snapshot")
+        if section is None:
+            return self.call("state_snapshot.section", (name,))
+        return decode(section["value"]).get(name)
+
+    # State changes
+
+    def add_listener(self, section: str, callback):
+        with self._lock:
+            self._listeners.setdefault(section, []).append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            for callbacks in self._listeners.values():
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+    def subscribe(self, section: str) -> asyncio.Queue:
+        """Queue of a section's new values. Must be called from the event loop."""
+        updates = asyncio.Queue(maxsize=16)
+        with self._lock:
+            self._queues.setdefault(section, []).append((asyncio.get_running_loop(), updates))
+        return updates
+
+    def unsubscribe(self, updates: asyncio.Queue):
+        with self._lock:
+            for subscribers in self._queues.values():
+                subscribers[:] = [(loop, q) for loop, q in subscribers if q is not updates]
+
+    def _follow(self):
+        delay = 0.2
+        while self._running:
+            try:
+                sock, lines = self._connect()
+            except OSError as e:
+                if self.connected.is_set() or delay == 0.2:
+                    logger.warning("⏳ Owner daemon not reachable at %s: %s", self.socket_path, e)
+                self.connected.clear()
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            delay = 0.2
+            self._subscription = sock
+            try:
+                sock.settimeout(None)
+                sock.sendall(b'{"subscribe": true}\n')
+                self.state.reopen()
+                self.connected.set()
+                logger.info("🔗 Following the owner daemon's state")
+                self._dispatch(list(self.state.document()["sections"]))
+                for line in lines:
+                    self._dispatch(json.loads(line)["changed"])
+            except (OSError, ValueError) as e:
+                logger.warning("Owner subscription lost: %s", e)
+            except Exception as e:
+                # Anything else would end this thread and leave the worker without state updates
+                logger.error("❌ Owner subscription failed, reconnecting: %s", e)
+            finally:
+                self.connected.clear()
+                lines.close()
+                sock.close()
+                self._subscription = None
+
+    def _dispatch(self, sections: list):
+        for name in sections:
+            with self._lock:
+                callbacks = list(self._listeners.get(name, ()))
+                subscribers = list(self._queues.get(name, ()))
+            if not callbacks and not subscribers:
+                continue
+            section = self.state.section(name)
+            if section is None:
+                continue
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error("State listener for %s failed: %s", name, e)
+            value = decode(section["value"])
+            if isinstance(value, Exception):
+                continue
+            for loop, updates in subscribers:
+                try:
+                    loop.call_soon_threadsafe(offer, updates, value)
+                except RuntimeError:
+                    # Event loop already closed
+                    self.unsubscribe(updates)
+
+
+class RemoteObject:
+    """A service, or an attribute of one, living in the owner daemon; calling it forwards the call."""
+
+    __slots__ = ("_link", "_method")
+
+    def __init__(self, link: OwnerLink, method: str):
+        self._link = link
+        self._method = method
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return RemoteObject(self._link, f"{self._method}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        return self._link.invoke(self._method, args, kwargs)
+
+
+class RemoteProvider:
+    """Stands in for a ``Provider`` in an API worker: the service itself runs in the owner daemon.
+
+    State comes from the owner's published health section; ``get`` waits
+    for the owner to build the service, as ``Provider.get`` would build it.
+    """
+
+    def __init__(self, name: str, target: str, link: OwnerLink):
+        self.name = name
+        self.target = target
+        self.link = link
+        self.build_seconds = None
+        self.error = None
+
+    @property
+    def state(self) -> str:
+        if not self.link.connected.is_set():
+            return "unreachable"
+        section = self.link.state.section("health")
+        return decode(section["value"]).get(self.name, "pending") if section else "pending"
+
+    @property
+    def built(self) -> bool:
+        return self.state == "ready"
+
+    def get(self):
+        self.link.call(self.target)
+        return self
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return RemoteObject(self.link, f"{self.target}.{name}")
@@ -0,0 +1,242 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from app.containers.logging_container import LoggingContainer
+from app.models.schemas import PlayRecord
+from app.utils.storage_utils import data_dir
+from app.utils.text_utils import canonical_artist
+
+logger = LoggingContainer.get_logger("PlayHistory")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    value TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS plays (
+    started_at INTEGER NOT NULL,
+    ended_at INTEGER NOT NULL,
+    title_id INTEGER,
+    artist_id INTEGER,
+    album_id INTEGER,
+    artist_key_id INTEGER,
+    duration_ms INTEGER,
+    enrichment_id TEXT,
+    device TEXT
+);
+CREATE INDEX IF NOT EXISTS plays_started ON plays (started_at);
+CREATE INDEX IF NOT EXISTS plays_artist ON plays (artist_key_id, started_at);
+"""
+
+_SELECT = """
+SELECT p.started_at, p.ended_at, t.value, a.value, al.value, p.duration_ms, p.enrichment_id, p.device
+FROM plays p
+LEFT JOIN names t ON t.id = p.title_id
+LEFT JOIN names a ON a.id = p.artist_id
+LEFT JOIN names al ON al.id = p.album_id
+"""
+
+
+class PlayHistory:
+    """Append-only record of played tracks.
+
+    A play is written once, when it ends, so rows are never updated. Titles,
+    artists and albums are interned in a ``names`` table, which keeps a play
+    at a few integers on disk. Plays are indexed by start time and by
+    canonical artist. The last ``RECENT`` plays, including the current one,
+    also live in a fixed-size ring buffer that serves the "recently played"
+    view without touching the disk.
+
+    ``track_started`` is called on the metadata hot path. It only appends to
+    the ring buffer and hands the finished play to a writer thread, which
+    inserts in batches.
+    """
+
+    RECENT = 100
+    BATCH = 64
+    NAME_CACHE = 4096
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else data_dir() / "play_history.db"
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=self.RECENT)  # PlayRecord, oldest first
+        self._current = None  # (media track id, PlayRecord)
+        self._queue = queue.SimpleQueue()
+        self._names = {}  # value -> id, writer thread only
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._load_recent()
+        self._writer = threading.Thread(target=self._run, name="PlayHistory", daemon=True)
+        self._writer.start()
+
+    def track_started(self, track_id: int, title: str | None, artist: str | None,
+                      album: str | None = None, duration_ms: int | None = None, device: str | None = None):
+        """Close the current play and open a new one. Tracks without a title only close it.
+
+        The same title and artist again (AVRCP resends the track when e.g.
+        only its duration becomes known) updates the current play instead.
+        """
+        now = time.time()
+        record = None
+        if title:
+            record = PlayRecord(
+                title=title, artist=artist, album=album, duration_ms=duration_ms,
+                device=device, started_at=now, current=True,
+            )
+        with self._lock:
+            if record and self._current and self._same_track(self._current[1], record):
+                current = self._current[1]
+                current.album = album or current.album
+                current.duration_ms = duration_ms or current.duration_ms
+                self._current = (track_id, current)
+                return
+            finished = self._finish(now)
+            if record:
+                self._current = (track_id, record)
+                self._recent.append(record)
+        if finished:
+            self._queue.put(finished)
+
+    def stopped(self):
+        """Close the current play (the player went away)."""
+        with self._lock:
+            finished = self._finish(time.time())
+        if finished:
+            self._queue.put(finished)
+
+    def enriched(self, track_id: int, enrichment_id: str | None):
+        """Attach the enrichment (Spotify track id) to the play of a pipeline track id."""
+        if not enrichment_id:
+            return
+        with self._lock:
+            if self._current and self._current[0] == track_id:
+                self._current[1].enrichment_id = enrichment_id
+
+    def recent(self, limit: int = 20) -> list[PlayRecord]:
+        with self._lock:
+            records = list(self._recent)[-limit:] if limit > 0 else []
+        return [record.model_copy() for record in reversed(records)]
+
+    def query(self, since: float | None = None, until: float | None = None,
+              artist: str | None = None, limit: int = 100) -> list[PlayRecord]:
+        """Finished plays started in [since, until], newest first, optionally for one artist."""
+        clauses, params = [], []
+        if artist:
+            clauses.append("p.artist_key_id = (SELECT id FROM names WHERE value = ?)")
+            params.append(self._artist_key(artist))
+        if since is not None:
+            clauses.append("p.started_at >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append("p.started_at <= ?")
+            params.append(int(until))
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._db_lock:
+            rows = self._db.execute(
+                f"{_SELECT}{where}ORDER BY p.started_at DESC LIMIT ?", (*params, max(0, limit)),
+            ).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            finished = self._finish(time.time())
+        if finished:
+            self._queue.put(finished)
+        self._queue.put(None)
+        self._writer.join(timeout=2)
+        with self._db_lock:
+            self._db.close()
+
+    @staticmethod
+    def _same_track(current: PlayRecord, record: PlayRecord) -> bool:
+        return (current.title, current.device) == (record.title, record.device) \
+            and PlayHistory._artist_key(current.artist) == PlayHistory._artist_key(record.artist)
+
+    def _finish(self, now: float) -> PlayRecord | None:
+        """Caller holds the lock."""
+        if not self._current:
+            return None
+        record = self._current[1]
+        record.ended_at = now
+        record.current = False
+        self._current = None
+        return record
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def _write(self, records: list[PlayRecord]):
+        with self._db_lock:
+            try:
+                self._db.execute("BEGIN")
+                self._db.executemany(
+                    "INSERT INTO plays (started_at, ended_at, title_id, artist_id, album_id, artist_key_id, "
+                    "duration_ms, enrichment_id, device) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(
+                        int(record.started_at),
+                        int(record.ended_at),
+                        self._name_id(record.title),
+                        self._name_id(record.artist),
+                        self._name_id(record.album),
+                        self._name_id(self._artist_key(record.artist)),
+                        record.duration_ms,
+                        record.enrichment_id,
+                        record.device,
+                    ) for record in records],
+                )
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._db.execute("ROLLBACK")
+                self._names.clear()
+                logger.error(f"Could not store {len(records)} play(s): {e}")
+
+    def _name_id(self, value: str | None) -> int | None:
+        """Interned id of a string. Caller holds the db lock inside a transaction."""
+        if not value:
+            return None
+        name_id = self._names.get(value)
+        if name_id is None:
+            self._db.execute("INSERT OR IGNORE INTO names (value) VALUES (?)", (value,))
+            name_id = self._db.execute("SELECT id FROM names WHERE value = ?", (value,)).fetchone()[0]
+            if len(self._names) >= self.NAME_CACHE:
+                self._names.clear()
+            self._names[value] = name_id
+        return name_id
+
+    def _load_recent(self):
+        with self._db_lock:
+            rows = self._db.execute(f"{_SELECT}ORDER BY p.started_at DESC LIMIT ?", (self.RECENT,)).fetchall()
+        self._recent.extend(self._to_record(row) for row in reversed(rows))
+
+    @staticmethod
+    def _artist_key(artist: str | None) -> str | None:
+        # Prefixed so artist keys never collide with interned display names
+        key = canonical_artist(artist or "")
+        return f"artist:{key}" if key else None
+
+    @staticmethod
+    def _to_record(row) -> PlayRecord:
+        started_at, ended_at, title, artist, album, duration_ms, enrichment_id, device = row
+        return PlayRecord(
+            title=title, artist=artist, album=album, duration_ms=duration_ms,
+            enrichment_id=enrichment_id, device=device, started_at=started_at, ended_at=ended_at,
+        )
@@ -0,0 +1,201 @@
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter
+
+from app.containers.logging_container import LoggingContainer
+
+logger = LoggingContainer.get_logger("Profiler")
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+class Profiler:
+    """On-demand CPU and memory profiling from inside the running service.
+
+    Nothing is hooked in until a request asks for it: cProfile and the stack
+    sampler run only for the requested seconds, and tracemalloc traces only
+    between ``memory_start`` and ``memory_stop``. One CPU profile runs at a
+    time.
+    """
+
+    MAX_SECONDS = 60
+    SAMPLE_INTERVAL = 0.01  # 100 Hz; a sample is one sys._current_frames() walk
+
+    def __init__(self, memory_frames: int = 10):
+        self.memory_frames = memory_frames
+        self._busy = threading.Lock()
+        self._baseline = None  # Previous tracemalloc snapshot, for diffs
+
+    def stop(self):
+        self.memory_stop()
+
+    # CPU
+
+    async def profile(self, seconds: float) -> pstats.Stats:
+        """cProfile the event loop thread (every async handler and callback) for ``seconds``.
+
+        cProfile only sees the thread it is enabled in. Worker threads (GLib
+        dispatch, HFP monitor, thread pool) are covered by ``sample``.
+        """
+        seconds = self._clamp(seconds)
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("Başka bir profil zaten çalışıyor.")
+        try:
+            profile = cProfile.Profile()
+            logger.info("🔬 cProfile started for %.1fs", seconds)
+            profile.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile.disable()
+            return pstats.Stats(profile)
+        finally:
+            self._busy.release()
+
+    async def sample(self, seconds: float) -> str:
+        """Sample every thread's stack at 100 Hz; returns collapsed stacks (flamegraph.pl/speedscope input)."""
+        seconds = self._clamp(seconds)
+        if not self._busy.acquire(blocking=False):
+            raise ProfilerBusy("Başka bir profil zaten çalışıyor.")
+        try:
+            logger.info("🔬 Stack sampling started for %.1fs", seconds)
+            stacks = await asyncio.to_thread(self._sample, seconds)
+        finally:
+            self._busy.release()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def _sample(self, seconds: float) -> Counter:
+        stacks = Counter()
+        own = threading.get_ident()
+        names = {}
+        labels = {}  # code object -> "function (file:line)"
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+                    frames.append(label)
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(self.SAMPLE_INTERVAL)
+        return stacks
+
+    @staticmethod
+    def pstats_text(stats: pstats.Stats, sort: str = "cumulative", limit: int = 60) -> str:
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    @staticmethod
+    def pstats_bytes(stats: pstats.Stats) -> bytes:
+        """Same content as ``Stats.dump_stats``: load with ``pstats.Stats(path)`` or snakeviz."""
+        return marshal.dumps(stats.stats)
+
+    def _clamp(self, seconds: float) -> float:
+        return max(0.1, min(float(seconds), self.MAX_SECONDS))
+
+    # Memory
+
+    def memory_start(self) -> dict:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._baseline = None
+            logger.info("🧠 tracemalloc started (%d frames)", self.memory_frames)
+        return self.memory_status()
+
+    def memory_stop(self) -> dict:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("🧠 tracemalloc stopped")
+        self._baseline = None
+        return self.memory_status()
+
+    def memory_status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        }
+
+    def memory_snapshot(self, top: int = 20, group_by: str = "lineno") -> dict:
+        """Top allocators now, and the change since the previous snapshot (which this one replaces)."""
+        if not tracemalloc.is_tracing():
+            raise LookupError("tracemalloc kapalı; önce action=start ile başlatın.")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        result = {
+            **self.memory_status(),
+            "top": [self._stat(stat) for stat in snapshot.statistics(group_by)[:top]],
+            "diff": None,
+        }
+        if self._baseline is not None:
+            result["diff"] = [
+                {**self._stat(stat), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(self._baseline, group_by)[:top]
+            ]
+        self._baseline = snapshot
+        return result
+
+    @staticmethod
+    def _stat(stat) -> dict:
+        frame = stat.traceback[0]
+        return {
+            "where": f"{frame.filename}:{frame.lineno}",
+            "size": stat.size,
+            "count": stat.count,
+            "traceback": stat.traceback.format()[-6:],
+        }
+
+    # Threads
+
+    @staticmethod
+    def threads() -> dict:
+        """Stack of every thread, plus pending asyncio tasks when called from the event loop."""
+        frames = sys._current_frames()
+        threads = []
+        for thread in threading.enumerate():
+            frame = frames.get(thread.ident)
+            threads.append({
+                "name": thread.name,
+                "ident": thread.ident,
+                "native_id": thread.native_id,
+                "daemon": thread.daemon,
+                "stack": traceback.format_stack(frame) if frame else [],
+            })
+        tasks = []
+        try:
+            running = asyncio.all_tasks()
+        except RuntimeError:
+            running = set()
+        for task in running:
+            tasks.append({
+                "name": task.get_name(),
+                "coro": getattr(task.get_coro(), "__qualname__", repr(task.get_coro())),
+                "stack": [line for frame in task.get_stack(limit=8) for line in traceback.format_stack(frame, limit=1)],
+            })
+        return {"threads": threads, "tasks": tasks}
@@ -0,0 +1,240 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from app.containers.config_container import ConfigContainer
+from app.containers.logging_container import LoggingContainer
+from app.containers.metrics_container import MetricsContainer
+from app.utils.ipc_utils import encode
+
+logger = LoggingContainer.get_logger("SharedState")
+
+MAGIC = b"BDS1"
+HEADER_SIZE = 64
+# magic, sequence (odd while the header changes), data offset, data length, data CRC-32
+_HEADER = struct.Struct("<4s4xQQQI")
+
+STATE_PUBLISHES = MetricsContainer.counter(
+    "bluedrive_shared_state_publishes_total", "Shared state versions written by the owner")
+STATE_READ_RETRIES = MetricsContainer.counter(
+    "bluedrive_shared_state_read_retries_total", "Shared state reads retried because the owner was writing")
+
+
+class SharedSegment:
+    """Memory-mapped file holding one JSON document, written by one process and read by many.
+
+    The data area is split in two halves. The writer fills the half readers
+    aren't pointed at, then swaps the header to it under a sequence counter
+    (seqlock): a reader that saw the counter change, or odd, reads again. A
+    CRC of the document catches the rare torn read the counter can't.
+    """
+
+    def __init__(self, path: Path, size: int = 0, create: bool = False):
+        self.path = path
+        if create:
+            # A new file, not the old one truncated: readers still mapping a previous owner's keep it
+            path.unlink(missing_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            try:
+                os.ftruncate(fd, size)
+                self._map = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            # Sequences of consecutive owners never coincide
+            self._sequence = time.time_ns() & ~1
+            self._half = 0
+            _HEADER.pack_into(self._map, 0, MAGIC, self._sequence, HEADER_SIZE, 0, 0)
+        else:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                self._map = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+            finally:
+                os.close(fd)
+        self.capacity = (len(self._map) - HEADER_SIZE) // 2
+
+    def write(self, data: bytes):
+        if len(data) > self.capacity:
+            raise ValueError(f"Paylaşılan durum çok büyük: {len(data)} > {self.capacity} bayt")
+        self._half ^= 1
+        offset = HEADER_SIZE + self._half * self.capacity
+        self._map[offset:offset + len(data)] = data
+        self._sequence += 1
+        struct.pack_into("<Q", self._map, 8, self._sequence)
+        _HEADER.pack_into(self._map, 0, MAGIC, self._sequence, offset, len(data), zlib.crc32(data))
+        self._sequence += 1
+        struct.pack_into("<Q", self._map, 8, self._sequence)
+
+    def sequence(self) -> int:
+        return struct.unpack_from("<Q", self._map, 8)[0]
+
+    def read(self, retries: int = 1000) -> tuple[int, bytes]:
+        """(sequence, document) as of one consistent moment."""
+        for _ in range(retries):
+            magic, before, offset, length, crc = _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError("Geçersiz paylaşılan durum dosyası")
+            if not before & 1:
+                data = self._map[offset:offset + length]
+                if self.sequence() == before and zlib.crc32(data) == crc:
+                    return before, data
+            STATE_READ_RETRIES.inc()
+            time.sleep(0)
+        raise TimeoutError("Paylaşılan durum okunamadı: sahip süreç yazmayı bitirmedi")
+
+    def close(self):
+        self._map.close()
+
+
+class StatePublisher:
+    """Owner side: collects state sections and publishes each new version to the segment.
+
+    Sources are named callables, as for ``StateSnapshot``; they are polled
+    every ``interval`` seconds (None: the profile's, with no polling while
+    idle) and return None while their service isn't ready. ``refresh(name)`` collects one now (a registry change) and
+    ``publish(name, value)`` sets a value pushed by a service (a new track).
+    A version is written only when a section's encoded value changed, and
+    ``on_change(version, sections)`` is then called with the changed names.
+    Errors a source raises (no A2DP device: LookupError) are published too,
+    and re-raised by the readers.
+    """
+
+    def __init__(self, path: Path, size: int, interval: float | None = None):
+        self.segment = SharedSegment(path, size, create=True)
+        self.interval = interval
+        self.on_change = None
+        self._sources = {}
+        self._idle_sources = set()  # Cheap in-memory sections, polled while idle too
+        self._sections = {}  # name -> {"version": n, "value": encoded}
+        self._encoded = {}  # name -> JSON text, to detect changes
+        self._version = 0
+        self._cond = threading.Condition()
+        self._refresh = set()
+        self._pushed = {}
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="StatePublisher", daemon=True)
+
+    def add_source(self, section: str, collect, while_idle: bool = False):
+        self._sources[section] = collect
+        if while_idle:
+            self._idle_sources.add(section)
+
+    def start(self):
+        self._write()
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
+        self.segment.close()
+        self.segment.path.unlink(missing_ok=True)
+
+    def refresh(self, section: str):
+        with self._cond:
+            self._refresh.add(section)
+            self._cond.notify()
+
+    def publish(self, section: str, value):
+        with self._cond:
+            self._pushed[section] = value
+            self._cond.notify()
+
+    def _run(self):
+        deadline = time.monotonic()
+        while True:
+            with self._cond:
+                while self._running and not self._refresh and not self._pushed and time.monotonic() < deadline:
+                    self._cond.wait(max(0.0, deadline - time.monotonic()))
+                if not self._running:
+                    return
+                if time.monotonic() >= deadline:
+                    # Pushed changes and refreshes still go out while idle
+                    names = set(self._sources) if self.interval or not ConfigContainer.idle() else self._idle_sources | self._refresh
+                    deadline = time.monotonic() + (self.interval or ConfigContainer.intervals().shared_state)
+                else:
+                    names = self._refresh
+                pushed, self._pushed, self._refresh = self._pushed, {}, set()
+            values = {name: self._collect(name) for name in names - pushed.keys()}
+            values.update(pushed)
+            changed = [name for name, value in values.items() if value is not None and self._set(name, value)]
+            if changed:
+                self._write()
+                if self.on_change:
+                    self.on_change(self._version, changed)
+
+    def _collect(self, name: str):
+        try:
+            return self._sources[name]()
+        except Exception as e:
+            return e
+
+    def _set(self, name: str, value) -> bool:
+        encoded = encode(value)
+        text = json.dumps(encoded, sort_keys=True, separators=(",", ":"))
+        if self._encoded.get(name) == text:
+            return False
+        self._encoded[name] = text
+        self._version += 1
+        self._sections[name] = {"version": self._version, "value": encoded}
+        return True
+
+    def _write(self):
+        document = json.dumps({"version": self._version, "pid": os.getpid(), "sections": self._sections},
+                              separators=(",", ":")).encode()
+        try:
+            self.segment.write(document)
+        except ValueError as e:
+            logger.error("%s", e)
+            return
+        STATE_PUBLISHES.inc()
+
+
+class SharedStateReader:
+    """Worker side: the owner's latest state document, parsed once per version."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._segment = None
+        self._lock = threading.Lock()
+        self._sequence = None
+        self._document = {"version": 0, "sections": {}}
+
+    def document(self) -> dict:
+        with self._lock:
+            try:
+                if self._segment is None:
+                    self._segment = SharedSegment(self.path)
+                elif self._segment.sequence() == self._sequence:
+                    return self._document
+                sequence, data = self._segment.read()
+            except (OSError, ValueError, TimeoutError) as e:
+                # Not created yet, or left by an owner that has since restarted
+                self.close_segment()
+                logger.debug("Shared state unavailable: %s", e)
+                return self._document
+            if sequence != self._sequence:
+                self._sequence, self._document = sequence, json.loads(data)
+            return self._document
+
+    def section(self, name: str) -> dict | None:
+        """{"version": n, "value": encoded} or None when the owner hasn't published it."""
+        return self.document()["sections"].get(name)
+
+    def reopen(self):
+        """The owner restarted: its segment is a new file under the same name."""
+        with self._lock:
+            self.close_segment()
+
+    def close_segment(self):
+        """Caller holds the lock."""
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+            self._sequence = None
@@ -0,0 +1,240 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.containers.logging_container import LoggingContainer
+from app.containers.metrics_container import MetricsContainer
+
+logger = LoggingContainer.get_logger("SignalHistory")
+
+# One sample: unix time, value, series index (into the series table)
+SAMPLE = np.dtype([("time", "<f8"), ("value", "<f4"), ("series", "<u2"), ("_pad", "<u2")])
+# What each kind of series measures
+UNITS = {"bt": "dBm", "wifi": "%", "cell": "%"}
+
+MAGIC = b"BDH1"
+VERSION = 1
+HEADER_SIZE = 64
+SERIES_SIZE = 64 * 1024  # JSON [[key, label], ...]; new series are dropped once it is full
+# magic, version, capacity, samples ever written, series table length
+_HEADER = struct.Struct("<4sH2xQQI")
+
+SIGNAL_SAMPLES = MetricsContainer.counter(
+    "bluedrive_signal_samples_total", "Link quality samples recorded", ("kind",))
+
+
+class SignalHistory:
+    """Link quality over time: Bluetooth RSSI, Wi-Fi signal and cellular strength.
+
+    Samples are fixed-width rows (time, value, series) in a ring of
+    ``capacity`` that overwrites the oldest, optionally backed by a
+    memory-mapped file so a drive's history survives restarts. A series is
+    one source, "bt:<address>", "wifi:<bssid>" or "cell:<address>", and
+    has a label (device name, SSID) kept in the series table at the start
+    of the file.
+
+    Nothing is polled: the registry and the Wi-Fi service report values
+    as their signals and scans deliver them. Queries select the window
+    and bucket it with numpy in one pass, so a day of samples costs about
+    as much as a minute does in Python.
+    """
+
+    def __init__(self, capacity: int = 524288, path: Path | None = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map = None
+        self._series = []  # index -> [key, label]
+        self._index = {}  # key -> index
+        if path is None:
+            self.capacity = capacity
+            self._samples = np.zeros(capacity, dtype=SAMPLE)
+            self.written = 0
+        else:
+            self._open(path, capacity)
+
+    def _open(self, path: Path, capacity: int):
+        size = HEADER_SIZE + SERIES_SIZE + capacity * SAMPLE.itemsize
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.capacity = capacity
+        self._samples = np.frombuffer(self._map, dtype=SAMPLE, count=capacity, offset=HEADER_SIZE + SERIES_SIZE)
+        magic, version, stored_capacity, written, table = _HEADER.unpack_from(self._map, 0)
+        if magic == MAGIC and version == VERSION and stored_capacity == capacity and table <= SERIES_SIZE:
+            try:
+                self._series = json.loads(bytes(self._map[HEADER_SIZE:HEADER_SIZE + table]) or b"[]")
+            except ValueError:
+                written, self._series = 0, []
+            self.written = written
+            self._index = {key: index for index, (key, _) in enumerate(self._series)}
+            logger.info("📶 Signal history loaded: %d samples, %d series", min(written, capacity), len(self._series))
+        else:
+            self.written = 0
+            self._write_series()
+
+    def close(self):
+        if self._map is not None:
+            with self._lock:
+                self._samples = np.zeros(0, dtype=SAMPLE)
+                self._map.flush()
+                self._map.close()
+                self._map = None
+
+    # Recording (any thread)
+
+    def record(self, kind: str, source: str, value: float, label: str | None = None, at: float | None = None):
+        key = f"{kind}:{source}"
+        with self._lock:
+            if self._map is None and self.path is not None:
+                return  # Closed
+            index = self._index.get(key)
+            if index is None:
+                index = self._add_series(key, label)
+                if index is None:
+                    return
+            elif label and self._series[index][1] != label:
+                self._series[index][1] = label
+                self._write_series()
+            sample = self._samples[self.written % self.capacity]
+            sample["time"] = time.time() if at is None else at
+            sample["value"] = value
+            sample["series"] = index
+            self.written += 1
+            if self._map is not None:
+                struct.pack_into("<Q", self._map, 16, self.written)
+        SIGNAL_SAMPLES.labels(kind).inc()
+
+    def record_networks(self, networks: list):
+        """A Wi-Fi scan: one sample per access point, all at the same time."""
+        now = time.time()
+        for network in networks:
+            self.record("wifi", network.bssid, network.signal, label=network.ssid, at=now)
+
+    def _add_series(self, key: str, label: str | None) -> int | None:
+        """Caller holds the lock."""
+        if len(self._series) > 0xFFFF:
+            return None
+        self._series.append([key, label])
+        if not self._write_series():
+            self._series.pop()
+            return None
+        self._index[key] = len(self._series) - 1
+        return len(self._series) - 1
+
+    def _write_series(self) -> bool:
+        """Caller holds the lock."""
+        if self._map is None:
+            return True
+        table = json.dumps(self._series, separators=(",", ":")).encode()
+        if len(table) > SERIES_SIZE:
+            logger.warning("📶 Signal history series table full; %s not recorded", self._series[-1][0])
+            return False
+        self._map[HEADER_SIZE:HEADER_SIZE + len(table)] = table
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity, self.written, len(table))
+        return True
+
+    # Queries
+
+    def series(self) -> list[dict]:
+        """Every series with its latest sample, newest first."""
+        with self._lock:
+            samples = self._kept()
+            table = [list(entry) for entry in self._series]
+        if not len(samples):
+            return []
+        # Last occurrence of each series index in the (time-ordered) ring
+        indexes, last = np.unique(samples["series"][::-1], return_index=True)
+        last = len(samples) - 1 - last
+        counts = np.bincount(samples["series"], minlength=len(table))
+        result = []
+        for index, position in zip(indexes.tolist(), last.tolist()):
+            key, label = table[index]
+            kind, _, source = key.partition(":")
+            result.append({
+                "key": key, "kind": kind, "source": source, "label": label, "unit": UNITS.get(kind),
+                "samples": int(counts[index]),
+                "last": float(samples["value"][position]),
+                "last_time": float(samples["time"][position]),
+            })
+        return sorted(result, key=lambda item: item["last_time"], reverse=True)
+
+    def query(self, keys: list[str] | None = None, start: float | None = None, end: float | None = None,
+              points: int = 300) -> dict:
+        """Series bucketed into ``points`` equal time buckets over [start, end).
+
+        ``keys`` are series keys or kinds ("wifi" is every access point);
+        None is every series. Each bucket has min, max, mean and sample
+        count; empty buckets are left out, so a dropout shows as a gap.
+        """
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+        if end <= start:
+            raise ValueError("end, start'tan büyük olmalı")
+        with self._lock:
+            table = [list(entry) for entry in self._series]
+            samples = self._window(start, end)
+        if keys is not None:
+            wanted = [index for index, (key, _) in enumerate(table)
+                      if key in keys or key.partition(":")[0] in keys]
+            samples = samples[np.isin(samples["series"], wanted)]
+
+        width = (end - start) / points
+        buckets = np.minimum(((samples["time"] - start) / width).astype(np.int64), points - 1)
+        # Sorted by (series, bucket), reduceat over the runs aggregates every series at once. The
+        # ring is in time order, so a stable (radix) sort on the 16-bit series index is enough
+        # unless the clock went back
+        order = np.argsort(samples["series"], kind="stable")
+        combined = samples["series"][order].astype(np.int64) * points + buckets[order]
+        if len(combined) and np.any(combined[1:] < combined[:-1]):
+            resort = np.argsort(combined, kind="stable")
+            order, combined = order[resort], combined[resort]
+        values = samples["value"][order]
+        runs = np.flatnonzero(np.diff(combined, prepend=-1)) if len(combined) else np.zeros(0, np.int64)
+        counts = np.diff(np.append(runs, len(combined)))
+        run_keys = combined[runs]
+        lows = np.minimum.reduceat(values, runs) if len(runs) else values[:0]
+        highs = np.maximum.reduceat(values, runs) if len(runs) else values[:0]
+        means = np.add.reduceat(values.astype(np.float64), runs) / counts if len(runs) else values[:0]
+
+        result = []
+        series_of_run = run_keys // points
+        boundaries = np.flatnonzero(np.diff(series_of_run, prepend=-1))
+        for first, last in zip(boundaries.tolist(), np.append(boundaries[1:], len(runs)).tolist()):
+            key, label = table[int(series_of_run[first])]
+            kind = key.partition(":")[0]
+            result.append({
+                "key": key, "label": label, "unit": UNITS.get(kind),
+                "t": np.round(start + (run_keys[first:last] % points) * width, 3).tolist(),
+                "min": np.round(lows[first:last].astype(np.float64), 2).tolist(),
+                "max": np.round(highs[first:last].astype(np.float64), 2).tolist(),
+                "mean": np.round(means[first:last], 2).tolist(),
+                "count": counts[first:last].tolist(),
+            })
+        return {"start": start, "end": end, "bucket_seconds": width, "series": result}
+
+    def _kept(self) -> np.ndarray:
+        """The samples in the ring, oldest first (a copy). Caller holds the lock."""
+        if self.written <= self.capacity:
+            return self._samples[:self.written].copy()
+        head = self.written % self.capacity
+        return np.concatenate((self._samples[head:], self._samples[:head]))
+
+    def _window(self, start: float, end: float) -> np.ndarray:
+        """Samples with start <= time < end (a copy). Caller holds the lock."""
+        if self.written <= self.capacity:
+            parts = (self._samples[:self.written],)
+        else:
+            head = self.written % self.capacity
+            parts = (self._samples[head:], self._samples[:head])
+        # Boolean selection copies only the window, not the ring
+        return np.concatenate([part[(part["time"] >= start) & (part["time"] < end)] for part in parts])
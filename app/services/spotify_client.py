@@ -0,0 +1,263 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.containers.logging_container import LoggingContainer
+from app.utils.metrics_utils import HTTP_ERRORS, HTTP_SECONDS
+from app.utils.trace_utils import CLIENT, span
+
+logger = LoggingContainer.get_logger("SpotifyClient")
+
+
+class SpotifyUnavailable(Exception):
+    """Raised when Spotify is disabled, rate limited or the circuit is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency and lets a single probe through on a timer."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() >= self._open_until:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """True if a call may go out now. In half-open state only one probe is allowed."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() < self._open_until or self._probe_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("✅ Spotify circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._trip(self.reset_timeout)
+
+    def open_for(self, seconds: float):
+        """Open the circuit for an explicit duration (e.g. 429 Retry-After)."""
+        with self._lock:
+            self._probe_in_flight = False
+            self._trip(seconds)
+
+    def _trip(self, seconds: float):
+        if self._state != self.OPEN:
+            logger.warning(f"🔌 Spotify circuit opened for {seconds:.0f}s")
+        self._state = self.OPEN
+        self._open_until = time.monotonic() + seconds
+
+
+class SpotifyClient:
+    """Minimal Spotify Web API client for in-car use.
+
+    Uses one pooled HTTP session, a total latency budget per call (token fetch
+    included) and a circuit breaker, so that dead zones cost nothing once the
+    circuit is open. Base URLs can point at a local stub server.
+    """
+
+    API_URL = "https://api.spotify.com/v1"
+    TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+    def __init__(
+        self,
+        client_id: str | None,
+        client_secret: str | None,
+        api_url: str | None = None,
+        token_url: str | None = None,
+        latency_budget: float = 2.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_retry_after: float = 300.0,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = (api_url or self.API_URL).rstrip("/")
+        self.token_url = token_url or self.TOKEN_URL
+        self.latency_budget = latency_budget
+        self.max_retry_after = max_retry_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and self.breaker.state != CircuitBreaker.OPEN
+
+    def search(self, q: str, type: str = "track", limit: int = 1) -> dict:
+        """Spotify /search. Raises SpotifyUnavailable instead of waiting on a dead link."""
+        if not self.enabled:
+            raise SpotifyUnavailable("Spotify credentials are not configured")
+        if not self.breaker.allow():
+            raise SpotifyUnavailable("Spotify circuit is open")
+
+        deadline = time.monotonic() + self.latency_budget
+        try:
+            token = self._get_token(deadline)
+            response = self._request(
+                "GET",
+                f"{self.api_url}/search",
+                deadline,
+                params={"q": q, "type": type, "limit": limit},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            payload = response.json()
+        except SpotifyUnavailable:
+            raise
+        except requests.exceptions.HTTPError as e:
+            # Other 4xx means the link works; server errors and rejected credentials (a 401/403 from
+            # the token endpoint would fail every call) count against the circuit
+            status = e.response.status_code if e.response is not None else 500
+            if status < 500 and status not in (401, 403):
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise SpotifyUnavailable(f"Spotify request failed: {e}") from e
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            # ValueError/KeyError: malformed JSON from a captive portal or proxy
+            self.breaker.record_failure()
+            raise SpotifyUnavailable(f"Spotify request failed: {e}") from e
+
+        self.breaker.record_success()
+        return payload
+
+    def close(self):
+        self.session.close()
+
+    def _get_token(self, deadline: float) -> str:
+        with self._token_lock:
+            if self._token and time.monotonic() < self._token_expires:
+                return self._token
+            response = self._request(
+                "POST",
+                self.token_url,
+                deadline,
+                data={"grant_type": "client_credentials"},
+                auth=(self.client_id, self.client_secret),
+            )
+            payload = response.json()
+            self._token = payload["access_token"]
+            # Refresh a minute early so a token never expires mid-request
+            self._token_expires = time.monotonic() + max(0, int(payload.get("expires_in", 3600)) - 60)
+            return self._token
+
+    def _request(self, method: str, url: str, deadline: float, **kwargs) -> requests.Response:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout("Latency budget exhausted")
+
+        endpoint = "token" if url == self.token_url else "search"
+        with span(f"HTTP {method} spotify {endpoint}", CLIENT) as traced:
+            start = time.perf_counter()
+            try:
+                # The timeouts bound each socket wait; _read_body holds the body to the deadline itself
+                response = self.session.request(method, url, timeout=(remaining, remaining), stream=True, **kwargs)
+                self._read_body(response, deadline)
+            except requests.exceptions.RequestException as e:
+                HTTP_ERRORS.labels("spotify", endpoint, type(e).__name__).inc()
+                raise
+            finally:
+                HTTP_SECONDS.labels("spotify", endpoint).observe(time.perf_counter() - start)
+            if traced:
+                traced.set("http.status_code", response.status_code)
+            if response.status_code >= 400:
+                HTTP_ERRORS.labels("spotify", endpoint, str(response.status_code)).inc()
+                if traced:
+                    traced.fail(f"HTTP {response.status_code}")
+
+        if response.status_code == 429:
+            retry_after = self._parse_retry_after(response.headers.get("Retry-After"))
+            self.breaker.open_for(retry_after)
+            raise SpotifyUnavailable(f"Spotify rate limited, retry after {retry_after:.0f}s")
+        if response.status_code == 401:
+            self._token = None
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _read_body(response: requests.Response, deadline: float):
+        """Read the streamed body by ``deadline``, however slowly it trickles in.
+
+        The read timeout only bounds each socket wait, so a timer shuts the
+        socket down at the deadline and the blocked read returns at once.
+        """
+        timer = None
+        if hasattr(response.raw, "shutdown"):  # urllib3 2.3+
+            timer = threading.Timer(max(0.0, deadline - time.monotonic()), _shutdown, (response.raw,))
+            timer.daemon = True
+            timer.start()
+        try:
+            response.content  # Reads and keeps the body, as without stream=True
+        except requests.exceptions.RequestException as e:
+            if time.monotonic() >= deadline:
+                raise requests.exceptions.Timeout("Latency budget exhausted while reading the response") from e
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        if time.monotonic() >= deadline:
+            response.close()
+            raise requests.exceptions.Timeout("Latency budget exhausted while reading the response")
+
+    def _parse_retry_after(self, value: str | None) -> float:
+        """Retry-After in seconds: delta-seconds or an HTTP-date, else the breaker's reset timeout."""
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            try:
+                when = parsedate_to_datetime(value)
+                if when.tzinfo is None:  # "-0000": UTC, origin unknown
+                    when = when.replace(tzinfo=timezone.utc)
+                seconds = (when - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                seconds = self.breaker.reset_timeout
+        return min(max(seconds, 1.0), self.max_retry_after)
+
+
+def _shutdown(raw):
+    try:
+        raw.shutdown()
+    except (OSError, RuntimeError, ValueError):
+        pass  # Already read, released or closed
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from app.containers.config_container import ConfigContainer
+from app.containers.logging_container import LoggingContainer
+from app.utils.storage_utils import data_dir, write_atomic
+
+logger = LoggingContainer.get_logger("StateSnapshot")
+
+
+class StateSnapshot:
+    """Last-known dashboard state, saved periodically and served after a restart.
+
+    Sources are named callables that return the live value of one section
+    (metadata, devices, Wi-Fi, phone). They return None while their service
+    isn't ready, which keeps the previously saved value. The file is read once
+    at startup, with no D-Bus, oFono or nmcli involved. Until the live
+    services are up, its sections are served marked ``stale: true``. The file
+    is rewritten atomically, and only when something changed.
+    """
+
+    def __init__(self, path: str | Path | None = None, interval: float | None = None):
+        self.path = Path(path) if path else data_dir() / "snapshot.json"
+        self.interval = interval
+        self._sources = {}  # section -> callable returning a JSON-able value or None
+        self._lock = threading.Lock()
+        self._sections = {}
+        self._saved_at = None
+        self._last_written = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._load()
+
+    def add_source(self, section: str, collect):
+        self._sources[section] = collect
+
+    def section(self, name: str):
+        """A section from the saved snapshot, or None."""
+        with self._lock:
+            return self._sections.get(name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"stale": True, "saved_at": self._saved_at, **self._sections}
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="StateSnapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ConfigContainer.wake()
+        self.save()
+
+    def save(self):
+        """Collect every source and write the file if anything changed."""
+        sections = {}
+        for section, collect in self._sources.items():
+            try:
+                value = collect()
+            except Exception as e:
+                logger.debug("Snapshot source %s failed: %s", section, e)
+                value = None
+            if value is not None:
+                sections[section] = self._jsonable(value)
+
+        with self._lock:
+            self._sections.update(sections)
+            data = json.dumps(self._sections, sort_keys=True, separators=(",", ":")).encode()
+            if data == self._last_written:
+                return
+            self._saved_at = time.time()
+            payload = json.dumps({"saved_at": self._saved_at, "sections": self._sections}).encode()
+        try:
+            write_atomic(self.path, payload)
+            self._last_written = data
+        except OSError as e:
+            logger.error(f"Snapshot could not be written: {e}")
+
+    def _run(self):
+        if self.interval is None:
+            # The profile's interval, held while idle
+            while ConfigContainer.pause("snapshot", self._stop):
+                self.save()
+            return
+        while not self._stop.wait(self.interval):
+            self.save()
+
+    def _load(self):
+        try:
+            stored = json.loads(self.path.read_text())
+            self._sections = stored.get("sections", {})
+            self._saved_at = stored.get("saved_at")
+            logger.info(f"Loaded snapshot from {self.path} ({len(self._sections)} sections)")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable snapshot {self.path}: {e}")
+            self._sections = {}
+
+    @classmethod
+    def _jsonable(cls, value):
+        if hasattr(value, "model_dump"):
+            return value.model_dump(mode="json")
+        if isinstance(value, (list, tuple)):
+            return [cls._jsonable(item) for item in value]
+        return value
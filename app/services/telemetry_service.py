@@ -0,0 +1,265 @@
+import asyncio
+import socket
+import threading
+import time
+
+import numpy as np
+
+from app.containers.logging_container import LoggingContainer
+from app.containers.metrics_container import MetricsContainer
+from app.utils.telemetry_utils import FRAME, MAGIC, MAX_DATAGRAM, VERSION, decimate, min_max
+
+logger = LoggingContainer.get_logger("TelemetryService")
+
+TELEMETRY_PACKETS = MetricsContainer.counter(
+    "bluedrive_telemetry_packets_total", "UDP telemetry datagrams by result", ("result",))
+TELEMETRY_SAMPLES = MetricsContainer.counter(
+    "bluedrive_telemetry_samples_total", "Telemetry samples stored")
+TELEMETRY_LOST = MetricsContainer.counter(
+    "bluedrive_telemetry_lost_packets_total", "Datagrams missing from a source's sequence")
+
+# Resolved once; a label lookup per packet would cost more than the packet
+_ACCEPTED = TELEMETRY_PACKETS.labels("ok")
+_MALFORMED = TELEMETRY_PACKETS.labels("malformed")
+# Row offsets 0..65535 for turning (t0, dt) into per-row times in place
+_ROWS = np.arange(1 << 16, dtype=np.int64)
+
+
+class TelemetryRing:
+    """Preallocated ring of one channel's (µs time, value) samples; the oldest are overwritten."""
+
+    __slots__ = ("name", "capacity", "times", "values", "written", "dt_us", "received_at")
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.written = 0  # Samples ever written; the ring holds the last ``capacity``
+        self.dt_us = 0
+        self.received_at = None
+
+    def extend(self, column: np.ndarray, t0_us: int, dt_us: int):
+        """Append a frame's column (a strided view) in place; no array is allocated."""
+        rows = len(column)
+        if rows > self.capacity:
+            t0_us += (rows - self.capacity) * dt_us
+            column = column[rows - self.capacity:]
+            self.written += rows - self.capacity
+            rows = self.capacity
+        start = self.written % self.capacity
+        first = min(rows, self.capacity - start)
+        self.values[start:start + first] = column[:first]
+        times = self.times[start:start + first]
+        np.multiply(_ROWS[:first], dt_us, out=times)
+        times += t0_us
+        if first < rows:
+            # Wrapped: the rest goes to the start of the ring
+            self.values[:rows - first] = column[first:]
+            times = self.times[:rows - first]
+            np.multiply(_ROWS[first:rows], dt_us, out=times)
+            times += t0_us
+        self.written += rows
+        self.dt_us = dt_us
+
+    def since(self, count: int) -> tuple[int, np.ndarray, np.ndarray]:
+        """Copies of the samples written after the first ``count``, oldest first, and the new count."""
+        first = max(count, self.written - self.capacity)
+        if first >= self.written:
+            return self.written, self.times[:0].copy(), self.values[:0].copy()
+        start, end = first % self.capacity, self.written % self.capacity
+        if start < end:
+            return self.written, self.times[start:end].copy(), self.values[start:end].copy()
+        return (self.written, np.concatenate((self.times[start:], self.times[:end])),
+                np.concatenate((self.values[start:], self.values[:end])))
+
+
+class TelemetryService:
+    """High-rate vehicle telemetry (speed, RPM, temperatures) over UDP.
+
+    A gateway on the car bus sends frames of ``telemetry_utils.FRAME``:
+    rows of float32 samples for a group of channels, with the row interval
+    instead of a timestamp per sample. Datagrams are received on the event
+    loop into one preallocated buffer, and each channel's column is copied
+    from it into that channel's preallocated ring. No buffer, list or array
+    is created per packet; ingest cost grows with channels, not samples.
+
+    Readers (HTTP series, WebSocket streams) copy out under the same lock
+    and downsample per request, so a 1 kHz channel costs a 20 Hz UI no
+    more than the points it draws. Gaps in each source's sequence count as
+    lost packets.
+    """
+
+    BATCH = 64  # Datagrams drained per reader callback before yielding to the loop
+
+    def __init__(self, host: str | None, port: int, names: dict, capacity: int = 16384):
+        self.host = host
+        self.port = port
+        self.names = names
+        self.capacity = capacity
+        self._buffer = bytearray(MAX_DATAGRAM)
+        self._rings = [None] * 256  # By channel id
+        self._by_name = {}
+        self._next_sequence = [-1] * 256  # By source id
+        self._lock = threading.Lock()
+        self._sock = None
+        self._loop = None
+        self.lost = 0
+
+    def start(self):
+        """Bind and receive on the running event loop. Must be called from the event loop."""
+        if self._sock is not None:
+            return
+        if self.host is None:
+            logger.info("📈 Telemetry disabled (BLUEDRIVE_TELEMETRY_ADDR is empty)")
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        try:
+            sock.bind((self.host, self.port))
+        except OSError as e:
+            sock.close()
+            logger.error("❌ Telemetry port %s:%d unavailable: %s", self.host, self.port, e)
+            return
+        sock.setblocking(False)
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._drain)
+        self._sock = sock
+        logger.info("📈 Telemetry listening on udp://%s:%d", self.host, sock.getsockname()[1])
+
+    def stop(self):
+        if self._sock is None:
+            return
+        try:
+            self._loop.remove_reader(self._sock.fileno())
+        except RuntimeError:
+            pass  # Loop already closed
+        self._sock.close()
+        self._sock = None
+
+    def _drain(self):
+        for _ in range(self.BATCH):
+            try:
+                size = self._sock.recv_into(self._buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                logger.warning("Telemetry receive failed: %s", e)
+                return
+            self.ingest(size)
+
+    def ingest(self, size: int) -> bool:
+        """Store the frame in the first ``size`` bytes of the receive buffer."""
+        buffer = self._buffer
+        if size < FRAME.size:
+            _MALFORMED.inc()
+            return False
+        magic, version, source, channels, _, rows, sequence, t0_us, dt_us = FRAME.unpack_from(buffer)
+        offset = FRAME.size + channels
+        if magic != MAGIC or version != VERSION or not channels or offset + rows * channels * 4 != size:
+            _MALFORMED.inc()
+            return False
+        values = np.frombuffer(buffer, dtype="<f4", count=rows * channels, offset=offset)
+
+        expected = self._next_sequence[source]
+        if expected >= 0 and sequence != expected:
+            gap = (sequence - expected) & 0xFFFF
+            if gap < 0x8000:  # Otherwise a late or repeated datagram, not a loss
+                self.lost += gap
+                TELEMETRY_LOST.inc(gap)
+        self._next_sequence[source] = (sequence + 1) & 0xFFFF
+
+        received_at = time.time()
+        with self._lock:
+            for index in range(channels):
+                channel = buffer[FRAME.size + index]
+                ring = self._rings[channel] or self._add_ring(channel)
+                ring.extend(values[index::channels], t0_us, dt_us)
+                ring.received_at = received_at
+        _ACCEPTED.inc()
+        TELEMETRY_SAMPLES.inc(rows * channels)
+        return True
+
+    def _add_ring(self, channel: int) -> TelemetryRing:
+        # Once per channel, on its first frame
+        ring = TelemetryRing(self.names.get(channel) or f"ch{channel}", self.capacity)
+        self._rings[channel] = ring
+        self._by_name[ring.name] = ring
+        logger.info("📈 New telemetry channel %d (%s)", channel, ring.name)
+        return ring
+
+    # Readers
+
+    def channels(self) -> list[dict]:
+        with self._lock:
+            rings = [ring for ring in self._rings if ring is not None]
+            return [{
+                "name": ring.name,
+                "samples": ring.written,
+                "kept": min(ring.written, ring.capacity),
+                "rate_hz": round(1e6 / ring.dt_us, 1) if ring.dt_us else None,
+                "last": float(ring.values[(ring.written - 1) % ring.capacity]),
+                "last_time_ms": int(ring.times[(ring.written - 1) % ring.capacity]) // 1000,
+                "received_at": ring.received_at,
+            } for ring in rings]
+
+    def stats(self) -> dict:
+        return {"listening": self._sock is not None, "port": self.port, "lost_packets": self.lost,
+                "channels": len(self._by_name), "capacity": self.capacity}
+
+    def series(self, channel: str, seconds: float = 10.0, points: int = 300, mode: str = "minmax") -> dict:
+        """The last ``seconds`` of a channel (sender clock), downsampled to ``points``."""
+        ring = self._ring(channel)
+        with self._lock:
+            _, times, values = ring.since(0)
+        if len(times):
+            times = times[np.searchsorted(times, times[-1] - int(seconds * 1e6)):]
+            values = values[len(values) - len(times):]
+        return self._downsample(times, values, points, mode)
+
+    def frame(self, channels: list[str], cursors: dict, points: int, mode: str = "minmax") -> dict:
+        """Samples after each channel's cursor, downsampled to ``points`` per channel.
+
+        The subscriber keeps the returned cursors for its next frame; a
+        channel without a cursor starts at its newest sample. Stateless on
+        this side, so a WebSocket worker can ask the owner for it.
+        """
+        series, positions = {}, {}
+        for name in channels:
+            ring = self._by_name.get(name)
+            if ring is None:
+                continue
+            cursor = cursors.get(name)
+            with self._lock:
+                if cursor is None:
+                    positions[name] = ring.written
+                    continue
+                positions[name], times, values = ring.since(cursor)
+            if len(times):
+                series[name] = self._downsample(times, values, points, mode)
+        return {"series": series, "cursors": positions}
+
+    def _ring(self, channel: str) -> TelemetryRing:
+        ring = self._by_name.get(channel)
+        if ring is None:
+            raise LookupError(f"Telemetri kanalı bulunamadı: {channel}")
+        return ring
+
+    @staticmethod
+    def _downsample(times: np.ndarray, values: np.ndarray, points: int, mode: str) -> dict:
+        if mode == "minmax":
+            times, lows, highs = min_max(times, values, points)
+            return {"t": _milliseconds(times), "min": _rounded(lows), "max": _rounded(highs)}
+        if mode == "decimate":
+            times, values = decimate(times, values, points)
+            return {"t": _milliseconds(times), "v": _rounded(values)}
+        raise ValueError("mode minmax veya decimate olmalı")
+
+
+def _milliseconds(times: np.ndarray) -> list:
+    return (times // 1000).tolist()
+
+
+def _rounded(values: np.ndarray) -> list:
+    # float32 -> float64 first, or JSON gets 0.10000000149011612
+    return np.round(values.astype(np.float64), 4).tolist()
@@ -0,0 +1,205 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.containers.logging_container import LoggingContainer
+from app.utils.storage_utils import data_dir
+from app.utils.text_utils import canonical_artist, canonical_title, similarity, trigrams
+
+logger = LoggingContainer.get_logger("TrackIndex")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    title_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (title_key, artist_key)
+);
+CREATE INDEX IF NOT EXISTS tracks_artist ON tracks (artist_key);
+CREATE TABLE IF NOT EXISTS title_grams (
+    term TEXT PRIMARY KEY,
+    docs INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    title_key, artist_key, content='tracks', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN
+    INSERT INTO tracks_fts(rowid, title_key, artist_key) VALUES (new.id, new.title_key, new.artist_key);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, title_key, artist_key)
+    VALUES ('delete', old.id, old.title_key, old.artist_key);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, title_key, artist_key)
+    VALUES ('delete', old.id, old.title_key, old.artist_key);
+    INSERT INTO tracks_fts(rowid, title_key, artist_key) VALUES (new.id, new.title_key, new.artist_key);
+END;
+"""
+
+
+class TrackIndex:
+    """Persistent local store of every successfully enriched track.
+
+    AVRCP title/artist pairs are reduced to canonical keys ("Song - Remastered
+    2011" -> "song", "Artist feat. X" -> "artist"). A lookup tries the unique
+    key index first, then the same artist's tracks, then the tracks sharing
+    the title's rarest trigrams, re-ranked by trigram similarity; a fuzzy
+    hit needs a similar artist too. Known tracks are enriched offline
+    without a network call.
+    """
+
+    MATCH_THRESHOLD = 0.6
+    CANDIDATES = 100
+    RARE_TRIGRAMS = 3
+    TITLE_WEIGHT = 0.7
+    MIN_ARTIST_SIMILARITY = 0.5  # A title match alone is not the song: "Yesterday" by someone else
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path else data_dir() / "track_index.db"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._fuzzy = True
+        try:
+            self._db.executescript(_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # SQLite without FTS5/trigram support (< 3.34): exact keys only
+            logger.warning(f"FTS5 trigram index unavailable, fuzzy matching disabled: {e}")
+            self._fuzzy = False
+            self._db.executescript(_SCHEMA.split("CREATE VIRTUAL TABLE")[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    @classmethod
+    def is_match(cls, title: str, artist: str, found_title: str, found_artist: str) -> bool:
+        """Whether a search hit is the AVRCP track: both title and artist must be similar."""
+        title_score = similarity(canonical_title(found_title), canonical_title(title))
+        artist_score = similarity(canonical_artist(found_artist), canonical_artist(artist))
+        return title_score >= cls.MATCH_THRESHOLD and artist_score >= cls.MIN_ARTIST_SIMILARITY
+
+    def lookup(self, title: str, artist: str) -> dict | None:
+        """Return the stored enrichment for an AVRCP title/artist, or None."""
+        title_key, artist_key = canonical_title(title), canonical_artist(artist)
+        if not title_key:
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM tracks WHERE title_key = ? AND artist_key = ?",
+                (title_key, artist_key),
+            ).fetchone()
+            if row:
+                return json.loads(row[0])
+
+            # Same artist, title differs (typo, unknown suffix)
+            candidates = self._db.execute(
+                "SELECT title_key, artist_key, payload FROM tracks WHERE artist_key = ? LIMIT ?",
+                (artist_key, self.CANDIDATES),
+            ).fetchall()
+            match = self._best_match(title_key, artist_key, candidates)
+            if match or not self._fuzzy:
+                return match
+
+            try:
+                candidates = self._trigram_candidates(title_key)
+            except sqlite3.OperationalError as e:
+                logger.debug("Fuzzy lookup failed for %r: %s", title_key, e)
+                return None
+        return self._best_match(title_key, artist_key, candidates)
+
+    def add(self, title: str, artist: str, fields: dict):
+        """Remember an enrichment under the AVRCP title/artist it was found for."""
+        self.add_many([(title, artist, fields)])
+
+    def add_many(self, rows):
+        now = time.time()
+        records = []
+        for title, artist, fields in rows:
+            title_key = canonical_title(title)
+            if title_key:
+                records.append((title_key, canonical_artist(artist), json.dumps(fields), now))
+        if not records:
+            return
+        with self._lock:
+            try:
+                self._db.execute("BEGIN")
+                for title_key, artist_key, payload, updated_at in records:
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO tracks (title_key, artist_key, payload, updated_at) VALUES (?, ?, ?, ?)",
+                        (title_key, artist_key, payload, updated_at),
+                    )
+                    if cursor.rowcount:
+                        # Document frequency per trigram, used to pick selective fuzzy queries
+                        self._db.executemany(
+                            "INSERT INTO title_grams (term, docs) VALUES (?, 1) "
+                            "ON CONFLICT (term) DO UPDATE SET docs = docs + 1",
+                            ((g,) for g in self._query_grams(title_key)),
+                        )
+                    else:
+                        self._db.execute(
+                            "UPDATE tracks SET payload = ?, updated_at = ? WHERE title_key = ? AND artist_key = ?",
+                            (payload, updated_at, title_key, artist_key),
+                        )
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._db.execute("ROLLBACK")
+                logger.error(f"Could not store track enrichment: {e}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _query_grams(title_key: str) -> set:
+        # Trigrams the FTS5 trigram tokenizer also produces (no padding)
+        return {title_key[i:i + 3] for i in range(len(title_key) - 2)}
+
+    def _trigram_candidates(self, title_key: str) -> list:
+        """Tracks sharing one of the title's rarest trigrams. Caller holds the lock."""
+        grams = list(self._query_grams(title_key))
+        if not grams:
+            return []
+        placeholders = ",".join("?" * len(grams))
+        rare = self._db.execute(
+            f"SELECT term FROM title_grams WHERE term IN ({placeholders}) ORDER BY docs LIMIT ?",
+            (*grams, self.RARE_TRIGRAMS),
+        ).fetchall()
+        if not rare:
+            return []
+        query = "title_key : (" + " OR ".join(f'"{term}"' for (term,) in rare) + ")"
+        return self._db.execute(
+            "SELECT t.title_key, t.artist_key, t.payload FROM tracks_fts f "
+            "JOIN tracks t ON t.id = f.rowid WHERE tracks_fts MATCH ? LIMIT ?",
+            (query, self.CANDIDATES),
+        ).fetchall()
+
+    def _best_match(self, title_key: str, artist_key: str, candidates) -> dict | None:
+        title_grams, artist_grams = trigrams(title_key), trigrams(artist_key)
+        best_score, best_payload = 0.0, None
+        for cand_title, cand_artist, payload in candidates:
+            score = self.TITLE_WEIGHT * self._jaccard(title_grams, trigrams(cand_title))
+            if score + (1 - self.TITLE_WEIGHT) <= best_score:
+                continue
+            artist_score = self._jaccard(artist_grams, trigrams(cand_artist))
+            if artist_score < self.MIN_ARTIST_SIMILARITY:
+                continue
+            score += (1 - self.TITLE_WEIGHT) * artist_score
+            if score > best_score:
+                best_score, best_payload = score, payload
+        if best_score >= self.MATCH_THRESHOLD:
+            return json.loads(best_payload)
+        return None
+
+    @staticmethod
+    def _jaccard(a: set, b: set) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+
+from app.containers.logging_container import LoggingContainer
+from app.models.schemas import VolumeState
+from app.services.device_registry import DeviceRegistry
+from app.utils.broadcast_utils import Broadcaster
+
+logger = LoggingContainer.get_logger("VolumeControl")
+
+
+class VolumeControl:
+    """Absolute volume of the active phone over A2DP (MediaTransport1.Volume).
+
+    A steering-wheel knob produces dozens of events a second. Requests only
+    move a target level. A single writer thread sends the latest target to
+    BlueZ at most ``max_writes_per_second`` times a second and drops the
+    levels in between. Clients see the effective volume: it is pushed from
+    the transport's PropertiesChanged signal, which fires when the phone
+    confirms the change or when the volume is changed on the phone itself.
+    """
+
+    MAX_VOLUME = 127  # AVRCP absolute volume range is 0..127
+    CONFIRM_WINDOW = 1.0  # A different level reported this soon after a write confirms an earlier write
+
+    def __init__(self, registry: DeviceRegistry, max_writes_per_second: float = 10.0):
+        self.registry = registry
+        self.bus = registry.bus
+        self.min_interval = 1.0 / max_writes_per_second
+        self._cond = threading.Condition()
+        self._target = None  # (transport path, level) waiting to be written
+        self._written = {}  # transport path -> (level, monotonic time) written but not yet confirmed
+        self._last_write = 0.0
+        self._running = True
+        self._updates = Broadcaster("volume")
+        self._thread = threading.Thread(target=self._run, name="VolumeWriter", daemon=True)
+        self._thread.start()
+        registry.add_interface_listener("org.bluez.MediaTransport1", self._on_transport_changed)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def get(self) -> VolumeState:
+        transport_path, volume = self._active_transport()
+        with self._cond:
+            target = self._target[1] if self._target and self._target[0] == transport_path else None
+        return self._state(transport_path, volume, target)
+
+    def set(self, level: int) -> VolumeState:
+        """Move the target to an absolute level (0..127). Returns immediately."""
+        transport_path, volume = self._active_transport()
+        level = max(0, min(self.MAX_VOLUME, int(level)))
+        with self._cond:
+            self._target = (transport_path, level)
+            self._cond.notify()
+        return self._state(transport_path, volume, level)
+
+    def step(self, delta: int) -> VolumeState:
+        """Relative knob step, applied on top of the latest level asked for.
+
+        That is the target that hasn't been written yet, else the last
+        written level the phone hasn't confirmed, else the phone's volume.
+        """
+        transport_path, volume = self._active_transport()
+        with self._cond:
+            if self._target and self._target[0] == transport_path:
+                base = self._target[1]
+            else:
+                written = self._written.get(transport_path)
+                base = written[0] if written else volume
+        if base is None:
+            # A D-Bus round trip: done outside the lock the writer thread and knob events share
+            base = self._read_volume(transport_path)
+        return self.set(base + int(delta))
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register an effective-volume listener. Must be called from the event loop."""
+        return self._updates.subscribe()
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._updates.unsubscribe(queue)
+
+    def _active_transport(self) -> tuple[str, int | None]:
+        player_path = self.registry.active_player_path()
+        transport_path, volume = self.registry.transport_for(player_path) if player_path else (None, None)
+        if not transport_path:
+            raise LookupError("Ses aktarımı (A2DP) olan cihaz bulunamadı.")
+        return transport_path, volume
+
+    def _read_volume(self, transport_path: str) -> int:
+        try:
+            return int(self.bus.get("org.bluez", transport_path)["org.bluez.MediaTransport1"].Volume)
+        except Exception as e:
+            # A guessed level would jump the car volume on the next knob step
+            logger.warning("Could not read volume from %s: %s", transport_path, e)
+            raise LookupError("Ses seviyesi okunamadı.") from e
+
+    def _state(self, transport_path: str, volume: int | None, target: int | None) -> VolumeState:
+        return VolumeState(
+            transport_path=transport_path,
+            volume=volume,
+            percent=round(volume * 100 / self.MAX_VOLUME) if volume is not None else None,
+            target=target,
+            pending=target is not None and target != volume,
+        )
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._target is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                # Hold the write back until the rate limit allows it; later knob events replace the target
+                delay = self._last_write + self.min_interval - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                transport_path, level = self._target
+                self._target = None
+                self._last_write = time.monotonic()
+                self._written[transport_path] = (level, self._last_write)
+
+            try:
+                self.bus.get("org.bluez", transport_path)["org.bluez.MediaTransport1"].Volume = level
+                logger.debug("Volume %d written to %s", level, transport_path)
+            except Exception as e:
+                logger.error("Volume write failed (%s, %d): %s", transport_path, level, e)
+                with self._cond:
+                    if self._written.get(transport_path, (None,))[0] == level:
+                        del self._written[transport_path]
+
+    def _on_transport_changed(self, path: str, changed: dict, invalidated: list):
+        if "Volume" not in changed:
+            return
+        with self._cond:
+            written = self._written.get(path)
+            # The phone confirmed the last write, or changed the volume itself
+            if written and (written[0] == changed["Volume"] or time.monotonic() - written[1] > self.CONFIRM_WINDOW):
+                del self._written[path]
+        player_path = self.registry.active_player_path()
+        if not player_path or self.registry.transport_for(player_path)[0] != path:
+            return
+        with self._cond:
+            target = self._target[1] if self._target and self._target[0] == path else None
+        self._updates.publish(self._state(path, changed["Volume"], target))
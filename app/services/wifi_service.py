@@ -3,24 +3,43 @@ import time
 import re
 from typing import List, Dict, Optional
 
+from app.containers.config_container import ConfigContainer
+from app.containers.journal_container import STATE, JournalContainer
+from app.containers.logging_container import LoggingContainer
 from app.models.schemas import WifiNetwork
+from app.utils.metrics_utils import run_command
+from app.utils.trace_utils import traced
+
+logger = LoggingContainer.get_logger("WifiService")
 
 
 class WifiService:
-    def __init__(self, interface: str = 'wlan0', scan_timeout: int = 10):
+    def __init__(self, interface: str = 'wlan0', scan_timeout: float | None = None):
         self.interface = interface
-        self.scan_timeout = scan_timeout
+        self.scan_timeout = scan_timeout  # None: the profile's wifi_scan_wait
+        self._scan_listeners = []
         self._validate_interface()
 
+    def add_scan_listener(self, callback):
+        """callback(networks) with the access points each scan or connection check saw."""
+        self._scan_listeners.append(callback)
+
+    def _notify_scan(self, networks: List[WifiNetwork]):
+        for callback in self._scan_listeners:
+            try:
+                callback(networks)
+            except Exception as e:
+                logger.error("Scan listener failed: %s", e)
+
     def _validate_interface(self):
         try:
-            subprocess.run(['nmcli', '-t', 'device', 'status'], check=True, capture_output=True, text=True)
+            run_command(['nmcli', '-t', 'device', 'status'], check=True, capture_output=True, text=True)
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Geçersiz ağ arayüzü: {self.interface}") from e
 
     def _trigger_scan(self) -> bool:
         try:
-            subprocess.run(
+            run_command(
                 ['nmcli', 'device', 'wifi', 'rescan'],
                 check=True,
                 timeout=15,
@@ -29,29 +48,34 @@ class WifiService:
             )
             return True
         except subprocess.TimeoutExpired:
-            print("Tarama işlemi zaman aşımına uğradı")
+            logger.warning("Tarama işlemi zaman aşımına uğradı")
             return False
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Tarama başlatma hatası: {e.stderr}") from e
 
+    @traced("wifi.scan_networks")
     def scan_networks(self) -> List[Dict[str, str]]:
         try:
             if not self._trigger_scan():
                 return []
 
-            print(f"Tarama tamamlanması bekleniyor ve veri bekleniyor...")
+            logger.info("Tarama tamamlanması bekleniyor ve veri bekleniyor...")
 
             # 3 kez tekrar dene
             for attempt in range(5):
-                time.sleep(self.scan_timeout)
-                result = subprocess.run(
+                time.sleep(self.scan_timeout if self.scan_timeout is not None
+                           else ConfigContainer.intervals().wifi_scan_wait)
+                result = run_command(
                     ['nmcli', '-t', '-f', 'SSID,SIGNAL,SECURITY,BSSID', 'device', 'wifi', 'list'],
                     capture_output=True,
                     text=True
                 )
                 if result.stdout.strip():
-                    return self._parse_scan_results(result.stdout)
-                print(f"❗ Tarama boş döndü. Yeniden deneme: {attempt+1}/5")
+                    networks = self._parse_scan_results(result.stdout)
+                    JournalContainer.record(STATE, "wifi.scan", {"networks": len(networks)})
+                    self._notify_scan(networks)
+                    return networks
+                logger.warning("❗ Tarama boş döndü. Yeniden deneme: %d/5", attempt + 1)
 
             raise RuntimeError("Hiçbir WiFi ağı bulunamadı.")
 
@@ -83,6 +107,7 @@ class WifiService:
 
         return sorted(networks, key=lambda x: x.signal, reverse=True)
     
+    @traced("wifi.connect")
     def connect(self, ssid: str, password: Optional[str] = None) -> bool:
         """
         Belirtilen WiFi ağına bağlanır
@@ -92,7 +117,7 @@ class WifiService:
             if password:
                 cmd += ['password', password]
 
-            result = subprocess.run(
+            result = run_command(
                 cmd,
                 check=True,
                 capture_output=True,
@@ -101,11 +126,12 @@ class WifiService:
             )
             
             # Bağlantı başarı kontrolü
-            if "successfully activated" in result.stdout:
-                return True
-            return False
+            connected = "successfully activated" in result.stdout
+            JournalContainer.record(STATE, "wifi.connect", {"ssid": ssid, "ok": connected})
+            return connected
             
         except subprocess.CalledProcessError as e:
+            JournalContainer.record(STATE, "wifi.connect", {"ssid": ssid, "ok": False, "exit": e.returncode})
             error_msg = e.stderr.lower()
             if 'secrets' in error_msg:
                 raise PermissionError("Geçersiz şifre") from e
@@ -113,19 +139,22 @@ class WifiService:
                 raise ConnectionError("Ağ bulunamadı") from e
             raise RuntimeError(f"Bağlantı hatası: {e.stderr}") from e
 
+    @traced("wifi.disconnect")
     def disconnect(self) -> bool:
         """
         Mevcut WiFi bağlantısını keser
         """
         try:
-            subprocess.run(
+            run_command(
                 ['nmcli', 'device', 'disconnect', self.interface],
                 check=True,
                 capture_output=True,
                 text=True
             )
+            JournalContainer.record(STATE, "wifi.disconnect", {"ok": True})
             return True
         except subprocess.CalledProcessError as e:
+            JournalContainer.record(STATE, "wifi.disconnect", {"ok": False, "exit": e.returncode})
             raise RuntimeError(f"Bağlantı kesme hatası: {e.stderr}") from e
 
     def get_wifi_status(self) -> Dict[str, str]:
@@ -134,14 +163,14 @@ class WifiService:
         """
         try:
             # Genel WiFi durumu
-            radio_status = subprocess.run(
+            radio_status = run_command(
                 ['nmcli', 'radio', 'wifi'],
                 capture_output=True,
                 text=True
             ).stdout.strip()
             
             # Aktif bağlantı bilgisi
-            connection = subprocess.run(
+            connection = run_command(
                 ['nmcli', '-t', '-f', 'NAME,DEVICE,TYPE', 'connection', 'show', '--active'],
                 capture_output=True,
                 text=True
@@ -176,7 +205,7 @@ class WifiService:
             return None
 
         try:
-            result = subprocess.run(
+            result = run_command(
                 ['nmcli', '-t', '-f', 'SSID,SIGNAL,BSSID', 'device', 'wifi'],
                 capture_output=True,
                 text=True
@@ -185,13 +214,15 @@ class WifiService:
             for line in result.stdout.splitlines():
                 if status['connection']['name'] in line:
                     ssid, signal, bssid = line.split(':')[:3]
-                    return WifiNetwork(
+                    network = WifiNetwork(
                         ssid=ssid,
                         signal=int(signal),
                         security='',  # Aktif bağlantıda security bilgisi mevcut değil
                         bssid=bssid,
                         interface=self.interface
                     )
+                    self._notify_scan([network])
+                    return network
             return None
             
         except subprocess.CalledProcessError as e:
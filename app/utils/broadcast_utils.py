@@ -0,0 +1,43 @@
+import asyncio
+
+from app.utils.metrics_utils import SUBSCRIBERS
+
+
+def offer(queue: asyncio.Queue, frame):
+    """Put ``frame`` on a bounded queue. Runs on the queue's event loop."""
+    # Slow clients lose the oldest frame rather than blocking the pipeline
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(frame)
+
+
+class Broadcaster:
+    """Frames published from any thread to asyncio.Queue listeners, each on its own event loop.
+
+    Every listener is counted under ``channel`` in bluedrive_subscribers.
+    """
+
+    def __init__(self, channel: str, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._subscribers = set()  # {(loop, queue)}
+        SUBSCRIBERS.labels(channel).set_function(lambda: len(self._subscribers))
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a listener. Must be called from the event loop."""
+        queue = asyncio.Queue(maxsize=self.maxsize)
+        self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    def publish(self, frame):
+        for loop, queue in list(self._subscribers):
+            try:
+                loop.call_soon_threadsafe(offer, queue, frame)
+            except RuntimeError:
+                # Event loop already closed
+                self._subscribers.discard((loop, queue))
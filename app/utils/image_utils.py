@@ -0,0 +1,55 @@
+# app/utils/image_utils.py
+import numpy as np
+from PIL import Image
+
+SAMPLE_SIZE = 64  # Palette is computed on a 64x64 downsample
+BITS = 4  # Quantization: 16 levels per channel, 4096 bins
+
+def extract_palette(image: Image.Image) -> dict:
+    """Dominant, vibrant and muted colors of an image as '#rrggbb' strings."""
+    small = image.convert("RGB").resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.uint8).reshape(-1, 3)
+
+    # Bin every pixel into a uniform color cube and average the pixels per bin
+    shift = 8 - BITS
+    q = (pixels >> shift).astype(np.int32)
+    bins = (q[:, 0] << (2 * BITS)) | (q[:, 1] << BITS) | q[:, 2]
+    size = 1 << (3 * BITS)
+    counts = np.bincount(bins, minlength=size)
+    sums = np.stack([np.bincount(bins, weights=pixels[:, c], minlength=size) for c in range(3)], axis=1)
+    used = counts > 0
+    colors = sums[used] / counts[used, None]
+    population = counts[used]
+
+    rgb = colors / 255.0
+    high, low = rgb.max(axis=1), rgb.min(axis=1)
+    lightness = (high + low) / 2
+    saturation = np.where(high == low, 0.0, (high - low) / (1 - np.abs(2 * lightness - 1) + 1e-6))
+
+    dominant = colors[population.argmax()]
+
+    vibrant_mask = (saturation > 0.35) & (lightness > 0.3) & (lightness < 0.75)
+    vibrant = _pick(colors, saturation * np.sqrt(population), vibrant_mask, dominant)
+
+    muted_mask = (saturation < 0.4) & (lightness > 0.2) & (lightness < 0.7)
+    muted = _pick(colors, population.astype(float), muted_mask, dominant)
+
+    return {
+        "dominant": _hex(dominant),
+        "vibrant": _hex(vibrant),
+        "muted": _hex(muted),
+        "on_dominant": "#000000" if _luminance(dominant) > 0.5 else "#ffffff",
+    }
+
+def _pick(colors, score, mask, fallback):
+    if not mask.any():
+        return fallback
+    return colors[np.where(mask, score, -1).argmax()]
+
+def _luminance(color) -> float:
+    r, g, b = np.asarray(color) / 255.0
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+def _hex(color) -> str:
+    r, g, b = (int(round(c)) for c in color)
+    return f"#{r:02x}{g:02x}{b:02x}"
@@ -0,0 +1,106 @@
+# app/utils/ipc_utils.py
+import base64
+import fcntl
+import os
+import sys
+from pathlib import Path
+
+from app.utils.storage_utils import data_dir
+
+# Longest message line on the owner socket (a journal upload is the largest)
+MAX_MESSAGE = 64 * 1024 * 1024
+
+
+def owner_socket_path() -> Path:
+    """Unix socket the owner daemon serves commands on. Override with BLUEDRIVE_OWNER_SOCKET."""
+    return Path(os.getenv("BLUEDRIVE_OWNER_SOCKET") or data_dir() / "owner.sock")
+
+
+def shared_state_path() -> Path:
+    """Shared-memory state segment; tmpfs when there is one. Override with BLUEDRIVE_SHARED_STATE."""
+    configured = os.getenv("BLUEDRIVE_SHARED_STATE")
+    if configured:
+        return Path(configured)
+    if os.path.isdir("/dev/shm"):
+        return Path("/dev/shm") / f"bluedrive-{os.getuid()}-state"
+    return data_dir() / "state.shm"
+
+
+def acquire_owner_lock() -> int:
+    """Lock that makes this process the only one driving the hardware; held until ``release_owner_lock``."""
+    path = data_dir() / "owner.lock"
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        raise RuntimeError(
+            f"Donanım başka bir BlueDrive süreci tarafından kullanılıyor ({path}). "
+            "Çok işçili kurulumda işçileri BLUEDRIVE_ROLE=worker ile başlatın."
+        ) from None
+    os.ftruncate(fd, 0)
+    os.write(fd, str(os.getpid()).encode())
+    return fd
+
+
+def release_owner_lock(fd: int | None):
+    """Let another lifespan (a restart in this process, or another process) take the hardware."""
+    if fd is not None:
+        os.close(fd)
+
+
+def encode(value):
+    """Service results as JSON-able trees: pydantic models, responses, bytes and errors are tagged."""
+    from starlette.responses import Response
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(key): encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [encode(item) for item in value]
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode()}
+    if hasattr(value, "model_dump"):
+        return {"__model__": [type(value).__module__, type(value).__name__], "value": value.model_dump(mode="json")}
+    if isinstance(value, Response):
+        return {"__response__": {
+            "status_code": value.status_code, "media_type": value.media_type, "body": value.body.decode()}}
+    if isinstance(value, BaseException):
+        return {"__error__": [type(value).__module__, type(value).__name__, str(value)]}
+    if isinstance(value, Path):
+        return str(value)
+    return repr(value)
+
+
+def decode(value):
+    """Inverse of ``encode``. Errors come back as exception instances, not raised."""
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    if "__model__" in value:
+        model = _loaded(*value["__model__"])
+        return model(**value["value"]) if model is not None else value["value"]
+    if "__response__" in value:
+        from starlette.responses import Response
+        response = value["__response__"]
+        return Response(response["body"], status_code=response["status_code"], media_type=response["media_type"])
+    if "__error__" in value:
+        module, name, message = value["__error__"]
+        error = _loaded(module, name)
+        if not (isinstance(error, type) and issubclass(error, Exception)):
+            return RuntimeError(f"{name}: {message}")
+        try:
+            return error(message)
+        except Exception:
+            # Needs more than a message (CalledProcessError's cmd, UnicodeError's positions)
+            return RuntimeError(f"{name}: {message}")
+    return {key: decode(item) for key, item in value.items()}
+
+
+def _loaded(module: str, name: str):
+    """A class from a module this process has already imported; never imports (a worker has no dbus)."""
+    return getattr(sys.modules.get(module), name, None)
@@ -0,0 +1,217 @@
+# app/utils/metrics_utils.py
+import inspect
+import subprocess
+import time
+
+from app.containers.metrics_container import MetricsContainer
+from app.containers.trace_container import CLIENT, TraceContainer
+
+DBUS_SECONDS = MetricsContainer.histogram(
+    "bluedrive_dbus_call_seconds", "D-Bus method calls and property access", ("service", "interface", "member"))
+DBUS_ERRORS = MetricsContainer.counter(
+    "bluedrive_dbus_errors_total", "Failed D-Bus calls", ("service", "interface", "member"))
+SUBPROCESS_SECONDS = MetricsContainer.histogram(
+    "bluedrive_subprocess_seconds", "bluetoothctl/nmcli/systemctl runs", ("command",))
+SUBPROCESS_ERRORS = MetricsContainer.counter(
+    "bluedrive_subprocess_errors_total", "Subprocesses that failed, timed out or exited non-zero", ("command", "reason"))
+HTTP_SECONDS = MetricsContainer.histogram(
+    "bluedrive_http_request_seconds", "Outgoing HTTP requests", ("target", "endpoint"))
+HTTP_ERRORS = MetricsContainer.counter(
+    "bluedrive_http_errors_total", "Outgoing HTTP requests that failed", ("target", "endpoint", "reason"))
+WS_SEND_SECONDS = MetricsContainer.histogram(
+    "bluedrive_ws_send_seconds", "WebSocket frame sends", ("channel",))
+CACHE_REQUESTS = MetricsContainer.counter(
+    "bluedrive_cache_requests_total", "Cache lookups by result (hit/miss)", ("cache", "result"))
+OWNER_CALL_SECONDS = MetricsContainer.histogram(
+    "bluedrive_owner_call_seconds", "Commands a worker forwarded to the owner daemon", ("method",))
+OWNER_CALL_ERRORS = MetricsContainer.counter(
+    "bluedrive_owner_call_errors_total", "Forwarded commands that failed or found no owner", ("method", "reason"))
+SUBSCRIBERS = MetricsContainer.gauge(
+    "bluedrive_subscribers", "Live subscribers per push channel", ("channel",))
+
+_SERVICES = {"org.bluez": "bluez", "org.ofono": "ofono", "org.freedesktop.NetworkManager": "nm"}
+_DBUS_CHILDREN = {}  # (service, interface, member) -> (seconds child, errors child, span name)
+
+
+def _dbus_children(service: str, interface: str, member: str) -> tuple:
+    key = (service, interface, member)
+    children = _DBUS_CHILDREN.get(key)
+    if children is None:
+        span_name = f"dbus {service} {interface}.{member}" if interface else f"dbus {service} {member}"
+        children = _DBUS_CHILDREN[key] = (DBUS_SECONDS.labels(*key), DBUS_ERRORS.labels(*key), span_name)
+    return children
+
+
+def _finish(span, error: BaseException = None):
+    if span is not None:
+        TraceContainer.finish(span, error)
+
+
+def cache_result(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class TimedBus:
+    """pydbus bus whose proxies time every method call and property access.
+
+    ``get`` (an Introspect round trip) is timed too. Everything else, such as
+    ``subscribe``, goes to the wrapped bus untouched.
+    """
+
+    def __init__(self, bus):
+        self._bus = bus
+
+    def get(self, service: str, path: str = None):
+        label = _SERVICES.get(service, service)
+        seconds, errors, span_name = _dbus_children(label, "", "Introspect")
+        span = TraceContainer.start(span_name, CLIENT)
+        start = time.perf_counter()
+        try:
+            target = self._bus.get(service, path) if path is not None else self._bus.get(service)
+        except Exception as e:
+            errors.inc()
+            _finish(span, e)
+            raise
+        seconds.observe(time.perf_counter() - start)
+        _finish(span)
+        return TimedProxy(target, label)
+
+    def __getattr__(self, name):
+        return getattr(self._bus, name)
+
+
+class TimedProxy:
+    """Times calls on a pydbus object/interface or a dbus-python Interface.
+
+    Inside a trace, each call and property access is also a child span.
+    """
+
+    __slots__ = ("_target", "_service", "_interface")
+
+    def __init__(self, target, service: str, interface: str = ""):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_service", _SERVICES.get(service, service))
+        object.__setattr__(self, "_interface", interface)
+
+    def __getitem__(self, interface: str):
+        return TimedProxy(self._target[interface], self._service, interface)
+
+    def __getattr__(self, name):
+        children = _dbus_children(self._service, self._interface, name)
+        # pydbus exposes D-Bus properties as data descriptors on the proxy class; reading one is a
+        # round trip and gets a span. A method lookup is local: no span here, the call gets its own
+        is_property = inspect.isdatadescriptor(getattr(type(self._target), name, None))
+        span = TraceContainer.start(children[2], CLIENT) if is_property else None
+        start = time.perf_counter()
+        try:
+            value = getattr(self._target, name)
+        except Exception as e:
+            children[1].inc()
+            _finish(span, e)
+            raise
+        if is_property or not callable(value):
+            children[0].observe(time.perf_counter() - start)
+            _finish(span)
+            return value
+        return _TimedMethod(value, children)
+
+    def __setattr__(self, name, value):
+        seconds, errors, span_name = _dbus_children(self._service, self._interface, f"Set.{name}")
+        span = TraceContainer.start(span_name, CLIENT)
+        start = time.perf_counter()
+        try:
+            setattr(self._target, name, value)
+        except Exception as e:
+            errors.inc()
+            _finish(span, e)
+            raise
+        seconds.observe(time.perf_counter() - start)
+        _finish(span)
+
+
+class _TimedMethod:
+    __slots__ = ("_method", "_children")
+
+    def __init__(self, method, children: tuple):
+        self._method = method
+        self._children = children
+
+    def __call__(self, *args, **kwargs):
+        seconds, errors, span_name = self._children
+        span = TraceContainer.start(span_name, CLIENT)
+        start = time.perf_counter()
+        try:
+            result = self._method(*args, **kwargs)
+        except Exception as e:
+            errors.inc()
+            seconds.observe(time.perf_counter() - start)
+            _finish(span, e)
+            raise
+        seconds.observe(time.perf_counter() - start)
+        _finish(span)
+        return result
+
+
+class observe_subprocess:
+    """Context manager timing a subprocess block (Popen/communicate, pexpect sessions).
+
+    Inside a trace the block is a child span and the current one while it
+    runs, so steps inside (pairing prompts, slept commands) can be marked
+    on it with ``trace_utils.add_event``.
+    """
+
+    __slots__ = ("command", "span", "_start", "_token")
+
+    def __init__(self, command: str):
+        self.command = command
+
+    def __enter__(self):
+        self.span = TraceContainer.start(f"subprocess {self.command}", CLIENT)
+        self._token = TraceContainer.current.set(self.span) if self.span is not None else None
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        SUBPROCESS_SECONDS.labels(self.command).observe(time.perf_counter() - self._start)
+        if exc_type is not None:
+            SUBPROCESS_ERRORS.labels(self.command, _reason(exc_type)).inc()
+        if self.span is not None:
+            TraceContainer.current.reset(self._token)
+            if exc_type is not None:
+                # Not str(exc): CalledProcessError repeats the argv, Wi-Fi password included
+                self.span.fail(_reason(exc_type))
+            _finish(self.span)
+        return False
+
+
+def run_command(args, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run, timed per command ("sudo systemctl" counts as systemctl)."""
+    command = args[1] if args[0] == "sudo" and len(args) > 1 else args[0]
+    with observe_subprocess(command) as observed:
+        if observed.span is not None:
+            observed.span.set("process.command_args", _command_text(args))
+        result = subprocess.run(args, **kwargs)
+        if result.returncode != 0:
+            SUBPROCESS_ERRORS.labels(command, "exit").inc()
+            if observed.span is not None:
+                observed.span.fail(f"exit status {result.returncode}")
+    return result
+
+
+def _command_text(args) -> str:
+    """Command line for a span, with Wi-Fi secrets (nmcli ... password X) masked."""
+    words = [str(arg) for arg in args]
+    for index, word in enumerate(words[:-1]):
+        if word in ("password", "wifi-sec.psk"):
+            words[index + 1] = "***"
+    return " ".join(words)
+
+
+def _reason(exc_type) -> str:
+    if issubclass(exc_type, subprocess.TimeoutExpired):
+        return "timeout"
+    if issubclass(exc_type, subprocess.CalledProcessError):
+        return "exit"
+    if issubclass(exc_type, FileNotFoundError):
+        return "missing"
+    return exc_type.__name__
@@ -0,0 +1,21 @@
+# app/utils/storage_utils.py
+import os
+import tempfile
+from pathlib import Path
+
+def data_dir() -> Path:
+    """Directory for persistent service state (indexes, caches). Override with BLUEDRIVE_DATA_DIR."""
+    path = Path(os.getenv("BLUEDRIVE_DATA_DIR", "data"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def write_atomic(path: Path, data: bytes):
+    """Write via a temp file and rename, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
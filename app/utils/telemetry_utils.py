@@ -0,0 +1,57 @@
+# app/utils/telemetry_utils.py
+import struct
+
+import numpy as np
+
+# UDP telemetry frame, little-endian: a block of rows sampled at the same instants
+#   magic "BT", version, source id, channel count k, flags (0), row count m, sequence,
+#   time of row 0 (µs, sender clock), µs between rows; then k channel ids (u8) and
+#   m x k float32 values, row by row
+FRAME = struct.Struct("<2sBBBBHHQI")
+MAGIC = b"BT"
+VERSION = 1
+MAX_DATAGRAM = 65507
+
+# Channel ids the car gateway sends; others are named ch<id> (BLUEDRIVE_TELEMETRY_CHANNELS adds or renames)
+CHANNELS = {
+    0: "speed",  # km/h
+    1: "rpm",
+    2: "coolant_temp",  # °C
+    3: "throttle",  # %
+    4: "engine_load",  # %
+    5: "fuel_level",  # %
+    6: "battery_voltage",  # V
+    7: "intake_temp",  # °C
+}
+
+
+def channel_names(spec: str = "") -> dict:
+    """CHANNELS with "8=oil_temp,9=boost" applied on top."""
+    names = dict(CHANNELS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        channel, _, name = item.partition("=")
+        names[int(channel)] = name.strip()
+    return names
+
+
+def pack_frame(source: int, channel_ids, t0_us: int, dt_us: int, values: np.ndarray, sequence: int) -> bytes:
+    """One frame; ``values`` is rows x channels."""
+    rows, channels = values.shape
+    return (FRAME.pack(MAGIC, VERSION, source, channels, 0, rows, sequence & 0xFFFF, t0_us, dt_us)
+            + bytes(channel_ids) + values.astype("<f4").tobytes())
+
+
+def decimate(times: np.ndarray, values: np.ndarray, points: int) -> tuple[np.ndarray, np.ndarray]:
+    """Every k-th sample so that at most ``points`` remain; the newest is always kept."""
+    if len(values) <= points:
+        return times, values
+    step = -(-len(values) // points)
+    return times[::-1][::step][::-1], values[::-1][::step][::-1]
+
+
+def min_max(times: np.ndarray, values: np.ndarray, buckets: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(bucket start times, minima, maxima) over ``buckets`` equal runs of samples; peaks survive."""
+    if len(values) <= buckets:
+        return times, values, values
+    edges = np.arange(buckets) * len(values) // buckets
+    return times[edges], np.minimum.reduceat(values, edges), np.maximum.reduceat(values, edges)
@@ -0,0 +1,41 @@
+# app/utils/text_utils.py
+import re
+
+from app.utils.bluetooth_utils import normalize
+
+# AVRCP titles often carry edition suffixes that Spotify search results don't
+_TITLE_SUFFIX = re.compile(
+    r"\s*[\(\[-]\s*(?:\d{4}\s+)?(?:remaster(?:ed)?|live|radio edit|single version|album version|"
+    r"mono|stereo|explicit|clean|deluxe|bonus track|acoustic|edit|version|from)\b.*$",
+    re.IGNORECASE,
+)
+_FEATURING = re.compile(
+    r"\s*(?:[\(\[]\s*(?:feat|ft|featuring|with)\b|\b(?:feat|ft|featuring)\b\.?\s).*$",
+    re.IGNORECASE,
+)
+_ARTIST_SEPARATOR = re.compile(r"\s*(?:,|&|;|/)\s*|\s+(?:x|and)\s+", re.IGNORECASE)
+
+def canonical_title(title):
+    """'Song - Remastered 2011' / 'Song (feat. X)' -> 'song'"""
+    title = _FEATURING.sub("", title or "")
+    title = _TITLE_SUFFIX.sub("", title)
+    return re.sub(r"\s+", " ", normalize(title)).strip()
+
+def canonical_artist(artist):
+    """'Artist feat. X' / 'Artist & Y' -> 'artist' (primary artist only)"""
+    artist = _FEATURING.sub("", artist or "")
+    artist = _ARTIST_SEPARATOR.split(artist, maxsplit=1)[0]
+    return re.sub(r"\s+", " ", normalize(artist)).strip()
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a, b):
+    """Trigram Jaccard similarity of two canonical strings, 0.0 - 1.0."""
+    if a == b:
+        return 1.0
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
@@ -0,0 +1,70 @@
+# app/utils/trace_utils.py
+import functools
+import inspect
+
+from app.containers.trace_container import CLIENT, INTERNAL, SERVER, TraceContainer  # noqa: F401 (kinds re-exported)
+
+
+class span:
+    """Context manager for a child span of the current trace (a no-op outside one).
+
+        with span("bluetoothctl connect", mac=mac_address) as s:
+            ...
+            if s: s.add_event("paired")
+
+    ``root=True`` starts a new trace instead. The span is the value of the
+    ``with`` and is None when nothing is being traced.
+    """
+
+    __slots__ = ("name", "kind", "attributes", "root", "_span", "_token")
+
+    def __init__(self, name: str, kind: int = INTERNAL, root: bool = False, **attributes):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.root = root
+
+    def __enter__(self):
+        self._span = TraceContainer.start(self.name, self.kind, self.attributes, root=self.root)
+        self._token = TraceContainer.current.set(self._span) if self._span is not None else None
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            TraceContainer.current.reset(self._token)
+            TraceContainer.finish(self._span, exc)
+        return False
+
+
+def traced(name: str = None):
+    """Decorator: run a sync or async function inside a child span named ``name`` (default: qualified name)."""
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_event(name: str, **attributes):
+    """Mark a point in time (a pairing step, a retry) on the current span."""
+    current = TraceContainer.current.get()
+    if current is not None:
+        current.add_event(name, **attributes)
+
+
+def set_attribute(key: str, value):
+    current = TraceContainer.current.get()
+    if current is not None:
+        current.set(key, value)
+
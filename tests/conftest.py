@@ -0,0 +1,36 @@
+import shutil
+import socket
+
+import pytest
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def mock_env(tmp_path_factory):
+    """tools.mock_env: private dbus-daemon with mocked BlueZ, oFono and NetworkManager, fakes on PATH."""
+    pytest.importorskip("dbus", reason="dbus-python is not installed (requirements-dev.txt)")
+    pytest.importorskip("dbusmock", reason="python-dbusmock is not installed (requirements-dev.txt)")
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon not found; install the dbus package")
+    from tools.mock_env import MockEnvironment
+
+    with MockEnvironment(str(tmp_path_factory.mktemp("mock"))) as mock:
+        yield mock
+
+
+@pytest.fixture(scope="session")
+def server(mock_env):
+    """uvicorn running app.main against ``mock_env``, every service ready."""
+    from tools.bench_suite import Server
+
+    server = Server(mock_env.env, mock_env.workdir, _free_port())
+    try:
+        server.wait_ready(60)
+        yield server
+    finally:
+        server.stop()
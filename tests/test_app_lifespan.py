@@ -0,0 +1,17 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("BLUEDRIVE_DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("BLUEDRIVE_TELEMETRY_ADDR", "")  # No UDP listener
+    from app.main import app
+    return app
+
+
+def test_lifespan_runs_twice_in_one_process(app):
+    # The owner lock is released at shutdown, so an embedded restart (or the next test) can take it
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert client.get("/health").status_code == 200
@@ -0,0 +1,54 @@
+"""Hot paths benchmarked in process: no bus, radio or network needed."""
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark", reason="pytest-benchmark is not installed (requirements-dev.txt)")
+
+
+def test_telemetry_ingest(benchmark):
+    from app.services.telemetry_service import TelemetryService
+    from app.utils.telemetry_utils import CHANNELS, pack_frame
+
+    service = TelemetryService(None, 0, names=CHANNELS, capacity=16384)
+    channels = list(range(8))
+    frame = pack_frame(1, channels, 0, 1000, np.ones((10, len(channels)), dtype=np.float32), 0)
+    sequence = itertools.count(1)
+
+    def ingest():
+        service._buffer[:len(frame)] = frame
+        service._buffer[8:10] = (next(sequence) & 0xFFFF).to_bytes(2, "little")
+        return service.ingest(len(frame))
+
+    assert benchmark(ingest)
+    assert service.lost == 0
+
+
+def test_signal_history_query_day(benchmark):
+    from app.services.signal_history import SignalHistory
+
+    history = SignalHistory(capacity=1 << 20)
+    end = time.time()
+    for index in range(20):
+        history.record("wifi", f"10:20:30:40:50:{index:02d}", 50.0, label=f"AP {index}", at=end - 86400)
+    # A day of samples across 20 series, written straight into the ring
+    samples = history._samples
+    samples["time"] = np.linspace(end - 86400, end, len(samples))
+    samples["value"] = np.random.default_rng(1).uniform(0, 100, len(samples))
+    samples["series"] = np.arange(len(samples)) % 20
+    history.written = len(samples)
+
+    result = benchmark(history.query, None, end - 86400, end, 300)
+    assert len(result["series"]) == 20
+
+
+def test_track_index_fuzzy_lookup(benchmark, tmp_path):
+    from app.services.track_index import TrackIndex
+
+    index = TrackIndex(tmp_path / "tracks.db")
+    index.add_many((f"Song number {i}", f"Artist {i % 50}", {"id": i}) for i in range(5000))
+    # Typo in the title: exact key misses, the same artist's tracks are ranked
+    assert benchmark(index.lookup, "Song numbr 123", "Artist 23") == {"id": 123}
+    index.close()
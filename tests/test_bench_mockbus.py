@@ -0,0 +1,106 @@
+"""End-to-end benchmarks against tools.mock_env; the figures tools.bench_suite prints, under pytest-benchmark.
+
+    pytest tests/test_bench_mockbus.py --benchmark-json bench.json
+"""
+import http.client
+import itertools
+
+import pytest
+
+from tools.bench_suite import ENDPOINTS, memory_per_client, ws_round_trip
+from tools.mock_env import ACCESS_POINTS, DEVICES
+
+pytest.importorskip("pytest_benchmark", reason="pytest-benchmark is not installed (requirements-dev.txt)")
+pytestmark = pytest.mark.mockbus
+
+
+@pytest.fixture
+def connection(server):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def websocket(server, request):
+    from websockets.sync.client import connect
+
+    with connect(f"ws://127.0.0.1:{server.port}/ws/{request.param}", open_timeout=10) as websocket:
+        yield websocket
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_endpoint_latency(benchmark, connection, path):
+    def get():
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    assert benchmark(get) < 500
+
+
+@pytest.mark.parametrize("websocket", ["spotify-metadata"], indirect=True)
+def test_track_to_websocket(benchmark, mock_env, websocket):
+    mock_env.set_status("playing")
+    counter = itertools.count()
+    benchmark.pedantic(lambda: ws_round_trip(
+        websocket, lambda i: mock_env.set_track(f"Bench Track {i}"),
+        lambda i, data, _: data.get("title") == f"Bench Track {i}", next(counter)), rounds=30)
+
+
+@pytest.mark.parametrize("websocket", ["volume"], indirect=True)
+def test_volume_to_websocket(benchmark, mock_env, websocket):
+    counter = itertools.count()
+    benchmark.pedantic(lambda: ws_round_trip(
+        websocket, lambda i: mock_env.set_volume(20 + i % 100),
+        lambda i, data, _: data.get("volume") == 20 + i % 100, next(counter)), rounds=30)
+
+
+@pytest.mark.parametrize("websocket", ["phone-data"], indirect=True)
+def test_call_to_websocket(benchmark, mock_env, websocket):
+    def answered(i, data, path):
+        if data.get("call_active") and data.get("caller_info") == f"+90555000{i:04d}":
+            mock_env.end_call(path)
+            return True
+        return False
+
+    counter = itertools.count()
+    # phone-data is polled (the profile's phone_poll), so few rounds
+    benchmark.pedantic(lambda: ws_round_trip(
+        websocket, lambda i: mock_env.incoming_call(f"+90555000{i:04d}"), answered, next(counter), timeout=15),
+        rounds=3)
+
+
+def _flow(server, method: str, path: str, body: dict = None):
+    status, response = server.request(method, path, body, timeout=120)
+    assert status == 200, response[:200]
+    return response
+
+
+def test_bluetooth_scan(benchmark, server):
+    benchmark.pedantic(_flow, (server, "GET", "/scan"), rounds=3)
+
+
+def test_connect_paired_device(benchmark, server):
+    paired = next(device for device in DEVICES if device["paired"])
+    benchmark.pedantic(_flow, (server, "GET", f"/connect/{paired['address']}"), rounds=3)
+
+
+def test_wifi_scan_and_connect(benchmark, server):
+    protected = next(ap for ap in ACCESS_POINTS if ap.get("password"))
+    benchmark.pedantic(_flow, (server, "GET", "/wifi/scan"), rounds=3)
+    _flow(server, "POST", "/wifi/connect", {"ssid": protected["ssid"], "password": protected["password"]})
+    _flow(server, "POST", "/wifi/disconnect")
+
+
+def test_memory_per_websocket_client(server, record_property):
+    memory = memory_per_client(server, 50)
+    record_property("per_client_kb", memory["per_client_kb"])
+    assert memory["per_client_kb"] < 1024, memory
+
+
+# Last: pairing changes the fake state, the device is paired for later runs
+def test_pair_and_connect_new_device(benchmark, server):
+    new = next(device for device in DEVICES if not device["paired"])
+    benchmark.pedantic(_flow, (server, "GET", f"/connect/{new['address']}"), rounds=1)
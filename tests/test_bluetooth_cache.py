@@ -0,0 +1,127 @@
+import shutil
+
+import pytest
+
+from app.services import bluetooth_cache
+from app.services.bluetooth_cache import BluetoothCache
+from tools.bluetooth_reset_check import ADAPTER, build_tree
+from tools.mock_env import DEVICES
+
+FIRST, SECOND = (device["address"] for device in DEVICES[:2])
+
+
+class FakeBluez:
+    """Stands in for the system bus: RemoveDevice drops the device's storage, as bluetoothd does."""
+
+    def __init__(self, root, online=True):
+        self.root = root
+        self.online = online
+        self.removed = []
+
+    def __call__(self, address):
+        if not self.online:
+            raise ConnectionError("system bus unavailable")
+        self.removed.append(address)
+        shutil.rmtree(self.root / ADAPTER / address, ignore_errors=True)
+        (self.root / ADAPTER / "cache" / address).unlink(missing_ok=True)
+
+
+@pytest.fixture
+def systemctl(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bluetooth_cache, "run_command", lambda args, **kwargs: calls.append(args[-2:]))
+    return calls
+
+
+@pytest.fixture
+def cache(tmp_path, systemctl, monkeypatch):
+    root = tmp_path / "bluetooth"
+    build_tree(root)
+    cache = BluetoothCache(root=root, backups=tmp_path / "backups")
+    cache.bluez = FakeBluez(root)
+    monkeypatch.setattr(cache, "_remove_over_dbus", cache.bluez)
+    return cache
+
+
+def adapter(cache):
+    return cache.root / ADAPTER
+
+
+def test_cache_level_keeps_pairing_keys(cache, systemctl):
+    info = (adapter(cache) / FIRST / "info").read_text()
+    result = cache.reset(FIRST, "cache")
+
+    assert result["level"] == "cache"
+    assert (adapter(cache) / FIRST / "info").read_text() == info
+    assert not (adapter(cache) / FIRST / "attributes").exists()
+    assert not (adapter(cache) / "cache" / FIRST).exists()
+    assert (adapter(cache) / SECOND / "attributes").is_file()
+    assert (adapter(cache) / "cache" / SECOND).is_file()
+    assert systemctl == [["stop", "bluetooth"], ["start", "bluetooth"]]
+    assert (cache.backups / result["backup"]).is_file()
+
+
+def test_adapter_cache_level_keeps_every_pairing(cache):
+    cache.reset(level="cache")
+    assert not any((adapter(cache) / "cache").iterdir())
+    assert all((adapter(cache) / device["address"] / "info").is_file() for device in DEVICES if device["paired"])
+
+
+def test_device_level_removes_that_device_over_the_bus(cache, systemctl):
+    result = cache.reset(FIRST, "device")
+
+    assert result["via"] == "RemoveDevice"
+    assert cache.bluez.removed == [FIRST]
+    assert not (adapter(cache) / FIRST).exists()
+    assert (adapter(cache) / SECOND / "info").is_file()
+    assert systemctl == []  # Nothing left on disk, bluetoothd keeps running
+
+
+def test_device_level_falls_back_to_files_without_a_bus(cache, systemctl):
+    cache.bluez.online = False
+    result = cache.reset(FIRST, "device")
+
+    assert result["via"] == "files"
+    assert not (adapter(cache) / FIRST).exists()
+    assert not (adapter(cache) / "cache" / FIRST).exists()
+    assert systemctl == [["stop", "bluetooth"], ["start", "bluetooth"]]
+
+
+def test_full_level_empties_the_storage_and_can_be_restored(cache):
+    result = cache.reset(FIRST, "full")
+    assert not any(cache.root.iterdir())
+
+    cache.restore(result["backup"])
+    assert (adapter(cache) / FIRST / "info").is_file()
+    assert (adapter(cache) / SECOND / "info").is_file()
+
+
+def test_repeats_escalate_within_the_window(cache):
+    assert [cache.reset(FIRST)["level"] for _ in range(4)] == ["cache", "device", "full", "full"]
+
+
+def test_adapter_repeats_skip_the_device_level(cache):
+    assert [cache.reset()["level"] for _ in range(2)] == ["cache", "full"]
+
+
+def test_escalation_starts_over_after_the_window(cache):
+    assert cache.reset(FIRST)["level"] == "cache"
+    level, at = cache._last[FIRST]
+    cache._last[FIRST] = (level, at - cache.escalate_after - 1)
+    assert cache.reset(FIRST)["level"] == "cache"
+
+
+def test_explicit_level_is_not_escalated(cache):
+    cache.reset(SECOND, "cache")
+    assert cache.reset(SECOND, "cache")["level"] == "cache"
+
+
+@pytest.mark.parametrize("address, level, error", [
+    ("AA:BB:CC:DD:EE:99", "cache", LookupError),
+    (FIRST, "everything", ValueError),
+    ("../etc", "cache", ValueError),
+])
+def test_bad_input_is_refused(cache, systemctl, address, level, error):
+    with pytest.raises(error):
+        cache.reset(address, level)
+    assert systemctl == []
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.utils.broadcast_utils import Broadcaster
+
+
+def test_publish_from_another_thread():
+    async def main():
+        updates = Broadcaster("test-thread")
+        first, second = updates.subscribe(), updates.subscribe()
+        publisher = threading.Thread(target=updates.publish, args=("frame",))
+        publisher.start()
+        publisher.join()
+        return await asyncio.wait_for(first.get(), 1), await asyncio.wait_for(second.get(), 1)
+
+    assert asyncio.run(main()) == ("frame", "frame")
+
+
+def test_slow_listener_loses_the_oldest_frame():
+    async def main():
+        updates = Broadcaster("test-slow", maxsize=2)
+        queue = updates.subscribe()
+        for frame in range(5):
+            updates.publish(frame)
+        await asyncio.sleep(0)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert asyncio.run(main()) == [3, 4]
+
+
+def test_unsubscribe_and_closed_loops_leave_the_count():
+    updates = Broadcaster("test-count")
+
+    async def subscribe():
+        return updates.subscribe()
+
+    queue = asyncio.run(subscribe())  # Its loop is closed once run() returns
+    asyncio.run(subscribe())
+    assert len(updates) == 2
+    updates.unsubscribe(queue)
+    updates.publish("frame")
+    assert len(updates) == 0
+
+
+@pytest.fixture
+def volume_control():
+    pytest.importorskip("pydbus", reason="pydbus is not installed")
+    from app.services.volume_control import VolumeControl
+
+    class Registry:
+        bus = None
+
+        def add_interface_listener(self, interface, callback):
+            pass
+
+        def active_player_path(self):
+            return "/org/bluez/hci0/dev_00/player0"
+
+        def transport_for(self, player_path):
+            return "/org/bluez/hci0/dev_00/fd0", None  # Volume not cached yet
+
+    control = VolumeControl(Registry(), max_writes_per_second=0.001)
+    yield control
+    control.stop()
+
+
+def test_volume_step_reads_the_bus_outside_the_lock(volume_control, monkeypatch):
+    held = []
+
+    def read_volume(transport_path):
+        # From another thread: the condition's lock is reentrant for this one
+        def try_lock():
+            acquired = volume_control._cond.acquire(timeout=0.2)
+            if acquired:
+                volume_control._cond.release()
+            held.append(not acquired)
+
+        other = threading.Thread(target=try_lock)
+        other.start()
+        other.join()
+        return 60
+
+    monkeypatch.setattr(volume_control, "_read_volume", read_volume)
+    assert volume_control.step(5).target == 65
+    assert held == [False]
@@ -0,0 +1,93 @@
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from app.services.cover_cache import CoverCache
+from app.services.spotify_client import CircuitBreaker
+
+
+def _jpeg(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (700, 700), color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    covers = {"/red.jpg": _jpeg((200, 30, 30)), "/green.jpg": _jpeg((30, 200, 30)), "/blue.jpg": _jpeg((30, 30, 200))}
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path == "/huge.jpg":
+            # No Content-Length: the limit must hold while streaming too
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"\xff" * (256 * 1024))
+            return
+        body = self.covers.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Handler.requests.clear()
+    yield lambda name: f"http://127.0.0.1:{server.server_address[1]}/{name}"
+    server.shutdown()
+
+
+def test_cached_cover_is_not_downloaded_again(tmp_path, url):
+    cache = CoverCache(tmp_path)
+    cover_id = cache.fetch(url("red.jpg"))
+    assert cache.fetch(url("red.jpg")) == cover_id
+    assert _Handler.requests == ["/red.jpg"]
+    assert cache.read(cover_id, 64)[:2] == b"\xff\xd8"
+    assert cache.palette(cover_id)
+
+
+def test_least_recently_used_cover_is_evicted(tmp_path, url):
+    cache = CoverCache(tmp_path)
+    red, green = cache.fetch(url("red.jpg")), cache.fetch(url("green.jpg"))
+    cache.max_bytes = cache._total + 1024  # Room for two covers, not three
+    cache.get(red)  # Green is now the oldest
+    blue = cache.fetch(url("blue.jpg"))
+    assert cache.contains(red) and cache.contains(blue)
+    assert not cache.contains(green)
+    assert not (tmp_path / green).exists()
+    assert cache.read(green) is None
+
+
+def test_failed_download_caches_nothing(tmp_path, url):
+    cache = CoverCache(tmp_path)
+    assert cache.fetch(url("missing.jpg")) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_cover_is_refused(tmp_path, url):
+    cache = CoverCache(tmp_path, max_download=64 * 1024)
+    assert cache.fetch(url("huge.jpg")) is None
+    assert cache.fetch(url("red.jpg")) is not None
+
+
+def test_open_circuit_skips_the_download(tmp_path, url):
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    cache = CoverCache(tmp_path, breaker=breaker)
+    assert cache.fetch(url("red.jpg")) is None
+    assert _Handler.requests == []
@@ -0,0 +1,128 @@
+import pytest
+
+pytest.importorskip("gi", reason="PyGObject is not installed")
+pytest.importorskip("pydbus", reason="pydbus is not installed")
+
+from app.services import device_registry  # noqa: E402
+from app.services.device_registry import DeviceRegistry  # noqa: E402
+
+PHONE_A = "/org/bluez/hci0/dev_AA_AA_AA_AA_AA_AA"
+PHONE_B = "/org/bluez/hci0/dev_BB_BB_BB_BB_BB_BB"
+PLAYER_A = PHONE_A + "/player0"
+PLAYER_B = PHONE_B + "/player0"
+
+
+def _phone(path, connected=True):
+    address = path.rsplit("dev_", 1)[-1].replace("_", ":")
+    return {"org.bluez.Device1": {"Address": address, "Name": address[:2], "Paired": True, "Connected": connected}}
+
+
+def _player(device_path, status="paused"):
+    return {"org.bluez.MediaPlayer1": {"Device": device_path, "Status": status, "Track": {}}}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(device_registry, "SystemBus", lambda: object())
+    monkeypatch.delenv("BLUEDRIVE_DRIVER_PHONE", raising=False)
+    registry = DeviceRegistry()
+    changes = []
+    registry.add_active_listener(changes.append)
+    registry.changes = changes
+    return registry
+
+
+def _connect(registry, path, player_status="paused"):
+    registry._on_interfaces_added(None, "/", None, "InterfacesAdded", (path, _phone(path)))
+    registry._on_interfaces_added(None, "/", None, "InterfacesAdded", (path + "/player0", _player(path, player_status)))
+
+
+def _status(registry, player_path, status):
+    registry._on_properties_changed(
+        None, player_path, None, "PropertiesChanged", ("org.bluez.MediaPlayer1", {"Status": status}, []))
+
+
+def test_most_recently_connected_wins_when_nothing_plays(registry):
+    _connect(registry, PHONE_A)
+    assert registry._active_player == PLAYER_A
+
+    # Nothing playing: a newly connected phone takes over only once the current player is gone
+    _connect(registry, PHONE_B)
+    assert registry._active_player == PLAYER_A
+    registry._on_interfaces_removed(None, "/", None, "InterfacesRemoved", (PLAYER_A, ["org.bluez.MediaPlayer1"]))
+    assert registry._active_player == PLAYER_B
+
+
+def test_most_recently_playing_player_wins(registry):
+    _connect(registry, PHONE_A)
+    _connect(registry, PHONE_B)
+
+    _status(registry, PLAYER_B, "playing")
+    assert registry._active_player == PLAYER_B
+    _status(registry, PLAYER_A, "playing")
+    assert registry._active_player == PLAYER_A
+
+    # Pausing the newest one hands the source back to the phone still playing
+    _status(registry, PLAYER_A, "paused")
+    assert registry._active_player == PLAYER_B
+    assert registry.changes == [PLAYER_A, PLAYER_B, PLAYER_A, PLAYER_B]
+
+
+def test_pinned_phone_beats_a_playing_one(registry):
+    _connect(registry, PHONE_A)
+    _connect(registry, PHONE_B, player_status="playing")
+    assert registry._active_player == PLAYER_B
+
+    registry.pin("aa:aa:aa:aa:aa:aa")
+    assert registry.pinned_address == "AA:AA:AA:AA:AA:AA"
+    assert registry._active_player == PLAYER_A
+    _status(registry, PLAYER_B, "playing")
+    assert registry._active_player == PLAYER_A
+
+    registry.pin(None)
+    assert registry._active_player == PLAYER_B
+
+
+def test_pin_rejects_a_malformed_address(registry):
+    with pytest.raises(ValueError):
+        registry.pin("not-a-mac")
+    assert registry.pinned_address is None
+
+
+def test_driver_phone_wins_when_nothing_plays(registry, monkeypatch):
+    monkeypatch.setenv("BLUEDRIVE_DRIVER_PHONE", "aa:aa:aa:aa:aa:aa")
+    registry = DeviceRegistry()
+    assert registry.driver_address == "AA:AA:AA:AA:AA:AA"
+
+    _connect(registry, PHONE_B)
+    _connect(registry, PHONE_A)
+    assert registry._active_player == PLAYER_A
+
+    # A passenger playing music still takes over, and the driver's phone gets it back once that stops
+    _status(registry, PLAYER_B, "playing")
+    assert registry._active_player == PLAYER_B
+    _status(registry, PLAYER_B, "stopped")
+    assert registry._active_player == PLAYER_A
+
+
+def test_seed_selects_without_signals(registry):
+    objects = {
+        PHONE_A: _phone(PHONE_A),
+        PLAYER_A: _player(PHONE_A),
+        PHONE_B: _phone(PHONE_B),
+        PLAYER_B: _player(PHONE_B, "playing"),
+    }
+    registry._seed(objects, [])
+    registry._reselect()
+
+    assert registry._active_player == PLAYER_B
+    assert {d.address for d in registry.devices()} == {"AA:AA:AA:AA:AA:AA", "BB:BB:BB:BB:BB:BB"}
+    assert [d.address for d in registry.devices() if d.active] == ["BB:BB:BB:BB:BB:BB"]
+
+
+def test_failing_listener_does_not_stop_selection(registry):
+    registry.add_active_listener(lambda path: 1 / 0)
+    _connect(registry, PHONE_A)
+
+    assert registry._active_player == PLAYER_A
+    assert registry.changes == [PLAYER_A]
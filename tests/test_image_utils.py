@@ -0,0 +1,29 @@
+from PIL import Image, ImageDraw
+
+from app.utils.image_utils import extract_palette
+
+
+def test_solid_image_is_its_own_palette():
+    palette = extract_palette(Image.new("RGB", (300, 300), (30, 60, 200)))
+    assert palette["dominant"] == "#1e3cc8"
+    assert palette["vibrant"] == "#1e3cc8"
+    assert palette["on_dominant"] == "#ffffff"
+
+
+def test_dominant_is_the_largest_area_and_vibrant_the_saturated_one():
+    image = Image.new("RGB", (300, 300), (128, 128, 128))
+    ImageDraw.Draw(image).rectangle((0, 0, 99, 99), fill=(230, 20, 20))
+    palette = extract_palette(image)
+    assert palette["dominant"] == "#808080"
+    assert palette["vibrant"] == "#e61414"
+    assert palette["muted"] == "#808080"
+
+
+def test_light_cover_gets_dark_text():
+    palette = extract_palette(Image.new("RGB", (64, 64), (245, 240, 220)))
+    assert palette["on_dominant"] == "#000000"
+
+
+def test_grayscale_and_alpha_covers_are_accepted():
+    assert extract_palette(Image.new("L", (50, 80), 40))["dominant"] == "#282828"
+    assert extract_palette(Image.new("RGBA", (80, 50), (0, 200, 0, 128)))["dominant"] == "#00c800"
@@ -0,0 +1,39 @@
+import json
+import subprocess
+
+from app.models.schemas import Metadata
+from app.utils.ipc_utils import decode, encode
+
+
+def round_trip(value):
+    # Through JSON, as a line on the owner socket
+    return decode(json.loads(json.dumps(encode(value))))
+
+
+def test_plain_values_and_bytes():
+    value = {"a": [1, 2.5, "x", None, True], "b": b"\x00\xff"}
+    assert round_trip(value) == value
+
+
+def test_model():
+    metadata = Metadata(title="Song", artist="Artist")
+    assert round_trip(metadata) == metadata
+
+
+def test_error_keeps_its_type():
+    error = round_trip(LookupError("Cihaz bulunamadı"))
+    assert type(error) is LookupError
+    assert str(error) == "Cihaz bulunamadı"
+
+
+def test_error_needing_constructor_arguments():
+    error = round_trip(subprocess.CalledProcessError(1, ["sudo", "systemctl", "stop", "bluetooth"]))
+    assert isinstance(error, RuntimeError)
+    assert str(error).startswith("CalledProcessError: ")
+    assert "returned non-zero exit status 1" in str(error)
+
+
+def test_error_of_unknown_module():
+    error = decode({"__error__": ["not_imported_here", "DBusError", "org.bluez.Error.Failed"]})
+    assert isinstance(error, RuntimeError)
+    assert str(error) == "DBusError: org.bluez.Error.Failed"
@@ -0,0 +1,121 @@
+import asyncio
+import marshal
+
+import pytest
+
+from app.containers.journal_container import STATE, JournalContainer, _RingFile, read_journal
+from app.services.journal_replay import JournalReplayer, ReplayBusy
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setenv("BLUEDRIVE_JOURNAL_FILE", str(tmp_path / "journal.bin"))
+    monkeypatch.setattr(JournalContainer, "enabled", True)
+    JournalContainer.shutdown()
+    yield JournalContainer
+    JournalContainer.shutdown()
+
+
+class Tracker:
+    """Derives the active player from PropertiesChanged, like DeviceRegistry does."""
+
+    name = "Tracker"
+
+    def __init__(self, prefer_latest=True):
+        self.prefer_latest = prefer_latest
+        self.playing = []
+        self.active = None
+
+    def on_properties_changed(self, sender, path, iface, signal, params):
+        interface, changed, invalidated = params
+        if changed.get("Status") == "playing":
+            self.playing.append(path)
+        elif path in self.playing:
+            self.playing.remove(path)
+        active = (self.playing[-1] if self.prefer_latest else self.playing[0]) if self.playing else None
+        if active != self.active:
+            self.active = active
+            JournalContainer.record(STATE, "registry.active_player", active)
+
+    def journal_handlers(self):
+        return {"bluez.PropertiesChanged": self.on_properties_changed}
+
+
+def _drive(tracker):
+    handler = JournalContainer.journaled("bluez.PropertiesChanged", tracker.on_properties_changed)
+    for path, status in (("/player0", "playing"), ("/player1", "playing"), ("/player1", "paused")):
+        handler(":1.5", path, "org.freedesktop.DBus.Properties", "PropertiesChanged",
+                ("org.bluez.MediaPlayer1", {"Status": status}, []))
+    # A signal no replayed service handles
+    JournalContainer.journaled("nm.ScanDone", lambda networks: None)(["car"])
+
+
+def test_recorded_signals_read_back_in_order(journal):
+    _drive(Tracker())
+
+    events = read_journal(journal.snapshot())
+    assert [seq for seq, *_ in events] == [1, 2, 3, 4, 5, 6, 7]
+    assert [topic for _, _, kind, topic, _ in events if kind == STATE] == ["registry.active_player"] * 3
+    assert [payload for _, _, kind, _, payload in events if kind == STATE] == ["/player0", "/player1", "/player0"]
+
+
+def test_replay_reproduces_the_recorded_transitions(journal):
+    _drive(Tracker())
+    data = journal.snapshot()
+
+    fresh = Tracker()
+    result = asyncio.run(JournalReplayer((fresh,)).replay(data, speed=0))
+    assert result["deterministic"]
+    assert result["replayed"] == 3
+    assert result["skipped"] == {"nm.ScanDone": 1}
+    assert result["transitions"] == {"recorded": 3, "replayed": 3}
+    assert fresh.active == "/player0"
+
+    # Replayed events are captured, not appended to the journal
+    assert read_journal(journal.snapshot()) == read_journal(data)
+
+
+def test_replay_reports_the_first_divergence(journal):
+    _drive(Tracker())
+
+    result = asyncio.run(JournalReplayer((Tracker(prefer_latest=False),)).replay(journal.snapshot(), speed=0))
+    assert not result["deterministic"]
+    assert result["first_divergence"] == {
+        "index": 1,
+        "recorded": ("registry.active_player", "/player1"),
+        "replayed": None,
+    }
+
+
+def test_only_one_replay_at_a_time(journal):
+    _drive(Tracker())
+    replayer = JournalReplayer((Tracker(),))
+    replayer._busy.acquire()
+
+    with pytest.raises(ReplayBusy):
+        asyncio.run(replayer.replay(journal.snapshot(), speed=0))
+
+
+def test_full_ring_keeps_the_newest_events(tmp_path):
+    ring = _RingFile(tmp_path / "ring.bin", 512)
+    for index in range(100):
+        assert ring.append(STATE, b"counter", marshal.dumps(index))
+
+    events = read_journal(ring.snapshot())
+    assert len(events) < 100
+    assert events[-1][4] == 99
+    assert [seq for seq, *_ in events] == list(range(101 - len(events), 101))
+    ring.close()
+
+    # Reopened after a restart, appending continues the sequence
+    ring = _RingFile(tmp_path / "ring.bin", 512)
+    ring.append(STATE, b"counter", marshal.dumps(None))
+    assert read_journal(ring.snapshot())[-1][0] == 101
+    ring.close()
+
+
+def test_corrupt_journal_is_rejected():
+    with pytest.raises(ValueError):
+        read_journal(b"not a journal")
+    with pytest.raises(ValueError):
+        read_journal(b"\0" * 128)
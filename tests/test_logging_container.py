@@ -0,0 +1,14 @@
+from app.containers.logging_container import LoggingContainer
+
+
+def test_logging_resumes_after_shutdown(tmp_path, monkeypatch):
+    logger = LoggingContainer.get_logger("ShutdownCycleTest")
+    LoggingContainer.shutdown()
+
+    # The restarted listener opens its files in the current directory
+    monkeypatch.chdir(tmp_path)
+    logger.info("after restart")
+    LoggingContainer.shutdown()
+
+    assert "after restart" in (tmp_path / "logs" / "ShutdownCycleTest.log").read_text()
+    assert LoggingContainer._queue.empty()
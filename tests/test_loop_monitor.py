@@ -0,0 +1,36 @@
+import asyncio
+
+from app.containers.config_container import ConfigContainer
+from app.services.loop_monitor import LoopMonitor
+
+
+def test_idle_mode_pauses_sampling(monkeypatch):
+    async def scenario():
+        monitor = LoopMonitor(interval=0.01)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            assert monitor.histogram.total > 0
+
+            monkeypatch.setattr(ConfigContainer, "_idle", True)
+            monitor._apply_settings()
+            await asyncio.sleep(0.05)  # A sample already sleeping may still land
+            paused_at = monitor.histogram.total
+            await asyncio.sleep(0.1)
+            assert monitor.histogram.total == paused_at
+            assert monitor.report()["loop"]["paused"]
+            assert monitor.report()["incidents"] == []
+
+            monkeypatch.setattr(ConfigContainer, "_idle", False)
+            monitor._apply_settings()
+            await asyncio.sleep(0.1)
+            assert monitor.histogram.total > paused_at
+        finally:
+            monitor.stop()
+
+    asyncio.run(scenario())
+
+
+def test_interval_follows_the_profile():
+    monitor = LoopMonitor()
+    assert monitor.interval == ConfigContainer.intervals().loop_sample
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("gi", reason="PyGObject is not installed")
+pytest.importorskip("pydbus", reason="pydbus is not installed")
+
+from app.services.media_browser import MediaBrowser  # noqa: E402
+
+PLAYER = "/org/bluez/hci0/dev_00/player0"
+
+
+class FakeFolder:
+    Name = "Now playing"
+    NumberOfItems = 5000
+
+    def ChangeFolder(self, folder):
+        pass
+
+    def ListItems(self, window):
+        start, end = window["Start"].unpack(), window["End"].unpack()
+        return [(f"{PLAYER}/NowPlaying/item{i}", {"Name": f"Track {i}", "Type": "audio"}) for i in range(start, end + 1)]
+
+
+class FakeBus:
+    def get(self, service, path):
+        return {"org.bluez.MediaFolder1": FakeFolder(), "org.bluez.MediaPlayer1": type("Player", (), {"Playlist": ""})}
+
+
+class FakeRegistry:
+    bus = FakeBus()
+
+    def add_interface_listener(self, interface, callback):
+        pass
+
+    def add_active_listener(self, callback):
+        pass
+
+    def active_player_path(self):
+        return PLAYER
+
+
+@pytest.fixture
+def browser():
+    browser = MediaBrowser(FakeRegistry())
+    yield browser
+    browser.stop()
+
+
+def test_now_playing_count_is_clamped_like_folders(browser):
+    page = browser.list_now_playing(-10, 100_000)
+    assert page.start == 0
+    assert len(page.items) == MediaBrowser.MAX_COUNT
+    assert len(browser.list_folder(None, 0, 100_000).items) == MediaBrowser.MAX_COUNT
+
+
+def test_folder_change_drops_the_current_folders_pages(browser):
+    browser.list_now_playing(0, 10)
+    folder = f"{PLAYER}/NowPlaying"
+    assert browser._cached_page(folder, 0) is not None
+    browser._on_folder_changed(PLAYER, {"NumberOfItems": 4999}, [])
+    assert browser._cached_page(folder, 0) is None
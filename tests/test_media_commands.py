@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from app.services.media_commands import MediaCommandPipeline
+
+
+class Recorder:
+    def __init__(self, block: threading.Event | None = None):
+        self.rounds = []
+        self.block = block
+        self.started = threading.Event()
+
+    def __call__(self, skips, toggle):
+        self.started.set()
+        if self.block is not None:
+            self.block.wait(5)
+        self.rounds.append((skips, toggle))
+
+
+@pytest.fixture
+def pipeline():
+    pipelines = []
+
+    def make(execute, window=0.05):
+        pipelines.append(MediaCommandPipeline(execute, window))
+        return pipelines[-1]
+
+    yield make
+    for pipeline in pipelines:
+        pipeline.stop()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_burst_is_one_round_with_the_net_skip_count(pipeline):
+    recorder = Recorder()
+    commands = pipeline(recorder)
+    for command in ("next", "next", "previous", "next", "toggle"):
+        commands.submit(command)
+    wait_for(lambda: recorder.rounds)
+    time.sleep(0.1)
+    assert recorder.rounds == [(2, True)]
+
+
+def test_presses_that_cancel_out_make_no_round(pipeline):
+    recorder = Recorder()
+    commands = pipeline(recorder)
+    for command in ("next", "previous", "toggle", "toggle"):
+        commands.submit(command)
+    time.sleep(0.2)
+    assert recorder.rounds == []
+
+
+def test_presses_during_a_round_go_into_the_next_one(pipeline):
+    release = threading.Event()
+    recorder = Recorder(block=release)
+    commands = pipeline(recorder, window=0.01)
+    commands.submit("next")
+    assert recorder.started.wait(2)
+    for _ in range(3):
+        commands.submit("previous")
+    release.set()
+    wait_for(lambda: len(recorder.rounds) == 2)
+    assert recorder.rounds == [(1, False), (-3, False)]
+
+
+def test_failing_round_does_not_stop_the_worker(pipeline):
+    calls = []
+
+    def execute(skips, toggle):
+        calls.append(skips)
+        if len(calls) == 1:
+            raise RuntimeError("player went away")
+
+    commands = pipeline(execute, window=0.01)
+    commands.submit("next")
+    wait_for(lambda: calls == [1])
+    commands.submit("next")
+    wait_for(lambda: calls == [1, 1])
+    assert calls == [1, 1]
+
+
+def test_unknown_command_is_refused(pipeline):
+    with pytest.raises(ValueError):
+        pipeline(Recorder()).submit("shuffle")
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("gi", reason="PyGObject is not installed")
+pytest.importorskip("pydbus", reason="pydbus is not installed")
+
+from app.services import media_service  # noqa: E402
+from app.services.media_service import MediaService  # noqa: E402
+
+PLAYER = "/org/bluez/hci0/dev_00/player0"
+TRACK = {"Title": "Yesterday - Remastered 2009", "Artist": "The Beatles", "Album": "Help!", "Duration": 125_000_000}
+
+
+class FakeRegistry:
+    bus = None
+
+    def add_interface_listener(self, interface, callback):
+        pass
+
+    def active_player_path(self):
+        return PLAYER
+
+    def address_for(self, path):
+        return "AA:BB:CC:DD:EE:01"
+
+
+class SlowSpotify:
+    """Answers a search only once ``release`` is set, like a slow mobile link."""
+
+    available = True
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.searches = 0
+
+    def search(self, q, type="track", limit=1):
+        self.searches += 1
+        self.release.wait(5)
+        return {"tracks": {"items": [{
+            "name": "Yesterday",
+            "artists": [{"name": "The Beatles"}],
+            "album": {"name": "Help! (Remastered)", "release_date": "1965-08-06", "images": []},
+            "external_urls": {"spotify": "https://open.spotify.com/track/3BQHpFgAp4l80e1XslIjNI"},
+            "popularity": 80,
+            "duration_ms": 125_000,
+        }]}}
+
+    def close(self):
+        self.release.set()
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("BLUEDRIVE_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(media_service, "SystemBus", lambda: None)  # Nothing here talks to BlueZ
+    service = MediaService(FakeRegistry())
+    service.sp = SlowSpotify()
+    service.frames = []
+    service._publish = service.frames.append
+    yield service
+    service.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_bare_frame_is_published_before_enrichment(service):
+    assert service._observe_track(TRACK)
+
+    assert len(service.frames) == 1
+    bare = service.frames[0]
+    assert (bare.title, bare.artist, bare.enriched) == (TRACK["Title"], "The Beatles", False)
+    assert bare.album == "Help!"
+
+    service.sp.release.set()
+    wait_for(lambda: len(service.frames) == 2)
+    enriched = service.frames[1]
+    assert enriched.enriched and enriched.track_id == bare.track_id
+    assert enriched.album == "Help! (Remastered)"
+
+
+def test_indexed_track_is_enriched_in_the_first_frame(service):
+    service.sp.release.set()
+    service._observe_track(TRACK)
+    wait_for(lambda: len(service.frames) == 2)
+
+    service._observe_track({**TRACK, "Title": "Something else"})
+    service._observe_track(TRACK)
+    assert service.frames[-1].enriched
+    wait_for(lambda: service.sp.searches == 2)
+    assert service.sp.searches == 2  # "Something else" only
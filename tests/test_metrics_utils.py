@@ -0,0 +1,53 @@
+import pytest
+
+from app.containers.trace_container import TraceContainer
+from app.utils.metrics_utils import TimedProxy
+
+
+class _Property:
+    """Like pydbus's ProxyProperty: a data descriptor whose read is a D-Bus round trip."""
+
+    def __get__(self, instance, owner):
+        return True if instance is not None else self
+
+    def __set__(self, instance, value):
+        raise AttributeError("read-only")
+
+
+class _Method:
+    """Like pydbus's ProxyMethod: a non-data descriptor returning a bound callable."""
+
+    def __get__(self, instance, owner):
+        return lambda *args: "done"
+
+
+class FakeDevice:
+    Connected = _Property()
+    Connect = _Method()
+
+
+@pytest.fixture
+def started(monkeypatch):
+    names = []
+    start = TraceContainer.start
+
+    def counting(name, *args, **kwargs):
+        names.append(name)
+        return start(name, *args, **kwargs)
+
+    monkeypatch.setattr(TraceContainer, "start", staticmethod(counting))
+    return names
+
+
+def test_method_lookup_creates_no_span(started):
+    proxy = TimedProxy(FakeDevice(), "org.bluez", "org.bluez.Device1")
+    method = proxy.Connect
+    assert started == []
+    assert method() == "done"
+    assert started == ["dbus bluez org.bluez.Device1.Connect"]
+
+
+def test_property_read_is_a_span(started):
+    proxy = TimedProxy(FakeDevice(), "org.bluez", "org.bluez.Device1")
+    assert proxy.Connected is True
+    assert started == ["dbus bluez org.bluez.Device1.Connected"]
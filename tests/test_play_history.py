@@ -0,0 +1,47 @@
+import pytest
+
+from app.services.play_history import PlayHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = PlayHistory(tmp_path / "history.db")
+    yield history
+    history.close()
+
+
+def test_new_title_finishes_the_current_play(history):
+    history.track_started(1, "Yesterday", "The Beatles")
+    history.track_started(2, "Help!", "The Beatles")
+
+    newest, previous = history.recent(2)
+    assert newest.title == "Help!" and newest.current
+    assert previous.title == "Yesterday" and not previous.current
+    assert previous.ended_at is not None
+
+
+def test_resent_track_updates_the_current_play(history):
+    history.track_started(1, "Yesterday", "The Beatles", duration_ms=None)
+    history.track_started(2, "Yesterday", "The Beatles feat. Nobody", "Help!", duration_ms=125_000)
+    history.enriched(2, "3BQHpFgAp4l80e1XslIjNI")
+
+    plays = history.recent()
+    assert len(plays) == 1
+    assert plays[0].current
+    assert (plays[0].album, plays[0].duration_ms) == ("Help!", 125_000)
+    assert plays[0].enrichment_id == "3BQHpFgAp4l80e1XslIjNI"
+
+
+def test_stopped_closes_the_current_play(history, tmp_path):
+    history.track_started(1, "Yesterday", "The Beatles")
+    history.stopped()
+
+    play = history.recent(1)[0]
+    assert not play.current and play.ended_at is not None
+    history.close()
+
+    reopened = PlayHistory(tmp_path / "history.db")
+    try:
+        assert [play.title for play in reopened.query(artist="the beatles")] == ["Yesterday"]
+    finally:
+        reopened.close()
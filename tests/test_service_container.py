@@ -0,0 +1,132 @@
+import asyncio
+import contextvars
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.containers import service_container
+from app.containers.service_container import Provider, run_blocking
+
+
+class Service:
+    def __init__(self):
+        self.started = 0
+        self.stopped = 0
+
+    def ping(self):
+        return "pong"
+
+
+def test_importing_the_container_builds_nothing():
+    # A fresh interpreter, since other tests may have imported the heavy modules already
+    code = (
+        "import sys, app.containers.service_container as c\n"
+        "heavy = [m for m in ('pydbus', 'gi', 'dbus', 'requests', 'PIL', 'pexpect') if m in sys.modules]\n"
+        "assert not heavy, heavy\n"
+        "assert not any(p.built for p in c.PROVIDERS)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
+
+
+def test_factory_runs_on_first_use_only():
+    calls = []
+    provider = Provider("Service", lambda: calls.append(1) or Service())
+    assert provider.state == "pending" and not provider.built
+
+    assert provider.ping() == "pong"
+    assert provider.get() is provider.get()
+    assert calls == [1]
+    assert provider.state == "ready"
+    assert provider.build_seconds is not None
+
+
+def test_failed_build_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("bus not ready")
+        return Service()
+
+    provider = Provider("Service", factory)
+    with pytest.raises(RuntimeError):
+        provider.get()
+    assert provider.state == "failed" and provider.error == "bus not ready"
+
+    assert provider.get().ping() == "pong"
+    assert provider.state == "ready" and provider.error is None
+    assert len(attempts) == 2
+
+
+def test_concurrent_first_use_builds_once():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return Service()
+
+    provider = Provider("Service", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert len({id(r) for r in results}) == 1
+
+
+def test_start_hook_runs_once_and_stop_only_after_build():
+    def start(service):
+        service.started += 1
+
+    def stop(service):
+        service.stopped += 1
+
+    provider = Provider("Service", Service, start=start, stop=stop)
+    provider.stop()
+    assert not provider.built
+
+    provider.start()
+    provider.start()
+    provider.stop()
+    assert provider.get().started == 1
+    assert provider.get().stopped == 1
+
+
+def test_shutdown_stops_in_reverse_and_survives_failures(monkeypatch):
+    order = []
+
+    def failing(service):
+        order.append("b")
+        raise RuntimeError("stuck")
+
+    a = Provider("A", Service, stop=lambda s: order.append("a"))
+    b = Provider("B", Service, stop=failing)
+    c = Provider("C", Service, stop=lambda s: order.append("c"))
+    for provider in (a, b, c):
+        provider.get()
+    monkeypatch.setattr(service_container, "PROVIDERS", (a, b, c))
+
+    service_container.shutdown()
+    assert order == ["c", "b", "a"]
+    assert service_container.status() == {"A": "ready", "B": "ready", "C": "ready"}
+
+
+def test_run_blocking_keeps_the_callers_context():
+    request_id = contextvars.ContextVar("request_id", default=None)
+
+    async def main():
+        request_id.set("abc")
+        return await run_blocking(lambda prefix: (prefix + request_id.get(), threading.current_thread().name), "id:")
+
+    value, thread = asyncio.run(main())
+    assert value == "id:abc"
+    assert thread.startswith("ServiceCall")
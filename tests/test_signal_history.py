@@ -0,0 +1,115 @@
+import random
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.signal_history import SignalHistory
+
+START = 1_700_000_000.0
+
+
+def _reference(samples, start, end, points):
+    """The buckets query() should produce, computed one sample at a time."""
+    width = (end - start) / points
+    buckets = defaultdict(list)
+    for key, at, value in samples:
+        if start <= at < end:
+            buckets[key, min(int((at - start) / width), points - 1)].append(value)
+    result = defaultdict(dict)
+    for (key, bucket), values in sorted(buckets.items()):
+        result[key][bucket] = (min(values), max(values), round(sum(values) / len(values), 2), len(values))
+    return result
+
+
+def _buckets(series, start, width):
+    return {round((t - start) / width): (low, high, mean, count)
+            for t, low, high, mean, count in zip(series["t"], series["min"], series["max"], series["mean"], series["count"])}
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_query_matches_per_sample_bucketing(shuffle):
+    rng = random.Random(7)
+    samples = []
+    for step in range(3000):
+        key = rng.choice(["bt:AA", "bt:BB", "wifi:01", "cell:AA"])
+        # Whole dBm values, so float32 storage doesn't change them; a dropout between 1200 and 1500
+        if not 1200 <= step < 1500:
+            samples.append((key, START + step * 1.2 + rng.random(), float(rng.randint(-90, -30))))
+    if shuffle:
+        # The clock went back: samples are no longer in time order
+        rng.shuffle(samples)
+    history = SignalHistory(capacity=4096)
+    for key, at, value in samples:
+        kind, _, source = key.partition(":")
+        history.record(kind, source, value, at=at)
+
+    start, end, points = START + 100, START + 3400, 50
+    result = history.query(start=start, end=end, points=points)
+    expected = _reference(samples, start, end, points)
+
+    assert {s["key"] for s in result["series"]} == set(expected)
+    for series in result["series"]:
+        assert _buckets(series, start, result["bucket_seconds"]) == expected[series["key"]]
+    # The dropout is a gap, not a run of empty buckets
+    assert all(len(s["t"]) < points for s in result["series"])
+
+
+def test_query_filters_by_key_or_kind():
+    history = SignalHistory(capacity=100)
+    history.record("bt", "AA", -60, label="Phone", at=START)
+    history.record("wifi", "01", 70, label="car", at=START)
+    history.record("wifi", "02", 40, label="home", at=START)
+
+    by_kind = history.query(keys=["wifi"], start=START - 1, end=START + 1)
+    assert [s["key"] for s in by_kind["series"]] == ["wifi:01", "wifi:02"]
+    assert [s["unit"] for s in by_kind["series"]] == ["%", "%"]
+    by_key = history.query(keys=["bt:AA"], start=START - 1, end=START + 1)
+    assert [(s["key"], s["label"], s["unit"]) for s in by_key["series"]] == [("bt:AA", "Phone", "dBm")]
+    assert history.query(keys=["cell"], start=START - 1, end=START + 1)["series"] == []
+
+    with pytest.raises(ValueError):
+        history.query(start=START, end=START)
+
+
+def test_full_ring_keeps_the_newest_samples():
+    history = SignalHistory(capacity=10)
+    for step in range(25):
+        history.record("bt", "AA", -step, at=START + step)
+
+    (series,) = history.series()
+    assert series["samples"] == 10
+    assert series["last"] == -24.0
+    result = history.query(start=START, end=START + 25, points=25)
+    assert result["series"][0]["max"] == [float(-step) for step in range(15, 25)]
+
+
+def test_series_lists_the_latest_sample_newest_first():
+    history = SignalHistory(capacity=100)
+    history.record_networks([SimpleNamespace(bssid="01", ssid="car", signal=70)])
+    history.record("bt", "AA", -50, label="Phone", at=START)
+    history.record("bt", "AA", -55, label="Phone 2", at=START + 1)
+
+    bt, wifi = sorted(history.series(), key=lambda s: s["kind"])
+    assert (bt["label"], bt["last"], bt["samples"]) == ("Phone 2", -55.0, 2)
+    assert (wifi["source"], wifi["label"], wifi["last"]) == ("01", "car", 70.0)
+    assert [s["kind"] for s in history.series()] == ["wifi", "bt"]
+
+
+def test_persisted_history_survives_a_restart(tmp_path):
+    path = tmp_path / "signal_history.bin"
+    history = SignalHistory(capacity=8, path=path)
+    for step in range(12):
+        history.record("cell", "AA", step, label="Operator", at=START + step)
+    history.close()
+    history.record("cell", "AA", 99, at=START + 99)  # Ignored once closed
+
+    reopened = SignalHistory(capacity=8, path=path)
+    (series,) = reopened.series()
+    assert (series["key"], series["label"], series["samples"], series["last"]) == ("cell:AA", "Operator", 8, 11.0)
+    reopened.record("cell", "AA", 12, at=START + 12)
+    assert reopened.series()[0]["last"] == 12.0
+    reopened.close()
+
+    # A different capacity starts over instead of misreading the ring
+    assert SignalHistory(capacity=16, path=path).series() == []
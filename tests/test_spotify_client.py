@@ -0,0 +1,94 @@
+import email.utils
+import time
+
+import pytest
+
+from app.services.spotify_client import CircuitBreaker, SpotifyClient, SpotifyUnavailable
+from tools import spotify_stub
+
+
+@pytest.fixture
+def stub(request):
+    server = spotify_stub.serve(0, **getattr(request, "param", {}))
+    yield server
+    server.shutdown()
+
+
+def client_for(server, **options) -> SpotifyClient:
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    return SpotifyClient("id", "secret", api_url=f"{url}/v1", token_url=f"{url}/api/token", **options)
+
+
+def test_search(stub):
+    client = client_for(stub)
+    result = client.search("Yesterday Beatles")
+    assert result["tracks"]["items"][0]["name"] == "Yesterday"
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("stub", [{"trickle": 3.0}], indirect=True)
+def test_latency_budget_covers_a_trickling_body(stub):
+    client = client_for(stub, latency_budget=0.5)
+    began = time.monotonic()
+    with pytest.raises(SpotifyUnavailable):
+        client.search("Yesterday Beatles")
+    # Every byte arrives well within the per-read timeout; only the deadline stops it
+    assert time.monotonic() - began < 1.0
+
+
+@pytest.mark.parametrize("stub", [{"reject_credentials": True}], indirect=True)
+def test_rejected_credentials_count_against_the_circuit(stub):
+    client = client_for(stub, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(SpotifyUnavailable):
+            client.search("Yesterday Beatles")
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize("stub", [{"captive_portal": True}], indirect=True)
+def test_captive_portal_page_counts_against_the_circuit(stub):
+    client = client_for(stub, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(SpotifyUnavailable):
+            client.search("Yesterday Beatles")
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize("stub", [{"rate_limit_every": 1, "retry_after": 20}], indirect=True)
+def test_rate_limit_opens_the_circuit_for_retry_after(stub):
+    client = client_for(stub)
+    with pytest.raises(SpotifyUnavailable, match="rate limited"):
+        client.search("Yesterday Beatles")
+    assert client.breaker.state == CircuitBreaker.OPEN
+    assert 19 < client.breaker._open_until - time.monotonic() <= 20
+    with pytest.raises(SpotifyUnavailable, match="circuit is open"):
+        client.search("Yesterday Beatles")
+    assert stub.config.requests == 1
+
+
+def test_retry_after_accepts_an_http_date():
+    client = SpotifyClient("id", "secret", max_retry_after=300)
+    when = email.utils.formatdate(time.time() + 120, usegmt=True)
+    assert 115 < client._parse_retry_after(when) <= 120
+    assert client._parse_retry_after("not a date") == client.breaker.reset_timeout
+    assert client._parse_retry_after("3600") == 300
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # The probe is still in flight
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.15)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
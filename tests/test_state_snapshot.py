@@ -0,0 +1,94 @@
+import json
+
+from app.models.schemas import SourceDevice
+from app.services import state_snapshot
+from app.services.state_snapshot import StateSnapshot
+
+
+def _restart(path):
+    """What the next process sees before any service is up."""
+    return StateSnapshot(path)
+
+
+def test_saved_sections_are_served_stale_after_a_restart(tmp_path):
+    path = tmp_path / "snapshot.json"
+    snapshot = StateSnapshot(path)
+    snapshot.add_source("wifi", lambda: {"ssid": "car"})
+    snapshot.add_source("devices", lambda: [SourceDevice(address="AA:AA:AA:AA:AA:AA", name="Phone", connected=True)])
+    snapshot.save()
+
+    restored = _restart(path)
+    assert restored.section("wifi") == {"ssid": "car"}
+    assert restored.section("devices")[0]["address"] == "AA:AA:AA:AA:AA:AA"
+    served = restored.snapshot()
+    assert served["stale"] is True
+    assert served["saved_at"] == json.loads(path.read_text())["saved_at"]
+
+
+def test_unready_or_failing_sources_keep_the_saved_section(tmp_path):
+    path = tmp_path / "snapshot.json"
+    first = StateSnapshot(path)
+    first.add_source("wifi", lambda: {"ssid": "car"})
+    first.add_source("phone", lambda: {"state": "idle"})
+    first.save()
+
+    second = _restart(path)
+    second.add_source("wifi", lambda: None)  # Service not built yet
+    second.add_source("phone", lambda: 1 / 0)
+    second.add_source("metadata", lambda: {"title": "Help!"})
+    second.save()
+
+    third = _restart(path)
+    assert third.section("wifi") == {"ssid": "car"}
+    assert third.section("phone") == {"state": "idle"}
+    assert third.section("metadata") == {"title": "Help!"}
+
+
+def test_unchanged_state_is_not_rewritten(tmp_path, monkeypatch):
+    writes = []
+    real_write = state_snapshot.write_atomic
+    monkeypatch.setattr(state_snapshot, "write_atomic", lambda path, data: writes.append(data) or real_write(path, data))
+    value = {"ssid": "car"}
+    snapshot = StateSnapshot(tmp_path / "snapshot.json")
+    snapshot.add_source("wifi", lambda: dict(value))
+
+    snapshot.save()
+    snapshot.save()
+    assert len(writes) == 1
+
+    value["ssid"] = "home"
+    snapshot.save()
+    assert len(writes) == 2
+
+
+def test_failed_write_leaves_the_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "snapshot.json"
+    value = {"ssid": "car"}
+    snapshot = StateSnapshot(path)
+    snapshot.add_source("wifi", lambda: dict(value))
+    snapshot.save()
+    before = path.read_bytes()
+
+    def full_disk(src, dst):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr("os.replace", full_disk)
+    value["ssid"] = "home"
+    snapshot.save()
+
+    assert path.read_bytes() == before
+    assert [p.name for p in tmp_path.iterdir()] == ["snapshot.json"]
+
+    # The next save tries again instead of believing the write happened
+    monkeypatch.undo()
+    snapshot.save()
+    assert _restart(path).section("wifi") == {"ssid": "home"}
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / "snapshot.json"
+    path.write_text('{"sections": {"wifi"')
+
+    snapshot = StateSnapshot(path)
+    assert snapshot.section("wifi") is None
+    assert snapshot.snapshot() == {"stale": True, "saved_at": None}
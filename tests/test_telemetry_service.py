@@ -0,0 +1,124 @@
+import asyncio
+import socket
+
+import numpy as np
+import pytest
+
+from app.services.telemetry_service import TelemetryService
+from app.utils.telemetry_utils import channel_names, decimate, min_max, pack_frame
+
+
+def _feed(service, frame: bytes) -> bool:
+    """What the reader callback does after recv_into."""
+    service._buffer[:len(frame)] = frame
+    return service.ingest(len(frame))
+
+
+def _rows(start, count, channels=2):
+    # Channel c of row r holds start + r + 1000 * c, so every sample is recognisable
+    return np.arange(start, start + count, dtype=np.float32)[:, None] + 1000 * np.arange(channels, dtype=np.float32)
+
+
+@pytest.fixture
+def service():
+    return TelemetryService(None, 0, names=channel_names("8=oil_temp"), capacity=100)
+
+
+def test_frame_columns_land_in_named_rings(service):
+    assert _feed(service, pack_frame(1, [0, 8], 1_000_000, 1000, _rows(0, 10), sequence=0))
+
+    speed = service.series("speed", seconds=60, points=100, mode="decimate")
+    assert speed["v"] == list(range(10))
+    assert speed["t"] == list(range(1000, 1010))
+    assert service.series("oil_temp", seconds=60, points=100, mode="decimate")["v"] == list(range(1000, 1010))
+
+    channels = {c["name"]: c for c in service.channels()}
+    assert channels["speed"]["rate_hz"] == 1000.0
+    assert channels["oil_temp"]["last"] == 1009.0
+
+
+def test_full_ring_keeps_the_newest_samples(service):
+    for block in range(3):
+        _feed(service, pack_frame(1, [0, 1], block * 60_000, 1000, _rows(block * 60, 60), sequence=block))
+    # A single frame larger than the ring keeps its tail
+    _feed(service, pack_frame(1, [0, 1], 180_000, 1000, _rows(180, 150), sequence=3))
+
+    series = service.series("speed", seconds=60, points=1000, mode="decimate")
+    assert series["v"] == list(range(230, 330))
+    assert series["t"] == list(range(230, 330))
+    assert {c["name"]: c["samples"] for c in service.channels()} == {"speed": 330, "rpm": 330}
+
+
+def test_malformed_frames_are_rejected(service):
+    frame = pack_frame(1, [0, 1], 0, 1000, _rows(0, 4), sequence=0)
+
+    assert not _feed(service, frame[:10])
+    assert not _feed(service, b"XX" + frame[2:])
+    assert not _feed(service, frame[:-4])
+    assert service.channels() == []
+
+
+def test_sequence_gaps_count_as_lost_packets(service):
+    for sequence in (0, 1, 4, 5, 3):
+        _feed(service, pack_frame(1, [0], 0, 1000, _rows(0, 1, channels=1), sequence=sequence))
+    # 2 and 3 counted when 4 arrived; the late 3 is not a second loss
+    assert service.lost == 2
+
+    # Each source has its own sequence, and the counter wraps at 16 bits
+    _feed(service, pack_frame(2, [0], 0, 1000, _rows(0, 1, channels=1), sequence=0xFFFF))
+    _feed(service, pack_frame(2, [0], 0, 1000, _rows(0, 1, channels=1), sequence=0))
+    assert service.lost == 2
+
+
+def test_frame_cursors_return_only_new_samples(service):
+    _feed(service, pack_frame(1, [0], 0, 1000, _rows(0, 5, channels=1), sequence=0))
+
+    first = service.frame(["speed", "missing"], {}, points=100, mode="decimate")
+    assert first == {"series": {}, "cursors": {"speed": 5}}
+
+    _feed(service, pack_frame(1, [0], 5000, 1000, _rows(5, 3, channels=1), sequence=1))
+    second = service.frame(["speed"], first["cursors"], points=100, mode="decimate")
+    assert second["series"]["speed"]["v"] == [5, 6, 7]
+    assert second["cursors"] == {"speed": 8}
+
+
+def test_series_errors(service):
+    with pytest.raises(LookupError):
+        service.series("speed")
+    _feed(service, pack_frame(1, [0], 0, 1000, _rows(0, 5, channels=1), sequence=0))
+    with pytest.raises(ValueError):
+        service.series("speed", mode="average")
+
+
+def test_min_max_keeps_peaks_and_decimate_keeps_the_newest():
+    times = np.arange(1000, dtype=np.int64)
+    values = np.zeros(1000, dtype=np.float32)
+    values[437] = 9.0
+    values[612] = -3.0
+
+    starts, lows, highs = min_max(times, values, 10)
+    assert len(starts) == 10
+    assert highs.max() == 9.0 and lows.min() == -3.0
+
+    kept_times, kept = decimate(times, np.arange(1000), 300)
+    assert len(kept) <= 300
+    assert kept[-1] == 999 and kept_times[-1] == 999
+
+
+def test_datagrams_are_received_on_the_event_loop():
+    async def scenario():
+        service = TelemetryService("127.0.0.1", 0, names=channel_names(), capacity=100)
+        service.start()
+        port = service._sock.getsockname()[1]
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            sender.sendto(pack_frame(1, [0], 0, 1000, _rows(0, 4, channels=1), sequence=0), ("127.0.0.1", port))
+            for _ in range(100):
+                if service.channels():
+                    break
+                await asyncio.sleep(0.01)
+        service.stop()
+        return service
+
+    service = asyncio.run(scenario())
+    assert service.series("speed", mode="decimate")["v"] == [0, 1, 2, 3]
+    assert not service.stats()["listening"]
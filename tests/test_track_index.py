@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.track_index import TrackIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TrackIndex(tmp_path / "tracks.db")
+    yield index
+    index.close()
+
+
+def test_exact_key_ignores_edition_suffix(index):
+    index.add("Come Together", "The Beatles", {"id": "beatles"})
+    assert index.lookup("Come Together - Remastered 2009", "The Beatles") == {"id": "beatles"}
+
+
+def test_fuzzy_title_same_artist(index):
+    index.add("Bohemian Rhapsody", "Queen", {"id": "queen"})
+    assert index.lookup("Bohemian Rapsody", "Queen") == {"id": "queen"}
+
+
+def test_fuzzy_artist_spelling(index):
+    index.add("Bohemian Rhapsody", "Queen", {"id": "queen"})
+    assert index.lookup("Bohemian Rhapsody", "Quen") == {"id": "queen"}
+
+
+def test_same_title_other_artist_is_not_a_match(index):
+    index.add("Yesterday", "The Beatles", {"id": "beatles"})
+    assert index.lookup("Yesterday", "Leona Lewis") is None
+
+
+def test_same_title_picks_the_matching_artist(index):
+    index.add("Yesterday", "The Beatles", {"id": "beatles"})
+    index.add("Yesterday", "Leona Lewis", {"id": "leona"})
+    assert index.lookup("Yesterday (Live)", "Leona Lewis feat. Someone") == {"id": "leona"}
+
+
+def test_search_hit_with_matching_title_and_artist_is_accepted():
+    assert TrackIndex.is_match("Come Together - Remastered 2009", "The Beatles", "Come Together", "The Beatles")
+
+
+def test_search_hit_same_title_other_artist_is_rejected():
+    assert not TrackIndex.is_match("Yesterday", "The Beatles", "Yesterday", "Leona Lewis")
+
+
+def test_search_hit_same_artist_other_title_is_rejected():
+    assert not TrackIndex.is_match("Some Song", "Coldplay", "Yellow", "Coldplay")
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+pytest.importorskip("gi", reason="PyGObject is not installed")
+pytest.importorskip("pydbus", reason="pydbus is not installed")
+
+from app.services.volume_control import VolumeControl  # noqa: E402
+
+PLAYER = "/org/bluez/hci0/dev_00/player0"
+TRANSPORT = "/org/bluez/hci0/dev_00/fd0"
+
+
+class FakeTransport:
+    def __init__(self, volume=60):
+        self.writes = []
+        self._volume = volume
+
+    @property
+    def Volume(self):
+        if self._volume is None:
+            raise RuntimeError("org.freedesktop.DBus.Error.UnknownObject")
+        return self._volume
+
+    @Volume.setter
+    def Volume(self, level):
+        self.writes.append(level)
+
+
+class FakeBus:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get(self, service, path):
+        return {"org.bluez.MediaTransport1": self.transport}
+
+
+class FakeRegistry:
+    def __init__(self, transport, cached_volume=60):
+        self.bus = FakeBus(transport)
+        self.cached_volume = cached_volume
+
+    def add_interface_listener(self, interface, callback):
+        pass
+
+    def active_player_path(self):
+        return PLAYER
+
+    def transport_for(self, player_path):
+        # The phone never confirms: the cached volume stays where it was
+        return TRANSPORT, self.cached_volume
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_quick_steps_build_on_the_last_written_level():
+    transport = FakeTransport()
+    volume = VolumeControl(FakeRegistry(transport), max_writes_per_second=1000)
+    try:
+        for count in range(1, 6):
+            volume.step(1)
+            wait_for(lambda: len(transport.writes) == count)
+        assert transport.writes == [61, 62, 63, 64, 65]
+    finally:
+        volume.stop()
+
+
+def test_phone_change_replaces_an_old_written_level():
+    transport = FakeTransport()
+    registry = FakeRegistry(transport)
+    volume = VolumeControl(registry, max_writes_per_second=1000)
+    try:
+        volume.step(1)
+        wait_for(lambda: transport.writes == [61])
+        volume._written[TRANSPORT] = (61, time.monotonic() - VolumeControl.CONFIRM_WINDOW - 1)
+        registry.cached_volume = 30
+        volume._on_transport_changed(TRANSPORT, {"Volume": 30}, [])
+        assert volume.step(1).target == 31
+    finally:
+        volume.stop()
+
+
+def test_unreadable_volume_is_not_guessed():
+    transport = FakeTransport(volume=None)
+    volume = VolumeControl(FakeRegistry(transport, cached_volume=None), max_writes_per_second=1000)
+    try:
+        with pytest.raises(LookupError):
+            volume.step(1)
+        time.sleep(0.05)
+        assert transport.writes == []
+    finally:
+        volume.stop()
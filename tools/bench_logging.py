@@ -0,0 +1,109 @@
+"""Benchmark per-call cost of LoggingContainer loggers.
+
+    python -m tools.bench_logging --iterations 20000 --stall-ms 50
+
+Runs in a temporary directory (logs/ is created there). Compares, per call
+(mean and worst case):
+
+- a disabled DEBUG call with an f-string and with lazy %-arguments;
+- an enabled call through the queue pipeline, at INFO and DEBUG;
+- a call dropped by the rate limiter;
+- the old synchronous FileHandler.
+
+The last two rows repeat the enabled calls while the disk stalls for
+--stall-ms every 500 writes, as an SD card does under write-back. Under
+the GIL the listener's formatting and writing still cost CPU. What the
+queue removes is the caller waiting on the disk.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+STALL_EVERY = 500
+
+
+def timed_calls(function, iterations: int) -> tuple[float, float]:
+    """(mean ns, max ns) per call."""
+    worst = 0
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        began = time.perf_counter_ns()
+        function()
+        worst = max(worst, time.perf_counter_ns() - began)
+    return (time.perf_counter_ns() - start) / iterations, worst
+
+
+def stalling(handler_class):
+    """handler_class whose emit blocks for ``stall`` seconds every STALL_EVERY records."""
+    class Stalling(handler_class):
+        stall = 0.0
+        written = 0
+
+        def emit(self, record):
+            Stalling.written += 1
+            if Stalling.stall and Stalling.written % STALL_EVERY == 0:
+                time.sleep(Stalling.stall)
+            super().emit(record)
+    return Stalling
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--stall-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    n = args.iterations
+
+    workdir = tempfile.mkdtemp(prefix="bench_logging_")
+    os.chdir(workdir)
+    from app.containers import logging_container
+    from app.containers.logging_container import LoggingContainer
+    # Room for every timed record, so the numbers don't include the queue-full drop path
+    LoggingContainer.QUEUE_SIZE = n * 4
+    queued_files = logging_container._RotatingFileHandler = stalling(logging_container._RotatingFileHandler)
+
+    path, level = "/org/bluez/hci0/dev_AA_BB_CC_DD_EE_FF/player0", 64
+    info = LoggingContainer.get_logger("BenchInfo", logging.INFO, rate_limit=0)
+    debug = LoggingContainer.get_logger("BenchDebug", logging.DEBUG, rate_limit=0)
+    limited = LoggingContainer.get_logger("BenchLimited", logging.DEBUG, rate_limit=1)
+    for _ in range(10):
+        limited.debug("burst")  # Uses up the bucket so the timed calls are all dropped
+
+    # The handler every logger had before: synchronous, formatting and writing in the caller
+    legacy_file = stalling(logging.FileHandler)
+    legacy = logging.getLogger("BenchLegacy")
+    legacy.setLevel(logging.DEBUG)
+    legacy.propagate = False
+    legacy_handler = legacy_file(os.path.join(workdir, "legacy.log"), mode="w")
+    legacy_handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s"))
+    legacy.addHandler(legacy_handler)
+
+    rows = [
+        ("INFO logger, debug(f-string)", lambda: info.debug(f"Volume {level} written to {path}"), False),
+        ("INFO logger, debug(lazy)", lambda: info.debug("Volume %d written to %s", level, path), False),
+        ("INFO logger, info(lazy), queued", lambda: info.info("Volume %d written to %s", level, path), False),
+        ("DEBUG logger, debug(lazy), queued", lambda: debug.debug("Volume %d written to %s", level, path), False),
+        ("DEBUG logger, rate-limited drop", lambda: limited.debug("Volume %d written to %s", level, path), False),
+        ("legacy FileHandler, debug(f-string)", lambda: legacy.debug(f"Volume {level} written to {path}"), False),
+        ("stalling disk: queued", lambda: debug.debug("Volume %d written to %s", level, path), True),
+        ("stalling disk: legacy FileHandler", lambda: legacy.debug(f"Volume {level} written to {path}"), True),
+    ]
+    baseline, _ = timed_calls(lambda: None, n)
+    print(f"{'lambda call baseline':<40} {baseline:8.0f} ns")
+    for name, function, stalls in rows:
+        # The listener drains the previous row's backlog first; it would compete for the GIL
+        while not LoggingContainer._queue.empty():
+            time.sleep(0.05)
+        queued_files.stall = legacy_file.stall = args.stall_ms / 1000 if stalls else 0.0
+        mean, worst = timed_calls(function, n)
+        print(f"{name:<40} {mean:8.0f} ns mean  {worst / 1e6:8.2f} ms max")
+
+    drain = time.perf_counter()
+    LoggingContainer.shutdown()
+    print(f"\nListener drained the queue in {(time.perf_counter() - drain) * 1000:.0f} ms; files in {workdir}/logs")
+
+
+if __name__ == "__main__":
+    main()
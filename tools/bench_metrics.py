@@ -0,0 +1,70 @@
+"""Benchmark per-observation overhead of the metrics registry.
+
+    python -m tools.bench_metrics --iterations 200000
+
+Times histogram observations (cached child and labels() lookup), counter
+increments, a D-Bus call through TimedProxy against the same call made
+directly, and the subprocess timer context manager. Prints /metrics output
+for a small sample at the end.
+"""
+import argparse
+import time
+
+from app.containers.metrics_container import MetricsContainer
+from app.utils.metrics_utils import DBUS_SECONDS, TimedProxy, observe_subprocess
+
+
+class FakeInterface:
+    Status = "playing"
+
+    def Next(self):
+        return None
+
+
+def timed_block():
+    with observe_subprocess("bench"):
+        pass
+
+
+def per_call_ns(function, iterations: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    histogram = MetricsContainer.histogram("bench_seconds", "Benchmark histogram", ("kind",))
+    counter = MetricsContainer.counter("bench_total", "Benchmark counter", ("kind",))
+    child = histogram.labels("cached")
+    counter_child = counter.labels("cached")
+    direct = FakeInterface()
+    timed = TimedProxy(direct, "org.bluez", "org.bluez.MediaPlayer1")
+
+    baseline = per_call_ns(lambda: None, n)
+    rows = [
+        ("histogram.observe (cached child)", per_call_ns(lambda: child.observe(0.003), n)),
+        ("histogram.labels().observe", per_call_ns(lambda: histogram.labels("lookup").observe(0.003), n)),
+        ("counter.inc (cached child)", per_call_ns(counter_child.inc, n)),
+        ("direct method call", per_call_ns(direct.Next, n)),
+        ("TimedProxy method call", per_call_ns(lambda: timed.Next(), n)),
+        ("TimedProxy property read", per_call_ns(lambda: timed.Status, n)),
+        ("observe_subprocess block", per_call_ns(timed_block, n)),
+    ]
+    print(f"{'lambda call baseline':<36} {baseline:8.0f} ns")
+    for name, ns in rows:
+        print(f"{name:<36} {ns:8.0f} ns  (+{max(0.0, ns - baseline):.0f} ns over baseline)")
+
+    print()
+    print("\n".join(line for line in MetricsContainer.render().splitlines()
+                    if line.startswith(("bench_total", "# TYPE bench")) or 'kind="cached",le="0.005"' in line))
+    print(f"dbus children: {len(DBUS_SECONDS._children)}")
+
+
+if __name__ == "__main__":
+    main()
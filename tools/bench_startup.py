@@ -0,0 +1,121 @@
+"""Benchmark cold start: import time and time to first response.
+
+    python -m tools.bench_startup --runs 5 --port 8765
+
+Import time is measured in fresh interpreters (``import app.main``), with the
+slowest modules from ``-X importtime`` listed once. Time to first response
+starts uvicorn and polls ``--path`` until it answers 200. Time to warm is
+measured until /health reports every service ready, and is skipped when a
+service fails to build on this machine (no BlueZ/oFono/nmcli).
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def import_time(runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+        samples.append(float(output.stdout.strip().splitlines()[-1]) * 1000)
+    return samples
+
+
+def slowest_imports(count: int) -> list[tuple[int, str]]:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], capture_output=True, text=True,
+    )
+    rows = []
+    for line in output.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def get(port: int, path: str, timeout: float = 0.5):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def first_response(port: int, path: str, deadline: float) -> tuple[float | None, float | None]:
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    began = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    ttfr = warm = None
+    try:
+        while time.perf_counter() - began < deadline:
+            try:
+                status, body = get(port, path)
+                if ttfr is None and status == 200:
+                    ttfr = (time.perf_counter() - began) * 1000
+                if ttfr is not None:
+                    _, health = get(port, "/health") if path != "/health" else (status, body)
+                    states = json.loads(health)["services"].values()
+                    if all(state == "ready" for state in states):
+                        warm = (time.perf_counter() - began) * 1000
+                        break
+                    if "pending" not in states:
+                        break
+            except (OSError, http.client.HTTPException, ValueError):
+                pass
+            time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return ttfr, warm
+
+
+def summary(samples: list[float]) -> str:
+    return f"mean={statistics.fmean(samples):7.1f}ms min={min(samples):7.1f}ms max={max(samples):7.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--deadline", type=float, default=15.0, help="seconds to wait per server start")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    print(f"import app.main   {summary(import_time(args.runs))}")
+    for cumulative, module in slowest_imports(args.top):
+        print(f"    {cumulative / 1000:8.1f}ms  {module}")
+
+    ttfrs, warms = [], []
+    for _ in range(args.runs):
+        ttfr, warm = first_response(args.port, args.path, args.deadline)
+        if ttfr is not None:
+            ttfrs.append(ttfr)
+        if warm is not None:
+            warms.append(warm)
+    if ttfrs:
+        print(f"first response    {summary(ttfrs)}  ({args.path})")
+    else:
+        print(f"first response    no 200 from {args.path} within {args.deadline}s")
+    if warms:
+        print(f"all services warm {summary(warms)}")
+    else:
+        print("all services warm not reached (some services failed to build on this machine)")
+
+
+if __name__ == "__main__":
+    main()
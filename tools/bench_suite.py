@@ -0,0 +1,327 @@
+"""Reproducible end-to-end benchmarks against mocked BlueZ, oFono and NetworkManager.
+
+    python -m tools.bench_suite --requests 200 --signals 50 --clients 50 --json bench.json
+    python -m tools.bench_suite --skip-slow          # leave out scan/connect/Wi-Fi flows
+    python -m tools.bench_suite --workers 4          # owner daemon + 4 API workers
+
+Starts tools.mock_env (private D-Bus, fake bluetoothctl/nmcli) and a
+uvicorn server on top of it in a temporary directory, then measures:
+
+- HTTP endpoint latency (p50/p95/p99, one keep-alive connection);
+- signal to WebSocket: a PropertiesChanged on the mocked player or
+  transport, or an oFono CallAdded, until the client receives it;
+- Bluetooth scan, connect (paired and new device) and Wi-Fi scan/connect,
+  through the fakes with the delays in tools.mock_env.DELAYS;
+- resident memory per open /ws/spotify-metadata client.
+
+Every run starts from the same fixture, so numbers are comparable between
+commits on the same machine. /clean-cache is never called: it removes
+/var/lib/bluetooth whatever bus it runs against.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from tools.mock_env import ACCESS_POINTS, DEVICES, MockEnvironment
+
+ENDPOINTS = [
+    "/health",
+    "/media/metadata",
+    "/media/volume",
+    "/media/devices",
+    "/media/history/recent",
+    "/wifi/status",
+    "/wifi/current-connection",
+    "/snapshot",
+    "/metrics",
+]
+# Built on first use, never by the warm-up
+ON_DEMAND = ("Profiler", "JournalReplayer")
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": round(pick(0.50), 2),
+        "p95_ms": round(pick(0.95), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def row(name: str, result: dict) -> str:
+    if "error" in result:
+        return f"{name:<34} {result['error']}"
+    return (f"{name:<34} p50={result['p50_ms']:8.1f}ms p95={result['p95_ms']:8.1f}ms "
+            f"p99={result['p99_ms']:8.1f}ms max={result['max_ms']:8.1f}ms (n={result['n']})")
+
+
+class Server:
+    """uvicorn running app.main in ``workdir`` with the mock environment.
+
+    With ``workers`` > 1 the hardware owner daemon (app.owner) runs first
+    and uvicorn's workers run with BLUEDRIVE_ROLE=worker.
+    """
+
+    def __init__(self, env: dict, workdir: Path, port: int, workers: int = 1):
+        self.port = port
+        root = Path(__file__).resolve().parent.parent
+        env = {**env, "PYTHONPATH": str(root)}
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+        self.owner = None
+        if workers > 1:
+            self.owner = subprocess.Popen(
+                [sys.executable, "-m", "app.owner"], cwd=workdir, env=env,
+                stdout=open(workdir / "owner.log", "a"), stderr=subprocess.STDOUT,
+            )
+            env = {**env, "BLUEDRIVE_ROLE": "worker"}
+            command += ["--workers", str(workers)]
+        self.process = subprocess.Popen(
+            command, cwd=workdir, env=env,
+            stdout=open(workdir / "uvicorn.log", "a"), stderr=subprocess.STDOUT,
+        )
+
+    def request(self, method: str, path: str, body: dict = None, timeout: float = 60.0):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        try:
+            payload = json.dumps(body) if body is not None else None
+            connection.request(method, path, payload, {"Content-Type": "application/json"} if payload else {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def wait_ready(self, timeout: float) -> float:
+        """Milliseconds until /health reports every service ready."""
+        began = time.perf_counter()
+        while time.perf_counter() - began < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError("uvicorn exited; see uvicorn.log in the work directory")
+            if self.owner is not None and self.owner.poll() is not None:
+                raise RuntimeError("the owner daemon exited; see owner.log in the work directory")
+            try:
+                status, body = self.request("GET", "/health", timeout=1)
+                states = json.loads(body)["services"] if status == 200 else {}
+                states = {name: state for name, state in states.items() if name not in ON_DEMAND}
+                if states and all(state == "ready" for state in states.values()):
+                    return (time.perf_counter() - began) * 1000
+                failed = [name for name, state in states.items() if state == "failed"]
+                if failed:
+                    raise RuntimeError(f"services failed against the mocks: {', '.join(failed)}")
+            except (OSError, http.client.HTTPException, ValueError):
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f"services not ready after {timeout}s")
+
+    def pids(self) -> list[int]:
+        """uvicorn, its workers and the owner daemon."""
+        pids = [self.process.pid]
+        try:
+            with open(f"/proc/{self.process.pid}/task/{self.process.pid}/children") as f:
+                pids += [int(pid) for pid in f.read().split()]
+        except OSError:
+            pass
+        if self.owner is not None:
+            pids.append(self.owner.pid)
+        return pids
+
+    def rss_kb(self) -> int:
+        """Resident memory of every server process together."""
+        total = 0
+        for pid in self.pids():
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    total += next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+            except OSError:
+                pass
+        return total
+
+    def stop(self):
+        for process in (self.process, self.owner):
+            if process is None:
+                continue
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def endpoint_latency(server: Server, path: str, requests: int) -> dict:
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    samples = []
+    try:
+        for _ in range(requests):
+            began = time.perf_counter()
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            samples.append((time.perf_counter() - began) * 1000)
+            if response.status >= 500:
+                return {"error": f"HTTP {response.status}"}
+    finally:
+        connection.close()
+    return percentiles(samples)
+
+
+def ws_round_trip(websocket, trigger, matches, index: int, timeout: float = 10.0) -> float:
+    """Milliseconds from ``trigger(index)`` until a message satisfies ``matches(index, data, context)``."""
+    began = time.perf_counter()
+    context = trigger(index)
+    while True:
+        remaining = timeout - (time.perf_counter() - began)
+        if remaining <= 0:
+            raise TimeoutError(f"no matching message within {timeout}s")
+        try:
+            data = json.loads(websocket.recv(timeout=remaining))
+        except TimeoutError:
+            continue
+        if isinstance(data, str):
+            data = json.loads(data)  # phone-data sends its JSON as a JSON string
+        if isinstance(data, dict) and matches(index, data, context):
+            return (time.perf_counter() - began) * 1000
+
+
+def signal_to_ws(server: Server, channel: str, trigger, matches, count: int, timeout: float = 10.0) -> dict:
+    """Latency from ``trigger(i)`` (a mock signal) until a message on /ws/<channel> satisfies ``matches(i, data)``."""
+    from websockets.sync.client import connect
+
+    samples = []
+    with connect(f"ws://127.0.0.1:{server.port}/ws/{channel}", open_timeout=10) as websocket:
+        for index in range(count):
+            try:
+                samples.append(ws_round_trip(websocket, trigger, matches, index, timeout))
+            except TimeoutError as e:
+                return {"error": str(e)}
+    return percentiles(samples)
+
+
+def timed_flow(server: Server, method: str, path: str, body: dict = None, expect=None, runs: int = 1) -> dict:
+    samples = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        status, response = server.request(method, path, body, timeout=120)
+        samples.append((time.perf_counter() - began) * 1000)
+        if status != 200 or (expect is not None and not expect(json.loads(response))):
+            return {"error": f"HTTP {status}: {response[:200].decode(errors='replace')}"}
+    return percentiles(samples)
+
+
+def memory_per_client(server: Server, clients: int) -> dict:
+    from websockets.sync.client import connect
+
+    before = server.rss_kb()
+    sockets = []
+    try:
+        for _ in range(clients):
+            websocket = connect(f"ws://127.0.0.1:{server.port}/ws/spotify-metadata", open_timeout=10)
+            websocket.recv(timeout=10)
+            sockets.append(websocket)
+        time.sleep(1.0)  # Each handler has run its first poll and allocated what it keeps
+        after = server.rss_kb()
+    finally:
+        for websocket in sockets:
+            websocket.close()
+    return {"clients": clients, "rss_before_kb": before, "rss_after_kb": after,
+            "per_client_kb": round((after - before) / clients, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--signals", type=int, default=50, help="signals per WebSocket channel")
+    parser.add_argument("--calls", type=int, default=5, help="incoming calls (phone-data is polled every 3s)")
+    parser.add_argument("--clients", type=int, default=50, help="WebSocket clients for the memory figure")
+    parser.add_argument("--skip-slow", action="store_true", help="skip scan, connect and Wi-Fi flows")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers; >1 adds the owner daemon")
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--workdir", help="keep mocks, logs and traces here (default: a new temp dir)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with MockEnvironment(args.workdir) as mock:
+        print(f"work directory: {mock.workdir}")
+        server = Server(mock.env, mock.workdir, args.port, args.workers)
+        try:
+            results["startup_ready_ms"] = round(server.wait_ready(args.ready_timeout), 1)
+            print(f"{'startup until all services ready':<34} {results['startup_ready_ms']:8.1f}ms")
+
+            print("\nHTTP endpoints")
+            for path in ENDPOINTS:
+                results[f"GET {path}"] = endpoint_latency(server, path, args.requests)
+                print(row(f"GET {path}", results[f"GET {path}"]))
+
+            print("\nSignal to WebSocket")
+            mock.set_status("playing")
+            results["track -> ws/spotify-metadata"] = signal_to_ws(
+                server, "spotify-metadata",
+                lambda i: mock.set_track(f"Bench Track {i}"),
+                lambda i, data, _: data.get("title") == f"Bench Track {i}",
+                args.signals)
+            results["volume -> ws/volume"] = signal_to_ws(
+                server, "volume",
+                lambda i: mock.set_volume(20 + i % 100),
+                lambda i, data, _: data.get("volume") == 20 + i % 100,
+                args.signals)
+
+            def call(i):
+                return mock.incoming_call(f"+90555000{i:04d}")
+
+            def answered(i, data, path):
+                if data.get("call_active") and data.get("caller_info") == f"+90555000{i:04d}":
+                    mock.end_call(path)
+                    return True
+                return False
+            results["CallAdded -> ws/phone-data"] = signal_to_ws(server, "phone-data", call, answered, args.calls)
+            for name in ("track -> ws/spotify-metadata", "volume -> ws/volume", "CallAdded -> ws/phone-data"):
+                print(row(name, results[name]))
+
+            if not args.skip_slow:
+                print("\nFlows through the fakes")
+                paired = next(device for device in DEVICES if device["paired"])
+                new = next(device for device in DEVICES if not device["paired"])
+                protected = next(ap for ap in ACCESS_POINTS if ap.get("password"))
+                flows = [
+                    ("GET /paired-devices", "GET", "/paired-devices", None, lambda r: isinstance(r, list) and r),
+                    ("GET /scan", "GET", "/scan", None, lambda r: len(r) == len(DEVICES)),
+                    ("connect paired device", "GET", f"/connect/{paired['address']}", None, None),
+                    ("pair + connect new device", "GET", f"/connect/{new['address']}", None,
+                     lambda r: r["status"] == "connected"),
+                    ("GET /wifi/scan", "GET", "/wifi/scan", None, lambda r: len(r) > 0),
+                    ("POST /wifi/connect", "POST", "/wifi/connect",
+                     {"ssid": protected["ssid"], "password": protected["password"]}, None),
+                    ("POST /wifi/disconnect", "POST", "/wifi/disconnect", None, None),
+                ]
+                for name, method, path, body, expect in flows:
+                    results[name] = timed_flow(server, method, path, body, expect)
+                    print(row(name, results[name]))
+
+            print("\nMemory")
+            results["ws memory"] = memory_per_client(server, args.clients)
+            memory = results["ws memory"]
+            print(f"{'per /ws/spotify-metadata client':<34} {memory['per_client_kb']:8.1f} KB "
+                  f"(RSS {memory['rss_before_kb']} -> {memory['rss_after_kb']} KB, {memory['clients']} clients)")
+        finally:
+            server.stop()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "python": sys.version.split()[0], "machine": os.uname().machine, "workers": args.workers,
+            "results": results,
+        }, indent=2))
+        print(f"\nresults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
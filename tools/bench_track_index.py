@@ -0,0 +1,87 @@
+"""Benchmark TrackIndex over a synthetic library.
+
+    python -m tools.bench_track_index --tracks 50000 --queries 2000
+
+Builds a throwaway index, then times exact canonical hits, AVRCP-style
+variants ("- Remastered 2011", "feat. X"), typo'd titles and misses.
+"""
+import argparse
+import random
+import statistics
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.track_index import TrackIndex
+
+WORDS = [
+    "love", "night", "heart", "fire", "dream", "rain", "summer", "road", "light", "shadow",
+    "river", "gold", "wild", "blue", "city", "moon", "dance", "home", "storm", "echo",
+    "sky", "ocean", "stone", "ghost", "paper", "silver", "winter", "empire", "velvet", "neon",
+]
+SUFFIXES = [" - Remastered 2011", " - Radio Edit", " (Live)", " - 2015 Remaster", " [Deluxe]"]
+
+
+def random_name(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS).title() for _ in range(words)) + " " + "".join(
+        rng.choice(string.ascii_lowercase) for _ in range(4)
+    )
+
+
+def make_library(size: int, rng: random.Random):
+    artists = [random_name(rng, 2) for _ in range(max(1, size // 10))]
+    return [(random_name(rng, rng.randint(1, 4)), rng.choice(artists)) for _ in range(size)]
+
+
+def typo(text: str, rng: random.Random) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:]
+
+
+def timed(index: TrackIndex, queries) -> tuple[list[float], int]:
+    latencies, hits = [], 0
+    for title, artist in queries:
+        start = time.perf_counter()
+        if index.lookup(title, artist) is not None:
+            hits += 1
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies, hits
+
+
+def report(name: str, latencies: list[float], hits: int):
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(
+        f"{name:<10} n={len(latencies):<6} hit={hits / len(latencies):6.1%} "
+        f"mean={statistics.fmean(latencies):8.1f}us p50={p(0.5):8.1f}us p99={p(0.99):8.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    library = make_library(args.tracks, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = TrackIndex(Path(tmp) / "bench.db")
+        start = time.perf_counter()
+        index.add_many((title, artist, {"album": title, "cover_url": None}) for title, artist in library)
+        print(f"indexed {len(index)} tracks in {time.perf_counter() - start:.2f}s")
+
+        sample = rng.sample(library, min(args.queries, len(library)))
+        report("exact", *timed(index, sample))
+        report("variant", *timed(index, [(t + rng.choice(SUFFIXES), a + " feat. Someone") for t, a in sample]))
+        report("typo", *timed(index, [(typo(t, rng), a) for t, a in sample]))
+        report("typo+art", *timed(index, [(typo(t, rng), typo(a, rng)) for t, a in sample]))
+        report("miss", *timed(index, [(random_name(rng, 3), random_name(rng, 2)) for _ in sample]))
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Check the Bluetooth cache reset ladder against a temporary BlueZ storage tree.
+
+    python -m tools.bluetooth_reset_check
+    python -m tools.bluetooth_reset_check --mock --keep
+
+Builds /var/lib/bluetooth's layout under a temporary directory (an
+adapter, a directory with info and attributes per paired phone, a cache
+entry per phone) and runs app.services.bluetooth_cache.BluetoothCache
+on it: a device reset escalating cache -> device -> full, an adapter-wide
+cache reset, restoring a backup, and the refused inputs. Prints one line
+per check and exits 1 if any failed.
+
+tools/fakes goes first on PATH, so sudo systemctl stop/start does
+nothing. Without --mock the system bus address points nowhere, so the
+device level takes its offline path (files removed with the service
+stopped). --mock starts tools.mock_env and checks that RemoveDevice
+reached the mocked BlueZ. --keep leaves the directory for inspection.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from tools.mock_env import DEVICES, FAKES, MockEnvironment, device_path
+
+ADAPTER = "00:1A:7D:DA:71:13"
+
+
+def build_tree(root: Path):
+    """BlueZ storage for the mock_env phones: paired ones have info and attributes, all have a cache entry."""
+    adapter = root / ADAPTER
+    (adapter / "cache").mkdir(parents=True)
+    (adapter / "settings").write_text("[General]\nDiscoverable=false\n")
+    for device in DEVICES:
+        address = device["address"]
+        (adapter / "cache" / address).write_text(f"[General]\nName={device['name']}\n\n[ServiceRecords]\n0x00010000=3601\n")
+        if device["paired"]:
+            (adapter / address).mkdir()
+            (adapter / address / "info").write_text(f"[General]\nName={device['name']}\n\n[LinkKey]\nKey=00112233\n")
+            (adapter / address / "attributes").write_text("[0001]\nUUID=00002800-0000-1000-8000-00805f9b34fb\n")
+
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def expect(self, name: str, condition: bool, detail=""):
+        print(f"{'ok  ' if condition else 'FAIL'} {name}{f'  ({detail})' if detail and not condition else ''}")
+        self.failed += not condition
+
+    def raises(self, name: str, error: type, call):
+        try:
+            call()
+        except error:
+            self.expect(name, True)
+        except Exception as e:
+            self.expect(name, False, f"{type(e).__name__}: {e}")
+        else:
+            self.expect(name, False, "no error")
+
+
+def run(workdir: Path, mock: MockEnvironment | None) -> int:
+    from app.services.bluetooth_cache import BluetoothCache
+
+    root, backups = workdir / "bluetooth", workdir / "backups"
+    build_tree(root)
+    cache = BluetoothCache(root=root, backups=backups, keep=20)
+    adapter = root / ADAPTER
+    first, second = (device["address"] for device in DEVICES[:2])
+    checks = Checks()
+
+    result = cache.reset(first)
+    checks.expect("1st device reset is cache", result["level"] == "cache", result)
+    checks.expect("cache: pairing kept", (adapter / first / "info").is_file())
+    checks.expect("cache: attributes and cache entry gone",
+                  not (adapter / first / "attributes").exists() and not (adapter / "cache" / first).exists())
+    checks.expect("cache: other phones untouched", (adapter / "cache" / second).is_file()
+                  and (adapter / second / "attributes").is_file())
+    checks.expect("cache: backup taken", result["backup"] is not None and (backups / result["backup"]).is_file())
+
+    result = cache.reset(first)
+    checks.expect("2nd device reset is device", result["level"] == "device", result)
+    checks.expect("device: phone's storage gone", not (adapter / first).exists())
+    checks.expect("device: other pairings kept", (adapter / second / "info").is_file())
+    if mock is not None:
+        objects = mock._connection().get_object("org.bluez", "/").GetManagedObjects(
+            dbus_interface="org.freedesktop.DBus.ObjectManager")
+        checks.expect("device: RemoveDevice reached BlueZ", result["via"] == "RemoveDevice"
+                      and device_path(first) not in objects, result)
+    else:
+        checks.expect("device: offline removal without a bus", result["via"] == "files", result)
+
+    result = cache.reset()
+    checks.expect("1st adapter reset is cache", result["level"] == "cache", result)
+    checks.expect("adapter cache: every cache entry gone", not any((adapter / "cache").iterdir()))
+    checks.expect("adapter cache: pairings kept", (adapter / second / "info").is_file()
+                  and not (adapter / second / "attributes").exists())
+
+    result = cache.reset()
+    checks.expect("2nd adapter reset is full", result["level"] == "full", result)
+    checks.expect("full: storage emptied", root.is_dir() and not any(root.iterdir()))
+
+    oldest = cache.list_backups()[-1]["name"]
+    result = cache.restore(oldest)
+    checks.expect("restore: first phone paired again", (adapter / first / "info").is_file()
+                  and (adapter / "cache" / first).is_file(), result)
+    checks.expect("restore: state before it backed up", result["backup"] is not None)
+    checks.expect("restore: escalation forgotten", cache.reset(first)["level"] == "cache")
+
+    checks.raises("unknown device refused", LookupError, lambda: cache.reset("AA:BB:CC:DD:EE:99", "cache"))
+    checks.raises("unknown level refused", ValueError, lambda: cache.reset(first, "everything"))
+    checks.raises("invalid MAC refused", ValueError, lambda: cache.reset("../etc", "cache"))
+    checks.raises("backup outside the directory refused", LookupError, lambda: cache.restore("../bluetooth.tar.gz"))
+    print(f"{'all checks passed' if not checks.failed else f'{checks.failed} check(s) failed'}; "
+          f"{len(cache.list_backups())} backups in {backups}")
+    return 1 if checks.failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mock", action="store_true", help="RemoveDevice against tools.mock_env's BlueZ")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary directory")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bluedrive_btreset_"))
+    os.environ["PATH"] = f"{FAKES}{os.pathsep}{os.environ.get('PATH', '')}"
+    try:
+        if args.mock:
+            with MockEnvironment(workdir=str(workdir / "mock")) as mock:
+                os.environ["DBUS_SYSTEM_BUS_ADDRESS"] = mock.env["DBUS_SYSTEM_BUS_ADDRESS"]
+                status = run(workdir, mock)
+        else:
+            # Never the machine's bus: RemoveDevice must fail and fall back to the files
+            os.environ["DBUS_SYSTEM_BUS_ADDRESS"] = f"unix:path={workdir / 'no-bus'}"
+            status = run(workdir, None)
+    finally:
+        if args.keep:
+            print(f"kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
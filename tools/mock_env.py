@@ -0,0 +1,286 @@
+"""Private system bus with mocked BlueZ, oFono and NetworkManager, plus fake CLIs.
+
+    python -m tools.mock_env --workdir /tmp/bluedrive-mock
+    # prints the environment to run the service against, then waits for Ctrl-C
+
+MockEnvironment starts its own dbus-daemon (never the machine's system
+bus) and a python-dbusmock template server per daemon. tools/fakes is put
+first on PATH, so bluetoothctl, nmcli, sudo and systemctl answer from a
+JSON state file instead of touching the radio. The Spotify stub stands in
+for the Web API. Needs dbus-daemon, python-dbusmock and dbus-python.
+
+The mocks can be driven while the service runs: set_track, set_status and
+set_volume emit the PropertiesChanged signals a phone's AVRCP player
+would. incoming_call and end_call emit oFono's CallAdded and CallRemoved.
+update_fake_state changes what the fakes report next (access points,
+devices).
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tools import spotify_stub
+
+FAKES = Path(__file__).resolve().parent / "fakes"
+
+BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>system</type>
+  <listen>unix:dir={dir}</listen>
+  <policy context="default">
+    <allow user="*"/>
+    <allow own="*"/>
+    <allow send_destination="*"/>
+    <allow receive_sender="*"/>
+  </policy>
+</busconfig>
+"""
+
+# Phones and access points the fakes and mocks agree on
+DEVICES = [
+    {"address": "AA:BB:CC:DD:EE:01", "name": "Pixel 8", "paired": True},
+    {"address": "AA:BB:CC:DD:EE:02", "name": "iPhone 15", "paired": True},
+    {"address": "AA:BB:CC:DD:EE:03", "name": "Galaxy S23", "paired": False},
+]
+ACCESS_POINTS = [
+    {"ssid": "BlueDrive-Home", "signal": 82, "security": "WPA2", "bssid": "10:20:30:40:50:01", "password": "secret123"},
+    {"ssid": "Cafe Guest", "signal": 54, "security": "", "bssid": "10:20:30:40:50:02"},
+    {"ssid": "Office", "signal": 31, "security": "WPA2 WPA3", "bssid": "10:20:30:40:50:03", "password": "office-pw"},
+]
+# Seconds the fakes wait; roughly what the real stack takes on a Pi
+DELAYS = {"scan": 0.0, "pair": 1.0, "connect": 0.8, "wifi_scan": 0.5, "wifi_connect": 1.5}
+
+
+def device_path(address: str) -> str:
+    return "/org/bluez/hci0/dev_" + address.replace(":", "_")
+
+
+class MockEnvironment:
+    """Context manager; ``env`` is the environment to start the service with."""
+
+    MODEM_PATH = "/ril_0"  # Created by the dbusmock oFono template
+
+    def __init__(self, workdir: str = None, devices: list = None, access_points: list = None,
+                 delays: dict = None, connected: str = None):
+        self.workdir = Path(workdir or tempfile.mkdtemp(prefix="bluedrive_mock_"))
+        self.devices = [dict(device) for device in (devices or DEVICES)]
+        self.access_points = [dict(ap) for ap in (access_points or ACCESS_POINTS)]
+        self.delays = {**DELAYS, **(delays or {})}
+        self.connected = connected or self.devices[0]["address"]
+        self.state_file = self.workdir / "fake_state.json"
+        self.env = {}
+        self._daemon = None
+        self._mocks = []
+        self._stub = None
+        self._bus = None
+        self._calls = 0
+
+    def __enter__(self):
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        for device in self.devices:
+            device["connected"] = device["address"] == self.connected
+        self.state_file.write_text(json.dumps({
+            "devices": self.devices,
+            "access_points": self.access_points,
+            "wifi": {"radio": True, "connected": None},
+            "delays": self.delays,
+        }))
+        try:
+            address = self._start_bus()
+            self._stub = spotify_stub.serve(0)
+            stub_url = f"http://127.0.0.1:{self._stub.server_address[1]}"
+            self.env = {
+                **os.environ,
+                "PATH": f"{FAKES}{os.pathsep}{os.environ.get('PATH', '')}",
+                "DBUS_SYSTEM_BUS_ADDRESS": address,
+                "BLUEDRIVE_FAKE_STATE": str(self.state_file),
+                "BLUEDRIVE_DATA_DIR": str(self.workdir / "data"),
+                "SPOTIFY_CLIENT_ID": "bench",
+                "SPOTIFY_CLIENT_SECRET": "bench",
+                "SPOTIFY_API_URL": f"{stub_url}/v1",
+                "SPOTIFY_TOKEN_URL": f"{stub_url}/api/token",
+                "PYTHONUNBUFFERED": "1",
+            }
+            self._start_mocks()
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        for process in self._mocks + ([self._daemon] if self._daemon else []):
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._mocks, self._daemon = [], None
+        if self._stub is not None:
+            self._stub.shutdown()
+            self._stub = None
+
+    # Setup
+
+    def _start_bus(self) -> str:
+        if shutil.which("dbus-daemon") is None:
+            raise RuntimeError("dbus-daemon not found; install the dbus package")
+        bus_dir = self.workdir / "bus"
+        bus_dir.mkdir(exist_ok=True)
+        config = self.workdir / "bus.conf"
+        config.write_text(BUS_CONFIG.format(dir=bus_dir))
+        self._daemon = subprocess.Popen(
+            ["dbus-daemon", f"--config-file={config}", "--nofork", "--print-address"],
+            stdout=subprocess.PIPE, text=True,
+        )
+        address = self._daemon.stdout.readline().strip()
+        if not address:
+            raise RuntimeError("dbus-daemon did not start")
+        return address
+
+    def _start_mocks(self):
+        try:
+            import dbus  # noqa: F401
+            import dbusmock  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError(f"{e.name} is required: pip install python-dbusmock dbus-python") from e
+
+        log = open(self.workdir / "dbusmock.log", "a")
+        for template, name in (("bluez5", "org.bluez"), ("ofono", "org.ofono"),
+                               ("networkmanager", "org.freedesktop.NetworkManager")):
+            self._mocks.append(subprocess.Popen(
+                [sys.executable, "-m", "dbusmock", "--system", "--template", template],
+                env=self.env, stdout=log, stderr=subprocess.STDOUT,
+            ))
+            self._wait_for_name(name)
+
+        bluez = self._mock("org.bluez", "/")
+        bluez.AddAdapter("hci0", "bluedrive-bench")
+        for device in self.devices:
+            path = bluez.AddDevice("hci0", device["address"], device["name"])
+            self._mock("org.bluez", path).UpdateProperties("org.bluez.Device1", {
+                "Paired": self._dbus.Boolean(device["paired"]),
+                "Connected": self._dbus.Boolean(device["connected"]),
+            })
+        self._add_player(self.connected)
+
+        network = self._mock("org.freedesktop.NetworkManager", "/org/freedesktop/NetworkManager")
+        wifi = network.AddWiFiDevice("mock_wifi0", "wlan0", 30)  # 30: NM_DEVICE_STATE_DISCONNECTED
+        for index, ap in enumerate(self.access_points):
+            network.AddAccessPoint(wifi, f"Mock_AP{index}", ap["ssid"], ap["bssid"], 2, 2412, 54000,
+                                   ap["signal"], 0 if not ap.get("security") else 0x100)
+
+    def _add_player(self, address: str):
+        """AVRCP player and A2DP transport of a connected phone, as BlueZ exports them."""
+        dbus = self._dbus
+        path = device_path(address)
+        root = self._mock("org.bluez", "/")
+        root.AddObject(f"{path}/player0", "org.bluez.MediaPlayer1", {
+            "Device": dbus.ObjectPath(path),
+            "Status": "paused",
+            "Position": dbus.UInt32(0),
+            "Track": dbus.Dictionary({"Title": "", "Artist": "", "Album": "", "Duration": dbus.UInt32(0)},
+                                     signature="sv"),
+        }, [(method, "", "", "") for method in ("Play", "Pause", "Stop", "Next", "Previous")])
+        root.AddObject(f"{path}/sep1/fd0", "org.bluez.MediaTransport1", {
+            "Device": dbus.ObjectPath(path),
+            "State": "active",
+            "Volume": dbus.UInt16(64),
+        }, [])
+
+    def _wait_for_name(self, name: str, timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        while not self._connection().name_has_owner(name):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{name} did not appear on the mock bus; see {self.workdir}/dbusmock.log")
+            time.sleep(0.05)
+
+    @property
+    def _dbus(self):
+        import dbus
+        return dbus
+
+    def _connection(self):
+        if self._bus is None:
+            self._bus = self._dbus.bus.BusConnection(self.env["DBUS_SYSTEM_BUS_ADDRESS"])
+        return self._bus
+
+    def _mock(self, service: str, path: str):
+        return self._dbus.Interface(self._connection().get_object(service, path), "org.freedesktop.DBus.Mock")
+
+    # Driving the mocks
+
+    def set_track(self, title: str, artist: str = "Bench Artist", album: str = "Bench Album",
+                  duration_ms: int = 180_000, address: str = None):
+        dbus = self._dbus
+        self._mock("org.bluez", f"{device_path(address or self.connected)}/player0").UpdateProperties(
+            "org.bluez.MediaPlayer1", {
+                "Track": dbus.Dictionary({"Title": title, "Artist": artist, "Album": album,
+                                          "Duration": dbus.UInt32(duration_ms)}, signature="sv"),
+            })
+
+    def set_status(self, status: str, address: str = None):
+        self._mock("org.bluez", f"{device_path(address or self.connected)}/player0").UpdateProperties(
+            "org.bluez.MediaPlayer1", {"Status": status})
+
+    def set_volume(self, volume: int, address: str = None):
+        self._mock("org.bluez", f"{device_path(address or self.connected)}/sep1/fd0").UpdateProperties(
+            "org.bluez.MediaTransport1", {"Volume": self._dbus.UInt16(volume)})
+
+    def update_fake_state(self, update):
+        """Apply ``update(state)`` to the fakes' state file (replaced atomically, as the fakes do)."""
+        state = json.loads(self.state_file.read_text())
+        update(state)
+        tmp = self.state_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.state_file)
+
+    def incoming_call(self, number: str = "+905551112233") -> str:
+        dbus = self._dbus
+        self._calls += 1
+        path = f"{self.MODEM_PATH}/voicecall{90 + self._calls:02d}"
+        properties = {"State": "incoming", "LineIdentification": number, "Name": "", "Multiparty": False}
+        self._mock("org.ofono", "/").AddObject(
+            path, "org.ofono.VoiceCall", properties,
+            [("Answer", "", "", "self.EmitSignal('org.ofono.VoiceCall', 'PropertyChanged', 'sv', ['State', 'active'])"),
+             ("Hangup", "", "", "")])
+        self._mock("org.ofono", self.MODEM_PATH).EmitSignal(
+            "org.ofono.VoiceCallManager", "CallAdded", "oa{sv}",
+            [dbus.ObjectPath(path), dbus.Dictionary(properties, signature="sv")])
+        return path
+
+    def end_call(self, path: str):
+        self._mock("org.ofono", self.MODEM_PATH).EmitSignal(
+            "org.ofono.VoiceCallManager", "CallRemoved", "o", [self._dbus.ObjectPath(path)])
+        self._mock("org.ofono", "/").RemoveObject(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workdir", help="state, bus socket and dbusmock log (default: a new temp dir)")
+    args = parser.parse_args()
+
+    with MockEnvironment(args.workdir) as mock:
+        for key in ("PATH", "DBUS_SYSTEM_BUS_ADDRESS", "BLUEDRIVE_FAKE_STATE", "BLUEDRIVE_DATA_DIR",
+                    "SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "SPOTIFY_API_URL", "SPOTIFY_TOKEN_URL"):
+            print(f"export {key}='{mock.env[key]}'")
+        print("# then: uvicorn app.main:app --port 8000    (Ctrl-C here stops the mocks)", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
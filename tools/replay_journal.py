@@ -0,0 +1,117 @@
+"""Fetch, read and replay BlueDrive event journals.
+
+    python -m tools.replay_journal fetch --url http://raspberrypi:8000 --token $BLUEDRIVE_DEBUG_TOKEN -o field.bin
+    python -m tools.replay_journal dump field.bin --topic hfp.
+    python -m tools.replay_journal run field.bin --speed 10
+    python -m tools.replay_journal run field.bin --speed 0 --repeat 5 --json replay.json
+
+``run`` starts tools.mock_env and the service on top of it (as
+tools.bench_suite does) and posts the journal to /debug/journal/replay.
+It prints signal throughput, handler latency, whether the replayed state
+transitions matched the recorded ones, and the server's RSS after each
+repeat. With --speed 0 the same journal is a repeatable workload for
+comparing commits.
+"""
+import argparse
+import datetime
+import json
+import secrets
+import sys
+import urllib.request
+from pathlib import Path
+
+from app.containers.journal_container import SIGNAL, read_journal
+
+
+def fetch(args):
+    request = urllib.request.Request(f"{args.url.rstrip('/')}/debug/journal", headers={"X-Debug-Token": args.token})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        data = response.read()
+    Path(args.output).write_bytes(data)
+    print(f"{len(read_journal(data))} events written to {args.output}")
+
+
+def dump(args):
+    events = read_journal(Path(args.journal).read_bytes())
+    events = [event for event in events if event[3].startswith(args.topic)]
+    for seq, at, kind, topic, payload in events[-args.limit:] if args.limit else events:
+        when = datetime.datetime.fromtimestamp(at).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        if kind == SIGNAL:
+            # Signal handlers' arguments; the sender/path/interface/name prefix of pydbus signals adds nothing here
+            call_args, kwargs = payload
+            payload = (call_args[-1] if len(call_args) == 5 else call_args) if not kwargs else (call_args, kwargs)
+        print(f"{seq:>8} {when} {'>' if kind == SIGNAL else '='} {topic:<28} {payload!r}")
+
+
+def run(args):
+    from tools.bench_suite import Server
+    from tools.mock_env import MockEnvironment
+
+    data = Path(args.journal).read_bytes()
+    signals = sum(1 for event in read_journal(data) if event[2] == SIGNAL)
+    token = secrets.token_hex(8)
+    results = []
+    with MockEnvironment(args.workdir) as mock:
+        print(f"work directory: {mock.workdir}; {signals} signals in {args.journal}")
+        server = Server({**mock.env, "BLUEDRIVE_DEBUG_TOKEN": token}, mock.workdir, args.port)
+        try:
+            server.wait_ready(args.ready_timeout)
+            for run_index in range(args.repeat):
+                url = (f"http://127.0.0.1:{args.port}/debug/journal/replay"
+                       f"?speed={args.speed}&max_gap={args.max_gap}")
+                request = urllib.request.Request(url, data=data, method="POST", headers={
+                    "X-Debug-Token": token, "Content-Type": "application/octet-stream"})
+                with urllib.request.urlopen(request, timeout=3600) as response:
+                    result = json.loads(response.read())
+                result["rss_kb"] = server.rss_kb()
+                results.append(result)
+                handler = result["handler_ms"] or {}
+                print(f"run {run_index + 1}: {result['replayed']}/{result['signals']} signals in {result['seconds']:.2f}s "
+                      f"({result['signals_per_second']}/s) handler p50={handler.get('p50')}ms p99={handler.get('p99')}ms "
+                      f"errors={result['errors']} deterministic={result['deterministic']} rss={result['rss_kb']} KB")
+                if result["skipped"]:
+                    print(f"    skipped (no handler here): {result['skipped']}")
+                if result["first_divergence"]:
+                    print(f"    first divergence: {result['first_divergence']}")
+        finally:
+            server.stop()
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, default=str))
+        print(f"results written to {args.json}")
+    if not all(result["deterministic"] for result in results):
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = commands.add_parser("fetch", help="download /debug/journal from a running instance")
+    fetch_parser.add_argument("--url", required=True)
+    fetch_parser.add_argument("--token", required=True, help="the instance's BLUEDRIVE_DEBUG_TOKEN")
+    fetch_parser.add_argument("-o", "--output", default="journal.bin")
+    fetch_parser.set_defaults(handler=fetch)
+
+    dump_parser = commands.add_parser("dump", help="print a journal's events")
+    dump_parser.add_argument("journal")
+    dump_parser.add_argument("--topic", default="", help="topic prefix (bluez., ofono., hfp., media., wifi.)")
+    dump_parser.add_argument("--limit", type=int, default=0, help="only the last N events")
+    dump_parser.set_defaults(handler=dump)
+
+    run_parser = commands.add_parser("run", help="replay a journal into the service on the mocked bus")
+    run_parser.add_argument("journal")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="0: as fast as possible")
+    run_parser.add_argument("--max-gap", type=float, default=5.0, help="longest pause between signals, seconds")
+    run_parser.add_argument("--repeat", type=int, default=1)
+    run_parser.add_argument("--port", type=int, default=8768)
+    run_parser.add_argument("--ready-timeout", type=float, default=60.0)
+    run_parser.add_argument("--workdir", help="keep mocks, logs and traces here (default: a new temp dir)")
+    run_parser.add_argument("--json", help="also write every run's result to this file")
+    run_parser.set_defaults(handler=run)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Local stand-in for the Spotify token and search endpoints.
+
+Simulates slow links, server errors and rate limiting so SpotifyClient's
+latency budget and circuit breaker can be exercised without a network:
+
+    python -m tools.spotify_stub --port 8765 --latency 0.5 --error-rate 0.2 --rate-limit-every 10
+    python -m tools.spotify_stub --trickle 5        # bodies that take 5 s to arrive
+    python -m tools.spotify_stub --captive-portal   # searches answered with a 200 HTML login page
+    SPOTIFY_API_URL=http://127.0.0.1:8765/v1 SPOTIFY_TOKEN_URL=http://127.0.0.1:8765/api/token ...
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit_every=0, retry_after=5, offline=False, trickle=0.0,
+                 reject_credentials=False, captive_portal=False):
+        self.latency = latency
+        self.trickle = trickle
+        self.reject_credentials = reject_credentials
+        self.captive_portal = captive_portal
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.offline = offline
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def fake_track(query: str) -> dict:
+    words = query.split()
+    title = " ".join(words[:-1]) or query
+    artist = words[-1] if words else "Unknown"
+    return {
+        "name": title,
+        "artists": [{"name": artist}],
+        "album": {
+            "name": f"{title} (Album)",
+            "release_date": "2020-01-01",
+            "images": [{"url": f"http://127.0.0.1/cover/{abs(hash(query)) % 10_000}.jpg"}],
+        },
+        "external_urls": {"spotify": "https://open.spotify.com/track/stub"},
+        "popularity": 50,
+        "duration_ms": 180_000,
+    }
+
+
+def make_handler(config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict, headers: dict | None = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            try:
+                if config.trickle:
+                    # Headers at once, then the body a byte at a time over ``trickle`` seconds
+                    for index in range(len(body)):
+                        self.wfile.write(body[index:index + 1])
+                        self.wfile.flush()
+                        time.sleep(config.trickle / len(body))
+                else:
+                    self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client gave up (latency budget exceeded)
+
+        def _simulate(self) -> bool:
+            """Apply configured faults. Returns False if a response was already sent."""
+            if config.offline:
+                # Hold the connection open like a dead mobile link
+                time.sleep(3600)
+                return False
+            with config.lock:
+                config.requests += 1
+                count = config.requests
+            time.sleep(config.latency)
+            if config.rate_limit_every and count % config.rate_limit_every == 0:
+                self._send_json(429, {"error": "rate limited"}, {"Retry-After": str(config.retry_after)})
+                return False
+            if random.random() < config.error_rate:
+                self._send_json(503, {"error": "unavailable"})
+                return False
+            return True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            if not self.path.endswith("/api/token"):
+                self._send_json(404, {"error": "not found"})
+                return
+            if config.reject_credentials:
+                self._send_json(401, {"error": "invalid_client"})
+                return
+            if self._simulate():
+                self._send_json(200, {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.endswith("/search"):
+                self._send_json(404, {"error": "not found"})
+                return
+            if config.captive_portal:
+                body = b"<html><body>Sign in to continue</body></html>"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if self._simulate():
+                query = parse_qs(url.query).get("q", [""])[0]
+                self._send_json(200, {"tracks": {"items": [fake_track(query)]}})
+
+    return Handler
+
+
+def serve(port: int = 0, **options) -> ThreadingHTTPServer:
+    """Start the stub in a daemon thread and return the server (server_address has the port)."""
+    config = StubConfig(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--retry-after", type=int, default=5)
+    parser.add_argument("--offline", action="store_true", help="never answer (tunnel)")
+    parser.add_argument("--trickle", type=float, default=0.0, help="seconds to send each body over, byte by byte")
+    parser.add_argument("--reject-credentials", action="store_true", help="answer the token endpoint with 401")
+    parser.add_argument("--captive-portal", action="store_true", help="answer searches with a 200 HTML page")
+    args = parser.parse_args()
+
+    server = serve(
+        args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+        offline=args.offline,
+        trickle=args.trickle,
+        reject_credentials=args.reject_credentials,
+        captive_portal=args.captive_portal,
+    )
+    print(f"Spotify stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
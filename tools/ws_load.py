@@ -0,0 +1,353 @@
+"""WebSocket fan-out load generator and soak test against the mocked bus.
+
+    python -m tools.ws_load --metadata-clients 300 --phone-clients 100 --scan-clients 2 --duration 7200
+    python -m tools.ws_load --duration 600 --churn 0.1 --json soak.json
+
+Starts tools.mock_env and uvicorn (as tools.bench_suite does), opens the
+requested clients on /ws/spotify-metadata, /ws/phone-data and
+/wifi/ws/scan, and scripts state changes on the mocks: a track skip every
+--skip-interval, an incoming call every --call-interval (ended after
+--call-length) and an access point appearing every --ap-interval.
+
+Each change carries a sequence number (track title, caller number, SSID).
+Per channel it reports:
+
+- delivery latency from the mock signal until each client sees it;
+- missed: a client connected before the change never saw it within --deadline;
+- duplicates: a change shown again after the client had moved past it.
+
+For the server it reports RSS, CPU, threads, open fds and event-loop lag.
+A report is printed every --report-interval. --churn reconnects that
+fraction of clients each interval. Anything allocated per connection and
+never released (memory, threads, fds) then grows steadily. The last line
+compares the start of the run with the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tools.bench_suite import Server, percentiles
+from tools.mock_env import MockEnvironment
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+class Channel:
+    """Scripted changes on one WebSocket endpoint and what its clients saw of them."""
+
+    def __init__(self, name: str, path: str, key):
+        self.name = name
+        self.path = path
+        self.key = key  # message -> sequence number of the change it shows, or None
+        self.clients = []
+        self.events = []  # (seq, sent_at) not yet checked for misses
+        self.sent_at = {}
+        self.latencies = []
+        self.sent = self.missed = self.duplicates = self.disconnects = 0
+
+    def record_sent(self, seq: int):
+        now = time.monotonic()
+        self.sent += 1
+        self.sent_at[seq] = now
+        self.events.append((seq, now))
+
+    def check_missed(self, deadline: float):
+        """Count misses for changes older than ``deadline``, then forget them."""
+        now = time.monotonic()
+        while self.events and now - self.events[0][1] > deadline:
+            seq, sent_at = self.events.pop(0)
+            for client in self.clients:
+                if client.connected_at is not None and client.connected_at < sent_at and seq not in client.seen:
+                    self.missed += 1
+                client.seen.discard(seq)
+            self.sent_at.pop(seq, None)
+
+    def take_interval(self) -> dict:
+        result = {
+            "clients": sum(1 for client in self.clients if client.connected_at is not None),
+            "sent": self.sent,
+            "missed": self.missed,
+            "duplicates": self.duplicates,
+            "disconnects": self.disconnects,
+            "latency": percentiles(self.latencies) if self.latencies else None,
+        }
+        self.latencies = []
+        self.sent = self.missed = self.duplicates = self.disconnects = 0
+        return result
+
+
+class Client:
+    def __init__(self, channel: Channel, url: str):
+        self.channel = channel
+        self.url = url
+        self.connected_at = None
+        self.seen = set()
+        self.last = None
+        self.reconnect = asyncio.Event()
+
+    async def run(self, stop: asyncio.Event):
+        from websockets.asyncio.client import connect
+
+        while not stop.is_set():
+            self.reconnect.clear()
+            try:
+                async with connect(self.url, open_timeout=30, max_size=None) as websocket:
+                    self.connected_at = time.monotonic()
+                    receiver = asyncio.ensure_future(self._receive(websocket))
+                    waiters = [receiver, asyncio.ensure_future(stop.wait()),
+                               asyncio.ensure_future(self.reconnect.wait())]
+                    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                    for waiter in waiters:
+                        waiter.cancel()
+                    if receiver.done() and not receiver.cancelled():
+                        raise receiver.exception() or ConnectionError("server closed the connection")
+            except Exception:
+                self.channel.disconnects += 1
+                await asyncio.sleep(1.0)
+            finally:
+                self.connected_at = None
+                self.seen.clear()
+                self.last = None
+
+    async def _receive(self, websocket):
+        channel = self.channel
+        async for message in websocket:
+            data = json.loads(message)
+            if isinstance(data, str):
+                data = json.loads(data)  # phone-data sends its JSON as a JSON string
+            seq = channel.key(data)
+            if seq is None or seq == self.last:
+                continue
+            if seq in self.seen:
+                channel.duplicates += 1
+            else:
+                self.seen.add(seq)
+                sent_at = channel.sent_at.get(seq)
+                if sent_at is not None:
+                    channel.latencies.append((time.monotonic() - sent_at) * 1000)
+            self.last = seq
+
+
+def title_seq(data) -> int | None:
+    title = data.get("title") if isinstance(data, dict) else None
+    return int(title[5:]) if title and title.startswith("Soak ") else None
+
+
+def caller_seq(data) -> int | None:
+    caller = data.get("caller_info") if isinstance(data, dict) and data.get("call_active") else None
+    return int(caller[-6:]) if caller and caller.startswith("+90999") else None
+
+
+def ssid_seq(data) -> int | None:
+    if not isinstance(data, list):
+        return None
+    seqs = [int(network["ssid"][6:]) for network in data
+            if isinstance(network, dict) and network.get("ssid", "").startswith("Churn-")]
+    return max(seqs) if seqs else None
+
+
+class ProcessStats:
+    """CPU, memory, threads and fds of the server from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._cpu = self._cpu_seconds()
+        self._at = time.monotonic()
+
+    def _cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+
+    def sample(self) -> dict:
+        status = {}
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                status[key] = value.split()[0] if value.split() else ""
+        cpu, now = self._cpu_seconds(), time.monotonic()
+        percent = (cpu - self._cpu) / (now - self._at) * 100 if now > self._at else 0.0
+        self._cpu, self._at = cpu, now
+        return {
+            "rss_kb": int(status.get("VmRSS", 0)),
+            "cpu_percent": round(percent, 1),
+            "threads": int(status.get("Threads", 0)),
+            "fds": len(os.listdir(f"/proc/{self.pid}/fd")),
+        }
+
+
+async def every(seconds: float, stop: asyncio.Event, action):
+    seq = 0
+    while not stop.is_set():
+        seq += 1
+        await action(seq)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def soak(args, mock: MockEnvironment, server: Server) -> dict:
+    loop = asyncio.get_running_loop()
+    # dbus-python calls block; one thread keeps them ordered and off the clients' loop
+    mock_thread = ThreadPoolExecutor(1, thread_name_prefix="mock")
+    call = lambda function, *a: loop.run_in_executor(mock_thread, function, *a)
+    base = f"ws://127.0.0.1:{server.port}"
+
+    channels = [
+        (Channel("spotify-metadata", "/ws/spotify-metadata", title_seq), args.metadata_clients),
+        (Channel("phone-data", "/ws/phone-data", caller_seq), args.phone_clients),
+        (Channel("wifi-scan", "/wifi/ws/scan", ssid_seq), args.scan_clients),
+    ]
+    metadata, phone, scan = (channel for channel, _ in channels)
+    stop = asyncio.Event()
+    tasks = []
+    stats = ProcessStats(server.process.pid)
+    # The idle server's memory, so per-client figures only count what the clients added
+    baseline_rss_kb = stats.sample()["rss_kb"]
+    for channel, count in channels:
+        for _ in range(count):
+            client = Client(channel, base + channel.path)
+            channel.clients.append(client)
+            tasks.append(asyncio.ensure_future(client.run(stop)))
+            await asyncio.sleep(args.ramp / max(1, sum(count for _, count in channels)))
+
+    async def skip(seq):
+        metadata.record_sent(seq)
+        await call(mock.set_track, f"Soak {seq}")
+
+    async def hang_up(path):
+        await asyncio.sleep(args.call_length)
+        await call(mock.end_call, path)
+
+    async def ring(seq):
+        phone.record_sent(seq)
+        path = await call(mock.incoming_call, f"+90999{seq:06d}")
+        tasks.append(asyncio.ensure_future(hang_up(path)))
+
+    async def churn_ap(seq):
+        def update(state):
+            state["access_points"] = [ap for ap in state["access_points"] if not ap["ssid"].startswith("Churn-")]
+            state["access_points"].append({"ssid": f"Churn-{seq}", "signal": 40 + seq % 50, "security": "WPA2",
+                                           "bssid": f"02:00:00:00:{seq // 256 % 256:02x}:{seq % 256:02x}"})
+        scan.record_sent(seq)
+        await call(mock.update_fake_state, update)
+
+    if args.metadata_clients:
+        await call(mock.set_status, "playing")
+        tasks.append(asyncio.ensure_future(every(args.skip_interval, stop, skip)))
+    if args.phone_clients:
+        tasks.append(asyncio.ensure_future(every(args.call_interval, stop, ring)))
+    if args.scan_clients:
+        tasks.append(asyncio.ensure_future(every(args.ap_interval, stop, churn_ap)))
+
+    reports = []
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < args.duration:
+            await asyncio.sleep(min(args.report_interval, args.duration - (time.monotonic() - started)))
+            report = {"elapsed_s": round(time.monotonic() - started), "server": stats.sample()}
+            try:
+                status, body = await loop.run_in_executor(None, server.request, "GET", "/debug/loop", None, 5)
+                lag = json.loads(body)["loop"]["lag"] if status == 200 else {}
+                report["server"]["loop_lag_p99_ms"] = lag.get("p99_ms")
+                report["server"]["loop_lag_max_ms"] = lag.get("max_ms")
+            except (OSError, ValueError, KeyError):
+                report["server"]["loop_lag_p99_ms"] = None  # The loop did not answer within 5s
+            for channel, _ in channels:
+                channel.check_missed(args.deadline)
+                report[channel.name] = channel.take_interval()
+            connected = sum(report[channel.name]["clients"] for channel, _ in channels)
+            report["server"]["rss_baseline_kb"] = baseline_rss_kb
+            report["server"]["rss_per_client_kb"] = (
+                round((report["server"]["rss_kb"] - baseline_rss_kb) / connected, 1) if connected else None)
+            reports.append(report)
+            print_report(report, [channel.name for channel, _ in channels])
+            if args.churn:
+                for channel, _ in channels:
+                    count = int(len(channel.clients) * args.churn)
+                    for client in channel.clients[:count]:
+                        client.reconnect.set()
+                    channel.clients = channel.clients[count:] + channel.clients[:count]  # Next slice next time
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        mock_thread.shutdown()
+    return {"reports": reports, "trend": trend(reports)}
+
+
+def print_report(report: dict, channels: list[str]):
+    server = report["server"]
+    lag = server.get("loop_lag_p99_ms")
+    print(f"[{report['elapsed_s']:>6}s] rss={server['rss_kb'] / 1024:7.1f}MB cpu={server['cpu_percent']:5.1f}% "
+          f"threads={server['threads']:3d} fds={server['fds']:4d} "
+          f"loop p99={'n/a' if lag is None else f'{lag:.1f}ms'}")
+    for name in channels:
+        channel = report[name]
+        latency = channel["latency"]
+        delivered = (f"p50={latency['p50_ms']:7.1f}ms p95={latency['p95_ms']:7.1f}ms p99={latency['p99_ms']:7.1f}ms"
+                     if latency else "no deliveries")
+        print(f"    {name:<17} clients={channel['clients']:4d} sent={channel['sent']:4d} {delivered} "
+              f"missed={channel['missed']} dup={channel['duplicates']} disconnects={channel['disconnects']}")
+    sys.stdout.flush()
+
+
+def trend(reports: list) -> dict:
+    """Change in server resources between the first and last report."""
+    if len(reports) < 2:
+        return {}
+    first, last = reports[0], reports[-1]
+    hours = max(last["elapsed_s"] - first["elapsed_s"], 1) / 3600
+    return {
+        "rss_kb_per_hour": round((last["server"]["rss_kb"] - first["server"]["rss_kb"]) / hours, 1),
+        "threads": [first["server"]["threads"], last["server"]["threads"]],
+        "fds": [first["server"]["fds"], last["server"]["fds"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--metadata-clients", type=int, default=200)
+    parser.add_argument("--phone-clients", type=int, default=50)
+    parser.add_argument("--scan-clients", type=int, default=1,
+                        help="each one runs nmcli scans (--ap-interval should exceed the service's scan time)")
+    parser.add_argument("--duration", type=float, default=600, help="seconds")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds to open all clients over")
+    parser.add_argument("--skip-interval", type=float, default=5.0)
+    parser.add_argument("--call-interval", type=float, default=30.0)
+    parser.add_argument("--call-length", type=float, default=8.0, help="longer than the 3s phone-data poll")
+    parser.add_argument("--ap-interval", type=float, default=60.0)
+    parser.add_argument("--deadline", type=float, default=30.0, help="seconds before an undelivered change is missed")
+    parser.add_argument("--report-interval", type=float, default=60.0)
+    parser.add_argument("--churn", type=float, default=0.0, help="fraction of clients reconnected every report")
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--workdir", help="keep mocks, logs and traces here (default: a new temp dir)")
+    parser.add_argument("--json", help="also write every report and the trend to this file")
+    args = parser.parse_args()
+
+    with MockEnvironment(args.workdir) as mock:
+        print(f"work directory: {mock.workdir}")
+        server = Server(mock.env, mock.workdir, args.port)
+        try:
+            server.wait_ready(args.ready_timeout)
+            result = asyncio.run(soak(args, mock, server))
+        finally:
+            server.stop()
+
+    if result["trend"]:
+        change = result["trend"]
+        print(f"\ntrend: rss {change['rss_kb_per_hour']:+.0f} KB/h, threads {change['threads'][0]} -> "
+              f"{change['threads'][1]}, fds {change['fds'][0]} -> {change['fds'][1]}")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), **result}, indent=2))
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()